@@ -1,11 +1,16 @@
-from flask import Flask, jsonify, request, g
+from flask import Flask, jsonify, request, g, has_request_context, stream_with_context, copy_current_request_context
 from flask_cors import CORS
 import os
 import sys
 import json
+import hashlib
+import base64
 from datetime import datetime, timedelta
 import logging
 import time
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse
 import warnings
 
@@ -37,6 +42,33 @@ except ImportError:
     print("⚠️ python-dotenv not available, using system environment variables only")
 
 from utils.security import sanitize_search_input, validate_item_search_params, validate_spell_search_params, rate_limit_by_ip
+from utils.response_cache import cached_response, get_response_cache
+from utils.item_source_index import get_item_source_index, ITEM_SOURCE_INDEX_ENABLED, AVAILABILITY_FLAGS
+from utils.item_availability import parse_item_ids, batch_availability
+from utils.name_index import get_name_indexes, NAME_INDEX_ENABLED, NAME_INDEX_MAX_IN_IDS
+from utils.search_pagination import (
+    parse_pagination_args, encode_cursor, decode_cursor, keyset_condition,
+    encode_rank_cursor, decode_rank_cursor, rank_cursor_start,
+    resolve_total, get_search_count_cache
+)
+from utils.filter_planner import get_filter_planner, SPELL_CLASS_COLUMNS
+from utils.zone_map_store import get_zone_map_store, PRECOMPRESSED_ENCODINGS
+from utils.zone_map_catalog import get_zone_map_catalog
+from utils.npc_details import load_npc_relations
+from utils.schema_capabilities import get_schema_registry
+from utils.item_tooltips import get_item_tooltip_service
+from utils.recipe_results import get_recipe_result_index, query_primary_results, RECIPE_RESULT_INDEX_ENABLED
+from utils.recipe_graph import get_recipe_graph_manager, RECIPE_GRAPH_ENABLED, RECIPE_TREE_DEFAULT_DEPTH, RECIPE_TREE_MAX_DEPTH
+from utils.zone_summaries import (
+    get_zone_summary_store, fetch_zone_npcs, fetch_zone_items,
+    parse_zone_page_args, zone_page_of, ZONE_SUMMARIES_ENABLED
+)
+from utils.spawn_index import (
+    get_spawn_index_cache, SPAWN_REGION_MAX_RESULTS, SPAWN_NEAREST_MAX_K, SPAWN_INDEX_DATABASE_TTL_SECONDS
+)
+from utils.response_compression import get_response_compressor
+from utils.json_streaming import stream_json_list, streamed_json_response
+from utils.explain_sampler import get_explain_sampler
 
 # Import activity logger if user accounts are enabled
 if os.environ.get('ENABLE_USER_ACCOUNTS', 'false').lower() == 'true':
@@ -255,7 +287,6 @@ if ENABLE_USER_ACCOUNTS:
                     from routes.admin import track_endpoint_metric
                     is_error = response.status_code >= 400
                     status_code = response.status_code if is_error else None
-                    track_endpoint_metric(endpoint_key, response_time, is_error, status_code)
                     error_details = None
                     
                     # Add error details for failed requests
@@ -373,7 +404,12 @@ def load_config():
         'cache_expiry_hours': 24,
         'pricing_cache_expiry_hours': 168,  # 1 week
         'use_production_database': False,
-        'production_database_url': ''
+        'production_database_url': '',
+        # Response compression (see utils/response_compression.py)
+        'compression_enabled': True,
+        'compression_min_size': 1024,
+        'compression_gzip_level': 6,
+        'compression_brotli_quality': 4
     }
     
     try:
@@ -391,6 +427,11 @@ def load_config():
     config['frontend_port'] = int(os.getenv('FRONTEND_PORT', config['frontend_port']))
     config['cache_expiry_hours'] = int(os.getenv('CACHE_EXPIRY_HOURS', config['cache_expiry_hours']))
     config['pricing_cache_expiry_hours'] = int(os.getenv('PRICING_CACHE_EXPIRY_HOURS', config['pricing_cache_expiry_hours']))
+    if os.getenv('COMPRESSION_ENABLED'):
+        config['compression_enabled'] = os.getenv('COMPRESSION_ENABLED').lower() == 'true'
+    config['compression_min_size'] = int(os.getenv('COMPRESSION_MIN_SIZE', config['compression_min_size']))
+    config['compression_gzip_level'] = int(os.getenv('COMPRESSION_GZIP_LEVEL', config['compression_gzip_level']))
+    config['compression_brotli_quality'] = int(os.getenv('COMPRESSION_BROTLI_QUALITY', config['compression_brotli_quality']))
     
     return config
 
@@ -431,6 +472,10 @@ logger = logging.getLogger(__name__)
 # Load configuration
 config = load_config()
 
+# Compress large JSON/text responses per Accept-Encoding
+get_response_compressor().configure(config)
+get_response_compressor().init_app(app)
+
 # Global request tracking for non-OAuth routes
 if not ENABLE_USER_ACCOUNTS:
     @app.before_request
@@ -753,6 +798,58 @@ def cleanup_connections():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+SUGGEST_TYPES = ('items', 'spells', 'npcs', 'zones')
+
+@app.route('/api/suggest', methods=['GET'])
+@exempt_when_limiting
+def suggest_names():
+    """
+    Typeahead suggestions for item, spell, NPC and zone names.
+    
+    Served entirely from the in-memory prefix index - never touches the
+    database, so it is safe to call on every keystroke.
+    
+    Query params:
+        q: Prefix to complete (required)
+        types: Comma-separated subset of items,spells,npcs,zones (default: all)
+        limit: Suggestions per type, 1-25 (default 8)
+    """
+    search_query = sanitize_search_input(request.args.get('q', ''), max_length=100)
+    if not search_query:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+    
+    requested = [t.strip() for t in request.args.get('types', ','.join(SUGGEST_TYPES)).split(',') if t.strip()]
+    invalid = [t for t in requested if t not in SUGGEST_TYPES]
+    if invalid:
+        return jsonify({'error': f"Invalid types: {', '.join(invalid)}"}), 400
+    
+    try:
+        limit = max(1, min(int(request.args.get('limit', 8)), 25))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid limit'}), 400
+    
+    registry = get_name_indexes()
+    ready = registry.ready
+    if not ready and NAME_INDEX_ENABLED and not app.config.get('TESTING'):
+        # Kick off the first build; callers get empty suggestions until it lands
+        version_tag = _content_db_version_tag()
+        if version_tag:
+            ready = registry.ensure_fresh(get_eqemu_db_connection, version_tag)
+    
+    suggestions = {}
+    for suggest_type in requested:
+        index = registry.get_suggest(suggest_type) if ready else None
+        suggestions[suggest_type] = index.suggest(search_query, limit) if index else []
+    
+    response = jsonify({
+        'query': search_query,
+        'ready': ready,
+        'suggestions': suggestions
+    })
+    if ready:
+        response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
+
 @app.route('/api/items/search', methods=['GET'])
 @exempt_when_limiting
 @rate_limit_by_ip(requests_per_minute=60, requests_per_hour=600)  # Liberal limits for normal users
@@ -760,6 +857,12 @@ def search_items():
     """
     Search discovered items in the EQEmu database.
     Only returns items that exist in both items and discovered_items tables.
+    
+    Pagination: offset/limit, or after=<next_cursor of the previous page>.
+    Cursors are keyset <name,id> pairs, or rank:<position,id> when a name-only
+    search is paged in name index rank order. count=estimated (default) reuses a
+    cached total for repeated searches, count=exact always counts and
+    count=none skips the total.
     """
     app.logger.info("=== ITEM SEARCH START ===")
     conn = None
@@ -787,135 +890,66 @@ def search_items():
         if not search_query and not filters:
             return jsonify({'error': 'Search query or filters required'}), 400
         
+        try:
+            count_mode, after = parse_pagination_args(request.args)
+            rank_key = decode_rank_cursor(after)
+            after_key = decode_cursor(after) if after and not rank_key else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         cursor = conn.cursor()
         
         # Build WHERE clause and parameters
         where_conditions = []
         query_params = []
         
+        # Resolve name matches from the in-memory index when it's built
+        ranked_ids = search_name_index('items', search_query)
+        
         # Add search query condition if present
         if search_query:
-            where_conditions.append("items.Name LIKE %s")
-            query_params.append(f'%{search_query}%')
+            if ranked_ids is not None:
+                id_clause, id_params = _id_in_clause('items.id', ranked_ids)
+                where_conditions.append(id_clause)
+                query_params.extend(id_params)
+            else:
+                where_conditions.append("items.Name LIKE %s")
+                query_params.append(f'%{search_query}%')
         
-        # Add filter conditions
-        for filter_item in filters:
-            field = filter_item['field']
-            operator = filter_item['operator']
-            value = filter_item.get('value')
-            
-            # Map frontend field names to database column names
-            field_mapping = {
-                'name': 'items.Name',
-                'ac': 'items.ac',
-                'hp': 'items.hp',
-                'mana': 'items.mana',
-                'str': 'items.astr',
-                'sta': 'items.asta',
-                'agi': 'items.aagi',
-                'dex': 'items.adex',
-                'wis': 'items.awis',
-                'int': 'items.aint',
-                'cha': 'items.acha',
-                'weight': 'items.weight',
-                'damage': 'items.damage',
-                'delay': 'items.delay',
-                'magic': 'items.magic',
-                'nodrop': 'items.nodrop',
-                'norent': 'items.norent',
-                'classes': 'items.classes',
-                'races': 'items.races',
-                'reqlevel': 'items.reqlevel',
-                'stackable': 'items.stackable',
-                'stacksize': 'items.stacksize',
-                'icon': 'items.icon',
-                'price': 'items.price',
-                'size': 'items.size',
-                'mr': 'items.mr',
-                'fr': 'items.fr',
-                'cr': 'items.cr',
-                'dr': 'items.dr',
-                'pr': 'items.pr',
-                'reclevel': 'items.reclevel',
-                'lore_flag': 'items.loregroup',
-                'lore': 'items.lore',
-                'loretext': 'items.lore',  # Map loretext to lore column
-                'clickeffect': 'items.clickeffect',
-                'proceffect': 'items.proceffect',
-                'worneffect': 'items.worneffect',
-                'focuseffect': 'items.focuseffect',
-                'slots': 'items.slots'
-            }
-            
-            db_field = field_mapping.get(field, f'items.{field}')
-            
-            # Build condition based on operator
-            if operator == 'contains':
-                where_conditions.append(f"{db_field} LIKE %s")
-                query_params.append(f'%{value}%')
-            elif operator == 'equals':
-                where_conditions.append(f"{db_field} = %s")
-                query_params.append(value)
-            elif operator == 'not equals':
-                where_conditions.append(f"{db_field} != %s")
-                query_params.append(value)
-            elif operator == 'greater than':
-                where_conditions.append(f"{db_field} > %s")
-                query_params.append(value)
-            elif operator == 'less than':
-                where_conditions.append(f"{db_field} < %s")
-                query_params.append(value)
-            elif operator == 'between':
-                if isinstance(value, list) and len(value) == 2:
-                    where_conditions.append(f"{db_field} BETWEEN %s AND %s")
-                    query_params.extend([value[0], value[1]])
-            elif operator == 'is':
-                # For boolean fields
-                if field in ['magic', 'nodrop', 'norent']:
-                    # Convert boolean to int (0 or 1)
-                    bool_value = 1 if value else 0
-                    # Note: nodrop and norent are inverted in the database (0=True, 1=False)
-                    if field in ['nodrop', 'norent']:
-                        bool_value = 0 if value else 1
-                    where_conditions.append(f"{db_field} = %s")
-                    query_params.append(bool_value)
-                elif field == 'lore_flag':
-                    # loregroup: 0 = not lore, non-zero = lore
-                    if value:
-                        where_conditions.append(f"{db_field} != 0")
-                    else:
-                        where_conditions.append(f"{db_field} = 0")
-            elif operator == 'exists':
-                # For effect fields
-                if value:
-                    where_conditions.append(f"{db_field} IS NOT NULL AND {db_field} != 0 AND {db_field} != -1")
-                else:
-                    where_conditions.append(f"({db_field} IS NULL OR {db_field} = 0 OR {db_field} = -1)")
-            elif operator == 'includes' and field == 'slots':
-                # Bitwise AND for slot checking
-                where_conditions.append(f"({db_field} & %s) != 0")
-                query_params.append(value)
-            elif operator == 'starts with':
-                where_conditions.append(f"{db_field} LIKE %s")
-                query_params.append(f'{value}%')
-            elif operator == 'ends with':
-                where_conditions.append(f"{db_field} LIKE %s")
-                query_params.append(f'%{value}')
+        # Add filter conditions (compiled, range-collapsed and selectivity-ordered)
+        filter_plan = get_filter_planner().plan(filters, 'item')
+        if filter_plan.sql:
+            where_conditions.append(filter_plan.sql)
+            query_params.extend(filter_plan.params)
         
         # Combine all WHERE conditions
         where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
         
         # Build queries with dynamic WHERE clause
-        # First get count
-        count_query = f"""
-            SELECT COUNT(*) AS total_count
-            FROM items 
-            INNER JOIN discovered_items di ON items.id = di.item_id
-            WHERE {where_clause}
-        """
-        cursor.execute(count_query, query_params)
-        result = cursor.fetchone()
-        total_count = result['total_count'] if isinstance(result, dict) else result[0]
+        page_ids = None
+        if rank_key and ranked_ids is None:
+            # The index went away mid-paging; continue by position in name order
+            offset = rank_key[0]
+        page_offset = None if after_key else offset
+        # A keyset cursor keeps paging in name order even if the index is ready now
+        if ranked_ids is not None and not filters and not after_key:
+            # Name-only search: the index already knows the total and the ranked page
+            start = rank_cursor_start(ranked_ids, *rank_key) if rank_key else offset
+            page_ids = ranked_ids[start:start + limit]
+            page_where, items_params = _id_in_clause('items.id', page_ids)
+            page_tail = ""
+        else:
+            page_where = where_clause
+            items_params = list(query_params)
+            if after_key:
+                keyset_clause, keyset_params = keyset_condition(['items.Name', 'items.id'], list(after_key))
+                page_where = f"{where_clause} AND {keyset_clause}"
+                items_params.extend(keyset_params)
+                page_tail = "ORDER BY items.Name, items.id LIMIT %s"
+                items_params.append(limit)
+            else:
+                page_tail = "ORDER BY items.Name, items.id LIMIT %s OFFSET %s"
+                items_params.extend([limit, offset])
         
         # Then get items
         items_query = f"""
@@ -962,12 +996,9 @@ def search_items():
                 items.focuseffect
             FROM items 
             INNER JOIN discovered_items di ON items.id = di.item_id
-            WHERE {where_clause}
-            ORDER BY items.Name
-            LIMIT %s OFFSET %s
+            WHERE {page_where}
+            {page_tail}
         """
-        # Add limit and offset to params
-        items_params = query_params + [limit, offset]
         
         # Execute with timeout protection
         try:
@@ -983,6 +1014,37 @@ def search_items():
             raise Exception("Database query failed - connection may have timed out")
             
         items = cursor.fetchall()
+        get_filter_planner().record(filter_plan, query_time, cursor, items_query, items_params)
+        if page_ids is not None:
+            items = _order_rows_by_ids(items, page_ids)
+        
+        def count_items():
+            count_query = f"""
+                SELECT COUNT(*) AS total_count
+                FROM items 
+                INNER JOIN discovered_items di ON items.id = di.item_id
+                WHERE {where_clause}
+            """
+            cursor.execute(count_query, query_params)
+            result = cursor.fetchone()
+            return result['total_count'] if isinstance(result, dict) else result[0]
+        
+        if ranked_ids is not None and not filters:
+            total_count, total_is_estimate = len(ranked_ids), False
+        else:
+            total_count, total_is_estimate = resolve_total(
+                count_mode,
+                get_search_count_cache().make_key('items', search_query, filters),
+                len(items), page_offset, limit, count_items
+            )
+        
+        next_cursor = None
+        if page_ids is not None:
+            if start + limit < len(ranked_ids):
+                next_cursor = encode_rank_cursor(start + limit, page_ids[-1])
+        elif len(items) == limit:
+            last = items[-1]
+            next_cursor = encode_cursor(*((last['Name'], last['id']) if isinstance(last, dict) else (last[1], last[0])))
         
         # Convert to response format
         items_list = []
@@ -1150,6 +1212,9 @@ def search_items():
         return jsonify({
             'items': items_list,
             'total_count': total_count,
+            'total_is_estimate': total_is_estimate,
+            'count_mode': count_mode,
+            'next_cursor': next_cursor,
             'limit': limit,
             'offset': offset,
             'search_query': search_query,
@@ -1182,6 +1247,9 @@ def search_spells():
     """
     Search spells in the EQEmu database.
     Searches the spells_new table for spells matching the criteria.
+    
+    Supports the same count modes as item search; keyset cursors are
+    after=<level,name,id> because spells sort by level first.
     """
     app.logger.info("=== SPELL SEARCH START ===")
     conn = None
@@ -1209,169 +1277,75 @@ def search_spells():
         if not search_query and not filters:
             return jsonify({'error': 'Search query or filters required'}), 400
         
+        try:
+            count_mode, after = parse_pagination_args(request.args)
+            after_key = decode_cursor(after, leading_int=True) if after else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         cursor = conn.cursor()
         
         
         # Build WHERE clause and parameters
         where_conditions = []
         query_params = []
+        ranked_ids = None
         
-        # Add search query condition if present
+        # Add search query condition if present (in-memory name index when built)
         if search_query:
-            where_conditions.append("name LIKE %s")
-            query_params.append(f'%{search_query}%')
+            ranked_ids = search_name_index('spells', search_query)
+            if ranked_ids is not None:
+                id_clause, id_params = _id_in_clause('id', ranked_ids)
+                where_conditions.append(id_clause)
+                query_params.extend(id_params)
+            else:
+                where_conditions.append("name LIKE %s")
+                query_params.append(f'%{search_query}%')
         
-        # Add filter conditions
-        for filter_item in filters:
-            field = filter_item['field']
-            operator = filter_item['operator']
-            value = filter_item.get('value')
-            
-            # Map frontend field names to database column names
-            field_mapping = {
-                'name': 'spells_new.name',
-                'mana': 'spells_new.mana',
-                'cast_time': 'spells_new.cast_time',
-                'range': 'spells_new.range',
-                'targettype': 'spells_new.targettype',
-                'skill': 'spells_new.skill',
-                'resisttype': 'spells_new.resisttype',
-                'spell_category': 'spells_new.spell_category',
-                'buffduration': 'spells_new.buffduration',
-                'deities': 'spells_new.deities',
-                # Class level requirements
-                'warrior_level': 'spells_new.classes1',
-                'cleric_level': 'spells_new.classes2',
-                'paladin_level': 'spells_new.classes3',
-                'ranger_level': 'spells_new.classes4',
-                'shadowknight_level': 'spells_new.classes5',
-                'druid_level': 'spells_new.classes6',
-                'monk_level': 'spells_new.classes7',
-                'bard_level': 'spells_new.classes8',
-                'rogue_level': 'spells_new.classes9',
-                'shaman_level': 'spells_new.classes10',
-                'necromancer_level': 'spells_new.classes11',
-                'wizard_level': 'spells_new.classes12',
-                'magician_level': 'spells_new.classes13',
-                'enchanter_level': 'spells_new.classes14',
-                'beastlord_level': 'spells_new.classes15',
-                'berserker_level': 'spells_new.classes16',
-                # Spell effects
-                'effect1': 'spells_new.effectid1',
-                'effect2': 'spells_new.effectid2',
-                'effect3': 'spells_new.effectid3',
-                'effect4': 'spells_new.effectid4',
-                'effect5': 'spells_new.effectid5',
-                'effect6': 'spells_new.effectid6',
-                'effect7': 'spells_new.effectid7',
-                'effect8': 'spells_new.effectid8',
-                'effect9': 'spells_new.effectid9',
-                'effect10': 'spells_new.effectid10',
-                'effect11': 'spells_new.effectid11',
-                'effect12': 'spells_new.effectid12',
-                # Components
-                'component1': 'spells_new.components1',
-                'component2': 'spells_new.components2',
-                'component3': 'spells_new.components3',
-                'component4': 'spells_new.components4'
-            }
-            
-            db_field = field_mapping.get(field, f'spells_new.{field}')
-            
-            # Build condition based on operator
-            if operator == 'contains':
-                where_conditions.append(f"{db_field} LIKE %s")
-                query_params.append(f'%{value}%')
-            elif operator == 'equals':
-                where_conditions.append(f"{db_field} = %s")
-                query_params.append(value)
-            elif operator == 'not equals':
-                where_conditions.append(f"{db_field} != %s")
-                query_params.append(value)
-            elif operator == 'greater than':
-                where_conditions.append(f"{db_field} > %s")
-                query_params.append(value)
-            elif operator == 'less than':
-                where_conditions.append(f"{db_field} < %s")
-                query_params.append(value)
-            elif operator == 'between':
-                if isinstance(value, list) and len(value) == 2:
-                    where_conditions.append(f"{db_field} BETWEEN %s AND %s")
-                    query_params.extend([value[0], value[1]])
-            elif operator == 'exists':
-                # For effect fields and components
-                if value:
-                    where_conditions.append(f"{db_field} IS NOT NULL AND {db_field} != 0 AND {db_field} != -1")
-                else:
-                    where_conditions.append(f"({db_field} IS NULL OR {db_field} = 0 OR {db_field} = -1)")
-            elif operator == 'class_can_use':
-                # Special operator for class level requirements (255 = cannot use)
-                if value:
-                    where_conditions.append(f"{db_field} != 255")
-                else:
-                    where_conditions.append(f"{db_field} = 255")
-            elif operator == 'starts with':
-                where_conditions.append(f"{db_field} LIKE %s")
-                query_params.append(f'{value}%')
-            elif operator == 'ends with':
-                where_conditions.append(f"{db_field} LIKE %s")
-                query_params.append(f'%{value}')
+        # Add filter conditions (compiled, range-collapsed and selectivity-ordered)
+        filter_plan = get_filter_planner().plan(filters, 'spell')
+        if filter_plan.sql:
+            where_conditions.append(filter_plan.sql)
+            query_params.extend(filter_plan.params)
         
         # Detect if a specific class level filter is being used for sorting
         class_field_for_sorting = None
-        class_to_column_map = {
-            'warrior_level': 'classes1',
-            'cleric_level': 'classes2', 
-            'paladin_level': 'classes3',
-            'ranger_level': 'classes4',
-            'shadowknight_level': 'classes5',
-            'druid_level': 'classes6',
-            'monk_level': 'classes7',
-            'bard_level': 'classes8',
-            'rogue_level': 'classes9',
-            'shaman_level': 'classes10',
-            'necromancer_level': 'classes11',
-            'wizard_level': 'classes12',
-            'magician_level': 'classes13',
-            'enchanter_level': 'classes14',
-            'beastlord_level': 'classes15',
-            'berserker_level': 'classes16'
-        }
         
         # Look for class level filters to determine sorting column
         for filter_item in filters:
             field = filter_item['field']
-            if field in class_to_column_map:
-                class_field_for_sorting = class_to_column_map[field]
+            if field in SPELL_CLASS_COLUMNS:
+                class_field_for_sorting = SPELL_CLASS_COLUMNS[field]
                 app.logger.info(f"Using {field} ({class_field_for_sorting}) for sorting")
                 break
         
         # Combine all WHERE conditions
         where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
         
-        # Build queries with dynamic WHERE clause
-        # First get count - with a reasonable limit to prevent full table scans
-        count_query = f"""
-            SELECT COUNT(*) AS total_count
-            FROM (
-                SELECT 1 FROM spells_new
-                WHERE {where_clause}
-                LIMIT 10000
-            ) AS limited_count
-        """
-        app.logger.info(f"Executing spell count query")
-        count_start = time.time()
-        try:
-            cursor.execute(count_query, query_params)
-            count_time = (time.time() - count_start) * 1000
-            app.logger.info(f"Spell count query completed in {count_time:.2f}ms")
-            result = cursor.fetchone()
-            total_count = result['total_count'] if isinstance(result, dict) else result[0]
-            app.logger.info(f"Found {total_count} spells matching criteria")
-        except Exception as e:
-            app.logger.error(f"Count query failed: {e}")
-            # If count fails, just set a high number and continue
-            total_count = 9999
+        def count_spells():
+            if ranked_ids is not None and not filters:
+                return len(ranked_ids)
+            # Capped to prevent full table scans
+            count_query = f"""
+                SELECT COUNT(*) AS total_count
+                FROM (
+                    SELECT 1 FROM spells_new
+                    WHERE {where_clause}
+                    LIMIT 10000
+                ) AS limited_count
+            """
+            app.logger.info(f"Executing spell count query")
+            count_start = time.time()
+            try:
+                cursor.execute(count_query, query_params)
+                count_time = (time.time() - count_start) * 1000
+                app.logger.info(f"Spell count query completed in {count_time:.2f}ms")
+                result = cursor.fetchone()
+                return result['total_count'] if isinstance(result, dict) else result[0]
+            except Exception as e:
+                app.logger.error(f"Count query failed: {e}")
+                # If count fails, just set a high number and continue
+                return 9999
         
         # Determine sorting column - use specific class if filtered, otherwise minimum level
         if class_field_for_sorting:
@@ -1396,6 +1370,19 @@ def search_spells():
                 CASE WHEN classes16 = 255 THEN 999 ELSE classes16 END
             )"""
         
+        # Continue after the cursor row, or fall back to offset paging
+        page_where = where_clause
+        spells_params = list(query_params)
+        if after_key:
+            keyset_clause, keyset_params = keyset_condition([sort_column, 'name', 'id'], list(after_key))
+            page_where = f"{where_clause} AND {keyset_clause}"
+            spells_params.extend(keyset_params)
+            page_limit = "LIMIT %s"
+            spells_params.append(limit)
+        else:
+            page_limit = "LIMIT %s OFFSET %s"
+            spells_params.extend([limit, offset])
+        
         # Then get spells - reduce columns for better performance
         spells_query = f"""
             SELECT 
@@ -1412,12 +1399,10 @@ def search_spells():
                 icon, new_icon,
                 {sort_column} AS sort_level
             FROM spells_new
-            WHERE {where_clause}
-            ORDER BY sort_level ASC, name ASC
-            LIMIT %s OFFSET %s
+            WHERE {page_where}
+            ORDER BY sort_level ASC, name ASC, id ASC
+            {page_limit}
         """
-        # Add limit and offset to params
-        spells_params = query_params + [limit, offset]
         
         # Execute spell search query with timeout protection
         try:
@@ -1433,6 +1418,21 @@ def search_spells():
             raise Exception("Database query failed - connection may have timed out")
             
         spells = cursor.fetchall()
+        get_filter_planner().record(filter_plan, query_time, cursor, spells_query, spells_params)
+        
+        total_count, total_is_estimate = resolve_total(
+            count_mode,
+            get_search_count_cache().make_key('spells', search_query, filters),
+            len(spells), None if after_key else offset, limit, count_spells
+        )
+        
+        next_cursor = None
+        if len(spells) == limit:
+            last = spells[-1]
+            if isinstance(last, dict):
+                next_cursor = encode_cursor(_safe_int(last.get('sort_level')), last['name'], last['id'])
+            else:
+                next_cursor = encode_cursor(_safe_int(last[-1]), last[1], last[0])
         
         # Convert to response format with reduced columns
         spells_list = []
@@ -1587,6 +1587,9 @@ def search_spells():
         return jsonify({
             'spells': spells_list,
             'total_count': total_count,
+            'total_is_estimate': total_is_estimate,
+            'count_mode': count_mode,
+            'next_cursor': next_cursor,
             'limit': limit,
             'offset': offset,
             'search_query': search_query,
@@ -1615,6 +1618,7 @@ def search_spells():
 @app.route('/api/spells/<spell_id>/details', methods=['GET'])
 @exempt_when_limiting
 @rate_limit_by_ip(requests_per_minute=120, requests_per_hour=1200)  # Higher limits for single spell lookup
+@cached_response()
 def get_spell_details(spell_id):
     """
     Get detailed information for a specific spell by ID.
@@ -1864,12 +1868,19 @@ def get_spell_details(spell_id):
 
 @app.route('/api/spells/<spell_id>/items', methods=['GET'])
 @rate_limit_by_ip(requests_per_minute=30, requests_per_hour=300)
+@cached_response()
 def get_items_with_spell(spell_id):
     """
     Get discovered items that contain the specified spell as a scroll effect, click effect, proc effect, 
     worn effect, focus effect, or bard effect.
     Only returns items that exist in both items and discovered_items tables.
+    
+    The rows are fetched and the connection released before the formatted
+    list is streamed, so a client that never reads the body can't hold a
+    pooled connection.
     """
+    conn = None
+    cursor = None
     try:
         spell_id_int = int(spell_id)
         app.logger.info(f"Getting items with spell ID: {spell_id_int}")
@@ -1882,102 +1893,73 @@ def get_items_with_spell(spell_id):
         
         cursor = conn.cursor()
         
-        try:
-            # Check if required tables exist
-            cursor.execute("SHOW TABLES LIKE 'items'")
-            if not cursor.fetchone():
-                app.logger.warning("Items table not available in this database")
-                return jsonify({'items': [], 'message': 'Item data not available in this database'})
-            
-            cursor.execute("SHOW TABLES LIKE 'discovered_items'")
-            if not cursor.fetchone():
-                app.logger.warning("Discovered_items table not available in this database")
-                return jsonify({'items': [], 'message': 'Discovered items data not available in this database'})
-            
-            # Query for discovered items that have this spell in any spell effect field
-            # Only include items that exist in both items and discovered_items tables
-            query = """
-                SELECT DISTINCT
-                    items.id,
-                    items.name,
-                    items.icon,
-                    items.scrolleffect,
-                    items.clickeffect,
-                    items.proceffect,
-                    items.worneffect,
-                    items.focuseffect,
-                    items.bardeffect
-                FROM items
-                INNER JOIN discovered_items di ON items.id = di.item_id
-                WHERE items.scrolleffect = %s
-                   OR items.clickeffect = %s
-                   OR items.proceffect = %s
-                   OR items.worneffect = %s
-                   OR items.focuseffect = %s
-                   OR items.bardeffect = %s
-                ORDER BY items.name ASC
-                LIMIT 1000
-            """
-            
-            cursor.execute(query, (spell_id_int, spell_id_int, spell_id_int, spell_id_int, spell_id_int, spell_id_int))
-            results = cursor.fetchall()
-            app.logger.debug(f"Discovered items with spell {spell_id_int} query returned {len(results)} results")
-            
-            if not results:
-                return jsonify({'items': [], 'total_count': 0})
-            
-            # Format results
-            items = []
-            for row in results:
+        # Check if required tables exist
+        capabilities = get_schema_capabilities(conn, db_type)
+        if not capabilities.has('items'):
+            app.logger.warning("Items table not available in this database")
+            return jsonify({'items': [], 'message': 'Item data not available in this database'})
+        
+        if not capabilities.has('discovered_items'):
+            app.logger.warning("Discovered_items table not available in this database")
+            return jsonify({'items': [], 'message': 'Discovered items data not available in this database'})
+        
+        # Query for discovered items that have this spell in any spell effect field
+        # Only include items that exist in both items and discovered_items tables
+        query = """
+            SELECT DISTINCT
+                items.id,
+                items.name,
+                items.icon,
+                items.scrolleffect,
+                items.clickeffect,
+                items.proceffect,
+                items.worneffect,
+                items.focuseffect,
+                items.bardeffect
+            FROM items
+            INNER JOIN discovered_items di ON items.id = di.item_id
+            WHERE items.scrolleffect = %s
+               OR items.clickeffect = %s
+               OR items.proceffect = %s
+               OR items.worneffect = %s
+               OR items.focuseffect = %s
+               OR items.bardeffect = %s
+            ORDER BY items.name ASC
+            LIMIT 1000
+        """
+        
+        cursor.execute(query, (spell_id_int, spell_id_int, spell_id_int, spell_id_int, spell_id_int, spell_id_int))
+        
+        rows = cursor.fetchall()
+        cursor.close()
+        conn.close()
+        cursor = conn = None
+        app.logger.debug(f"Found {len(rows)} discovered items with spell ID: {spell_id_int}")
+        
+        effect_columns = ('scrolleffect', 'clickeffect', 'proceffect', 'worneffect', 'focuseffect', 'bardeffect')
+        effect_names = ('scroll', 'click', 'proc', 'worn', 'focus', 'bard')
+        
+        def format_rows():
+            for row in rows:
                 # Handle both dict and tuple results
                 if isinstance(row, dict):
-                    item_id, name, icon, scrolleffect, clickeffect, proceffect, worneffect, focuseffect, bardeffect = (
-                        row['id'], row['name'], row['icon'], row['scrolleffect'], 
-                        row['clickeffect'], row['proceffect'], row['worneffect'], 
-                        row['focuseffect'], row['bardeffect']
-                    )
+                    item_id, name, icon = row['id'], row['name'], row['icon']
+                    effects = [row[column] for column in effect_columns]
                 else:
-                    # Tuple format
-                    item_id, name, icon, scrolleffect, clickeffect, proceffect, worneffect, focuseffect, bardeffect = row
-                
-                # Determine which effect type(s) match
-                effect_types = []
-                if scrolleffect == spell_id_int:
-                    effect_types.append('scroll')
-                if clickeffect == spell_id_int:
-                    effect_types.append('click')
-                if proceffect == spell_id_int:
-                    effect_types.append('proc')
-                if worneffect == spell_id_int:
-                    effect_types.append('worn')
-                if focuseffect == spell_id_int:
-                    effect_types.append('focus')
-                if bardeffect == spell_id_int:
-                    effect_types.append('bard')
-                
-                items.append({
+                    item_id, name, icon = row[:3]
+                    effects = row[3:9]
+                yield {
                     'id': item_id,
                     'name': name.replace('_', ' ') if name else 'Unknown Item',
                     'icon': icon or 0,
-                    'effect_types': effect_types
-                })
-            
-            app.logger.info(f"Found {len(items)} discovered items with spell ID: {spell_id_int}")
-            
-            return jsonify({
-                'items': items,
-                'total_count': len(items),
-                'spell_id': spell_id_int
-            })
-            
-        except Exception as e:
-            app.logger.error(f"Error querying items with spell: {e}")
-            import traceback
-            app.logger.error(f"Traceback: {traceback.format_exc()}")
-            return jsonify({'error': f'Failed to query items with spell: {str(e)}'}), 500
-            
-        finally:
-            cursor.close()
+                    # Which effect type(s) match
+                    'effect_types': [effect for effect, value in zip(effect_names, effects) if value == spell_id_int]
+                }
+        
+        return streamed_json_response(stream_json_list(
+            {'spell_id': spell_id_int}, 'items', format_rows(),
+            tail=lambda: {'total_count': len(rows)}
+        ))
             
     except ValueError:
         app.logger.error(f"Invalid spell ID: {spell_id}")
@@ -1989,10 +1971,15 @@ def get_items_with_spell(spell_id):
         return jsonify({'error': f'Failed to get items with spell: {str(e)}'}), 500
         
     finally:
+        if cursor:
+            try:
+                cursor.close()
+            except Exception:
+                pass
         if conn:
             try:
                 conn.close()
-            except:
+            except Exception:
                 pass
 
 
@@ -2202,14 +2189,29 @@ config_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__fil
 db_config_manager = DatabaseConfigManager(config_path)
 
 # Force initial load to ensure we get persistent config
-db_config_manager.get_config()
+_initial_db_config = db_config_manager.get_config() or {}
 logger.info("Database config manager initialized")
 
+# Tie cached content responses to the configured content database
+get_response_cache().set_version_tag(_initial_db_config.get('production_database_url', ''))
+
 # Add callback to close pool when config changes
 def on_db_config_change():
-    """Close connection pool when database config changes."""
+    """Close connection pools when database config changes."""
     logger.info("Database configuration changed, closing connection pool")
     close_connection_pool()
+    from utils.content_db_manager import get_content_db_manager
+    get_content_db_manager().close()
+    get_response_cache().invalidate_all()
+    get_item_source_index().invalidate()
+    get_name_indexes().invalidate()
+    get_search_count_cache().invalidate_all()
+    get_schema_registry().invalidate()
+    get_item_tooltip_service().invalidate_all()
+    get_recipe_result_index().invalidate()
+    get_recipe_graph_manager().invalidate()
+    get_zone_summary_store().invalidate()
+    get_spawn_index_cache().invalidate_all()
 
 db_config_manager.add_reload_callback(on_db_config_change)
 
@@ -2318,28 +2320,27 @@ def initialize_database_connection(max_retries=3, initial_delay=2):
 
 # Helper function for EQEmu database connection
 def get_eqemu_db_connection():
-    """Get connection to the configured EQEmu database with automatic reconnection.
+    """Get a pooled connection to the configured EQEmu database.
     
-    WARNING: This function returns a raw connection for backward compatibility.
-    Callers MUST close the connection when done to avoid connection leaks!
+    Connections come from the shared pool owned by ContentDatabaseManager.
+    Callers MUST still call conn.close() when done - that returns the
+    connection to the pool rather than closing the socket.
     
     Consider refactoring to use context managers instead.
+    
+    Inside a shared_content_connection() block every call returns the same
+    borrowed connection (whose close() is a no-op) instead of a new one.
     """
     from utils.content_db_manager import get_content_db_manager
-    from utils.database_connectors import get_database_connector
+    
+    shared = g.get('shared_content_connection') if has_request_context() else None
+    if shared is not None and shared.get('conn') is not None:
+        return _SharedConnection(shared['conn']), shared['db_type'], None
     
     try:
         # Get the content database manager
         manager = get_content_db_manager()
         
-        # Get connection status for logging
-        status = manager.get_connection_status()
-        app.logger.debug(f"Content DB status: connected={status['connected']}, "
-                        f"pool_active={status['pool_active']}, "
-                        f"db_type={status['database_type']}")
-        
-        # For backward compatibility, create a direct connection
-        # This avoids the pooling complexity but ensures connections are closed
         config = db_config_manager.get_config()
         database_url = config.get('production_database_url', '')
         
@@ -2377,14 +2378,131 @@ def get_eqemu_db_connection():
                 'timeout': 5            # 5 second timeout for MSSQL
             })
         
-        # Create direct connection with timeout
-        conn = get_database_connector(db_type, db_config)
+        # Borrow from the shared pool (waits up to the pool timeout when exhausted)
+        conn = manager.acquire(db_type, db_config)
+        if shared is not None:
+            shared.update(conn=conn, db_type=db_type)
+            return _SharedConnection(conn), db_type, None
         return conn, db_type, None
         
     except Exception as e:
         app.logger.error(f"Failed to get database connection: {e}")
         return None, None, str(e)
 
+# Slow content queries are explained on pooled connections (when QUERY_EXPLAIN_SAMPLING=true)
+get_explain_sampler().set_connection_factory(get_eqemu_db_connection)
+
+def _content_db_version_tag():
+    """Identify the configured content database (None if not configured)."""
+    database_url = db_config_manager.get_config().get('production_database_url', '')
+    if not database_url:
+        return None
+    return hashlib.sha1(database_url.encode('utf-8')).hexdigest()[:12]
+
+def get_schema_capabilities(conn, db_type='mysql'):
+    """Get the content database's schema capabilities.
+    
+    The schema is introspected once per content database config; after that
+    capabilities.has('table') / has('table', 'column') never touch the database.
+    """
+    return get_schema_registry().get(conn, _content_db_version_tag(), db_type)
+
+def get_ready_item_source_index():
+    """Get the precomputed item source index if it can serve lookups.
+    
+    Returns None (so callers fall back to live queries) while the index is
+    missing or being built; a background build is started when needed.
+    """
+    if not ITEM_SOURCE_INDEX_ENABLED or app.config.get('TESTING'):
+        return None
+    try:
+        version_tag = _content_db_version_tag()
+        if not version_tag:
+            return None
+        index = get_item_source_index()
+        return index if index.ensure_fresh(get_eqemu_db_connection, version_tag) else None
+    except Exception as e:
+        app.logger.warning(f"Item source index unavailable: {e}")
+        return None
+
+def get_ready_recipe_result_index():
+    """Get the precomputed recipe -> primary result table if it can serve lookups.
+    
+    Returns None while it is missing or being built (a background build is
+    started when needed); callers then query results for their recipes directly.
+    """
+    if not RECIPE_RESULT_INDEX_ENABLED or app.config.get('TESTING'):
+        return None
+    try:
+        version_tag = _content_db_version_tag()
+        if not version_tag:
+            return None
+        index = get_recipe_result_index()
+        return index if index.ensure_fresh(get_eqemu_db_connection, version_tag) else None
+    except Exception as e:
+        app.logger.warning(f"Recipe result index unavailable: {e}")
+        return None
+
+def get_ready_recipe_graph():
+    """Get the in-memory recipe graph if built (None while it is building)."""
+    if not RECIPE_GRAPH_ENABLED or app.config.get('TESTING'):
+        return None
+    try:
+        version_tag = _content_db_version_tag()
+        if not version_tag:
+            return None
+        manager = get_recipe_graph_manager()
+        return manager.graph if manager.ensure_fresh(get_eqemu_db_connection, version_tag) else None
+    except Exception as e:
+        app.logger.warning(f"Recipe graph unavailable: {e}")
+        return None
+
+def get_ready_zone_summaries():
+    """Get the zone summary store if its artifacts can serve zone lists (None while building)."""
+    if not ZONE_SUMMARIES_ENABLED or app.config.get('TESTING'):
+        return None
+    try:
+        version_tag = _content_db_version_tag()
+        if not version_tag:
+            return None
+        store = get_zone_summary_store()
+        return store if store.ensure_fresh(get_eqemu_db_connection, version_tag) else None
+    except Exception as e:
+        app.logger.warning(f"Zone summaries unavailable: {e}")
+        return None
+
+def get_ready_name_index(kind):
+    """Get the in-memory name index for 'items', 'spells' or 'npcs' if built.
+    
+    Like get_ready_item_source_index(), returns None while building so
+    searches fall back to SQL LIKE.
+    """
+    if not NAME_INDEX_ENABLED or app.config.get('TESTING'):
+        return None
+    try:
+        version_tag = _content_db_version_tag()
+        if not version_tag:
+            return None
+        registry = get_name_indexes()
+        if not registry.ensure_fresh(get_eqemu_db_connection, version_tag):
+            return None
+        return registry.get(kind)
+    except Exception as e:
+        app.logger.warning(f"Name index unavailable: {e}")
+        return None
+
+def search_name_index(kind, search_query):
+    """Ranked ids matching search_query, or None when the SQL LIKE path should be used."""
+    if not search_query:
+        return None
+    index = get_ready_name_index(kind)
+    if index is None:
+        return None
+    ids = index.search(search_query)
+    if len(ids) > NAME_INDEX_MAX_IN_IDS:
+        return None
+    return ids
+
 # Context manager for safe database connections
 from contextlib import contextmanager
 
@@ -2408,6 +2526,50 @@ def safe_db_connection():
             except Exception as e:
                 app.logger.warning(f"Error closing database connection: {e}")
 
+class _SharedConnection:
+    """Connection handed out inside shared_content_connection(); close() is a no-op."""
+    
+    def __init__(self, conn):
+        self._conn = conn
+    
+    def close(self):
+        pass
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+@contextmanager
+def shared_content_connection():
+    """Make every content DB query in this request block reuse one pooled connection.
+    
+    The connection is borrowed lazily on the first get_eqemu_db_connection()
+    call and returned to the pool when the block exits. Not for use across
+    threads: worker threads get their own app context and connections.
+    """
+    previous = g.get('shared_content_connection')
+    g.shared_content_connection = shared = {}
+    try:
+        yield
+    finally:
+        g.shared_content_connection = previous
+        if shared.get('conn') is not None:
+            try:
+                shared['conn'].close()
+            except Exception as e:
+                app.logger.warning(f"Error closing shared database connection: {e}")
+
+def _id_in_clause(column, ids):
+    """Build an `IN (...)` condition for a list of ids (matches nothing when empty)."""
+    if not ids:
+        return "1=0", []
+    placeholders = ', '.join(['%s'] * len(ids))
+    return f"{column} IN ({placeholders})", list(ids)
+
+def _order_rows_by_ids(rows, ids, key='id'):
+    """Reorder fetched rows to follow a ranked id list (dict rows or tuples with id first)."""
+    position = {row_id: i for i, row_id in enumerate(ids)}
+    return sorted(rows, key=lambda row: position.get(row[key] if isinstance(row, dict) else row[0], len(ids)))
+
 # Helper function for safe numeric conversions
 def _safe_float(value):
     """Safely convert a value to float, returning None if conversion fails"""
@@ -2430,6 +2592,7 @@ def _safe_int(value):
 # Item search endpoints (EQEmu schema with discovered items join)
 @app.route('/api/items/<item_id>', methods=['GET'])
 @exempt_when_limiting
+@cached_response()
 def get_item_details(item_id):
     """
     Get detailed information about a specific discovered item using EQEmu schema.
@@ -2650,6 +2813,7 @@ def get_item_details(item_id):
 
 @app.route('/api/items/types', methods=['GET'])
 @exempt_when_limiting
+@cached_response()
 def get_item_types():
     """
     Get list of available item types for filtering (discovered items only).
@@ -2713,13 +2877,197 @@ def get_item_types():
         return jsonify({'error': f'Failed to get item types: {str(e)}'}), 500
 
 
+def _group_drop_sources(results):
+    """Group drop source rows (query or item source index) by zone."""
+    # Organize results by zone
+    zones_data = {}
+    for row in results:
+        # Handle both dict and tuple results
+        if isinstance(row, dict):
+            npc_id, npc_name, zone_short, zone_name, multiplier, probability, chance = (
+                row['npc_id'], row['npc_name'], row['zone'], row['zone_name'],
+                row['multiplier'], row['probability'], row['chance']
+            )
+        else:
+            # Tuple format: npc_id, npc_name, zone, zone_name, multiplier, probability, chance
+            npc_id, npc_name, zone_short, zone_name, multiplier, probability, chance = row
+        
+        if zone_short not in zones_data:
+            zones_data[zone_short] = {
+                'zone_short': zone_short,
+                'zone_name': zone_name,
+                'npcs': []
+            }
+        
+        # Calculate drop chance (chance * probability / 100)
+        drop_chance = round((chance * probability / 100), 2)
+        
+        zones_data[zone_short]['npcs'].append({
+            'npc_id': npc_id,
+            'npc_name': npc_name.replace('_', ' '),
+            'chance': chance,
+            'probability': probability,
+            'multiplier': multiplier,
+            'drop_chance': drop_chance
+        })
+    
+    # Convert to list and sort by zone name
+    zones_list = list(zones_data.values())
+    zones_list.sort(key=lambda x: x['zone_name'])
+    
+    return zones_list
+
+
+def _group_merchant_sources(results):
+    """Group merchant rows (query or item source index) by zone with pricing."""
+    # Organize results by zone
+    zones_data = {}
+    for row in results:
+        # Handle both dict and tuple results
+        if isinstance(row, dict):
+            npc_id, npc_name, npc_class, zone_short, zone_name, merchant_slot, item_base_price, merchant_sellrate = (
+                row['npc_id'], row['npc_name'], row['npc_class'], row['zone'], 
+                row['zone_name'], row['merchant_slot'], row['item_base_price'], row['merchant_sellrate']
+            )
+        else:
+            # Tuple format: npc_id, npc_name, npc_class, zone, zone_name, merchant_slot, item_base_price, merchant_sellrate
+            npc_id, npc_name, npc_class, zone_short, zone_name, merchant_slot, item_base_price, merchant_sellrate = row
+        
+        if zone_short not in zones_data:
+            zones_data[zone_short] = {
+                'zone_short': zone_short,
+                'zone_name': zone_name,
+                'merchants': []
+            }
+        
+        # Calculate actual selling price
+        actual_price = calculate_merchant_price(item_base_price, merchant_sellrate, npc_class)
+        
+        # Convert to coin breakdown
+        coins = convert_copper_to_coins(actual_price)
+        
+        # Determine merchant type and pricing info
+        merchant_type = 'merchant'
+        pricing_info = None
+        
+        if npc_class == 41:  # Shopkeeper
+            merchant_type = 'shopkeeper'
+            pricing_info = 'Sold for coins'
+        elif npc_class == 61:  # LDON merchant
+            merchant_type = 'ldon_merchant'
+            pricing_info = 'Sold for adventure points'
+        else:
+            pricing_info = 'Sold for coins'
+        
+        zones_data[zone_short]['merchants'].append({
+            'npc_id': npc_id,
+            'npc_name': npc_name.replace('_', ' '),
+            'npc_class': npc_class,
+            'merchant_type': merchant_type,
+            'pricing_info': pricing_info,
+            'merchant_slot': merchant_slot,
+            'price_copper': actual_price,
+            'price_coins': coins,
+            'base_price': item_base_price,
+            'sellrate': merchant_sellrate
+        })
+    
+    # Convert to list and sort by zone name
+    zones_list = list(zones_data.values())
+    zones_list.sort(key=lambda x: x['zone_name'])
+    
+    return zones_list
+
+
+def _group_ground_spawns(results):
+    """Group ground spawn rows (query or item source index) by zone."""
+    # Organize results by zone
+    zones_data = {}
+    for row in results:
+        # Handle both dict and tuple results
+        if isinstance(row, dict):
+            spawn_id, max_x, max_y, max_z, respawn_timer, zone_short, zone_name = (
+                row['spawn_id'], row['max_x'], row['max_y'], row['max_z'],
+                row['respawn_timer'], row['zone_short'], row['zone_name']
+            )
+        else:
+            # Tuple format
+            spawn_id, max_x, max_y, max_z, respawn_timer, zone_short, zone_name = row
+        
+        if zone_short not in zones_data:
+            zones_data[zone_short] = {
+                'zone_short': zone_short,
+                'zone_name': zone_name,
+                'spawn_points': []
+            }
+        
+        # Format coordinates - simple X, Y, Z format
+        coord_display = f"{max_x}, {max_y}, {max_z}"
+        
+        zones_data[zone_short]['spawn_points'].append({
+            'spawn_id': spawn_id,
+            'coordinates': coord_display,
+            'x': max_x,
+            'y': max_y,
+            'z': max_z,
+            'respawn_timer': respawn_timer
+        })
+    
+    # Convert to list and sort by zone name
+    zones_list = list(zones_data.values())
+    zones_list.sort(key=lambda x: x['zone_name'])
+    
+    return zones_list
+
+
+def _group_forage_sources(results):
+    """Group forage rows (query or item source index) by zone."""
+    # Organize results by zone
+    zones_data = {}
+    for row in results:
+        # Handle both dict and tuple results
+        if isinstance(row, dict):
+            zone_short, zone_name, chance, level = (
+                row['zone_short'], row['zone_name'], row['chance'], row['level']
+            )
+        else:
+            # Tuple format
+            zone_short, zone_name, chance, level = row
+        
+        if zone_short not in zones_data:
+            zones_data[zone_short] = {
+                'zone_short': zone_short,
+                'zone_name': zone_name,
+                'forage_info': []
+            }
+        
+        zones_data[zone_short]['forage_info'].append({
+            'chance': chance,
+            'level': level
+        })
+    
+    # Convert to list and sort by zone name
+    zones_list = list(zones_data.values())
+    zones_list.sort(key=lambda x: x['zone_name'])
+    
+    return zones_list
+
+
 @app.route('/api/items/<item_id>/drop-sources', methods=['GET'])
 @rate_limit_by_ip(requests_per_minute=30, requests_per_hour=300)
+@cached_response()
 def get_item_drop_sources(item_id):
     """
     Get NPCs and zones where an item is dropped.
     Optimized version of the legacy PHP query with proper JOINs and indexing.
     """
+    index = get_ready_item_source_index()
+    if index and index.has_table('lootdrop_entries'):
+        try:
+            return jsonify({'zones': _group_drop_sources(index.drop_rows(item_id))})
+        except (ValueError, TypeError):
+            pass  # Non-numeric id - let the query path handle it
+    
     try:
         conn, db_type, error = get_eqemu_db_connection()
         if not conn:
@@ -2730,8 +3078,7 @@ def get_item_drop_sources(item_id):
         
         try:
             # First check if required tables exist
-            cursor.execute("SHOW TABLES LIKE 'lootdrop_entries'")
-            if not cursor.fetchone():
+            if not get_schema_capabilities(conn, db_type).has('lootdrop_entries'):
                 app.logger.warning("Loot tables not available in this database")
                 return jsonify({'zones': [], 'message': 'Drop source data not available in this database'})
             
@@ -2770,43 +3117,7 @@ def get_item_drop_sources(item_id):
             if not results:
                 return jsonify({'zones': []})
             
-            # Organize results by zone
-            zones_data = {}
-            for row in results:
-                # Handle both dict and tuple results
-                if isinstance(row, dict):
-                    npc_id, npc_name, zone_short, zone_name, multiplier, probability, chance = (
-                        row['npc_id'], row['npc_name'], row['zone'], row['zone_name'],
-                        row['multiplier'], row['probability'], row['chance']
-                    )
-                else:
-                    # Tuple format: npc_id, npc_name, zone, zone_name, multiplier, probability, chance
-                    npc_id, npc_name, zone_short, zone_name, multiplier, probability, chance = row
-                
-                if zone_short not in zones_data:
-                    zones_data[zone_short] = {
-                        'zone_short': zone_short,
-                        'zone_name': zone_name,
-                        'npcs': []
-                    }
-                
-                # Calculate drop chance (chance * probability / 100)
-                drop_chance = round((chance * probability / 100), 2)
-                
-                zones_data[zone_short]['npcs'].append({
-                    'npc_id': npc_id,
-                    'npc_name': npc_name.replace('_', ' '),
-                    'chance': chance,
-                    'probability': probability,
-                    'multiplier': multiplier,
-                    'drop_chance': drop_chance
-                })
-            
-            # Convert to list and sort by zone name
-            zones_list = list(zones_data.values())
-            zones_list.sort(key=lambda x: x['zone_name'])
-            
-            return jsonify({'zones': zones_list})
+            return jsonify({'zones': _group_drop_sources(results)})
             
         finally:
             cursor.close()
@@ -2869,11 +3180,19 @@ def convert_copper_to_coins(copper_amount):
 
 @app.route('/api/items/<item_id>/merchant-sources', methods=['GET'])
 @rate_limit_by_ip(requests_per_minute=30, requests_per_hour=300)
+@cached_response()
 def get_item_merchant_sources(item_id):
     """
     Get NPCs and zones where an item is sold by merchants.
     Optimized version of the legacy PHP query with proper JOINs and pricing info.
     """
+    index = get_ready_item_source_index()
+    if index and index.has_table('merchantlist'):
+        try:
+            return jsonify({'zones': _group_merchant_sources(index.merchant_rows(item_id))})
+        except (ValueError, TypeError):
+            pass  # Non-numeric id - let the query path handle it
+    
     try:
         conn, db_type, error = get_eqemu_db_connection()
         if not conn:
@@ -2884,8 +3203,8 @@ def get_item_merchant_sources(item_id):
         
         try:
             # First check if required tables exist
-            cursor.execute("SHOW TABLES LIKE 'merchantlist'")
-            if not cursor.fetchone():
+            capabilities = get_schema_capabilities(conn, db_type)
+            if not capabilities.has('merchantlist'):
                 app.logger.warning("Merchant tables not available in this database")
                 return jsonify({'zones': [], 'message': 'Merchant data not available in this database'})
             
@@ -2900,8 +3219,9 @@ def get_item_merchant_sources(item_id):
             
             # Optimized query using explicit JOINs and proper indexing
             # Include pricing information for shopkeepers and LDON merchants
-            # Note: sellrate might not exist in all EQEmu schemas, so we'll use a default
-            query = """
+            # sellrate doesn't exist in all EQEmu schemas; default to 100 (list price) without it
+            sellrate_column = 'ml.sellrate' if capabilities.has('merchantlist', 'sellrate') else '100'
+            query = f"""
                 SELECT DISTINCT
                     nt.id as npc_id,
                     nt.name as npc_name,
@@ -2910,7 +3230,7 @@ def get_item_merchant_sources(item_id):
                     z.long_name as zone_name,
                     ml.slot as merchant_slot,
                     i.price as item_base_price,
-                    100 as merchant_sellrate
+                    {sellrate_column} as merchant_sellrate
                 FROM npc_types nt
                 INNER JOIN merchantlist ml ON nt.merchant_id = ml.merchantid
                 INNER JOIN spawnentry se ON nt.id = se.npcID
@@ -2933,63 +3253,7 @@ def get_item_merchant_sources(item_id):
             if not results:
                 return jsonify({'zones': []})
             
-            # Organize results by zone
-            zones_data = {}
-            for row in results:
-                # Handle both dict and tuple results
-                if isinstance(row, dict):
-                    npc_id, npc_name, npc_class, zone_short, zone_name, merchant_slot, item_base_price, merchant_sellrate = (
-                        row['npc_id'], row['npc_name'], row['npc_class'], row['zone'], 
-                        row['zone_name'], row['merchant_slot'], row['item_base_price'], row['merchant_sellrate']
-                    )
-                else:
-                    # Tuple format: npc_id, npc_name, npc_class, zone, zone_name, merchant_slot, item_base_price, merchant_sellrate
-                    npc_id, npc_name, npc_class, zone_short, zone_name, merchant_slot, item_base_price, merchant_sellrate = row
-                
-                if zone_short not in zones_data:
-                    zones_data[zone_short] = {
-                        'zone_short': zone_short,
-                        'zone_name': zone_name,
-                        'merchants': []
-                    }
-                
-                # Calculate actual selling price
-                actual_price = calculate_merchant_price(item_base_price, merchant_sellrate, npc_class)
-                
-                # Convert to coin breakdown
-                coins = convert_copper_to_coins(actual_price)
-                
-                # Determine merchant type and pricing info
-                merchant_type = 'merchant'
-                pricing_info = None
-                
-                if npc_class == 41:  # Shopkeeper
-                    merchant_type = 'shopkeeper'
-                    pricing_info = 'Sold for coins'
-                elif npc_class == 61:  # LDON merchant
-                    merchant_type = 'ldon_merchant'
-                    pricing_info = 'Sold for adventure points'
-                else:
-                    pricing_info = 'Sold for coins'
-                
-                zones_data[zone_short]['merchants'].append({
-                    'npc_id': npc_id,
-                    'npc_name': npc_name.replace('_', ' '),
-                    'npc_class': npc_class,
-                    'merchant_type': merchant_type,
-                    'pricing_info': pricing_info,
-                    'merchant_slot': merchant_slot,
-                    'price_copper': actual_price,
-                    'price_coins': coins,
-                    'base_price': item_base_price,
-                    'sellrate': merchant_sellrate
-                })
-            
-            # Convert to list and sort by zone name
-            zones_list = list(zones_data.values())
-            zones_list.sort(key=lambda x: x['zone_name'])
-            
-            return jsonify({'zones': zones_list})
+            return jsonify({'zones': _group_merchant_sources(results)})
             
         finally:
             cursor.close()
@@ -3002,11 +3266,19 @@ def get_item_merchant_sources(item_id):
 
 @app.route('/api/items/<item_id>/ground-spawns', methods=['GET'])
 @rate_limit_by_ip(requests_per_minute=30, requests_per_hour=300)
+@cached_response()
 def get_item_ground_spawns(item_id):
     """
     Get zones and coordinates where an item spawns on the ground.
     Optimized version of the legacy PHP query with proper JOINs.
     """
+    index = get_ready_item_source_index()
+    if index and index.has_table('ground_spawns'):
+        try:
+            return jsonify({'zones': _group_ground_spawns(index.ground_spawn_rows(item_id))})
+        except (ValueError, TypeError):
+            pass  # Non-numeric id - let the query path handle it
+    
     try:
         conn, db_type, error = get_eqemu_db_connection()
         if not conn:
@@ -3017,8 +3289,7 @@ def get_item_ground_spawns(item_id):
         
         try:
             # First check if required tables exist
-            cursor.execute("SHOW TABLES LIKE 'ground_spawns'")
-            if not cursor.fetchone():
+            if not get_schema_capabilities(conn, db_type).has('ground_spawns'):
                 app.logger.warning("Ground spawns table not available in this database")
                 return jsonify({'zones': [], 'message': 'Ground spawn data not available in this database'})
             
@@ -3058,43 +3329,7 @@ def get_item_ground_spawns(item_id):
             if not results:
                 return jsonify({'zones': []})
             
-            # Organize results by zone
-            zones_data = {}
-            for row in results:
-                # Handle both dict and tuple results
-                if isinstance(row, dict):
-                    spawn_id, max_x, max_y, max_z, respawn_timer, zone_short, zone_name = (
-                        row['spawn_id'], row['max_x'], row['max_y'], row['max_z'],
-                        row['respawn_timer'], row['zone_short'], row['zone_name']
-                    )
-                else:
-                    # Tuple format
-                    spawn_id, max_x, max_y, max_z, respawn_timer, zone_short, zone_name = row
-                
-                if zone_short not in zones_data:
-                    zones_data[zone_short] = {
-                        'zone_short': zone_short,
-                        'zone_name': zone_name,
-                        'spawn_points': []
-                    }
-                
-                # Format coordinates - simple X, Y, Z format
-                coord_display = f"{max_x}, {max_y}, {max_z}"
-                
-                zones_data[zone_short]['spawn_points'].append({
-                    'spawn_id': spawn_id,
-                    'coordinates': coord_display,
-                    'x': max_x,
-                    'y': max_y,
-                    'z': max_z,
-                    'respawn_timer': respawn_timer
-                })
-            
-            # Convert to list and sort by zone name
-            zones_list = list(zones_data.values())
-            zones_list.sort(key=lambda x: x['zone_name'])
-            
-            return jsonify({'zones': zones_list})
+            return jsonify({'zones': _group_ground_spawns(results)})
             
         finally:
             cursor.close()
@@ -3107,11 +3342,19 @@ def get_item_ground_spawns(item_id):
 
 @app.route('/api/items/<item_id>/forage-sources', methods=['GET'])
 @rate_limit_by_ip(requests_per_minute=30, requests_per_hour=300)
+@cached_response()
 def get_item_forage_sources(item_id):
     """
     Get zones where an item can be foraged.
     Optimized version of the legacy PHP query with proper JOINs.
     """
+    index = get_ready_item_source_index()
+    if index and index.has_table('forage'):
+        try:
+            return jsonify({'zones': _group_forage_sources(index.forage_rows(item_id))})
+        except (ValueError, TypeError):
+            pass  # Non-numeric id - let the query path handle it
+    
     try:
         conn, db_type, error = get_eqemu_db_connection()
         if not conn:
@@ -3122,8 +3365,7 @@ def get_item_forage_sources(item_id):
         
         try:
             # First check if required tables exist
-            cursor.execute("SHOW TABLES LIKE 'forage'")
-            if not cursor.fetchone():
+            if not get_schema_capabilities(conn, db_type).has('forage'):
                 app.logger.warning("Forage table not available in this database")
                 return jsonify({'zones': [], 'message': 'Forage data not available in this database'})
             
@@ -3161,35 +3403,7 @@ def get_item_forage_sources(item_id):
             if not results:
                 return jsonify({'zones': []})
             
-            # Organize results by zone
-            zones_data = {}
-            for row in results:
-                # Handle both dict and tuple results
-                if isinstance(row, dict):
-                    zone_short, zone_name, chance, level = (
-                        row['zone_short'], row['zone_name'], row['chance'], row['level']
-                    )
-                else:
-                    # Tuple format
-                    zone_short, zone_name, chance, level = row
-                
-                if zone_short not in zones_data:
-                    zones_data[zone_short] = {
-                        'zone_short': zone_short,
-                        'zone_name': zone_name,
-                        'forage_info': []
-                    }
-                
-                zones_data[zone_short]['forage_info'].append({
-                    'chance': chance,
-                    'level': level
-                })
-            
-            # Convert to list and sort by zone name
-            zones_list = list(zones_data.values())
-            zones_list.sort(key=lambda x: x['zone_name'])
-            
-            return jsonify({'zones': zones_list})
+            return jsonify({'zones': _group_forage_sources(results)})
             
         finally:
             cursor.close()
@@ -3202,6 +3416,7 @@ def get_item_forage_sources(item_id):
 
 @app.route('/api/items/<item_id>/tradeskill-recipes', methods=['GET'])
 @rate_limit_by_ip(requests_per_minute=30, requests_per_hour=300)
+@cached_response()
 def get_item_tradeskill_recipes(item_id):
     """
     Get tradeskill recipes that use this item as a component.
@@ -3217,13 +3432,12 @@ def get_item_tradeskill_recipes(item_id):
         
         try:
             # First check if required tables exist
-            cursor.execute("SHOW TABLES LIKE 'tradeskill_recipe'")
-            if not cursor.fetchone():
+            capabilities = get_schema_capabilities(conn, db_type)
+            if not capabilities.has('tradeskill_recipe'):
                 app.logger.warning("Tradeskill recipe tables not available in this database")
                 return jsonify({'skills': [], 'message': 'Tradeskill recipe data not available in this database'})
             
-            cursor.execute("SHOW TABLES LIKE 'tradeskill_recipe_entries'")
-            if not cursor.fetchone():
+            if not capabilities.has('tradeskill_recipe_entries'):
                 app.logger.warning("Tradeskill recipe entries table not available in this database")
                 return jsonify({'skills': [], 'message': 'Tradeskill recipe data not available in this database'})
             
@@ -3236,58 +3450,16 @@ def get_item_tradeskill_recipes(item_id):
             if not cursor.fetchone():
                 return jsonify({'skills': []})
             
-            # Optimized query using explicit JOINs
-            # Include recipe name, ID, tradeskill type, and resulting item icon
+            # Recipes using this item; result icons/names come from the precomputed
+            # recipe -> primary result table instead of a derived table over all recipes
             query = """
                 SELECT 
                     tsr.name as recipe_name,
                     tsr.id as recipe_id,
                     tsr.tradeskill,
-                    tsre.componentcount,
-                    result_items.icon as result_item_icon,
-                    result_items.name as result_item_name
+                    tsre.componentcount
                 FROM tradeskill_recipe tsr
                 INNER JOIN tradeskill_recipe_entries tsre ON tsr.id = tsre.recipe_id
-                LEFT JOIN (
-                    SELECT 
-                        tre_result.recipe_id,
-                        MAX(CASE 
-                            WHEN i.name NOT LIKE '%%Hammer%%' AND i.name NOT LIKE '%%hammer%%' 
-                            AND i.name NOT LIKE '%%Tool%%' AND i.name NOT LIKE '%%tool%%'
-                            AND i.name NOT LIKE '%%Kit%%' AND i.name NOT LIKE '%%kit%%'
-                            AND i.name NOT LIKE '%%Needle%%' AND i.name NOT LIKE '%%needle%%'
-                            AND i.name NOT LIKE '%%Awl%%' AND i.name NOT LIKE '%%awl%%'
-                            AND i.name NOT LIKE '%%Chisel%%' AND i.name NOT LIKE '%%chisel%%'
-                            AND i.name NOT LIKE '%%Tongs%%' AND i.name NOT LIKE '%%tongs%%'
-                            AND i.name NOT LIKE '%%File%%' AND i.name NOT LIKE '%%file%%'
-                            AND i.name NOT LIKE '%%Planer%%' AND i.name NOT LIKE '%%planer%%'
-                            AND i.name NOT LIKE '%%Saw%%' AND i.name NOT LIKE '%%saw%%'
-                            AND i.name NOT LIKE '%%Pottery Wheel%%' AND i.name NOT LIKE '%%pottery wheel%%'
-                            AND i.name NOT LIKE '%%Kiln%%' AND i.name NOT LIKE '%%kiln%%'
-                            THEN i.icon
-                            ELSE NULL
-                        END) as icon,
-                        MAX(CASE 
-                            WHEN i.name NOT LIKE '%%Hammer%%' AND i.name NOT LIKE '%%hammer%%' 
-                            AND i.name NOT LIKE '%%Tool%%' AND i.name NOT LIKE '%%tool%%'
-                            AND i.name NOT LIKE '%%Kit%%' AND i.name NOT LIKE '%%kit%%'
-                            AND i.name NOT LIKE '%%Needle%%' AND i.name NOT LIKE '%%needle%%'
-                            AND i.name NOT LIKE '%%Awl%%' AND i.name NOT LIKE '%%awl%%'
-                            AND i.name NOT LIKE '%%Chisel%%' AND i.name NOT LIKE '%%chisel%%'
-                            AND i.name NOT LIKE '%%Tongs%%' AND i.name NOT LIKE '%%tongs%%'
-                            AND i.name NOT LIKE '%%File%%' AND i.name NOT LIKE '%%file%%'
-                            AND i.name NOT LIKE '%%Planer%%' AND i.name NOT LIKE '%%planer%%'
-                            AND i.name NOT LIKE '%%Saw%%' AND i.name NOT LIKE '%%saw%%'
-                            AND i.name NOT LIKE '%%Pottery Wheel%%' AND i.name NOT LIKE '%%pottery wheel%%'
-                            AND i.name NOT LIKE '%%Kiln%%' AND i.name NOT LIKE '%%kiln%%'
-                            THEN i.name
-                            ELSE NULL
-                        END) as name
-                    FROM tradeskill_recipe_entries tre_result
-                    INNER JOIN items i ON tre_result.item_id = i.id
-                    WHERE tre_result.successcount > 0
-                    GROUP BY tre_result.recipe_id
-                ) result_items ON tsr.id = result_items.recipe_id
                 WHERE tsre.item_id = %s
                   AND tsre.componentcount > 0
                 GROUP BY tsr.id
@@ -3297,11 +3469,19 @@ def get_item_tradeskill_recipes(item_id):
             
             cursor.execute(query, (item_id,))
             results = cursor.fetchall()
-            app.logger.debug(f"Drop sources query for item {item_id} returned {len(results)} results")
+            app.logger.debug(f"Tradeskill recipes query for item {item_id} returned {len(results)} results")
             
             if not results:
                 return jsonify({'skills': []})
             
+            recipe_ids = [row['recipe_id'] if isinstance(row, dict) else row[1] for row in results]
+            result_index = get_ready_recipe_result_index()
+            if result_index:
+                primary_results = result_index.get_many(recipe_ids)
+            else:
+                # Table still building: pick results for just these recipes
+                primary_results = query_primary_results(cursor, recipe_ids)
+            
             # EverQuest tradeskill mapping (based on EQEmu skills documentation)
             tradeskill_names = {
                 # Legacy/custom mapping (preserved for compatibility)
@@ -3341,18 +3521,12 @@ def get_item_tradeskill_recipes(item_id):
             for row in results:
                 # Handle both dict and tuple results
                 if isinstance(row, dict):
-                    recipe_name, recipe_id, tradeskill, componentcount, result_item_icon, result_item_name = (
-                        row['recipe_name'], row['recipe_id'], row['tradeskill'], row['componentcount'],
-                        row.get('result_item_icon'), row.get('result_item_name')
+                    recipe_name, recipe_id, tradeskill, componentcount = (
+                        row['recipe_name'], row['recipe_id'], row['tradeskill'], row['componentcount']
                     )
                 else:
-                    # Tuple format - now includes icon and name
-                    if len(row) >= 6:
-                        recipe_name, recipe_id, tradeskill, componentcount, result_item_icon, result_item_name = row
-                    else:
-                        # Fallback for old format
-                        recipe_name, recipe_id, tradeskill, componentcount = row[:4]
-                        result_item_icon, result_item_name = None, None
+                    recipe_name, recipe_id, tradeskill, componentcount = row[:4]
+                _, result_item_icon, result_item_name = primary_results.get(recipe_id, (None, None, None))
                 
                 # Get tradeskill name
                 skill_name = tradeskill_names.get(tradeskill, f'Unknown Skill ({tradeskill})')
@@ -3392,6 +3566,7 @@ def get_item_tradeskill_recipes(item_id):
 
 @app.route('/api/recipes/<recipe_id>', methods=['GET'])
 @rate_limit_by_ip(requests_per_minute=30, requests_per_hour=300)
+@cached_response()
 def get_recipe_details(recipe_id):
     """
     Get detailed information about a specific recipe including:
@@ -3409,18 +3584,16 @@ def get_recipe_details(recipe_id):
         
         try:
             # First check if required tables exist
-            cursor.execute("SHOW TABLES LIKE 'tradeskill_recipe'")
-            if not cursor.fetchone():
+            capabilities = get_schema_capabilities(conn, db_type)
+            if not capabilities.has('tradeskill_recipe'):
                 app.logger.warning("Tradeskill_recipe table not available in this database")
                 return jsonify({'error': 'Recipe data not available in this database'}), 503
             
-            cursor.execute("SHOW TABLES LIKE 'tradeskill_recipe_entries'")  
-            if not cursor.fetchone():
+            if not capabilities.has('tradeskill_recipe_entries'):
                 app.logger.warning("Tradeskill_recipe_entries table not available in this database")
                 return jsonify({'error': 'Recipe entries data not available in this database'}), 503
             
-            cursor.execute("SHOW TABLES LIKE 'items'")
-            if not cursor.fetchone():
+            if not capabilities.has('items'):
                 app.logger.warning("Items table not available in this database")
                 return jsonify({'error': 'Items data not available in this database'}), 503
             
@@ -3599,8 +3772,51 @@ def get_recipe_details(recipe_id):
         return jsonify({'error': f'Failed to get recipe details: {str(e)}'}), 500
 
 
+@app.route('/api/recipes/<recipe_id>/tree', methods=['GET'])
+@rate_limit_by_ip(requests_per_minute=30, requests_per_hour=300)
+@cached_response()
+def get_recipe_tree(recipe_id):
+    """
+    Expand a recipe into its full sub-component tree.
+    
+    Craftable components are expanded through their easiest producing recipe,
+    up to ?depth= levels. Raw material totals are aggregated over the whole
+    chain; cycles (a recipe needing its own product further down) stop at the
+    repeated recipe and are flagged. Trees stop expanding at
+    RECIPE_TREE_MAX_NODES recipe nodes and are then marked truncated.
+    """
+    try:
+        recipe_id = int(recipe_id)
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid recipe ID'}), 400
+    
+    try:
+        depth = int(request.args.get('depth', RECIPE_TREE_DEFAULT_DEPTH))
+    except ValueError:
+        return jsonify({'error': 'depth must be an integer'}), 400
+    if depth < 1 or depth > RECIPE_TREE_MAX_DEPTH:
+        return jsonify({'error': f'depth must be between 1 and {RECIPE_TREE_MAX_DEPTH}'}), 400
+    
+    try:
+        graph = get_ready_recipe_graph()
+        if graph is None:
+            response = jsonify({'error': 'Recipe graph is being built, try again shortly', 'building': True})
+            response.headers['Retry-After'] = '10'
+            return response, 503
+        
+        expanded = graph.expand(recipe_id, depth)
+        if expanded is None:
+            return jsonify({'error': 'Recipe not found'}), 404
+        return jsonify(expanded)
+        
+    except Exception as e:
+        app.logger.error(f"Error expanding recipe tree for recipe {recipe_id}: {e}")
+        return jsonify({'error': f'Failed to expand recipe tree: {str(e)}'}), 500
+
+
 @app.route('/api/items/<item_id>/created-by-recipes', methods=['GET'])
 @rate_limit_by_ip(requests_per_minute=30, requests_per_hour=300)
+@cached_response()
 def get_item_created_by_recipes(item_id):
     """
     Get tradeskill recipes that create this item as a result.
@@ -3616,12 +3832,7 @@ def get_item_created_by_recipes(item_id):
         
         try:
             # Check if required tables exist
-            cursor.execute("SHOW TABLES LIKE 'tradeskill_recipe'")
-            if not cursor.fetchone():
-                return jsonify({'recipes': []})
-            
-            cursor.execute("SHOW TABLES LIKE 'tradeskill_recipe_entries'")
-            if not cursor.fetchone():
+            if not get_schema_capabilities(conn, db_type).has_all('tradeskill_recipe', 'tradeskill_recipe_entries'):
                 return jsonify({'recipes': []})
             
             # Validate item_id
@@ -3737,13 +3948,74 @@ def get_item_created_by_recipes(item_id):
         return jsonify({'error': f'Failed to get creation recipes: {str(e)}'}), 500
 
 
+@app.route('/api/items/availability', methods=['POST'])
+@rate_limit_by_ip(requests_per_minute=30, requests_per_hour=600)
+def get_items_data_availability():
+    """
+    Batch version of the item availability check for search result pages.
+    
+    Body: {"item_ids": [1001, 1002, ...]} (up to AVAILABILITY_BATCH_MAX_IDS)
+    
+    Returns a bitmap per item (bit order in 'flags') computed from the item
+    source index when it is ready, otherwise with one grouped IN (...) query
+    per source type.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        item_ids = parse_item_ids(data.get('item_ids'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    index = get_ready_item_source_index()
+    if index:
+        return jsonify({
+            'flags': list(AVAILABILITY_FLAGS),
+            'items': {str(item_id): index.availability_bits(item_id) for item_id in item_ids},
+            'source': 'index'
+        })
+    
+    conn = None
+    try:
+        conn, db_type, error = get_eqemu_db_connection()
+        if not conn:
+            app.logger.error(f"Database connection failed: {error}")
+            return jsonify({'error': error or 'Database not configured'}), 503
+        
+        cursor = conn.cursor()
+        try:
+            bits = batch_availability(cursor, item_ids, get_schema_capabilities(conn, db_type))
+        finally:
+            cursor.close()
+        
+        return jsonify({
+            'flags': list(AVAILABILITY_FLAGS),
+            'items': {str(item_id): value for item_id, value in bits.items()},
+            'source': 'database'
+        })
+        
+    except Exception as e:
+        app.logger.error(f"Error checking batch item availability: {e}")
+        return jsonify({'error': f'Failed to check data availability: {str(e)}'}), 500
+    finally:
+        if conn:
+            conn.close()
+
+
 @app.route('/api/items/<item_id>/availability', methods=['GET'])
 @rate_limit_by_ip(requests_per_minute=60, requests_per_hour=600)
+@cached_response()
 def get_item_data_availability(item_id):
     """
     Lightweight endpoint to check which data sources are available for an item.
     Returns counts/existence flags without fetching actual data for efficiency.
     """
+    index = get_ready_item_source_index()
+    if index:
+        try:
+            return jsonify(index.availability(int(item_id)))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid item ID'}), 400
+    
     try:
         conn, db_type, error = get_eqemu_db_connection()
         if not conn:
@@ -3770,44 +4042,41 @@ def get_item_data_availability(item_id):
             
             app.logger.info(f"Checking availability for item {item_id}")
             
+            # Table checks come from the cached schema snapshot (no queries)
+            capabilities = get_schema_capabilities(conn, db_type)
+            has_recipe_tables = capabilities.has_all('tradeskill_recipe', 'tradeskill_recipe_entries')
+            
             # Check tradeskill recipes (where item is used as component) - Use simple existence check
             try:
-                cursor.execute("SHOW TABLES LIKE 'tradeskill_recipe'")
-                if cursor.fetchone():
-                    cursor.execute("SHOW TABLES LIKE 'tradeskill_recipe_entries'")
-                    if cursor.fetchone():
-                        # Simple existence check - just see if any record exists
-                        cursor.execute("""
-                            SELECT 1 FROM tradeskill_recipe_entries 
-                            WHERE item_id = %s AND componentcount > 0 LIMIT 1
-                        """, (item_id,))
-                        result = cursor.fetchone()
-                        availability['tradeskill_recipes'] = 1 if result else 0
-                        app.logger.info(f"Tradeskill recipes for item {item_id}: {'found' if result else 'none'}")
+                if has_recipe_tables:
+                    # Simple existence check - just see if any record exists
+                    cursor.execute("""
+                        SELECT 1 FROM tradeskill_recipe_entries 
+                        WHERE item_id = %s AND componentcount > 0 LIMIT 1
+                    """, (item_id,))
+                    result = cursor.fetchone()
+                    availability['tradeskill_recipes'] = 1 if result else 0
+                    app.logger.info(f"Tradeskill recipes for item {item_id}: {'found' if result else 'none'}")
             except Exception as e:
                 app.logger.error(f"Tradeskill recipes check failed: {e}")
             
             # Check created by recipes (where item is created as result) - Use simple existence check
             try:
-                cursor.execute("SHOW TABLES LIKE 'tradeskill_recipe'")
-                if cursor.fetchone():
-                    cursor.execute("SHOW TABLES LIKE 'tradeskill_recipe_entries'")
-                    if cursor.fetchone():
-                        # Simple existence check - just see if any record exists
-                        cursor.execute("""
-                            SELECT 1 FROM tradeskill_recipe_entries 
-                            WHERE item_id = %s AND successcount > 0 LIMIT 1
-                        """, (item_id,))
-                        result = cursor.fetchone()
-                        availability['created_by_recipes'] = 1 if result else 0
-                        app.logger.info(f"Created by recipes for item {item_id}: {'found' if result else 'none'}")
+                if has_recipe_tables:
+                    # Simple existence check - just see if any record exists
+                    cursor.execute("""
+                        SELECT 1 FROM tradeskill_recipe_entries 
+                        WHERE item_id = %s AND successcount > 0 LIMIT 1
+                    """, (item_id,))
+                    result = cursor.fetchone()
+                    availability['created_by_recipes'] = 1 if result else 0
+                    app.logger.info(f"Created by recipes for item {item_id}: {'found' if result else 'none'}")
             except Exception as e:
                 app.logger.error(f"Created by recipes check failed: {e}")
             
             # Check drop sources - Use the same complex query as the actual drop sources endpoint
             try:
-                cursor.execute("SHOW TABLES LIKE 'lootdrop_entries'")
-                if cursor.fetchone():
+                if capabilities.has('lootdrop_entries'):
                     # Use the same filtering logic as the drop sources endpoint to avoid false positives
                     cursor.execute("""
                         SELECT 1 FROM npc_types nt
@@ -3832,8 +4101,7 @@ def get_item_data_availability(item_id):
             
             # Check merchant sources - Use existence check
             try:
-                cursor.execute("SHOW TABLES LIKE 'merchantlist'")
-                if cursor.fetchone():
+                if capabilities.has('merchantlist'):
                     cursor.execute("""
                         SELECT 1 FROM merchantlist 
                         WHERE item = %s LIMIT 1
@@ -3845,8 +4113,7 @@ def get_item_data_availability(item_id):
             
             # Check ground spawns - Use existence check
             try:
-                cursor.execute("SHOW TABLES LIKE 'ground_spawns'")
-                if cursor.fetchone():
+                if capabilities.has('ground_spawns'):
                     cursor.execute("""
                         SELECT 1 FROM ground_spawns 
                         WHERE item = %s LIMIT 1
@@ -3858,8 +4125,7 @@ def get_item_data_availability(item_id):
             
             # Check forage sources - Use existence check
             try:
-                cursor.execute("SHOW TABLES LIKE 'forage'")
-                if cursor.fetchone():
+                if capabilities.has('forage'):
                     cursor.execute("""
                         SELECT 1 FROM forage 
                         WHERE itemid = %s LIMIT 1
@@ -3880,6 +4146,115 @@ def get_item_data_availability(item_id):
         return jsonify({'error': f'Failed to check data availability: {str(e)}'}), 500
 
 
+# Sections of /api/items/<id>/full (sequential runs load them in this order)
+ITEM_PAGE_SECTIONS = {
+    'details': get_item_details,
+    'availability': get_item_data_availability,
+    'drop_sources': get_item_drop_sources,
+    'merchant_sources': get_item_merchant_sources,
+    'ground_spawns': get_item_ground_spawns,
+    'forage_sources': get_item_forage_sources,
+    'tradeskill_recipes': get_item_tradeskill_recipes,
+    'created_by_recipes': get_item_created_by_recipes
+}
+ITEM_PAGE_WORKERS = int(os.environ.get('ITEM_PAGE_WORKERS', '4'))
+_item_page_executor = None
+_item_page_executor_lock = threading.Lock()
+
+def _get_item_page_executor():
+    global _item_page_executor
+    if _item_page_executor is None:
+        with _item_page_executor_lock:
+            if _item_page_executor is None:
+                _item_page_executor = ThreadPoolExecutor(max_workers=ITEM_PAGE_WORKERS, thread_name_prefix='item-page')
+    return _item_page_executor
+
+def _render_item_section(name, item_id):
+    """Run one item page section's view and return (name, status, json body).
+    
+    Calls the undecorated view: the aggregate route does its own rate
+    limiting and caching.
+    """
+    try:
+        response = app.make_response(inspect.unwrap(ITEM_PAGE_SECTIONS[name])(item_id))
+        return name, response.status_code, response.get_json(silent=True)
+    except Exception as e:
+        app.logger.error(f"Item page section {name} failed for item {item_id}: {e}")
+        return name, 500, {'error': f'Failed to load {name}'}
+
+def _iter_item_sections(item_id, sections, parallel):
+    """Yield (name, status, body) for each section as it completes.
+    
+    Sequential runs share one borrowed connection; parallel runs fan out
+    to the worker pool, where each worker borrows its own pooled connection.
+    """
+    if not parallel or len(sections) < 2:
+        with shared_content_connection():
+            for name in sections:
+                yield _render_item_section(name, item_id)
+        return
+    executor = _get_item_page_executor()
+    futures = [
+        executor.submit(copy_current_request_context(_render_item_section), name, item_id)
+        for name in sections
+    ]
+    for future in as_completed(futures):
+        yield future.result()
+
+
+@app.route('/api/items/<item_id>/full', methods=['GET'])
+@rate_limit_by_ip(requests_per_minute=30, requests_per_hour=300)
+@cached_response()
+def get_item_full(item_id):
+    """
+    Get several item page sections in one request.
+    
+    Query params:
+        include: Comma-separated sections (default: all); see ITEM_PAGE_SECTIONS
+        parallel: '1' to run sections concurrently on the worker pool
+                  (default runs them in order on one borrowed connection)
+        format: 'ndjson' to stream one {"section", "status", "data"} line per
+                section as it completes, ending with {"done": true}
+    
+    Each section's data is exactly what its standalone endpoint returns.
+    """
+    try:
+        int(item_id)
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid item ID'}), 400
+    
+    include = request.args.get('include')
+    sections = [name.strip() for name in include.split(',') if name.strip()] if include else list(ITEM_PAGE_SECTIONS)
+    unknown = [name for name in sections if name not in ITEM_PAGE_SECTIONS]
+    if unknown or not sections:
+        return jsonify({
+            'error': f"Unknown sections: {', '.join(unknown)}" if unknown else 'No sections requested',
+            'available_sections': list(ITEM_PAGE_SECTIONS)
+        }), 400
+    sections = list(dict.fromkeys(sections))
+    parallel = request.args.get('parallel') in ('1', 'true')
+    
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            for name, status, body in _iter_item_sections(item_id, sections, parallel):
+                yield json.dumps({'section': name, 'status': status, 'data': body}) + '\n'
+            yield json.dumps({'done': True}) + '\n'
+        return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    results = {name: (status, body) for name, status, body in _iter_item_sections(item_id, sections, parallel)}
+    payload = {'item_id': item_id, 'sections': {}, 'errors': {}}
+    for name in sections:
+        status, body = results[name]
+        if status == 200:
+            payload['sections'][name] = body
+        else:
+            payload['errors'][name] = {'status': status, 'error': (body or {}).get('error')}
+    # A missing item is a 404 for the whole page, like the details endpoint
+    if results.get('details', (200,))[0] == 404:
+        return jsonify(dict(payload, error='Item not found')), 404
+    return jsonify(payload)
+
+
 @app.route('/api/debug/tables', methods=['GET'])
 @rate_limit_by_ip(requests_per_minute=10, requests_per_hour=60)
 def debug_database_tables():
@@ -4015,8 +4390,15 @@ def search_npcs():
         where_conditions = []
         query_params = []
         
-        # Add search query condition with underscore/space/hash handling
-        if search_query:
+        # Add search query condition with underscore/space/hash handling.
+        # The in-memory name index applies the same normalization without the
+        # six-way LIKE scan; fall back to SQL while it's being built.
+        ranked_ids = search_name_index('npcs', search_query)
+        if ranked_ids is not None:
+            id_clause, id_params = _id_in_clause('nt.id', ranked_ids)
+            where_conditions.append(id_clause)
+            query_params.extend(id_params)
+        elif search_query:
             # Convert spaces to underscores for database search, and use both patterns
             search_with_underscores = search_query.replace(' ', '_')
             search_with_spaces = search_query.replace('_', ' ')
@@ -4231,11 +4613,16 @@ def parse_special_abilities(special_abilities_str):
 
 @app.route('/api/npcs/<npc_id>/details', methods=['GET'])
 @rate_limit_by_ip(requests_per_minute=30, requests_per_hour=300)
+@cached_response()
 def get_npc_details(npc_id):
     """
     Get detailed information about a specific NPC including spawn locations and loot drops.
     Only shows discovered items in loot drops.
+    
+    Related data is loaded with one query per relation (see utils.npc_details);
+    the assembled page is kept in the response cache.
     """
+    conn = None
     try:
         npc_id_int = int(npc_id)
         app.logger.info(f"Getting NPC details for ID: {npc_id_int}")
@@ -4270,203 +4657,8 @@ def get_npc_details(npc_id):
                 columns = [desc[0] for desc in cursor.description]
                 npc_data = dict(zip(columns, npc_result))
             
-            # Get spawn locations matching EQ Alla clone query structure
-            spawn_query = """
-                SELECT DISTINCT
-                    z.note,
-                    z.short_name,
-                    z.long_name,
-                    s2.x,
-                    s2.y,
-                    s2.z,
-                    sg.name AS spawngroup
-                FROM zone z
-                INNER JOIN spawn2 s2 ON z.short_name = s2.zone
-                INNER JOIN spawnentry se ON s2.spawngroupID = se.spawngroupID
-                LEFT JOIN spawngroup sg ON s2.spawngroupID = sg.id
-                WHERE se.npcID = %s
-                ORDER BY z.long_name
-            """
-            
-            cursor.execute(spawn_query, (npc_id_int,))
-            spawn_results = cursor.fetchall()
-            
-            spawn_locations = []
-            for spawn in spawn_results:
-                if isinstance(spawn, dict):
-                    spawn_data = dict(spawn)
-                else:
-                    columns = [desc[0] for desc in cursor.description]
-                    spawn_data = dict(zip(columns, spawn))
-                
-                spawn_locations.append({
-                    'zone_short_name': spawn_data['short_name'],
-                    'zone_long_name': spawn_data['long_name'] or spawn_data['short_name'],
-                    'zone_note': spawn_data.get('note', ''),
-                    'spawngroup': spawn_data.get('spawngroup', ''),
-                    'x': spawn_data.get('x', 0),
-                    'y': spawn_data.get('y', 0),
-                    'z': spawn_data.get('z', 0)
-                })
-            
-            # Get NPC spells (matching EQ Alla clone query structure)
-            npc_spells = []
-            if npc_data.get('npc_spells_id'):
-                spells_query = """
-                    SELECT 
-                        nse.spellid,
-                        sn.name as spell_name,
-                        sn.new_icon,
-                        nse.minlevel,
-                        nse.maxlevel,
-                        nse.priority,
-                        nse.recast_delay
-                    FROM npc_spells_entries nse
-                    INNER JOIN spells_new sn ON nse.spellid = sn.id
-                    WHERE nse.npc_spells_id = %s
-                    AND nse.minlevel <= %s
-                    AND nse.maxlevel >= %s
-                    ORDER BY nse.priority DESC, sn.name
-                """
-                
-                cursor.execute(spells_query, (npc_data['npc_spells_id'], npc_data.get('level', 1), npc_data.get('level', 1)))
-                spell_results = cursor.fetchall()
-                
-                for spell in spell_results:
-                    if isinstance(spell, dict):
-                        spell_data = dict(spell)
-                    else:
-                        columns = [desc[0] for desc in cursor.description]
-                        spell_data = dict(zip(columns, spell))
-                    
-                    npc_spells.append({
-                        'spell_id': spell_data['spellid'],
-                        'spell_name': spell_data['spell_name'].replace('_', ' ') if spell_data['spell_name'] else 'Unknown Spell',
-                        'icon': spell_data.get('new_icon', 0),
-                        'min_level': spell_data.get('minlevel', 1),
-                        'max_level': spell_data.get('maxlevel', 255),
-                        'priority': spell_data.get('priority', 0),
-                        'recast_delay': spell_data.get('recast_delay', 0)
-                    })
-
-            # Get merchant items (only discovered items)
-            merchant_items = []
-            if npc_data.get('merchant_id'):
-                merchant_query = """
-                    SELECT DISTINCT
-                        i.id as item_id,
-                        i.name as item_name,
-                        i.icon,
-                        i.price
-                    FROM merchantlist ml
-                    INNER JOIN items i ON ml.item = i.id
-                    INNER JOIN discovered_items di ON i.id = di.item_id
-                    WHERE ml.merchantid = %s
-                    AND ml.item > 0
-                    ORDER BY ml.slot, i.name
-                    LIMIT 100
-                """
-                
-                cursor.execute(merchant_query, (npc_data['merchant_id'],))
-                merchant_results = cursor.fetchall()
-                
-                for item in merchant_results:
-                    if isinstance(item, dict):
-                        item_data = dict(item)
-                    else:
-                        columns = [desc[0] for desc in cursor.description]
-                        item_data = dict(zip(columns, item))
-                    
-                    merchant_items.append({
-                        'item_id': item_data['item_id'],
-                        'item_name': item_data['item_name'].replace('_', ' ') if item_data['item_name'] else 'Unknown Item',
-                        'icon': item_data.get('icon', 0),
-                        'price': item_data.get('price', 0)
-                    })
-
-            # Get loot drops with hierarchical structure (loot drops containing items)
-            loot_drops = []
-            if npc_data.get('loottable_id'):
-                # First, get all unique loot drops for this NPC's loot table
-                loot_groups_query = """
-                    SELECT DISTINCT
-                        lte.lootdrop_id,
-                        lte.probability as table_probability,
-                        lte.multiplier,
-                        lte.droplimit,
-                        lte.mindrop
-                    FROM loottable_entries lte
-                    WHERE lte.loottable_id = %s
-                    ORDER BY lte.probability DESC, lte.lootdrop_id
-                """
-                
-                cursor.execute(loot_groups_query, (npc_data['loottable_id'],))
-                loot_groups = cursor.fetchall()
-                
-                for group in loot_groups:
-                    if isinstance(group, dict):
-                        group_data = dict(group)
-                    else:
-                        columns = [desc[0] for desc in cursor.description]
-                        group_data = dict(zip(columns, group))
-                    
-                    loot_drop_id = group_data['lootdrop_id']
-                    table_probability = group_data.get('probability', 100)
-                    multiplier = group_data.get('multiplier', 1)
-                    droplimit = group_data.get('droplimit', 0)
-                    mindrop = group_data.get('mindrop', 0)
-                    
-                    # Get items for this specific loot drop group
-                    items_query = """
-                        SELECT DISTINCT
-                            i.id as item_id,
-                            i.name as item_name,
-                            i.icon,
-                            i.itemtype,
-                            lde.chance as item_chance
-                        FROM lootdrop_entries lde
-                        INNER JOIN items i ON lde.item_id = i.id
-                        INNER JOIN discovered_items di ON i.id = di.item_id
-                        WHERE lde.lootdrop_id = %s
-                        AND lde.item_id > 0
-                        ORDER BY lde.chance DESC, i.name
-                        LIMIT 20
-                    """
-                    
-                    cursor.execute(items_query, (loot_drop_id,))
-                    item_results = cursor.fetchall()
-                    
-                    items = []
-                    for item in item_results:
-                        if isinstance(item, dict):
-                            item_data = dict(item)
-                        else:
-                            columns = [desc[0] for desc in cursor.description]
-                            item_data = dict(zip(columns, item))
-                        
-                        # Calculate overall probability (table_probability * item_chance)
-                        item_chance = item_data.get('item_chance', 1)
-                        overall_probability = round((table_probability / 100.0) * (item_chance / 100.0) * 100, 2)
-                        
-                        items.append({
-                            'item_id': item_data['item_id'],
-                            'item_name': item_data['item_name'].replace('_', ' ') if item_data['item_name'] else 'Unknown Item',
-                            'icon': item_data.get('icon', 0),
-                            'itemtype': item_data.get('itemtype', 0),
-                            'item_chance': item_chance,
-                            'overall_probability': max(0.01, overall_probability)
-                        })
-                    
-                    # Only add loot drop groups that have items
-                    if items:
-                        loot_drops.append({
-                            'loot_drop_id': loot_drop_id,
-                            'table_probability': table_probability,
-                            'multiplier': multiplier,
-                            'droplimit': droplimit,
-                            'mindrop': mindrop,
-                            'items': items
-                        })
+            # Spawns, spells, merchant list and loot in a fixed number of batched queries
+            relations = load_npc_relations(cursor, npc_data)
             
             # Format response with comprehensive NPC data matching EQ Alla clone
             detailed_npc = {
@@ -4509,10 +4701,10 @@ def get_npc_details(npc_id):
                 'special_attacks': parse_special_abilities(npc_data.get('special_abilities', '')),
                 
                 # Associated data
-                'spawn_locations': spawn_locations,
-                'loot_drops': loot_drops,
-                'spells': npc_spells,
-                'merchant_items': merchant_items
+                'spawn_locations': relations['spawn_locations'],
+                'loot_drops': relations['loot_drops'],
+                'spells': relations['spells'],
+                'merchant_items': relations['merchant_items']
             }
             
             app.logger.info(f"NPC details retrieved successfully for ID: {npc_id_int}")
@@ -4599,223 +4791,262 @@ if __name__ == '__main__':
     logger.info("✅ Server startup complete")
 
 
+def _parse_bbox(value):
+    """Parse a "min_x,min_y,max_x,max_y" query param (None if absent)."""
+    if not value:
+        return None
+    parts = [float(p) for p in value.split(',')]
+    if len(parts) != 4 or parts[0] > parts[2] or parts[1] > parts[3]:
+        raise ValueError("bbox must be min_x,min_y,max_x,max_y")
+    return tuple(parts)
+
+
+def _typed_array(values, stride):
+    """Encode a numpy array as a base64 typed-array block for the browser."""
+    return {
+        'dtype': 'float32' if values.dtype.kind == 'f' else 'uint8',
+        'stride': stride,
+        'count': len(values),
+        'data': base64.b64encode(values.tobytes()).decode('ascii')
+    }
+
+
+def _zone_map_payload(zone_map, zone_short_name, bbox, lod, typed):
+    """Render a zone map query as the JSON payload the map page expects."""
+    segments, colors = zone_map.query_segments(bbox, lod)
+    labels = zone_map.query_labels(bbox)
+    
+    payload = {
+        'zone': zone_short_name,
+        'version': zone_map.version,
+        'bbox': list(zone_map.bbox),
+        'line_count': len(segments),
+        'label_count': len(labels)
+    }
+    if typed:
+        payload['format'] = 'typed'
+        payload['segments'] = _typed_array(segments, 6)
+        payload['colors'] = _typed_array(colors, 3)
+        payload['labels'] = [list(label) for label in labels]
+    else:
+        payload['lines'] = [
+            f"L {s[0]:.4f}, {s[1]:.4f}, {s[2]:.4f}, {s[3]:.4f}, {s[4]:.4f}, {s[5]:.4f}, {c[0]}, {c[1]}, {c[2]}"
+            for s, c in zip(segments.tolist(), colors.tolist())
+        ]
+        payload['labels'] = [
+            f"P {x:.4f}, {y:.4f}, {z:.4f}, {r}, {g}, {b}, {size}, {text}"
+            for x, y, z, r, g, b, size, text in labels
+        ]
+    return payload
+
+
+def _zone_map_cache_headers(response, zone_map, etag):
+    """Apply validators and caching policy to a zone map response."""
+    response.set_etag(etag)
+    response.last_modified = int(zone_map.source_mtime)
+    response.vary.add('Accept-Encoding')
+    # Versioned URLs (?v=<version>) never change; anything else revalidates
+    if request.args.get('v') == zone_map.version:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'public, no-cache'
+    return response
+
+
 @app.route('/api/zone-map/<zone_short_name>', methods=['GET'])
 def get_zone_map(zone_short_name):
     """
-    Get zone map data (lines) for rendering an interactive map.
-    Reads from the Maps folder and returns processed line data.
+    Get zone map data (lines and labels) for rendering an interactive map.
+    
+    Served from the pre-parsed binary map store; nothing is truncated.
+    Full-map responses are precompressed (gzip, and brotli when available)
+    on first request and served from disk with a strong ETag, so
+    conditional requests get a 304.
+    
+    Query params:
+        bbox: Optional viewport "min_x,min_y,max_x,max_y" in map units
+        lod: Optional simplification grid size in map units (0 = full detail)
+        format: 'typed' for base64 float32/uint8 arrays, otherwise the
+                original "L ..." / "P ..." strings
+        v: Optional map version (from /api/zone-maps); a matching version
+           makes the response cacheable as immutable
     """
     try:
         # Sanitize zone name to prevent directory traversal
-        zone_short_name = zone_short_name.replace('..', '').replace('/', '').replace('\\', '').strip()
+        zone_short_name = zone_short_name.replace('..', '').replace('/', '').replace('\\', '').strip().lower()
         
         if not zone_short_name:
             return jsonify({'error': 'Zone name is required'}), 400
         
-        # Look for map file in Maps directory - try multiple possible locations
-        # First try: relative to backend directory (Railway deployment with symlink)
-        maps_dir = os.path.join(os.path.dirname(__file__), 'Maps')
-        
-        # Second try: relative to project root (local development)
-        if not os.path.exists(maps_dir):
-            maps_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Maps')
-        
-        # Third try: absolute path for Railway deployment
-        if not os.path.exists(maps_dir):
-            maps_dir = '/app/Maps'
-        
-        # Debug logging for production troubleshooting
-        print(f"[DEBUG] zone-map endpoint: zone={zone_short_name}, maps_dir={maps_dir}, exists={os.path.exists(maps_dir)}")
-        if os.path.exists(maps_dir):
-            files = os.listdir(maps_dir)[:5]  # Show first 5 files for debugging
-            print(f"[DEBUG] Maps directory contains {len(os.listdir(maps_dir))} files, sample: {files}")
-        
-        map_file_path = os.path.join(maps_dir, f"{zone_short_name}.txt")
-        
-        # Also try with _1 and _2 suffixes if base doesn't exist
-        if not os.path.exists(map_file_path):
-            for suffix in ['_1', '_2']:
-                alt_path = os.path.join(maps_dir, f"{zone_short_name}{suffix}.txt")
-                if os.path.exists(alt_path):
-                    map_file_path = alt_path
-                    break
-        
-        if not os.path.exists(map_file_path):
+        try:
+            bbox = _parse_bbox(request.args.get('bbox'))
+            lod = float(request.args.get('lod', 0))
+            if lod < 0:
+                raise ValueError("lod must be >= 0")
+        except ValueError as e:
+            return jsonify({'error': f'Invalid map query: {e}'}), 400
+        
+        store = get_zone_map_store()
+        zone_map = store.get(zone_short_name)
+        if zone_map is None:
             return jsonify({'error': 'Zone map not found', 'zone': zone_short_name}), 404
         
-        # Read and parse map file
-        lines = []
-        try:
-            with open(map_file_path, 'r', encoding='utf-8') as f:
-                for line_num, line in enumerate(f):
-                    line = line.strip()
-                    if line.startswith('L '):
-                        lines.append(line)
-                    # Limit lines to prevent excessive memory usage
-                    if len(lines) >= 10000:
-                        app.logger.warning(f"Zone map {zone_short_name} has >10000 lines, truncating")
-                        break
-        except UnicodeDecodeError:
-            # Try with latin-1 encoding if UTF-8 fails
-            with open(map_file_path, 'r', encoding='latin-1') as f:
-                for line_num, line in enumerate(f):
-                    line = line.strip()
-                    if line.startswith('L '):
-                        lines.append(line)
-                    if len(lines) >= 10000:
-                        break
-        
-        # Try to load label file (usually _1.txt suffix)
-        labels = []
-        label_file_path = os.path.join(maps_dir, f"{zone_short_name}_1.txt")
-        
-        if os.path.exists(label_file_path):
-            try:
-                with open(label_file_path, 'r', encoding='utf-8') as f:
-                    for line_num, line in enumerate(f):
-                        line = line.strip()
-                        if line.startswith('P '):
-                            labels.append(line)
-                        # Limit labels to prevent excessive memory usage
-                        if len(labels) >= 1000:
-                            app.logger.warning(f"Zone labels {zone_short_name} has >1000 labels, truncating")
-                            break
-            except UnicodeDecodeError:
-                # Try with latin-1 encoding if UTF-8 fails
-                with open(label_file_path, 'r', encoding='latin-1') as f:
-                    for line_num, line in enumerate(f):
-                        line = line.strip()
-                        if line.startswith('P '):
-                            labels.append(line)
-                        if len(labels) >= 1000:
-                            break
-            except Exception as e:
-                app.logger.warning(f"Could not read label file for {zone_short_name}: {str(e)}")
+        typed = request.args.get('format') == 'typed'
+        variant = 'typed' if typed else 'legacy'
         
-        app.logger.info(f"Loaded {len(lines)} map lines and {len(labels)} labels for zone: {zone_short_name}")
+        if bbox is None and not lod:
+            # Full map: pick the best stored encoding the client accepts
+            encoding = next(
+                (enc for enc, _ in PRECOMPRESSED_ENCODINGS if request.accept_encodings[enc]),
+                'identity'
+            )
+            etag = f"{zone_map.version}-{variant}" + ('' if encoding == 'identity' else f"-{encoding}")
+            if request.if_none_match.contains_weak(etag):
+                response = app.response_class(status=304)
+                return _zone_map_cache_headers(response, zone_map, etag)
+            body = store.get_response(
+                zone_short_name, zone_map, variant,
+                lambda: _zone_map_payload(zone_map, zone_short_name, None, 0, typed),
+                encoding
+            )
+            response = app.response_class(body, mimetype='application/json')
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+            return _zone_map_cache_headers(response, zone_map, etag)
         
-        return jsonify({
-            'zone': zone_short_name,
-            'lines': lines,
-            'labels': labels,
-            'line_count': len(lines),
-            'label_count': len(labels)
-        })
+        # Viewport / LOD queries are rendered per request but still revalidate cheaply
+        query_key = hashlib.md5(f"{bbox}|{lod}".encode('utf-8')).hexdigest()[:12]
+        etag = f"{zone_map.version}-{variant}-{query_key}"
+        if request.if_none_match.contains_weak(etag):
+            return _zone_map_cache_headers(app.response_class(status=304), zone_map, etag)
+        
+        payload = _zone_map_payload(zone_map, zone_short_name, bbox, lod, typed)
+        app.logger.info(f"Loaded {payload['line_count']} map lines and {payload['label_count']} labels for zone: {zone_short_name}")
+        return _zone_map_cache_headers(jsonify(payload), zone_map, etag)
         
-    except FileNotFoundError:
-        return jsonify({'error': 'Zone map not found', 'zone': zone_short_name}), 404
     except Exception as e:
         app.logger.error(f"Error loading zone map {zone_short_name}: {str(e)}")
         return jsonify({'error': 'Failed to load zone map'}), 500
 
 
+@app.route('/api/zone-maps', methods=['GET'])
+def list_zone_maps():
+    """
+    List the zones that have map files.
+    
+    Each zone reports its available layers (base, _1, _2, _3) with file
+    size, mtime and encoding, straight from the in-memory map catalog, plus
+    the map version to pass as ?v= for immutable /api/zone-map responses.
+    """
+    try:
+        zones = get_zone_map_catalog().list_zones()
+        store = get_zone_map_store()
+        for zone in zones:
+            zone['version'] = store.source_version(zone['zone'])
+        return jsonify({
+            'zones': zones,
+            'count': len(zones)
+        })
+    except Exception as e:
+        app.logger.error(f"Error listing zone maps: {str(e)}")
+        return jsonify({'error': 'Failed to list zone maps'}), 500
+
+
+def _load_zone_npcs(zone_short_name):
+    """
+    Get a zone's full spawn list.
+    
+    Returns:
+        Tuple of (npcs, source, version); version identifies the zone summary
+        build the list came from (None for live database results)
+    
+    Raises:
+        ConnectionError: If the database is needed but not available
+    """
+    summaries = get_ready_zone_summaries()
+    if summaries:
+        try:
+            summary = summaries.get_zone(zone_short_name)
+            return (summary['npcs'] if summary else []), 'summary', summaries.built_at
+        except OSError as e:
+            app.logger.warning(f"Zone summary for {zone_short_name} unreadable, using database: {e}")
+    
+    conn, db_type, error = get_eqemu_db_connection()
+    if not conn:
+        raise ConnectionError(error or 'Database not configured')
+    cursor = conn.cursor()
+    try:
+        # Based on EQEmu spawn2 schema: https://docs.eqemu.io/schema/spawns/spawn2/
+        return fetch_zone_npcs(cursor, zone_short_name), 'database', None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _zone_spawn_grid(zone_short_name):
+    """
+    Get the spatial index over a zone's spawn points.
+    
+    The spawn list is only loaded when the grid isn't cached. Grids are keyed
+    by the zone summary build, or without summaries by the content database
+    and a SPAWN_INDEX_DATABASE_TTL_SECONDS time bucket.
+    
+    Returns:
+        Tuple of (SpawnGrid, source)
+    """
+    summaries = get_ready_zone_summaries()
+    if summaries:
+        version, source = ('summary', summaries.built_at), 'summary'
+    else:
+        version_tag = _content_db_version_tag()
+        version = ('database', version_tag, int(time.time() // SPAWN_INDEX_DATABASE_TTL_SECONDS)) \
+            if version_tag else None
+        source = 'database'
+    
+    loaded = {}
+    
+    def load():
+        npcs, loaded['source'], _ = _load_zone_npcs(zone_short_name)
+        return npcs
+    
+    grid = get_spawn_index_cache().get(zone_short_name, version, load)
+    return grid, loaded.get('source', source)
+
+
 @app.route('/api/zone-npcs/<zone_short_name>', methods=['GET'])
+@cached_response()
 def get_zone_npcs(zone_short_name):
     """
     Get all NPCs that spawn in a specific zone with their spawn locations.
     Returns detailed NPC information for the zone page NPC list.
+    
+    Served from the precomputed zone summaries when built. ?limit=&offset=
+    page through the list; without limit the whole list is returned.
     """
     try:
         zone_short_name = zone_short_name.lower().strip()
-        app.logger.info(f"Getting NPCs for zone: {zone_short_name}")
-        
-        # Get database connection
-        conn, db_type, error = get_eqemu_db_connection()
-        if not conn:
-            app.logger.error(f"Database connection failed: {error}")
-            return jsonify({'error': error or 'Database not configured'}), 503
-        
-        npcs = []
+        try:
+            limit, offset = parse_zone_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        cursor = conn.cursor()
         try:
-            # Query to get all NPCs in the specified zone with spawn details
-            # Based on EQEmu spawn2 schema: https://docs.eqemu.io/schema/spawns/spawn2/
-            npc_query = """
-                SELECT DISTINCT
-                    nt.id,
-                    nt.name,
-                    nt.lastname,
-                    nt.level,
-                    nt.race,
-                    nt.class,
-                    nt.hp,
-                    nt.mana,
-                    nt.AC,
-                    nt.mindmg,
-                    nt.maxdmg,
-                    s2.x,
-                    s2.y,
-                    s2.z,
-                    s2.heading,
-                    s2.respawntime,
-                    s2.variance,
-                    s2.pathgrid,
-                    sg.name AS spawngroup_name,
-                    se.chance AS spawn_chance
-                FROM npc_types nt
-                INNER JOIN spawnentry se ON nt.id = se.npcID
-                INNER JOIN spawn2 s2 ON se.spawngroupID = s2.spawngroupID
-                LEFT JOIN spawngroup sg ON s2.spawngroupID = sg.id
-                WHERE s2.zone = %s
-                ORDER BY nt.level DESC, nt.name ASC
-                LIMIT 500
-            """
-            
-            cursor.execute(npc_query, (zone_short_name,))
-            results = cursor.fetchall()
-            
-            app.logger.debug(f"Found {len(results)} NPC spawns in zone: {zone_short_name}")
-            
-            # Process results
-            for row in results:
-                if isinstance(row, dict):
-                    npc_data = dict(row)
-                else:
-                    columns = [desc[0] for desc in cursor.description]
-                    npc_data = dict(zip(columns, row))
-                
-                npc = {
-                    'id': npc_data['id'],
-                    'name': npc_data['name'].replace('_', ' ') if npc_data['name'] else 'Unknown NPC',
-                    'lastname': npc_data.get('lastname', '') or '',
-                    'full_name': (npc_data['name'].replace('_', ' ') + ' ' + (npc_data.get('lastname', '') or '')).strip(),
-                    'level': npc_data.get('level', 1),
-                    'race': npc_data.get('race', 0),
-                    'class': npc_data.get('class', 0),
-                    'hp': npc_data.get('hp', 0),
-                    'mana': npc_data.get('mana', 0),
-                    'ac': npc_data.get('AC', 0),
-                    'mindmg': npc_data.get('mindmg', 0),
-                    'maxdmg': npc_data.get('maxdmg', 0),
-                    'location': {
-                        'x': float(npc_data.get('x', 0)) if npc_data.get('x') is not None else 0,
-                        'y': float(npc_data.get('y', 0)) if npc_data.get('y') is not None else 0,
-                        'z': float(npc_data.get('z', 0)) if npc_data.get('z') is not None else 0,
-                        'heading': float(npc_data.get('heading', 0)) if npc_data.get('heading') is not None else 0
-                    },
-                    'spawn_info': {
-                        'respawn_time': npc_data.get('respawntime', 0),
-                        'variance': npc_data.get('variance', 0),
-                        'spawn_chance': npc_data.get('spawn_chance', 100),
-                        'spawngroup': npc_data.get('spawngroup_name', '') or '',
-                        'pathgrid': npc_data.get('pathgrid', 0)
-                    }
-                }
-                npcs.append(npc)
-            
-            app.logger.info(f"Retrieved {len(npcs)} NPCs for zone: {zone_short_name}")
-            
-        finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
+            npcs, source, _ = _load_zone_npcs(zone_short_name)
+        except ConnectionError as e:
+            app.logger.error(f"Database connection failed: {e}")
+            return jsonify({'error': str(e)}), 503
+        
+        page = zone_page_of(npcs, limit, offset)
+        app.logger.debug(f"Retrieved {len(page)} of {len(npcs)} NPCs for zone {zone_short_name} from {source}")
         
         return jsonify({
             'zone': zone_short_name,
-            'npcs': npcs,
-            'count': len(npcs)
+            'npcs': page,
+            'count': len(page),
+            'total': len(npcs),
+            'offset': offset,
+            'limit': limit,
+            'source': source
         })
         
     except Exception as e:
@@ -4823,6 +5054,107 @@ def get_zone_npcs(zone_short_name):
         return jsonify({'error': f'Failed to get zone NPCs: {str(e)}'}), 500
 
 
+def _spawn_space_args():
+    """Read ?space= (world or map); map coordinates are world x/y negated."""
+    space = (request.args.get('space') or 'world').lower()
+    if space not in ('world', 'map'):
+        raise ValueError("space must be 'world' or 'map'")
+    return space
+
+
+@app.route('/api/zone-npcs/<zone_short_name>/region', methods=['GET'])
+@cached_response()
+def get_zone_npcs_region(zone_short_name):
+    """
+    Get the spawns inside a rectangle of a zone.
+    
+    Query params:
+        bbox: "min_x,min_y,max_x,max_y" (required)
+        space: 'world' (spawn2 coordinates, default) or 'map' (zone map
+            units, as used by the map viewer)
+        limit: Maximum spawns returned (default and max SPAWN_REGION_MAX_RESULTS)
+    """
+    zone_short_name = zone_short_name.lower().strip()
+    try:
+        bbox = _parse_bbox(request.args.get('bbox'))
+        if bbox is None:
+            raise ValueError('bbox is required')
+        space = _spawn_space_args()
+        limit = int(request.args.get('limit', SPAWN_REGION_MAX_RESULTS))
+        if not 1 <= limit <= SPAWN_REGION_MAX_RESULTS:
+            raise ValueError(f'limit must be between 1 and {SPAWN_REGION_MAX_RESULTS}')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        grid, source = _zone_spawn_grid(zone_short_name)
+        min_x, min_y, max_x, max_y = bbox
+        if space == 'map':
+            min_x, min_y, max_x, max_y = -max_x, -max_y, -min_x, -min_y
+        npcs, total = grid.query_bbox(min_x, min_y, max_x, max_y, limit)
+        return jsonify({
+            'zone': zone_short_name,
+            'bbox': list(bbox),
+            'space': space,
+            'npcs': npcs,
+            'count': len(npcs),
+            'total': total,
+            'truncated': total > len(npcs),
+            'source': source
+        })
+    except ConnectionError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        app.logger.error(f"Error getting NPC region for zone {zone_short_name}: {e}")
+        return jsonify({'error': f'Failed to get zone NPC region: {str(e)}'}), 500
+
+
+@app.route('/api/zone-npcs/<zone_short_name>/nearest', methods=['GET'])
+@cached_response()
+def get_zone_npcs_nearest(zone_short_name):
+    """
+    Get the spawns closest to a point in a zone.
+    
+    Query params:
+        x, y: Point (required); z: optional height for 3D distances
+        space: 'world' (default) or 'map', as for /region
+        k: Number of spawns (default 10, max SPAWN_NEAREST_MAX_K)
+        max_distance: Optional cutoff distance
+    """
+    zone_short_name = zone_short_name.lower().strip()
+    try:
+        x = float(request.args['x'])
+        y = float(request.args['y'])
+        z = float(request.args['z']) if request.args.get('z') else None
+        space = _spawn_space_args()
+        k = int(request.args.get('k', 10))
+        if not 1 <= k <= SPAWN_NEAREST_MAX_K:
+            raise ValueError(f'k must be between 1 and {SPAWN_NEAREST_MAX_K}')
+        max_distance = float(request.args['max_distance']) if request.args.get('max_distance') else None
+    except KeyError:
+        return jsonify({'error': 'x and y are required'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        grid, source = _zone_spawn_grid(zone_short_name)
+        if space == 'map':
+            x, y = -x, -y
+        nearest = grid.nearest(x, y, z, k, max_distance)
+        return jsonify({
+            'zone': zone_short_name,
+            'space': space,
+            'npcs': [dict(npc, distance=round(distance, 2)) for distance, npc in nearest],
+            'count': len(nearest),
+            'source': source
+        })
+    except ConnectionError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        app.logger.error(f"Error getting nearest NPCs for zone {zone_short_name}: {e}")
+        return jsonify({'error': f'Failed to get nearest zone NPCs: {str(e)}'}), 500
+
+
 def get_cursor_value(cursor_row, index=0):
     """Helper to extract values from cursor results regardless of format"""
     if cursor_row is None:
@@ -4974,94 +5306,71 @@ def debug_zone_items(zone_short_name):
 
 
 @app.route('/api/zone-items/<zone_short_name>', methods=['GET'])
+@cached_response()
 def get_zone_items(zone_short_name):
     """
     Get all items that drop from NPCs in a specific zone.
     Returns unique items with drop information for the zone page items list.
+    
+    Each item carries its best drop chance in the zone and how many of the
+    zone's NPCs drop it. Paged like /api/zone-npcs.
     """
+    zone_short_name = (zone_short_name or '').lower().strip()
     if not zone_short_name:
         return jsonify({'error': 'Zone short name is required'}), 400
+    try:
+        limit, offset = parse_zone_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    cursor = None
-    conn = None
     try:
-        conn, db_type, error = get_eqemu_db_connection()
-        if not conn:
-            return jsonify({'error': error or 'Database not connected'}), 503
+        summaries = get_ready_zone_summaries()
+        summary = None
+        if summaries:
+            try:
+                summary = summaries.get_zone(zone_short_name)
+            except OSError as e:
+                app.logger.warning(f"Zone summary for {zone_short_name} unreadable, using database: {e}")
+                summaries = None
+        if summaries:
+            if summary is None:
+                return jsonify({'error': f'Zone {zone_short_name} not found'}), 404
+            items = summary['items']
+            source = 'summary'
+        else:
+            conn, db_type, error = get_eqemu_db_connection()
+            if not conn:
+                return jsonify({'error': error or 'Database not connected'}), 503
             
-        cursor = conn.cursor()
-        items = []
-        
-        # Debug: First check if zone exists
-        cursor.execute("SELECT zoneidnumber, short_name, long_name FROM zone WHERE short_name = %s", (zone_short_name,))
-        zone_info = cursor.fetchone()
-        
-        if not zone_info:
-            app.logger.error(f"Zone '{zone_short_name}' not found in database")
-            return jsonify({'error': f'Zone {zone_short_name} not found'}), 404
-        
-        app.logger.info(f"Found zone: {zone_info}")
-        
-        # Use optimized single query approach for maximum performance
-        # This eliminates the N+1 query problem by joining all tables at once
-        import time
-        start_time = time.time()
-        
-        optimized_query = """
-        SELECT DISTINCT 
-            items.id, 
-            items.Name, 
-            items.icon, 
-            items.itemtype
-        FROM spawn2 s2
-        JOIN spawnentry se ON s2.spawngroupID = se.spawngroupID  
-        JOIN npc_types nt ON se.npcID = nt.id
-        JOIN loottable_entries lte ON nt.loottable_id = lte.loottable_id
-        JOIN lootdrop_entries lde ON lte.lootdrop_id = lde.lootdrop_id
-        JOIN items ON lde.item_id = items.id
-        WHERE s2.zone = %s
-        AND nt.loottable_id > 0
-        AND items.Name IS NOT NULL
-        AND items.Name != ''
-        ORDER BY items.Name
-        """
-        
-        cursor.execute(optimized_query, (zone_short_name,))
-        item_results = cursor.fetchall()
-        query_time = time.time() - start_time
-        
-        # Format results
-        items = []
-        for item_row in item_results:
-            items.append({
-                'id': get_cursor_value(item_row, 0),
-                'name': get_cursor_value(item_row, 1),
-                'icon': get_cursor_value(item_row, 2) or 0,
-                'item_type': get_cursor_value(item_row, 3) or 0
-            })
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT zoneidnumber, short_name, long_name FROM zone WHERE short_name = %s", (zone_short_name,))
+                if not cursor.fetchone():
+                    app.logger.error(f"Zone '{zone_short_name}' not found in database")
+                    return jsonify({'error': f'Zone {zone_short_name} not found'}), 404
+                
+                start_time = time.time()
+                items = fetch_zone_items(cursor, zone_short_name)
+                app.logger.info(f"Retrieved {len(items)} items for zone: {zone_short_name} in {(time.time() - start_time)*1000:.1f}ms")
+            finally:
+                cursor.close()
+                conn.close()
+            source = 'database'
         
-        app.logger.info(f"Retrieved {len(items)} items for zone: {zone_short_name} in {query_time*1000:.1f}ms using optimized single query")
+        page = zone_page_of(items, limit, offset)
         
     except Exception as e:
         app.logger.error(f"Error getting items for zone {zone_short_name}: {e}")
         return jsonify({'error': f'Failed to get zone items: {str(e)}'}), 500
     
-    finally:
-        if cursor:
-            try:
-                cursor.close()
-            except:
-                pass
-        if conn:
-            try:
-                conn.close()
-            except:
-                pass
-    
     return jsonify({
         'zone': zone_short_name,
-        'items': items,
-        'count': len(items)
+        'items': page,
+        'count': len(page),
+        'total': len(items),
+        'offset': offset,
+        'limit': limit,
+        'source': source
     })
 
 
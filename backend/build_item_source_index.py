@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Offline builder for the precomputed item source index.
+
+The web app rebuilds the index in the background on its own; this script is
+for building it ahead of a deploy or after a large content import.
+
+Usage:
+    python build_item_source_index.py            # Build and save the index
+    python build_item_source_index.py --check    # Show the saved index status
+"""
+
+import sys
+import argparse
+import logging
+
+from utils.item_source_index import ItemSourceIndex
+from utils.content_db_manager import get_content_db_manager
+from utils.persistent_config import get_persistent_config
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the item source index')
+    parser.add_argument('--check', action='store_true', help='Show the saved index status and exit')
+    parser.add_argument('--path', help='Override the index file path')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    index = ItemSourceIndex(path=args.path) if args.path else ItemSourceIndex()
+
+    if args.check:
+        if not index.load():
+            print(f"No item source index found at {index.path}")
+            return 1
+        for key, value in index.get_status().items():
+            print(f"{key}: {value}")
+        return 0
+
+    db_config = get_persistent_config().get_database_config() or {}
+    database_url = db_config.get('production_database_url', '')
+    if not database_url:
+        print("ERROR: No content database configured.")
+        return 1
+
+    with get_content_db_manager().get_connection() as conn:
+        index.build(conn, index.make_version_tag(database_url))
+    index.save()
+
+    status = index.get_status()
+    print(f"Indexed {status['items_with_flags']} items in {status['build_seconds']}s -> {index.path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Offline builder for the binary zone map store.
+
+The web app converts a zone's Maps/*.txt files on first request; this script
+converts every map up front so a fresh deploy never parses text at serve time.
+
+Usage:
+    python build_zone_maps.py                # Build all zone maps
+    python build_zone_maps.py qeynos2 ...     # Build specific zones
+    python build_zone_maps.py --maps-dir DIR  # Override the Maps directory
+"""
+
+import sys
+import time
+import argparse
+import logging
+
+from utils.zone_map_store import ZoneMapStore, ZONE_MAP_CACHE_DIR
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build binary zone maps')
+    parser.add_argument('zones', nargs='*', help='Zone short names (default: all)')
+    parser.add_argument('--maps-dir', help='Override the Maps directory')
+    parser.add_argument('--out', default=ZONE_MAP_CACHE_DIR, help='Output directory')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    store = ZoneMapStore(maps_dir=args.maps_dir, cache_dir=args.out)
+    if not store.maps_dir:
+        print("ERROR: No Maps directory found.")
+        return 1
+
+    start = time.time()
+    if args.zones:
+        built = 0
+        for zone in args.zones:
+            if store.build(zone):
+                built += 1
+            else:
+                print(f"No map found for {zone}")
+    else:
+        built = store.build_all()
+
+    print(f"Built {built} zone maps in {time.time() - start:.1f}s -> {store.cache_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
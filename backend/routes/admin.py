@@ -13,10 +13,30 @@ import os
 import psutil
 import time
 from collections import defaultdict, deque
+from functools import lru_cache
 import json
 import threading
 import atexit
-from utils.query_tracking_persistence import QueryTrackingPersistence
+from utils.query_tracking_persistence import QueryTrackingPersistence, write_json_atomic
+from utils.response_cache import get_response_cache
+from utils.item_source_index import get_item_source_index
+from utils.name_index import get_name_indexes
+from utils.search_pagination import get_search_count_cache
+from utils.filter_planner import get_filter_planner
+from utils.zone_map_catalog import get_zone_map_catalog
+from utils.zone_map_store import get_zone_map_store
+from utils.schema_capabilities import get_schema_registry
+from utils.item_tooltips import get_item_tooltip_service
+from utils.recipe_results import get_recipe_result_index
+from utils.recipe_graph import get_recipe_graph_manager
+from utils.zone_summaries import get_zone_summary_store
+from utils.spawn_index import get_spawn_index_cache
+from utils.response_compression import get_response_compressor
+from utils.metrics_store import get_metrics_store, LATENCY_WINDOWS, QUERY_PROFILE_SORTS
+from utils.latency_histogram import LatencyHistogram
+from utils.query_tracker import get_query_tracking_queue
+from utils.sql_fingerprint import fingerprint_query
+from utils.explain_sampler import get_explain_sampler
 
 admin_bp = Blueprint('admin', __name__)
 logger = logging.getLogger(__name__)
@@ -47,8 +67,7 @@ def save_timeline_data(timeline_data):
                 timeline_list.append(entry_copy)
         
         # Save to file
-        with open(TIMELINE_DATA_FILE, 'w') as f:
-            json.dump(timeline_list, f, indent=2)
+        write_json_atomic(TIMELINE_DATA_FILE, timeline_list)
             
         try:
             logger.info(f"Timeline data saved to {TIMELINE_DATA_FILE} ({len(timeline_list)} entries)")
@@ -2291,6 +2310,7 @@ def reconnect_database():
         # Reset connection state without blocking operations
         from utils.content_db_manager import get_content_db_manager
         manager = get_content_db_manager()
+        manager.close()
         
         # Reset retry delay to allow immediate reconnection attempt
         with manager._lock:
@@ -2337,6 +2357,12 @@ try:
 except Exception as e:
     logger.error(f"Failed to initialize system_metrics: {e}")
 
+# Guards the in-process system_metrics structures; request threads update them concurrently
+metrics_lock = threading.RLock()
+
+# Fleet-wide metrics shared by all worker processes start from the persisted query stats
+get_metrics_store().seed_database_stats(database_stats)
+
 def initialize_test_data():
     """REMOVED - No test data initialization."""
     pass
@@ -2380,21 +2406,37 @@ def periodic_save_query_tracking():
 # Don't start periodic query tracking save immediately 
 # periodic_save_query_tracking()
 
+def save_query_tracking():
+    """
+    Write query tracking metrics and timeline to disk.
+    
+    Copies the data under metrics_lock and writes outside it, so request
+    threads and the query tracking queue aren't held up by the file I/O.
+    
+    Returns:
+        True if both files were written
+    """
+    with metrics_lock:
+        db_stats = system_metrics['database_stats']
+        metrics_to_save = {
+            'total_queries': db_stats['total_queries'],
+            'query_times': list(db_stats['query_times']),
+            'slow_queries': list(db_stats['slow_queries']),
+            'query_types': dict(db_stats['query_types']),
+            'tables_accessed': dict(db_stats['tables_accessed']),
+            'table_sources': {table: dict(sources) for table, sources in db_stats['table_sources'].items()}
+        }
+        timeline = [dict(entry, tables=dict(entry['tables'])) for entry in db_stats['timeline']]
+    
+    saved_metrics = query_persistence.save_metrics(metrics_to_save)
+    saved_timeline = query_persistence.save_timeline(timeline)
+    return saved_metrics and saved_timeline
+
 # Save query tracking data on shutdown
 def save_query_tracking_on_shutdown():
     """Save query tracking data when the application shuts down."""
     try:
-        metrics_to_save = {
-            'total_queries': system_metrics['database_stats']['total_queries'],
-            'query_times': system_metrics['database_stats']['query_times'],
-            'slow_queries': system_metrics['database_stats']['slow_queries'],
-            'query_types': system_metrics['database_stats']['query_types'],
-            'tables_accessed': system_metrics['database_stats']['tables_accessed'],
-            'table_sources': system_metrics['database_stats']['table_sources']
-        }
-        
-        query_persistence.save_metrics(metrics_to_save)
-        query_persistence.save_timeline(system_metrics['database_stats']['timeline'])
+        save_query_tracking()
         try:
             logger.info("Query tracking data saved on shutdown")
         except:
@@ -2584,15 +2626,19 @@ def reset_metrics():
     global system_metrics
     
     try:
+        # Clear the shared metrics for every worker
+        get_metrics_store().reset()
+
         # Clear in-memory metrics
-        system_metrics['response_times'].clear()
-        system_metrics['endpoint_stats'].clear()
-        system_metrics['database_stats']['total_queries'] = 0
-        system_metrics['database_stats']['query_times'].clear()
-        system_metrics['database_stats']['slow_queries'].clear()
-        system_metrics['database_stats']['query_types'].clear()
-        system_metrics['database_stats']['tables_accessed'].clear()
-        system_metrics['database_stats']['timeline'].clear()
+        with metrics_lock:
+            system_metrics['response_times'].clear()
+            system_metrics['endpoint_stats'].clear()
+            system_metrics['database_stats']['total_queries'] = 0
+            system_metrics['database_stats']['query_times'].clear()
+            system_metrics['database_stats']['slow_queries'].clear()
+            system_metrics['database_stats']['query_types'].clear()
+            system_metrics['database_stats']['tables_accessed'].clear()
+            system_metrics['database_stats']['timeline'].clear()
         
         # Clear persistent data files
         import os
@@ -2656,7 +2702,12 @@ def get_system_metrics():
         logger.debug(f"Metrics endpoint called, total_queries: {system_metrics['database_stats']['total_queries']}, timeline_entries: {len(system_metrics['database_stats']['timeline'])}")
         
         # Update timeline to current hour if needed
-        update_query_timeline()
+        with metrics_lock:
+            update_query_timeline()
+
+        # Request and query metrics aggregated across all worker processes
+        fleet = get_metrics_store().snapshot()
+        fleet_db = fleet['database']
         
         # Get system resource usage
         process = psutil.Process()
@@ -2689,22 +2740,27 @@ def get_system_metrics():
         uptime_seconds = time.time() - system_metrics['server_start_time']
         
         # Calculate average response time
-        response_times = list(system_metrics['response_times'])
+        response_times = fleet['response_times']
         avg_response_time = sum(response_times) / len(response_times) if response_times else 0
+
+        # Response time percentiles over the last hour, all endpoints combined
+        overall_latency = LatencyHistogram()
+        for histogram in get_metrics_store().latency_histograms('endpoint', LATENCY_WINDOWS['1h']).values():
+            overall_latency.merge(histogram)
         
         # Calculate error rate
-        total_requests = sum(stats['total_calls'] for stats in system_metrics['endpoint_stats'].values())
-        total_errors = sum(stats['errors'] for stats in system_metrics['endpoint_stats'].values())
+        total_requests = sum(stats['total_calls'] for stats in fleet['endpoint_stats'].values())
+        total_errors = sum(stats['errors'] for stats in fleet['endpoint_stats'].values())
         error_rate = (total_errors / total_requests * 100) if total_requests > 0 else 0
         
         # Get database metrics
-        db_query_times = list(system_metrics['database_stats']['query_times'])
+        db_query_times = fleet_db['query_times']
         avg_query_time = sum(db_query_times) / len(db_query_times) if db_query_times else 0
         
         # Debug timeline
-        timeline_len = len(system_metrics['database_stats']['timeline'])
+        timeline_len = len(fleet_db['timeline'])
         logger.info(f"Timeline length before formatting: {timeline_len}")
-        formatted_timeline = format_query_timeline(system_metrics['database_stats']['timeline'])
+        formatted_timeline = format_query_timeline(fleet_db['timeline'])
         logger.info(f"Timeline length after formatting: {len(formatted_timeline)}")
         
         return jsonify(create_success_response({
@@ -2731,22 +2787,44 @@ def get_system_metrics():
                 'total_requests': total_requests,
                 'error_rate': round(error_rate, 2),
                 'error_count': total_errors,
-                'response_time_history': response_times[-20:] if response_times else []
+                'response_time_history': response_times[-20:] if response_times else [],
+                'latency': overall_latency.summary(),
+                'compression': get_response_compressor().get_stats()
             },
             'cache': {
                 'cached_classes': 0,
                 'cached_spell_details': 0,
                 'total_spells': 0,
-                'cache_age_hours': {}
+                'cache_age_hours': {},
+                'response_cache': get_response_cache().get_stats(),
+                'item_source_index': get_item_source_index().get_status(),
+                'name_indexes': get_name_indexes().get_status(),
+                'search_counts': get_search_count_cache().get_stats(),
+                'filter_planner': get_filter_planner().get_stats(),
+                'zone_maps': dict(get_zone_map_catalog().get_status(), **get_zone_map_store().get_stats()),
+                'schema_capabilities': get_schema_registry().get_status(),
+                'item_tooltips': get_item_tooltip_service().get_stats(),
+                'recipe_results': get_recipe_result_index().get_status(),
+                'recipe_graph': get_recipe_graph_manager().get_status(),
+                'zone_summaries': get_zone_summary_store().get_status(),
+                'spawn_index': get_spawn_index_cache().get_stats()
             },
             'database': {
-                'total_queries': system_metrics['database_stats']['total_queries'],
+                'total_queries': fleet_db['total_queries'],
                 'avg_query_time': round(avg_query_time, 2),
-                'query_types': dict(system_metrics['database_stats']['query_types']),
-                'tables_accessed': dict(system_metrics['database_stats']['tables_accessed']),
-                'slow_queries_count': len(system_metrics['database_stats']['slow_queries']),
-                'recent_slow_queries': list(system_metrics['database_stats']['slow_queries'])[-5:],
-                'timeline': formatted_timeline
+                'query_types': fleet_db['query_types'],
+                'tables_accessed': fleet_db['tables_accessed'],
+                'slow_queries_count': len(fleet_db['slow_queries']),
+                'recent_slow_queries': fleet_db['slow_queries'][-5:],
+                'timeline': formatted_timeline,
+                'tracking_queue': get_query_tracking_queue().get_stats(),
+                'explain_sampler': get_explain_sampler().get_status()
+            },
+            'workers': {
+                'active': len(fleet['workers']),
+                'pids': [worker['pid'] for worker in fleet['workers']],
+                'stats_since': fleet['stats_since'],
+                'metrics_store': get_metrics_store().get_status()
             },
             'health_score': calculate_health_score(cpu_percent, memory.percent, error_rate, avg_response_time)
         }))
@@ -2953,14 +3031,24 @@ def get_endpoint_metrics():
     """
     Get detailed metrics for all API endpoints.
     
+    Query parameters:
+        window: Latency percentile window (5m, 1h, 24h; default: 1h)
+    
     Returns:
-        JSON response with endpoint performance data
+        JSON response with endpoint performance data and per-table query latency
     """
     try:
-        global system_metrics
+        window = request.args.get('window', '1h')
+        if window not in LATENCY_WINDOWS:
+            return create_error_response(f"window must be one of: {', '.join(LATENCY_WINDOWS)}", 400)
+
+        store = get_metrics_store()
+        fleet = store.snapshot()
+        endpoint_latency = store.latency_summaries('endpoint', LATENCY_WINDOWS[window])
+        table_latency = store.latency_summaries('table', LATENCY_WINDOWS[window])
         endpoints = []
         
-        for endpoint, stats in system_metrics['endpoint_stats'].items():
+        for endpoint, stats in fleet['endpoint_stats'].items():
             avg_time = (stats['total_time'] / stats['total_calls']) if stats['total_calls'] > 0 else 0
             success_rate = ((stats['total_calls'] - stats['errors']) / stats['total_calls'] * 100) if stats['total_calls'] > 0 else 100
             
@@ -2974,7 +3062,7 @@ def get_endpoint_metrics():
             
             # Calculate calls per hour
             if stats['last_called']:
-                hours_since_start = (time.time() - system_metrics['server_start_time']) / 3600
+                hours_since_start = (time.time() - fleet['stats_since']) / 3600
                 calls_per_hour = stats['total_calls'] / hours_since_start if hours_since_start > 0 else 0
             else:
                 calls_per_hour = 0
@@ -2988,7 +3076,8 @@ def get_endpoint_metrics():
                 'status': status,
                 'totalCalls': stats['total_calls'],
                 'errors': stats['errors'],
-                'lastCalled': stats['last_called']
+                'lastCalled': stats['last_called'],
+                'latency': endpoint_latency.get(endpoint)
             })
         
         # Sort by total calls descending
@@ -3021,14 +3110,73 @@ def get_endpoint_metrics():
                 }
             ]
         
+        tables = [dict(latency, table=table) for table, latency in table_latency.items()]
+        tables.sort(key=lambda x: x['p99'] or 0, reverse=True)
+        
         return jsonify(create_success_response({
-            'endpoints': endpoints
+            'endpoints': endpoints,
+            'tables': tables,
+            'window': window
         }))
         
     except Exception as e:
         return create_error_response(f"Failed to get endpoint metrics: {str(e)}", 500)
 
 
+@admin_bp.route('/admin/system/queries', methods=['GET'])
+@require_admin
+def get_query_profiles():
+    """
+    Get the most expensive SQL statements, grouped by fingerprint.
+    
+    Query parameters:
+        sort: total_time, calls, mean_time, max_time or rows (default: total_time)
+        limit: Number of statements to return (default: 20, max: 200)
+        window: Latency percentile window (5m, 1h, 24h; default: 1h)
+    
+    Returns:
+        JSON response with per-statement query profiles
+    """
+    try:
+        sort = request.args.get('sort', 'total_time')
+        window = request.args.get('window', '1h')
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+        if sort not in QUERY_PROFILE_SORTS:
+            return create_error_response(f"sort must be one of: {', '.join(QUERY_PROFILE_SORTS)}", 400)
+        if window not in LATENCY_WINDOWS:
+            return create_error_response(f"window must be one of: {', '.join(LATENCY_WINDOWS)}", 400)
+        
+        return jsonify(create_success_response({
+            'queries': get_metrics_store().top_queries(sort, limit, LATENCY_WINDOWS[window]),
+            'sort': sort,
+            'window': window
+        }))
+    
+    except Exception as e:
+        return create_error_response(f"Failed to get query profiles: {str(e)}", 500)
+
+
+@admin_bp.route('/admin/system/queries/<fingerprint>/plan', methods=['GET'])
+@require_admin
+def get_query_plan(fingerprint):
+    """
+    Get the EXPLAIN plan captured for a statement by the EXPLAIN sampler.
+    
+    Plans are only captured when sampling is enabled (QUERY_EXPLAIN_SAMPLING=true).
+    
+    Returns:
+        JSON response with the plan, flagged scans/filesorts and suggested indexes
+    """
+    try:
+        plan = get_metrics_store().get_query_plan(fingerprint)
+        if plan is None:
+            return create_error_response("No plan captured for this query", 404)
+        return jsonify(create_success_response(plan))
+    
+    except Exception as e:
+        return create_error_response(f"Failed to get query plan: {str(e)}", 500)
+
+
 @admin_bp.route('/admin/system/logs', methods=['GET'])
 def get_system_logs():
     """
@@ -3615,47 +3763,50 @@ def track_endpoint_metric(endpoint, response_time, is_error=False, status_code=N
         # Debug logging
         logger.debug(f"Tracking metric for {endpoint}: {response_time}ms, error={is_error}")
         
-        # Initialize endpoint stats if not exists
-        if endpoint not in system_metrics['endpoint_stats']:
-            system_metrics['endpoint_stats'][endpoint] = {
-                'total_calls': 0,
-                'total_time': 0,
-                'errors': 0,
-                'last_called': None
-            }
+        get_metrics_store().record_request(endpoint, response_time, is_error)
+
+        with metrics_lock:
+            # Initialize endpoint stats if not exists
+            if endpoint not in system_metrics['endpoint_stats']:
+                system_metrics['endpoint_stats'][endpoint] = {
+                    'total_calls': 0,
+                    'total_time': 0,
+                    'errors': 0,
+                    'last_called': None
+                }
         
-        stats = system_metrics['endpoint_stats'][endpoint]
-        stats['total_calls'] += 1
-        stats['total_time'] += response_time
-        stats['last_called'] = time.time()
+            stats = system_metrics['endpoint_stats'][endpoint]
+            stats['total_calls'] += 1
+            stats['total_time'] += response_time
+            stats['last_called'] = time.time()
         
-        if is_error:
-            stats['errors'] += 1
+            if is_error:
+                stats['errors'] += 1
             
-            # Log detailed endpoint failure information
-            error_entry = {
-                'timestamp': datetime.now().isoformat(),
-                'message': f'Endpoint failure: {endpoint} - Status: {status_code} - {response_time}ms',
-                'context': 'Endpoint monitoring',
-                'endpoint': endpoint,
-                'status_code': status_code,
-                'response_time': response_time,
-                'error_details': error_details,
-                'stack_trace': stack_trace
-            }
+                # Log detailed endpoint failure information
+                error_entry = {
+                    'timestamp': datetime.now().isoformat(),
+                    'message': f'Endpoint failure: {endpoint} - Status: {status_code} - {response_time}ms',
+                    'context': 'Endpoint monitoring',
+                    'endpoint': endpoint,
+                    'status_code': status_code,
+                    'response_time': response_time,
+                    'error_details': error_details,
+                    'stack_trace': stack_trace
+                }
             
-            # Add to error log for system logs display
-            system_metrics['error_log'].append(error_entry)
+                # Add to error log for system logs display
+                system_metrics['error_log'].append(error_entry)
             
-            # Keep only last 100 errors to prevent memory issues
-            if len(system_metrics['error_log']) > 100:
-                system_metrics['error_log'] = system_metrics['error_log'][-100:]
+                # Keep only last 100 errors to prevent memory issues
+                if len(system_metrics['error_log']) > 100:
+                    system_metrics['error_log'] = system_metrics['error_log'][-100:]
                 
-            # Log to application logger as well
-            logger.error(f'Endpoint failure: {endpoint} - Status: {status_code} - Time: {response_time}ms - Error: {error_details}')
+                # Log to application logger as well
+                logger.error(f'Endpoint failure: {endpoint} - Status: {status_code} - Time: {response_time}ms - Error: {error_details}')
         
-        # Add to response time history
-        system_metrics['response_times'].append(response_time)
+            # Add to response time history
+            system_metrics['response_times'].append(response_time)
         
     except Exception as e:
         # Don't let metrics tracking break the app
@@ -3841,77 +3992,102 @@ def update_query_timeline(table_name=None):
         save_timeline_data(db_stats['timeline'])
 
 
-def track_database_query(query, execution_time, query_type=None, table_name=None, source_endpoint=None):
-    """Track database query metrics."""
-    global system_metrics
-    db_stats = system_metrics['database_stats']
+@lru_cache(maxsize=1024)
+def resolve_source_endpoint(method, path):
+    """Map a request to the user-friendly source name shown in table-source analysis."""
+    # Map common endpoints to user-friendly names
+    endpoint_mapping = {
+        '/api/search': 'Item Search',
+        '/api/search-items': 'Item Search',
+        '/api/items': 'Item Search',
+        '/api/spells': 'Spell Search',
+        '/api/search-spells': 'Spell Search',
+        '/api/classes': 'Class Data',
+        '/api/admin/database/config': 'Database Configuration',
+        '/api/admin/database/test': 'Database Test',
+        '/api/admin/database/table-sources': 'Query Source Analysis',
+        '/api/admin/system/metrics': 'System Monitoring',
+        '/api/admin/system/endpoints': 'Endpoint Monitoring',
+        '/api/health': 'Health Check',
+        '/api/heartbeat': 'Health Check'
+    }
     
-    # Track total queries
-    db_stats['total_queries'] += 1
+    # Check for exact matches first
+    if path in endpoint_mapping:
+        return endpoint_mapping[path]
     
-    # Track query time
-    db_stats['query_times'].append(execution_time)
+    # Check for partial matches for dynamic routes
+    for pattern, name in endpoint_mapping.items():
+        if path.startswith(pattern):
+            return name
+    
+    # Fallback to path-based naming
+    if '/search' in path:
+        return 'Search Operation'
+    elif '/items' in path:
+        return 'Item Data'
+    elif '/spells' in path:
+        return 'Spell Data'
+    elif '/admin' in path:
+        return 'Admin Dashboard'
+    return f"{method} {path}"
+
+
+def track_database_queries(entries):
+    """
+    Track a batch of database queries (called by the query tracking queue).
+    
+    Args:
+        entries: Dicts of track_database_query keyword arguments
+    """
+    for entry in entries:
+        try:
+            track_database_query(**entry)
+        except Exception as e:
+            logger.error(f"Error tracking database query: {e}")
+
+
+def track_database_query(query, execution_time, query_type=None, table_name=None, source_endpoint=None,
+                         request_info=None, rows=None, explain_params=None):
+    """
+    Track database query metrics.
+    
+    Args:
+        request_info: (method, path) of the request that ran the query, when
+            tracked off the request thread; defaults to the current request
+        rows: Rows returned or affected, if the driver reported it
+        explain_params: Parameters for the EXPLAIN sampler (slow MySQL
+            queries only); None skips sampling
+    """
+    global system_metrics
+    # Statement shape shared by every execution that differs only in literals
+    fingerprint = fingerprint_query(query)
     
     # Track slow queries (> 100ms)
+    slow_entry = None
     if execution_time > 100:
-        db_stats['slow_queries'].append({
+        slow_entry = {
             'query': query[:200] if len(query) > 200 else query,  # Truncate long queries
             'execution_time': execution_time,
             'timestamp': datetime.now().isoformat(),
             'type': query_type,
             'table': table_name,
-            'source_endpoint': source_endpoint
-        })
+            'source_endpoint': source_endpoint,
+            'fingerprint': fingerprint.id
+        }
     
     # Detect query type if not provided
     if not query_type:
-        query_upper = query.upper().strip()
-        if query_upper.startswith('SELECT'):
-            query_type = 'SELECT'
-        elif query_upper.startswith('INSERT'):
-            query_type = 'INSERT'
-        elif query_upper.startswith('UPDATE'):
-            query_type = 'UPDATE'
-        elif query_upper.startswith('DELETE'):
-            query_type = 'DELETE'
-        elif query_upper.startswith('SET'):
-            query_type = 'SET'
-        elif query_upper.startswith('SHOW'):
-            query_type = 'SHOW'
-        elif query_upper.startswith('DESCRIBE') or query_upper.startswith('DESC'):
-            query_type = 'DESCRIBE'
-        elif query_upper.startswith('EXPLAIN'):
-            query_type = 'EXPLAIN'
-        else:
-            query_type = 'OTHER'
-    
-    # Track query type
-    db_stats['query_types'][query_type] += 1
+        query_type = fingerprint.query_type
     
     # Detect table name if not provided
     if not table_name:
         query_upper = query.upper()
-        
-        if query_type in ['SELECT', 'INSERT', 'UPDATE', 'DELETE']:
-            # Standard SQL queries with table names
-            if 'FROM' in query_upper:
-                # Extract table name after FROM
-                parts = query_upper.split('FROM')
-                if len(parts) > 1:
-                    table_part = parts[1].strip().split()[0]
-                    table_name = table_part.strip('`"\' ')
-            elif 'INTO' in query_upper:
-                # Extract table name after INTO
-                parts = query_upper.split('INTO')
-                if len(parts) > 1:
-                    table_part = parts[1].strip().split()[0]
-                    table_name = table_part.strip('`"\' ')
-            elif 'UPDATE' in query_upper:
-                # Extract table name after UPDATE
-                parts = query_upper.split('UPDATE')
-                if len(parts) > 1:
-                    table_part = parts[1].strip().split()[0]
-                    table_name = table_part.strip('`"\' ')
+    
+        if query_type in ['SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE']:
+            # First table the statement reads or writes (joins and subqueries included)
+            if fingerprint.tables:
+                table_name = fingerprint.tables[0]
         elif query_type == 'SET':
             # SET queries don't operate on tables, use descriptive name
             if 'TRANSACTION' in query_upper and 'READ ONLY' in query_upper:
@@ -3929,80 +4105,68 @@ def track_database_query(query, execution_time, query_type=None, table_name=None
     
     # Detect source endpoint if not provided
     if not source_endpoint:
-        # Try to get the current request context
         try:
-            from flask import request
-            if request:
-                path = request.path
-                method = request.method
-                
-                # Map common endpoints to user-friendly names
-                endpoint_mapping = {
-                    '/api/search': 'Item Search',
-                    '/api/search-items': 'Item Search',
-                    '/api/items': 'Item Search',
-                    '/api/spells': 'Spell Search',
-                    '/api/search-spells': 'Spell Search',
-                    '/api/classes': 'Class Data',
-                    '/api/admin/database/config': 'Database Configuration',
-                    '/api/admin/database/test': 'Database Test',
-                    '/api/admin/database/table-sources': 'Query Source Analysis',
-                    '/api/admin/system/metrics': 'System Monitoring',
-                    '/api/admin/system/endpoints': 'Endpoint Monitoring',
-                    '/api/health': 'Health Check',
-                    '/api/heartbeat': 'Health Check'
-                }
-                
-                # Check for exact matches first
-                if path in endpoint_mapping:
-                    source_endpoint = endpoint_mapping[path]
-                else:
-                    # Check for partial matches for dynamic routes
-                    for pattern, name in endpoint_mapping.items():
-                        if path.startswith(pattern):
-                            source_endpoint = name
-                            break
-                    else:
-                        # Fallback to path-based naming
-                        if '/search' in path:
-                            source_endpoint = 'Search Operation'
-                        elif '/items' in path:
-                            source_endpoint = 'Item Data'
-                        elif '/spells' in path:
-                            source_endpoint = 'Spell Data'
-                        elif '/admin' in path:
-                            source_endpoint = 'Admin Dashboard'
-                        else:
-                            source_endpoint = f"{method} {path}"
+            if request_info is None:
+                # Called on the request thread; use the current request context
+                from flask import request
+                request_info = (request.method, request.path)
+            source_endpoint = resolve_source_endpoint(*request_info)
         except:
             source_endpoint = "Database Operation"
     
-    # Track table access
-    if table_name:
-        table_key = table_name.lower()
-        db_stats['tables_accessed'][table_key] += 1
-        
-        # Track which endpoint accessed this table
-        if source_endpoint:
-            db_stats['table_sources'][table_key][source_endpoint] += 1
+    # The lock only covers this process's dicts; the shared store and the
+    # sampler have their own locks
+    with metrics_lock:
+        db_stats = system_metrics['database_stats']
+        db_stats['total_queries'] += 1
+        db_stats['query_times'].append(execution_time)
+        if slow_entry is not None:
+            db_stats['slow_queries'].append(slow_entry)
+        db_stats['query_types'][query_type] += 1
     
-    # Update timeline data
-    update_query_timeline(table_name)
+        # Track table access
+        if table_name:
+            table_key = table_name.lower()
+            db_stats['tables_accessed'][table_key] += 1
+        
+            # Track which endpoint accessed this table
+            if source_endpoint:
+                db_stats['table_sources'][table_key][source_endpoint] += 1
     
-    # Save query tracking data every 100 queries to avoid too much I/O
-    if db_stats['total_queries'] % 100 == 0:
-        try:
-            metrics_to_save = {
-                'total_queries': db_stats['total_queries'],
-                'query_times': db_stats['query_times'],
-                'slow_queries': db_stats['slow_queries'],
-                'query_types': db_stats['query_types'],
-                'tables_accessed': db_stats['tables_accessed'],
-                'table_sources': db_stats['table_sources']
-            }
-            query_persistence.save_metrics(metrics_to_save)
-        except Exception as e:
-            logger.error(f"Error saving query tracking data: {e}")
+        # Update timeline data
+        update_query_timeline(table_name)
+    
+    get_metrics_store().record_query(
+        execution_time, query_type, table_name.lower() if table_name else None, slow_entry,
+        fingerprint=fingerprint, rows=rows, source_endpoint=source_endpoint
+    )
+    
+    # Capture a plan for slow statements (rate limited per fingerprint, runs in the background)
+    if explain_params is not None:
+        get_explain_sampler().offer(fingerprint, query, explain_params, execution_time)
+
+
+@admin_bp.route('/admin/system/filter-plans', methods=['GET'])
+@require_admin
+def get_filter_plans():
+    """
+    Get timings for item/spell search filter combinations, slowest first.
+    
+    EXPLAIN output is included for slow combinations when the planner runs
+    in debug mode (FILTER_PLANNER_DEBUG=true).
+    
+    Returns:
+        JSON response with filter plan stats
+    """
+    try:
+        limit = min(request.args.get('limit', 20, type=int), 100)
+        planner = get_filter_planner()
+        return jsonify(create_success_response({
+            'plans': planner.get_slow_plans(limit),
+            'stats': planner.get_stats()
+        }))
+    except Exception as e:
+        return create_error_response(f"Failed to get filter plans: {str(e)}", 500)
 
 
 @admin_bp.route('/admin/database/table-sources/<table_name>', methods=['GET'])
@@ -22,6 +22,7 @@ if parent_dir not in sys.path:
     sys.path.insert(0, parent_dir)
 
 from app import get_eqemu_db_connection
+from utils.item_tooltips import get_item_tooltip_service, ITEM_TOOLTIP_MAX_IDS
 
 logger = logging.getLogger(__name__)
 
@@ -152,82 +153,43 @@ def check_rate_limit():
 
 @item_bp.route('/items/<int:item_id>/tooltip', methods=['GET'])
 def get_item_tooltip(item_id):
-    """Get comprehensive item data for tooltips following Char Browser format."""
+    """Get comprehensive item data for tooltips following Char Browser format.
     
-    # TEMPORARY: Disable tooltip API completely to prevent backend crashes
-    # TODO: Re-enable once database connection pooling issues are resolved
-    logger.info(f"Tooltip API temporarily disabled for item {item_id} to prevent crashes")
-    return jsonify({
-        'error': 'Tooltip API temporarily disabled to prevent server crashes',
-        'message': 'Showing basic inventory data only',
-        'item_id': item_id
-    }), 503
-    
-    # Rate limiting check (disabled during maintenance)
+    Served from the tooltip row cache; only a cache miss borrows a database
+    connection, for a single-row query.
+    """
     if check_rate_limit():
         logger.warning(f"Rate limit exceeded for IP {request.remote_addr} on item {item_id}")
         return jsonify({'error': 'Rate limit exceeded - too many requests'}), 429
     
-    connection = None
+    if not item_id or item_id < 1:
+        logger.warning(f"Invalid item ID: {item_id}")
+        return jsonify({'error': 'Invalid item ID'}), 400
+    
     try:
-        # Validate item_id
-        if not item_id or item_id < 1:
-            logger.warning(f"Invalid item ID: {item_id}")
-            return jsonify({'error': 'Invalid item ID'}), 400
-        
-        conn, db_type, error = get_eqemu_db_connection()
-        if error:
-            logger.error(f"Database connection failed: {error}")
-            return jsonify({'error': 'Database connection failed'}), 500
-        
-        if not conn:
-            logger.error("No database connection available")
-            return jsonify({'error': 'Database connection failed'}), 500
+        item = get_item_tooltip_service().get_row(item_id, get_eqemu_db_connection)
+        if not item:
+            return jsonify({'error': 'Item not found'}), 404
         
-        connection = conn
+        return jsonify(format_item_tooltip(item))
         
-        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            # Following Char Browser column selection
-            query = """
-                SELECT id, Name, icon, ac, hp, mana, endur, attack, damage, delay,
-                       weight, astr, asta, aagi, adex, awis, aint, acha,
-                       pr, mr, fr, cr, dr, svcorruption,
-                       classes, races, deity, slots, itemtype, price,
-                       magic, nodrop, lore, stacksize, material, color
-                FROM items 
-                WHERE id = %s
-            """
-            cursor.execute(query, (item_id,))
-            item = cursor.fetchone()
-            
-            if not item:
-                return jsonify({'error': 'Item not found'}), 404
-            
-            # Format for tooltip display
-            formatted_item = format_item_tooltip(item)
-            logger.info(f"Retrieved tooltip data for item {item_id}: {item.get('Name', 'Unknown')}")
-            
-            return jsonify(formatted_item)
-            
-    except pymysql.Error as e:
-        logger.error(f"Database error getting item tooltip {item_id}: {str(e)}")
-        return jsonify({'error': 'Database query failed'}), 500
+    except ConnectionError as e:
+        logger.error(f"Database connection failed: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
     except Exception as e:
         logger.error(f"Error getting item tooltip {item_id}: {str(e)}")
         import traceback
         logger.error(f"Full traceback: {traceback.format_exc()}")
         return jsonify({'error': 'Internal server error'}), 500
-    finally:
-        if connection:
-            try:
-                connection.close()
-            except:
-                pass  # Ignore connection close errors
 
 @item_bp.route('/items/bulk', methods=['POST'])
 def get_items_bulk():
-    """Bulk fetch items for inventory tooltip preloading (Char Browser optimization)."""
+    """Bulk fetch items for inventory tooltip preloading (Char Browser optimization).
     
+    Cached items are answered from memory and only the missing ids are
+    queried (chunked IN on one connection). Results follow the order of the
+    requested ids.
+    """
     try:
         data = request.get_json()
         if not data or 'ids' not in data:
@@ -238,52 +200,26 @@ def get_items_bulk():
         if not item_ids or not isinstance(item_ids, list):
             return jsonify([])
         
-        if len(item_ids) > 500:  # Prevent abuse
+        if len(item_ids) > ITEM_TOOLTIP_MAX_IDS:  # Prevent abuse
             return jsonify({'error': 'Too many items requested'}), 400
         
-        conn, db_type, error = get_eqemu_db_connection()
-        if error:
-            logger.error(f"Database connection failed: {error}")
-            return jsonify({'error': 'Database connection failed'}), 500
+        try:
+            item_ids = [int(item_id) for item_id in item_ids]
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Item IDs must be integers'}), 400
         
-        if not conn:
-            logger.error("No database connection available")
-            return jsonify({'error': 'Database connection failed'}), 500
+        rows = get_item_tooltip_service().get_rows(item_ids, get_eqemu_db_connection)
+        formatted_items = [format_item_tooltip(row) for row in rows]
         
-        connection = conn
+        logger.info(f"Retrieved bulk tooltip data for {len(formatted_items)} items")
+        return jsonify(formatted_items)
         
-        with connection.cursor(pymysql.cursors.DictCursor) as cursor:
-            # Single query for all items (Char Browser optimization pattern)
-            placeholders = ','.join(['%s'] * len(item_ids))
-            query = f"""
-                SELECT id, Name, icon, ac, hp, mana, endur, attack, damage, delay,
-                       weight, astr, asta, aagi, adex, awis, aint, acha,
-                       pr, mr, fr, cr, dr, svcorruption,
-                       classes, races, deity, slots, itemtype, price,
-                       magic, nodrop, lore, stacksize, material, color
-                FROM items 
-                WHERE id IN ({placeholders})
-            """
-            
-            cursor.execute(query, item_ids)
-            items = cursor.fetchall()
-            
-            # Format all items for tooltips
-            formatted_items = []
-            for item in items:
-                formatted_item = format_item_tooltip(item)
-                if formatted_item:
-                    formatted_items.append(formatted_item)
-            
-            logger.info(f"Retrieved bulk tooltip data for {len(formatted_items)} items")
-            return jsonify(formatted_items)
-            
+    except ConnectionError as e:
+        logger.error(f"Database connection failed: {e}")
+        return jsonify({'error': 'Database connection failed'}), 500
     except Exception as e:
         logger.error(f"Error getting bulk items: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
-    finally:
-        if connection:
-            connection.close()
 
 @item_bp.route('/items/<int:item_id>/details', methods=['GET'])
 def get_item_details(item_id):
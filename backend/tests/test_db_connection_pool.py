@@ -0,0 +1,196 @@
+"""
+Tests for the bounded EQEmu connection pool.
+"""
+
+import threading
+import time
+import pytest
+from unittest.mock import patch
+
+from utils.db_connection_pool import BoundedConnectionPool, PoolExhaustedError
+from utils.content_db_manager import ContentDatabaseManager
+
+
+class FakeConnection:
+    """Minimal connection double that records ping/close calls."""
+
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+        self.pings = 0
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if not self.alive:
+            raise ConnectionError("gone away")
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def cursor(self):
+        return object()
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def factory():
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    return BoundedConnectionPool(factory, **kwargs), created
+
+
+class TestBoundedConnectionPool:
+    """Test connection reuse, health checks, recycling and backpressure."""
+
+    def test_connection_is_reused_after_close(self):
+        pool, created = make_pool(max_connections=2)
+
+        conn = pool.acquire()
+        conn.close()
+        conn.close()  # Returning twice must not double-count
+        again = pool.acquire()
+
+        assert again.raw_connection is created[0]
+        assert len(created) == 1
+        assert created[0].pings == 1
+        assert created[0].closed is False
+        stats = pool.get_pool_stats()
+        assert stats['borrows'] == 2
+        assert stats['connections_created'] == 1
+        assert stats['in_use_connections'] == 1
+
+    def test_exhausted_pool_times_out(self):
+        pool, _ = make_pool(max_connections=1, timeout=0.05)
+        held = pool.acquire()
+
+        with pytest.raises(PoolExhaustedError):
+            pool.acquire()
+
+        stats = pool.get_pool_stats()
+        assert stats['timeouts'] == 1
+        assert stats['total_connections'] == 1
+        held.close()
+
+    def test_waiting_borrower_gets_released_connection(self):
+        pool, created = make_pool(max_connections=1, timeout=2)
+        held = pool.acquire()
+        result = {}
+
+        def borrow():
+            conn = pool.acquire()
+            result['conn'] = conn.raw_connection
+            conn.close()
+
+        worker = threading.Thread(target=borrow)
+        worker.start()
+        time.sleep(0.05)
+        held.close()
+        worker.join(timeout=2)
+
+        assert result['conn'] is created[0]
+        assert len(created) == 1
+        assert pool.get_pool_stats()['waits'] == 1
+
+    def test_dead_connection_is_replaced(self):
+        pool, created = make_pool(max_connections=2)
+        pool.acquire().close()
+        created[0].alive = False
+
+        conn = pool.acquire()
+
+        assert conn.raw_connection is created[1]
+        assert created[0].closed is True
+        assert pool.get_pool_stats()['failed_pings'] == 1
+
+    def test_idle_connections_are_recycled(self):
+        pool, created = make_pool(max_idle=0.01)
+        pool.acquire().close()
+        time.sleep(0.03)
+
+        conn = pool.acquire()
+
+        assert conn.raw_connection is created[1]
+        assert created[0].closed is True
+        assert created[0].pings == 0  # Expired connections are not even pinged
+        assert pool.get_pool_stats()['connections_recycled'] == 1
+
+    def test_old_connections_are_closed_on_release(self):
+        pool, created = make_pool(max_age=0.01)
+        conn = pool.acquire()
+        time.sleep(0.03)
+        conn.close()
+
+        assert created[0].closed is True
+        assert pool.get_pool_stats()['total_connections'] == 0
+
+    def test_rollback_on_release_is_optional(self):
+        pool, created = make_pool(rollback_on_release=False)
+        pool.acquire().close()
+        assert created[0].rollbacks == 0
+
+        pool, created = make_pool()
+        pool.acquire().close()
+        assert created[0].rollbacks == 1
+
+    def test_context_manager_discards_on_error(self):
+        pool, created = make_pool()
+
+        with pytest.raises(ValueError):
+            with pool.get_connection():
+                raise ValueError("boom")
+
+        assert created[0].closed is True
+        assert pool.get_pool_stats()['connections_discarded'] == 1
+
+    def test_close_all(self):
+        pool, created = make_pool()
+        pool.acquire().close()
+
+        pool.close_all()
+
+        assert created[0].closed is True
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+
+
+class TestContentDatabaseManagerPool:
+    """Test that the content database manager shares and reports its pool."""
+
+    DB_CONFIG = {'host': 'db', 'port': 3306, 'database': 'peq', 'username': 'u',
+                 'password': 'p', 'autocommit': True}
+
+    def test_pool_is_shared_and_reported(self):
+        manager = ContentDatabaseManager()
+        with patch('utils.content_db_manager.get_database_connector',
+                   side_effect=lambda *a, **k: FakeConnection()) as connector, \
+             patch.object(manager, '_load_database_config', return_value=(None, None)):
+            manager.acquire('mysql', self.DB_CONFIG).close()
+            manager.acquire('mysql', dict(self.DB_CONFIG)).close()
+
+            status = manager.get_connection_status()
+
+        assert connector.call_count == 1
+        assert status['pool_active'] is True
+        assert status['pool_stats']['borrows'] == 2
+        assert status['pool_stats']['pool_type'] == 'bounded'
+        manager.close()
+        assert manager.get_connection_status()['pool_stats'] is None
+
+    def test_pool_is_rebuilt_when_settings_change(self):
+        manager = ContentDatabaseManager()
+        with patch('utils.content_db_manager.get_database_connector',
+                   side_effect=lambda *a, **k: FakeConnection()) as connector:
+            first = manager.acquire('mysql', self.DB_CONFIG)
+            raw = first.raw_connection
+            first.close()
+            manager.acquire('mysql', dict(self.DB_CONFIG, host='other')).close()
+
+        assert connector.call_count == 2
+        assert raw.closed is True
@@ -0,0 +1,190 @@
+"""
+Tests for automatic EXPLAIN capture of slow content queries.
+"""
+
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+from flask import Flask
+
+from tests.conftest import FakeCursor
+from utils import explain_sampler
+from utils.explain_sampler import ExplainSampler, analyze_plan
+from utils.metrics_store import MetricsStore
+from utils.query_tracker import TrackedCursor
+from utils.sql_fingerprint import extract_table_aliases, fingerprint_query
+
+ITEM_SEARCH = 'SELECT i.id, i.Name FROM items i WHERE i.itemtype = %s ORDER BY i.Name LIMIT 50'
+
+ITEM_SEARCH_PLAN = {
+    'query_block': {
+        'select_id': 1,
+        'ordering_operation': {
+            'using_filesort': True,
+            'table': {
+                'table_name': 'i',
+                'access_type': 'ALL',
+                'possible_keys': None,
+                'rows_examined_per_scan': 120000,
+                'attached_condition': "(`peq`.`i`.`itemtype` = 10)"
+            }
+        }
+    }
+}
+
+JOIN_PLAN = {
+    'query_block': {
+        'nested_loop': [
+            {'table': {'table_name': 'le', 'access_type': 'ALL', 'rows_examined_per_scan': 90000,
+                       'attached_condition': "((`peq`.`le`.`chance` > 5) and (`peq`.`le`.`item_charges` & 1))"}},
+            {'table': {'table_name': 'i', 'access_type': 'eq_ref', 'possible_keys': ['PRIMARY'], 'key': 'PRIMARY',
+                       'used_key_parts': ['id'], 'rows_examined_per_scan': 1}}
+        ]
+    }
+}
+
+
+def explain_cursor(plan):
+    """Cursor double answering EXPLAIN with plan and noting whether tracking was on."""
+    cursor = FakeCursor()
+    cursor._track_queries = True
+    cursor.tracked = []
+
+    def explain(query, params):
+        cursor.tracked.append(cursor._track_queries)
+        return [(json.dumps(plan),)]
+
+    cursor.responses = [('EXPLAIN', explain)]
+    return cursor
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MetricsStore(str(tmp_path / 'metrics.db'), flush_seconds=60)
+    with patch.object(explain_sampler, 'get_metrics_store', return_value=store):
+        yield store
+
+
+def make_sampler(cursor, db_type='mysql'):
+    conn = Mock()
+    conn.cursor.return_value = cursor
+    sampler = ExplainSampler(enabled=True, threshold_ms=100, interval_seconds=3600,
+                             connection_factory=Mock(return_value=(conn, db_type, None)))
+    return sampler, conn
+
+
+class TestAnalyzePlan:
+    def test_aliases_resolve_to_tables(self):
+        aliases = extract_table_aliases(fingerprint_query(
+            'SELECT * FROM items AS i LEFT JOIN lootdrop_entries le ON le.item_id = i.id WHERE i.id = 1'
+        ).normalized)
+        assert aliases == {'items': 'items', 'i': 'items', 'lootdrop_entries': 'lootdrop_entries',
+                           'le': 'lootdrop_entries'}
+
+    def test_full_scan_and_filesort_get_one_index(self):
+        analysis = analyze_plan(ITEM_SEARCH_PLAN, fingerprint_query(ITEM_SEARCH).normalized)
+        assert [issue['issue'] for issue in analysis['issues']] == ['full_scan', 'filesort']
+        assert analysis['issues'][0]['table'] == 'items'
+        assert analysis['issues'][0]['rows'] == 120000
+        assert analysis['suggested_indexes'] == [{
+            'table': 'items',
+            'columns': ['itemtype', 'name'],
+            'sql': 'ALTER TABLE items ADD INDEX idx_itemtype_name (itemtype, name)'
+        }]
+        assert analysis['flagged'] is True
+
+    def test_join_flags_only_the_scanned_table(self):
+        query = ('SELECT i.id FROM lootdrop_entries le JOIN items i ON i.id = le.item_id '
+                 'WHERE le.chance > 5 AND le.item_charges & 1')
+        analysis = analyze_plan(JOIN_PLAN, fingerprint_query(query).normalized)
+        assert [(issue['table'], issue['issue']) for issue in analysis['issues']] == \
+            [('lootdrop_entries', 'full_scan')]
+        # Bitmask tests can't use an index, so only the range column is suggested
+        assert analysis['suggested_indexes'][0]['columns'] == ['chance']
+
+    def test_unwatched_tables_are_ignored(self):
+        plan = {'query_block': {'table': {'table_name': 'zone', 'access_type': 'ALL'}}}
+        analysis = analyze_plan(plan, fingerprint_query('SELECT * FROM zone').normalized)
+        assert analysis == {'issues': [], 'suggested_indexes': [], 'flagged': False}
+
+
+class TestExplainSampler:
+    def test_capture_stores_plan_with_profile(self, store):
+        cursor = explain_cursor(ITEM_SEARCH_PLAN)
+        sampler, conn = make_sampler(cursor)
+        fingerprint = fingerprint_query(ITEM_SEARCH)
+        store.record_query(250, 'SELECT', 'items', fingerprint=fingerprint)
+
+        analysis = sampler.capture(fingerprint, ITEM_SEARCH, (10,), 250)
+
+        assert cursor.queries == [(f'EXPLAIN FORMAT=JSON {ITEM_SEARCH}', (10,))]
+        assert cursor.tracked == [False]
+        conn.close.assert_called_once()
+        assert analysis['flagged'] is True
+        profile = store.top_queries()[0]
+        assert profile['plan']['issues'][0]['issue'] == 'full_scan'
+        assert profile['plan']['captured_at'] is not None
+        saved = store.get_query_plan(fingerprint.id)
+        assert saved['plan'] == ITEM_SEARCH_PLAN
+        assert saved['query_ms'] == 250
+
+    def test_offer_is_rate_limited_per_fingerprint(self):
+        sampler, _ = make_sampler(explain_cursor(ITEM_SEARCH_PLAN))
+        fingerprint = fingerprint_query(ITEM_SEARCH)
+        with patch.object(explain_sampler.threading, 'Thread'):
+            assert sampler.offer(fingerprint, ITEM_SEARCH, (10,), 250) is True
+            assert sampler.offer(fingerprint, ITEM_SEARCH, (11,), 300) is False
+            assert sampler.offer(fingerprint, ITEM_SEARCH, (10,), 50) is False
+            assert sampler.offer(fingerprint_query('UPDATE items SET price = 1'), 'UPDATE items SET price = 1',
+                                 (), 250) is False
+        status = sampler.get_status()
+        assert status['queued'] == 1
+        assert status['skipped_recent'] == 1
+
+    def test_recent_plan_from_another_worker_is_reused(self, store):
+        cursor = explain_cursor(ITEM_SEARCH_PLAN)
+        sampler, _ = make_sampler(cursor)
+        fingerprint = fingerprint_query(ITEM_SEARCH)
+        store.save_query_plan(fingerprint.id, ITEM_SEARCH_PLAN, {'issues': [], 'flagged': False})
+
+        assert sampler.capture(fingerprint, ITEM_SEARCH, (10,), 250) is None
+        assert cursor.queries == []
+
+    def test_non_mysql_content_database_is_skipped(self, store):
+        cursor = explain_cursor(ITEM_SEARCH_PLAN)
+        sampler, conn = make_sampler(cursor, db_type='postgresql')
+
+        assert sampler.capture(fingerprint_query(ITEM_SEARCH), ITEM_SEARCH, (10,), 250) is None
+        assert cursor.queries == []
+        conn.close.assert_called_once()
+
+    def test_disabled_by_default(self):
+        assert ExplainSampler(connection_factory=Mock()).wants(500) is explain_sampler.QUERY_EXPLAIN_SAMPLING
+
+
+class TestTrackedCursorParams:
+    def test_params_kept_only_for_slow_mysql_queries(self):
+        sampler, _ = make_sampler(explain_cursor({}))
+        queue = Mock()
+        with patch('utils.query_tracker.get_explain_sampler', return_value=sampler), \
+                patch('utils.query_tracker.get_query_tracking_queue', return_value=queue), \
+                patch('utils.query_tracker.time.time', side_effect=[0.0, 0.5, 1.0, 1.001]):
+            TrackedCursor(Mock(rowcount=1), 'mysql').execute(ITEM_SEARCH, (10,))
+            TrackedCursor(Mock(rowcount=1), 'mysql').execute(ITEM_SEARCH, (10,))
+
+        slow, fast = (call.args for call in queue.put.call_args_list)
+        assert slow[4] == (10,)
+        assert fast[4] is None
+
+
+class TestQueryPlanEndpoint:
+    def test_missing_plan_is_404(self, tmp_path):
+        from routes import admin
+
+        app = Flask(__name__)
+        with app.test_request_context(), \
+                patch.object(admin, 'get_metrics_store', return_value=MetricsStore(str(tmp_path / 'm.db'))):
+            response = admin.get_query_plan.__wrapped__('0123456789abcdef')
+
+        assert response[1] == 404
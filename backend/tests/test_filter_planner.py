@@ -0,0 +1,106 @@
+"""
+Tests for the compiled search filter planner.
+"""
+
+from tests.conftest import FakeCursor
+from utils.filter_planner import FilterPlanner
+
+
+def f(field, operator, value=None):
+    item = {'field': field, 'operator': operator}
+    if value is not None:
+        item['value'] = value
+    return item
+
+
+EXPLAIN_ROWS = [{'id': 1, 'table': 'items', 'type': 'ALL', 'rows': 100000}]
+
+
+class TestFilterPlanner:
+    """Test translation, range collapsing, ordering and template caching."""
+
+    def test_empty_filters(self):
+        plan = FilterPlanner().plan([])
+        assert plan.sql == ''
+        assert plan.params == []
+
+    def test_item_operators_match_original_sql(self):
+        planner = FilterPlanner()
+
+        assert planner.plan([f('nodrop', 'is', True)]).sql == "items.nodrop = %s"
+        assert planner.plan([f('nodrop', 'is', True)]).params == [0]
+        assert planner.plan([f('lore_flag', 'is', True)]).sql == "items.loregroup != 0"
+        assert planner.plan([f('clickeffect', 'exists', False)]).sql == \
+            "(items.clickeffect IS NULL OR items.clickeffect = 0 OR items.clickeffect = -1)"
+        assert planner.plan([f('slots', 'includes', 4)]).sql == "(items.slots & %s) != 0"
+        assert planner.plan([f('loretext', 'starts with', 'Ancient')]).params == ['Ancient%']
+
+    def test_spell_class_filters(self):
+        plan = FilterPlanner().plan([f('wizard_level', 'class_can_use', True)], 'spell')
+        assert plan.sql == "spells_new.classes12 != 255"
+
+    def test_ranges_collapse(self):
+        plan = FilterPlanner().plan([
+            f('ac', 'greater than', 10.0),
+            f('ac', 'greater than', 20.0),
+            f('ac', 'between', [0, 50]),
+        ])
+        assert plan.sql == "items.ac > %s AND items.ac <= %s"
+        assert plan.params == [20, 50]
+
+    def test_nested_betweens_collapse(self):
+        plan = FilterPlanner().plan([f('hp', 'between', [10, 100]), f('hp', 'between', ['20', '200'])])
+        assert plan.sql == "items.hp BETWEEN %s AND %s"
+        assert plan.params == [20, 100]
+
+    def test_impossible_ranges(self):
+        planner = FilterPlanner()
+        assert planner.plan([f('ac', 'greater than', 50.0), f('ac', 'less than', 10.0),
+                             f('magic', 'is', True)]).sql == "1=0"
+        assert planner.plan([f('hp', 'equals', 5.0), f('hp', 'equals', 6.0)]).params == []
+        assert planner.plan([f('hp', 'equals', 5.0), f('hp', 'less than', 5.0)]).sql == "1=0"
+
+    def test_equality_absorbs_range(self):
+        plan = FilterPlanner().plan([f('hp', 'equals', 5.0), f('hp', 'between', [0, 10])])
+        assert plan.sql == "items.hp = %s"
+        assert plan.params == [5]
+
+    def test_selective_predicates_first_and_like_last(self):
+        plan = FilterPlanner().plan([
+            f('loretext', 'contains', 'dragon'),
+            f('proceffect', 'exists', False),
+            f('slots', 'includes', 0xFFFF),
+            f('reqlevel', 'equals', 50.0),
+        ])
+        assert plan.sql.split(' AND ')[0] == "items.reqlevel = %s"
+        assert plan.sql.endswith("items.lore LIKE %s")
+        assert plan.params == [50, 0xFFFF, '%dragon%']
+
+    def test_templates_are_cached_by_shape(self):
+        planner = FilterPlanner()
+        first = planner.plan([f('ac', 'greater than', 10.0)])
+        second = planner.plan([f('ac', 'greater than', 30.0)])
+
+        assert first.sql is second.sql
+        assert second.params == [30]
+        assert planner.get_stats()['template_hits'] == 1
+
+    def test_debug_mode_captures_explain_for_slow_plans(self):
+        planner = FilterPlanner(debug=True, explain_threshold_ms=100)
+        plan = planner.plan([f('ac', 'greater than', 10.0)])
+        cursor = FakeCursor([('EXPLAIN', EXPLAIN_ROWS)])
+
+        planner.record(plan, 20, cursor, "SELECT * FROM items WHERE items.ac > %s", [10])
+        planner.record(plan, 180, cursor, "SELECT * FROM items WHERE items.ac > %s", [10])
+
+        assert cursor.queries == [("EXPLAIN SELECT * FROM items WHERE items.ac > %s", [10])]
+        slow = planner.get_slow_plans()
+        assert slow[0]['calls'] == 2
+        assert slow[0]['max_ms'] == 180
+        assert slow[0]['explain'][0]['type'] == 'ALL'
+
+    def test_no_explain_without_debug(self):
+        planner = FilterPlanner(debug=False, explain_threshold_ms=0)
+        cursor = FakeCursor([('EXPLAIN', EXPLAIN_ROWS)])
+        planner.record(planner.plan([f('ac', 'greater than', 10.0)]), 500, cursor, "SELECT 1", [])
+        assert cursor.queries == []
@@ -0,0 +1,74 @@
+"""
+Tests for the batch item availability endpoint.
+"""
+
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+
+from utils.item_availability import parse_item_ids, batch_availability, FLAG_BITS
+from utils.schema_capabilities import SchemaCapabilities
+from tests.conftest import FakeCursor
+
+
+# One grouped query per source type
+AVAILABILITY_RESPONSES = [
+    ('lootdrop_entries lde', [{'item_id': 1001}]),
+    ('FROM merchantlist', [(1002,)]),
+    ('FROM forage', [{'itemid': 1003}, {'itemid': 9999}]),
+    ('tradeskill_recipe_entries', [{'item_id': 1001, 'used_in_recipe': 1, 'created_by_recipe': 0},
+                                   {'item_id': 1003, 'used_in_recipe': 0, 'created_by_recipe': 1}]),
+]
+
+
+CAPABILITIES = SchemaCapabilities({
+    table: {'id'} for table in ('lootdrop_entries', 'merchantlist', 'forage',
+                                 'tradeskill_recipe', 'tradeskill_recipe_entries')
+})
+
+
+class TestBatchAvailability:
+    """Test id parsing and the grouped queries."""
+
+    def test_parse_item_ids(self):
+        assert parse_item_ids([3, '1', 3]) == [3, 1]
+        for bad in (None, [], ['x'], [0], [True], list(range(1, 600))):
+            with pytest.raises(ValueError):
+                parse_item_ids(bad)
+
+    def test_one_query_per_source(self):
+        cursor = FakeCursor(AVAILABILITY_RESPONSES)
+        bits = batch_availability(cursor, [1001, 1002, 1003, 1004], CAPABILITIES)
+
+        # ground_spawns table is missing, so four queries instead of five
+        assert len(cursor.queries) == 4
+        assert all(params == (1001, 1002, 1003, 1004) for _, params in cursor.queries)
+        assert bits == {
+            1001: FLAG_BITS['drop_sources'] | FLAG_BITS['tradeskill_recipes'],
+            1002: FLAG_BITS['merchant_sources'],
+            1003: FLAG_BITS['forage_sources'] | FLAG_BITS['created_by_recipes'],
+            1004: 0
+        }
+
+
+class TestBatchAvailabilityEndpoint:
+    """Test POST /api/items/availability."""
+
+    def test_returns_bitmaps(self, flask_test_client):
+        mock_conn = Mock()
+        mock_conn.cursor.return_value = FakeCursor(AVAILABILITY_RESPONSES)
+        with patch('app.get_eqemu_db_connection', return_value=(mock_conn, 'mysql', None)), \
+             patch('app.get_schema_capabilities', return_value=CAPABILITIES):
+            response = flask_test_client.post('/api/items/availability', json={'item_ids': [1001, 1004]})
+
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['flags'][0] == 'drop_sources'
+        assert data['items'] == {'1001': 17, '1004': 0}
+        assert data['source'] == 'database'
+        mock_conn.close.assert_called_once()
+
+    def test_rejects_bad_body(self, flask_test_client):
+        response = flask_test_client.post('/api/items/availability', json={'item_ids': 'nope'})
+        assert response.status_code == 400
@@ -0,0 +1,67 @@
+"""
+Tests for the aggregate item page endpoint and shared content connections.
+"""
+
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+
+from tests.conftest import FakeCursor
+from utils.schema_capabilities import SchemaCapabilities
+
+
+@pytest.fixture
+def content_db():
+    """Patch the connection pool so every acquire() is counted."""
+    manager = Mock()
+    conn = Mock()
+    conn.cursor.side_effect = lambda *args, **kwargs: FakeCursor()
+    manager.acquire.return_value = conn
+    config = {'production_database_url': 'mysql://user:pw@localhost:3306/peq', 'database_type': 'mysql'}
+    with patch('utils.content_db_manager.get_content_db_manager', return_value=manager), \
+         patch('app.db_config_manager.get_config', return_value=config), \
+         patch('app.get_schema_capabilities', return_value=SchemaCapabilities({'merchantlist': {'item'}})):
+        yield manager, conn
+
+
+class TestItemPageEndpoint:
+    """Test /api/items/<id>/full."""
+
+    def test_sections_share_one_connection(self, flask_test_client, content_db):
+        manager, conn = content_db
+
+        response = flask_test_client.get(
+            '/api/items/1001/full?include=drop_sources,merchant_sources,ground_spawns')
+
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert set(data['sections']) == {'drop_sources', 'merchant_sources', 'ground_spawns'}
+        assert data['sections']['drop_sources']['zones'] == []
+        assert manager.acquire.call_count == 1
+        conn.close.assert_called_once()
+
+    def test_ndjson_streams_sections(self, flask_test_client, content_db):
+        response = flask_test_client.get('/api/items/1001/full?include=merchant_sources,forage_sources&format=ndjson')
+
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert response.mimetype == 'application/x-ndjson'
+        assert [line.get('section') for line in lines[:-1]] == ['merchant_sources', 'forage_sources']
+        assert lines[0]['status'] == 200
+        assert lines[-1] == {'done': True}
+
+    def test_parallel_uses_worker_connections(self, flask_test_client, content_db):
+        manager, conn = content_db
+
+        response = flask_test_client.get('/api/items/1001/full?include=merchant_sources,forage_sources&parallel=1')
+
+        data = json.loads(response.data)
+        assert set(data['sections']) == {'merchant_sources', 'forage_sources'}
+        assert manager.acquire.call_count == 2
+        assert conn.close.call_count == 2
+
+    def test_bad_requests(self, flask_test_client):
+        assert flask_test_client.get('/api/items/abc/full').status_code == 400
+        response = flask_test_client.get('/api/items/1001/full?include=details,bogus')
+        assert response.status_code == 400
+        assert 'bogus' in json.loads(response.data)['error']
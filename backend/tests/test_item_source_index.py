@@ -0,0 +1,142 @@
+"""
+Tests for the precomputed item source index.
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from utils.item_source_index import ItemSourceIndex
+from utils.schema_capabilities import SchemaCapabilities
+from tests.conftest import FakeConnection
+
+
+SOURCE_RESPONSES = [
+    ('lootdrop_entries lde', [
+        {'item_id': 1001, 'npc_id': 20, 'npc_name': 'a_gnoll', 'zone': 'qeytoqrg',
+         'zone_name': 'Qeynos Hills', 'multiplier': 1, 'probability': 100, 'chance': 25},
+        {'item_id': 1001, 'npc_id': 10, 'npc_name': 'Fippy_Darkpaw', 'zone': 'qeynos2',
+         'zone_name': 'North Qeynos', 'multiplier': 1, 'probability': 50, 'chance': 10},
+        {'item_id': 1001, 'npc_id': 30, 'npc_name': 'a_bandit', 'zone': 'qeytoqrg',
+         'zone_name': 'Qeynos Hills', 'multiplier': 1, 'probability': 100, 'chance': 5},
+    ]),
+    ('merchantlist ml', lambda query, params: [
+        {'item_id': 1002, 'npc_id': 40, 'npc_name': 'Merchant_Bob', 'npc_class': 41,
+         'zone': 'qeynos2', 'zone_name': 'North Qeynos', 'merchant_slot': 3,
+         'item_base_price': 2500, 'merchant_sellrate': 150 if 'ml.sellrate' in query else 100},
+    ]),
+    ('DISTINCT item FROM merchantlist', [{'item': 1002}, {'item': 1003}]),
+    ('FROM ground_spawns gs', [
+        {'item_id': 1004, 'spawn_id': 7, 'max_x': 10.0, 'max_y': 20.0, 'max_z': 3.0,
+         'respawn_timer': 300, 'zone_short': 'qeynos2', 'zone_name': 'North Qeynos'},
+    ]),
+    ('DISTINCT item FROM ground_spawns', [{'item': 1004}]),
+    ('FROM forage f', [
+        {'item_id': 1005, 'zone_short': 'qeytoqrg', 'zone_name': 'Qeynos Hills', 'chance': 15, 'level': 1},
+    ]),
+    ('DISTINCT itemid FROM forage', [{'itemid': 1005}]),
+    ('tradeskill_recipe_entries', [
+        {'item_id': 1001, 'used_in_recipe': 1, 'created_by_recipe': 0},
+        {'item_id': 1006, 'used_in_recipe': 0, 'created_by_recipe': 1},
+    ]),
+]
+
+
+def source_connection(tables=('lootdrop_entries', 'merchantlist', 'ground_spawns',
+                              'forage', 'tradeskill_recipe_entries')):
+    """Connection answering the index builder's bulk queries; only `tables` exist."""
+    show_tables = ('SHOW TABLES', lambda query, params: [{'name': params[0]}] if params[0] in tables else [])
+    return FakeConnection([show_tables] + SOURCE_RESPONSES)
+
+
+@pytest.fixture
+def built_index(tmp_path):
+    index = ItemSourceIndex(path=str(tmp_path / 'index.json.gz'))
+    index.build(source_connection(), version_tag='abc')
+    return index
+
+
+class TestItemSourceIndex:
+    """Test building, lookups and persistence."""
+
+    def test_drop_rows_are_sorted_like_the_query(self, built_index):
+        rows = built_index.drop_rows(1001)
+
+        assert [row['npc_id'] for row in rows] == [10, 30, 20]
+        assert rows[0] == {
+            'npc_id': 10, 'npc_name': 'Fippy_Darkpaw', 'zone': 'qeynos2', 'zone_name': 'North Qeynos',
+            'multiplier': 1, 'probability': 50, 'chance': 10
+        }
+
+    def test_other_source_rows(self, built_index):
+        assert built_index.merchant_rows(1002)[0]['item_base_price'] == 2500
+        assert built_index.merchant_rows(1002)[0]['merchant_sellrate'] == 100
+        assert built_index.ground_spawn_rows(1004)[0]['max_x'] == 10.0
+        assert built_index.forage_rows(1005) == [
+            {'zone_short': 'qeytoqrg', 'zone_name': 'Qeynos Hills', 'chance': 15, 'level': 1}
+        ]
+        assert built_index.drop_rows(9999) == []
+
+    def test_merchant_sellrate_follows_schema(self, tmp_path):
+        index = ItemSourceIndex(path=str(tmp_path / 'index.json.gz'))
+        capabilities = SchemaCapabilities({'merchantlist': {'merchantid', 'slot', 'item', 'sellrate'}})
+        index.build(source_connection(), version_tag='abc', capabilities=capabilities)
+
+        assert index.merchant_rows(1002)[0]['merchant_sellrate'] == 150
+
+    def test_availability_flags(self, built_index):
+        assert built_index.availability(1001) == {
+            'drop_sources': 1, 'merchant_sources': 0, 'ground_spawns': 0,
+            'forage_sources': 0, 'tradeskill_recipes': 1, 'created_by_recipes': 0
+        }
+        # Any merchantlist entry counts, even without a spawned merchant
+        assert built_index.availability(1003)['merchant_sources'] == 1
+        assert built_index.availability(1006)['created_by_recipes'] == 1
+        assert built_index.availability_bits(9999) == 0
+
+    def test_missing_tables_are_skipped(self, tmp_path):
+        index = ItemSourceIndex(path=str(tmp_path / 'index.json.gz'))
+        index.build(source_connection(tables=('forage',)))
+
+        assert index.ready
+        assert index.has_table('forage')
+        assert not index.has_table('lootdrop_entries')
+        assert index.drop_rows(1001) == []
+        assert index.availability(1005)['forage_sources'] == 1
+
+    def test_save_and_load_round_trip(self, built_index):
+        built_index.save()
+
+        loaded = ItemSourceIndex(path=built_index.path)
+        assert loaded.load()
+        assert loaded.version_tag == 'abc'
+        assert loaded.drop_rows(1001) == built_index.drop_rows(1001)
+        assert loaded.availability(1006) == built_index.availability(1006)
+
+    def test_freshness_and_invalidation(self, built_index):
+        assert built_index.is_fresh('abc')
+        assert not built_index.is_fresh('other-db')
+
+        built_index.invalidate()
+
+        assert not built_index.ready
+        assert built_index.get_status()['items_with_sources'] == 0
+
+    def test_ensure_fresh_rebuilds_in_background(self, tmp_path):
+        index = ItemSourceIndex(path=str(tmp_path / 'index.json.gz'))
+        factory_calls = []
+
+        def factory():
+            factory_calls.append(1)
+            return source_connection(), 'mysql', None
+
+        registry = Mock()
+        registry.get.return_value = SchemaCapabilities({'merchantlist': {'sellrate'}})
+        with patch('utils.item_source_index.get_schema_registry', return_value=registry):
+            assert index.ensure_fresh(factory, 'abc') is False
+            index._build_thread.join(timeout=5)
+
+        assert factory_calls == [1]
+        assert index.ensure_fresh(factory, 'abc') is True
+        assert index.get_status()['last_error'] is None
+        assert index.merchant_rows(1002)[0]['merchant_sellrate'] == 150
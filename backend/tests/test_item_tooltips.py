@@ -0,0 +1,100 @@
+"""
+Tests for the item tooltip service and tooltip routes.
+"""
+
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+from flask import Flask
+
+from utils.item_tooltips import ItemTooltipService
+from tests.conftest import FakeConnection
+
+
+def tooltip_connection(items):
+    """Connection over a small items table, returning rows in id-descending order."""
+    return FakeConnection([('FROM items', lambda query, params: [
+        {'id': item_id, 'Name': f'Item {item_id}', 'icon': 500, 'itemtype': 10}
+        for item_id in sorted(params, reverse=True) if item_id in items
+    ])])
+
+
+def queried_ids(conn):
+    return [list(params) for _, params in conn.queries]
+
+
+class TestItemTooltipService:
+    """Test caching, chunking and ordering."""
+
+    def test_rows_follow_request_order(self):
+        conn = tooltip_connection({1, 2, 3})
+        service = ItemTooltipService(chunk_size=2)
+
+        rows = service.get_rows([3, 1, 99, 2, 3], lambda: (conn, 'mysql', None))
+
+        assert [row['id'] for row in rows] == [3, 1, 2]
+        assert queried_ids(conn) == [[3, 1], [99, 2]]
+        assert conn.closed == 1
+
+    def test_only_missing_ids_are_queried(self):
+        conn = tooltip_connection({1, 2, 3})
+        service = ItemTooltipService()
+        factory = lambda: (conn, 'mysql', None)
+
+        service.get_rows([1, 99], factory)
+        rows = service.get_rows([2, 1, 99], factory)
+
+        assert [row['id'] for row in rows] == [2, 1]
+        # 99 was remembered as missing; only 2 needed a query
+        assert queried_ids(conn) == [[1, 99], [2]]
+
+        factory_calls = Mock(side_effect=factory)
+        assert service.get_row(1, factory_calls)['Name'] == 'Item 1'
+        factory_calls.assert_not_called()
+
+    def test_lru_eviction(self):
+        conn = tooltip_connection({1, 2, 3})
+        service = ItemTooltipService(max_entries=2)
+        factory = lambda: (conn, 'mysql', None)
+
+        service.get_rows([1, 2, 3], factory)
+        service.get_rows([1], factory)
+
+        assert queried_ids(conn)[-1] == [1]
+        assert service.get_stats()['entries'] == 2
+
+    def test_connection_error(self):
+        with pytest.raises(ConnectionError):
+            ItemTooltipService().get_rows([1], lambda: (None, None, 'Database not configured'))
+
+
+class TestTooltipRoutes:
+    """Test the re-enabled tooltip and bulk routes."""
+
+    @pytest.fixture
+    def client(self):
+        from routes import items
+
+        app = Flask(__name__)
+        app.register_blueprint(items.item_bp)
+        conn = tooltip_connection({5, 7})
+        items.request_times.clear()
+        with patch.object(items, 'get_eqemu_db_connection', return_value=(conn, 'mysql', None)), \
+             patch.object(items, 'get_item_tooltip_service', return_value=ItemTooltipService()):
+            yield app.test_client()
+
+    def test_single_tooltip(self, client):
+        response = client.get('/api/items/7/tooltip')
+
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['name'] == 'Item 7'
+        assert data['itemtype_name'] == 'Armor'
+        assert client.get('/api/items/8/tooltip').status_code == 404
+
+    def test_bulk_keeps_request_order(self, client):
+        response = client.post('/api/items/bulk', json={'ids': [5, 404, 7]})
+
+        assert [item['id'] for item in json.loads(response.data)] == [5, 7]
+        assert client.post('/api/items/bulk', json={'ids': ['x']}).status_code == 400
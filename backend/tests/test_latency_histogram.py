@@ -0,0 +1,119 @@
+"""
+Tests for latency histograms and their rolling windows in the metrics store.
+"""
+
+import random
+from unittest.mock import patch
+
+import pytest
+
+from utils import metrics_store
+from utils.latency_histogram import (
+    LatencyHistogram, bucket_index, bucket_upper_ms, LATENCY_BUCKET_COUNT, LATENCY_SUB_BUCKETS
+)
+from utils.metrics_store import MetricsStore
+
+
+class TestBuckets:
+    def test_indexes_are_monotonic_and_bounded(self):
+        previous = 0
+        for value in [0, 0.01, 0.1, 0.5, 1, 2.5, 10, 99.9, 1000, 60000, 1e9]:
+            index = bucket_index(value)
+            assert previous <= index < LATENCY_BUCKET_COUNT
+            previous = index
+        assert bucket_index(1e12) == LATENCY_BUCKET_COUNT - 1
+
+    def test_value_falls_below_bucket_upper_bound(self):
+        for value in [0.02, 0.33, 1.7, 12.5, 480.0, 7321.0]:
+            index = bucket_index(value)
+            assert value < bucket_upper_ms(index)
+            assert index == 0 or value >= bucket_upper_ms(index - 1)
+
+    def test_relative_error_is_bounded(self):
+        for value in [0.5, 3.3, 42.0, 917.0, 12345.0]:
+            upper = bucket_upper_ms(bucket_index(value))
+            assert (upper - value) / value <= 1 / LATENCY_SUB_BUCKETS + 1e-9
+
+
+class TestLatencyHistogram:
+    def test_percentiles_track_the_tail(self):
+        histogram = LatencyHistogram()
+        for _ in range(98):
+            histogram.record(5.0)
+        histogram.record(900.0)
+        histogram.record(2000.0)
+
+        summary = histogram.summary()
+        assert summary['count'] == 100
+        assert summary['p50'] == pytest.approx(5.0, rel=1 / LATENCY_SUB_BUCKETS)
+        assert summary['p90'] == pytest.approx(5.0, rel=1 / LATENCY_SUB_BUCKETS)
+        assert summary['p99'] == pytest.approx(900.0, rel=1 / LATENCY_SUB_BUCKETS)
+        assert summary['max'] == 2000.0
+
+    def test_percentiles_match_sorted_samples(self):
+        rng = random.Random(7)
+        samples = [rng.expovariate(1 / 30) for _ in range(5000)]
+        histogram = LatencyHistogram()
+        for value in samples:
+            histogram.record(value)
+
+        ordered = sorted(samples)
+        for percent in (50, 90, 99):
+            exact = ordered[int(len(ordered) * percent / 100) - 1]
+            assert histogram.percentile(percent) == pytest.approx(exact, rel=1 / LATENCY_SUB_BUCKETS)
+
+    def test_empty_summary(self):
+        assert LatencyHistogram().summary() == {'count': 0, 'p50': None, 'p90': None, 'p99': None, 'max': None}
+
+    def test_merge_adds_counts(self):
+        first, second = LatencyHistogram(), LatencyHistogram()
+        first.record(1.0)
+        second.record(1.0)
+        second.record(50.0)
+        merged = first.merge(second)
+        assert merged.total == 3
+        assert merged.max_ms == 50.0
+
+
+class TestStoreLatencyWindows:
+    def test_summaries_across_workers(self, tmp_path):
+        path = str(tmp_path / 'metrics.db')
+        worker_a = MetricsStore(path, flush_seconds=60)
+        worker_b = MetricsStore(path, flush_seconds=60)
+        for _ in range(99):
+            worker_a.record_request('GET /api/items', 4.0)
+        worker_b.record_request('GET /api/items', 750.0)
+        worker_b.record_query(12.0, 'SELECT', 'npc_types')
+        worker_b.flush()
+
+        endpoints = worker_a.latency_summaries('endpoint')
+        assert endpoints['GET /api/items']['count'] == 100
+        assert endpoints['GET /api/items']['p50'] == pytest.approx(4.0, rel=1 / LATENCY_SUB_BUCKETS)
+        assert endpoints['GET /api/items']['max'] == 750.0
+        assert worker_a.latency_summaries('table')['npc_types']['count'] == 1
+
+    def test_window_excludes_old_slots(self, tmp_path):
+        store = MetricsStore(str(tmp_path / 'metrics.db'), flush_seconds=60)
+        now = 1_800_000_000.0
+        with patch.object(metrics_store.time, 'time', return_value=now - 3000):
+            store.record_request('GET /api/items', 500.0)
+            store.flush()
+        with patch.object(metrics_store.time, 'time', return_value=now):
+            store.record_request('GET /api/items', 5.0)
+            last_5m = store.latency_summaries('endpoint', 300)['GET /api/items']
+            last_1h = store.latency_summaries('endpoint', 3600)['GET /api/items']
+
+        assert last_5m['count'] == 1
+        assert last_5m['max'] == 5.0
+        assert last_1h['count'] == 2
+        assert last_1h['max'] == 500.0
+
+    def test_old_slots_are_pruned(self, tmp_path):
+        store = MetricsStore(str(tmp_path / 'metrics.db'), flush_seconds=60)
+        now = 1_800_000_000.0
+        with patch.object(metrics_store.time, 'time', return_value=now - 2 * 86400):
+            store.record_request('GET /api/items', 5.0)
+            store.flush()
+        with patch.object(metrics_store.time, 'time', return_value=now):
+            store.flush()
+            assert store.latency_summaries('endpoint', 10 * 86400) == {}
@@ -0,0 +1,209 @@
+"""
+Tests for the multi-worker metrics store.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from utils import metrics_store
+from utils.metrics_store import MetricsStore
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'metrics' / 'metrics.db')
+
+
+class TestMetricsStore:
+    def test_aggregates_across_workers(self, db_path):
+        worker_a = MetricsStore(db_path, flush_seconds=60)
+        worker_b = MetricsStore(db_path, flush_seconds=60)
+
+        worker_a.record_request('GET /api/items', 10)
+        worker_a.record_request('GET /api/items', 30, is_error=True)
+        worker_b.record_request('GET /api/items', 20)
+        worker_b.record_request('GET /api/zones', 5)
+        worker_b.flush()
+
+        snapshot = worker_a.snapshot()
+        items = snapshot['endpoint_stats']['GET /api/items']
+        assert items['total_calls'] == 3
+        assert items['total_time'] == 60
+        assert items['errors'] == 1
+        assert snapshot['endpoint_stats']['GET /api/zones']['total_calls'] == 1
+        assert sorted(snapshot['response_times']) == [5, 10, 20, 30]
+        assert snapshot['shared'] is True
+
+    def test_query_counters_and_timeline(self, db_path):
+        worker_a = MetricsStore(db_path, flush_seconds=60)
+        worker_b = MetricsStore(db_path, flush_seconds=60)
+        worker_a.record_query(5, 'SELECT', 'items')
+        worker_b.record_query(150, 'SELECT', 'npc_types', slow_entry={'query': 'SELECT ...', 'execution_time': 150})
+        worker_b.record_query(2, 'SHOW')
+        worker_b.flush()
+
+        db = worker_a.snapshot()['database']
+        assert db['total_queries'] == 3
+        assert db['query_types'] == {'SELECT': 2, 'SHOW': 1}
+        assert db['tables_accessed'] == {'items': 1, 'npc_types': 1}
+        assert db['slow_queries'] == [{'query': 'SELECT ...', 'execution_time': 150}]
+        assert len(db['timeline']) == 1
+        assert db['timeline'][0]['total_queries'] == 3
+        assert db['timeline'][0]['tables'] == {'items': 1, 'npc_types': 1}
+
+    def test_recording_only_buffers(self, db_path):
+        writer = MetricsStore(db_path, flush_seconds=60)
+        reader = MetricsStore(db_path, flush_seconds=60)
+        with patch.object(writer, '_flush') as flush:
+            writer.record_request('GET /api/items', 10)
+            writer.record_query(5, 'SELECT', 'items')
+        flush.assert_not_called()
+
+        assert reader.snapshot()['endpoint_stats'] == {}
+        assert writer.get_status()['pending_requests'] == 1
+        writer.flush()
+        assert reader.snapshot()['endpoint_stats']['GET /api/items']['total_calls'] == 1
+        assert writer.get_status()['pending_requests'] == 0
+
+    def test_background_thread_flushes(self, db_path):
+        writer = MetricsStore(db_path, flush_seconds=0.01)
+        reader = MetricsStore(db_path, flush_seconds=60)
+        writer.record_request('GET /api/items', 10)
+
+        for _ in range(200):
+            if reader.snapshot()['endpoint_stats']:
+                break
+            time.sleep(0.01)
+        assert reader.snapshot()['endpoint_stats']['GET /api/items']['total_calls'] == 1
+        assert writer._flusher.name == 'metrics-flush' and writer._flusher.daemon
+
+    def test_failed_flush_keeps_buffer(self, db_path):
+        store = MetricsStore(db_path, flush_seconds=60)
+        store.record_request('GET /api/items', 10)
+        store.flush()
+        store.record_request('GET /api/items', 20)
+        conn = store._conn
+        store._conn = Mock(execute=Mock(side_effect=sqlite3.OperationalError('database is locked')))
+        store.flush()
+        store.record_request('GET /api/items', 30)
+
+        store._conn = conn
+        assert store.snapshot()['endpoint_stats']['GET /api/items']['total_time'] == 60
+
+    def test_sample_rings_are_bounded(self, db_path):
+        store = MetricsStore(db_path, flush_seconds=0)
+        with patch.object(metrics_store, 'QUERY_TIME_SAMPLES', 3):
+            for ms in range(10):
+                store.record_query(ms, 'SELECT')
+            assert store.snapshot()['database']['query_times'] == [7, 8, 9]
+
+    def test_reset_clears_every_worker(self, db_path):
+        worker_a = MetricsStore(db_path, flush_seconds=60)
+        worker_b = MetricsStore(db_path, flush_seconds=60)
+        worker_a.record_request('GET /api/items', 10)
+        worker_a.flush()
+        worker_b.record_query(5, 'SELECT', 'items')
+
+        worker_b.reset()
+        snapshot = worker_a.snapshot()
+        assert snapshot['endpoint_stats'] == {}
+        assert snapshot['database']['total_queries'] == 0
+
+    def test_seed_applies_once(self, db_path):
+        persisted = {
+            'total_queries': 40,
+            'query_times': [1.0, 2.0],
+            'slow_queries': [],
+            'query_types': {'SELECT': 40},
+            'tables_accessed': {'items': 40},
+            'timeline': [{'timestamp': '2026-01-01T10:00:00', 'total_queries': 40, 'tables': {'items': 40}}]
+        }
+        MetricsStore(db_path).seed_database_stats(persisted)
+        store = MetricsStore(db_path, flush_seconds=60)
+        store.seed_database_stats(persisted)
+        store.record_query(3, 'SELECT', 'items')
+
+        db = store.snapshot()['database']
+        assert db['total_queries'] == 41
+        assert db['query_types'] == {'SELECT': 41}
+        assert db['query_times'] == [1.0, 2.0, 3.0]
+        assert db['timeline'][0]['timestamp'] == '2026-01-01T10:00:00'
+
+    def test_forked_child_drops_parent_buffer(self, db_path):
+        store = MetricsStore(db_path, flush_seconds=60)
+        store.record_request('GET /api/items', 10)
+        store.flush()
+        store.record_request('GET /api/items', 10)  # buffered in the "parent"
+
+        with patch.object(metrics_store.os, 'getpid', return_value=os.getpid() + 1):
+            store.record_request('GET /api/zones', 5)
+            snapshot = store.snapshot()
+
+        assert snapshot['endpoint_stats']['GET /api/items']['total_calls'] == 1
+        assert snapshot['endpoint_stats']['GET /api/zones']['total_calls'] == 1
+        assert len(snapshot['workers']) == 2
+
+    def test_falls_back_to_memory_when_path_unusable(self, tmp_path):
+        blocker = tmp_path / 'not_a_dir'
+        blocker.write_text('x')
+        store = MetricsStore(str(blocker / 'metrics.db'))
+        store.record_request('GET /api/items', 10)
+
+        snapshot = store.snapshot()
+        assert snapshot['shared'] is False
+        assert snapshot['endpoint_stats']['GET /api/items']['total_calls'] == 1
+
+    def test_concurrent_recording(self, db_path):
+        store = MetricsStore(db_path, flush_seconds=0.01)
+
+        def work():
+            for _ in range(200):
+                store.record_request('GET /api/items', 1)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert store.snapshot()['endpoint_stats']['GET /api/items']['total_calls'] == 800
+
+
+class TestAdminMetricsEndpoints:
+    def test_endpoint_metrics_read_shared_store(self, db_path):
+        from flask import Flask
+        from routes import admin
+
+        store = MetricsStore(db_path, flush_seconds=60)
+        other_worker = MetricsStore(db_path, flush_seconds=60)
+        other_worker.record_request('GET /api/items', 40)
+        other_worker.record_request('GET /api/items', 20, is_error=True)
+        other_worker.flush()
+
+        app = Flask(__name__)
+        with app.test_request_context(), patch.object(admin, 'get_metrics_store', return_value=store):
+            response = admin.get_endpoint_metrics.__wrapped__()
+
+        endpoints = response.get_json()['data']['endpoints']
+        assert endpoints[0]['path'] == '/api/items'
+        assert endpoints[0]['totalCalls'] == 2
+        assert endpoints[0]['errors'] == 1
+        assert endpoints[0]['avgTime'] == 30
+        assert endpoints[0]['latency']['count'] == 2
+        assert endpoints[0]['latency']['max'] == 40
+
+    def test_endpoint_metrics_rejects_unknown_window(self, db_path):
+        from flask import Flask
+        from routes import admin
+
+        app = Flask(__name__)
+        with app.test_request_context('/?window=3d'), \
+                patch.object(admin, 'get_metrics_store', return_value=MetricsStore(db_path)):
+            response = admin.get_endpoint_metrics.__wrapped__()
+
+        assert response[1] == 400
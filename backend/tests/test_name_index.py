@@ -0,0 +1,227 @@
+"""
+Tests for the in-memory name search and typeahead indexes.
+"""
+
+from utils.name_index import TrigramNameIndex, PrefixSuggestIndex, NameIndexRegistry, normalize_name
+from tests.conftest import FakeConnection
+
+
+def spells_table_missing(query, params):
+    raise Exception("Table 'spells_new' doesn't exist")
+
+
+NAME_RESPONSES = [
+    ('spells_new', spells_table_missing),
+    ('npc_types', [{'id': 1, 'name': '#Lord_Nagafen'}, {'id': 2, 'name': 'a_fire_beetle'}]),
+    # Items and zones
+    ('', [(10, 'Short Sword'), (11, 'Rusty Short Sword')]),
+]
+
+
+def make_index(entries):
+    index = TrigramNameIndex()
+    index.build(entries)
+    return index
+
+
+class TestNormalizeName:
+    def test_npc_style_names(self):
+        assert normalize_name('#Lord_Nagafen') == 'lord nagafen'
+        assert normalize_name('  a__fire   beetle ') == 'a fire beetle'
+        assert normalize_name(None) == ''
+
+
+class TestTrigramNameIndex:
+    """Test matching and ranking."""
+
+    ITEMS = [
+        (1, 'Rusty Short Sword'),
+        (2, 'Short Sword'),
+        (3, 'Sword of Runes'),
+        (4, 'Shortened Sword Hilt'),
+        (5, 'Cloth Cap'),
+        (6, 'Swordsman Cap'),
+    ]
+
+    def test_ranks_exact_prefix_word_then_substring(self):
+        index = make_index(self.ITEMS)
+
+        assert index.search('short sword') == [2, 1]
+        assert index.search('sword') == [3, 6, 1, 2, 4]
+
+    def test_matches_are_verified_substrings(self):
+        index = make_index(self.ITEMS)
+        # All trigrams of "word short" exist, but not adjacently
+        assert index.search('word short') == []
+        assert index.search('zzz') == []
+
+    def test_short_queries_scan(self):
+        index = make_index(self.ITEMS)
+        assert index.search('ca') == [5, 6]
+        assert index.search('') == []
+
+    def test_npc_normalization(self):
+        index = make_index([(100, '#Lord_Nagafen'), (101, 'Lady_Vox'), (102, 'a_lord_of_flame')])
+
+        assert index.search('lord nagafen') == [100]
+        assert index.search('Lord_Nagafen') == [100]
+        assert index.search('#lord') == [100, 102]
+
+    def test_limit(self):
+        index = make_index(self.ITEMS)
+        assert index.search('sword', limit=2) == [3, 6]
+
+
+class TestPrefixSuggestIndex:
+    """Test typeahead lookups."""
+
+    def make_index(self, entries):
+        index = PrefixSuggestIndex()
+        index.build(entries)
+        return index
+
+    def test_full_name_matches_before_word_matches(self):
+        index = self.make_index([
+            {'id': 1, 'name': 'Short Sword', 'icon': 592},
+            {'id': 2, 'name': 'Swordsman Cap', 'icon': 640},
+            {'id': 3, 'name': 'Cloth Cap', 'icon': 639},
+        ])
+
+        assert [s['id'] for s in index.suggest('sw')] == [2, 1]
+        assert index.suggest('cap')[0] == {'id': 2, 'name': 'Swordsman Cap', 'icon': 640}
+        assert index.suggest('zz') == []
+
+    def test_limit_and_no_duplicates(self):
+        index = self.make_index([{'id': i, 'name': f'Sword Sword {i}'} for i in range(5)])
+
+        assert len(index.suggest('sword', limit=3)) == 3
+        assert len(index.suggest('sword', limit=10)) == 5
+
+    def test_zone_short_names(self):
+        index = self.make_index([{'id': 'qeynos2', 'name': 'North Qeynos'}])
+
+        assert index.suggest('qeynos2') == [{'id': 'qeynos2', 'name': 'North Qeynos'}]
+        assert index.suggest('north')[0]['id'] == 'qeynos2'
+
+    def test_registry_builds_npc_display_names(self):
+        registry = NameIndexRegistry()
+        registry.build(FakeConnection(NAME_RESPONSES))
+
+        assert registry.get_suggest('npcs').suggest('lord') == [{'id': 1, 'name': '#Lord Nagafen', 'level': None}]
+        assert registry.get_suggest('spells') is None
+
+
+class TestNameIndexRegistry:
+    def test_build_skips_missing_tables(self):
+        registry = NameIndexRegistry()
+        registry.build(FakeConnection(NAME_RESPONSES), version_tag='abc')
+
+        assert registry.is_fresh('abc')
+        assert registry.get('spells') is None
+        assert registry.get('npcs').search('nagafen') == [1]
+        assert registry.get('items').search('short sword') == [10, 11]
+        assert registry.get_status()['sizes'] == {'items': 2, 'npcs': 2, 'zones': 2}
+
+    def test_other_database_invalidates(self):
+        registry = NameIndexRegistry()
+        registry.build(FakeConnection(NAME_RESPONSES), version_tag='abc')
+
+        # Building is blocked by the retry window, but stale data must not be served
+        registry._last_build_attempt = float('inf')
+        assert registry.ensure_fresh(lambda: (None, None, 'down'), 'other') is False
+        assert registry.get('npcs') is None
+
+
+class TestItemSearchWithNameIndex:
+    """Test that item search pages straight from ranked index ids."""
+
+    def search(self, client, url, ranked_ids, names):
+        from unittest.mock import Mock, patch
+        from tests.conftest import MockRealDictCursor
+
+        columns = ['itemtype', 'ac', 'hp', 'mana', 'astr', 'asta', 'aagi', 'adex', 'awis', 'aint',
+                   'acha', 'weight', 'damage', 'delay', 'magic', 'nodrop', 'norent', 'classes',
+                   'races', 'slots', 'lore', 'loregroup', 'reqlevel', 'stackable', 'stacksize',
+                   'icon', 'price', 'size', 'mr', 'fr', 'cr', 'dr', 'pr', 'reclevel',
+                   'clickeffect', 'proceffect', 'worneffect', 'focuseffect']
+        rows = [dict({c: 0 for c in columns}, id=item_id, Name=name) for item_id, name in names]
+
+        with patch('app.get_eqemu_db_connection') as mock_get_conn, \
+             patch('app.search_name_index', return_value=ranked_ids):
+            mock_conn = Mock()
+            mock_cursor = MockRealDictCursor(rows)
+            mock_conn.cursor.return_value = mock_cursor
+            mock_get_conn.return_value = (mock_conn, 'mysql', None)
+            response = client.get(url)
+        return response, mock_cursor
+
+    def test_name_only_search_skips_count_query(self, flask_test_client):
+        response, cursor = self.search(flask_test_client, '/api/items/search?q=short+sword&limit=2',
+                                       [13, 12, 14], [(12, 'Rusty Short Sword'), (13, 'Short Sword')])
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['total_count'] == 3
+        assert [item['item_id'] for item in data['items']] == ['13', '12']
+        assert data['next_cursor'] == 'rank:2,12'
+        assert len(cursor.executed_queries) == 1
+        query, params = cursor.executed_queries[0]
+        assert 'COUNT(*)' not in query
+        assert params == [13, 12]
+
+    def test_next_cursor_follows_the_index_not_the_page_size(self, flask_test_client):
+        # Item 12 isn't discovered, so the page is short but more ranked ids remain
+        response, _ = self.search(flask_test_client, '/api/items/search?q=short+sword&limit=2',
+                                  [13, 12, 14], [(13, 'Short Sword')])
+        assert response.get_json()['next_cursor'] == 'rank:2,12'
+
+        response, cursor = self.search(flask_test_client, '/api/items/search?q=short+sword&limit=2&after=rank:2,12',
+                                       [13, 12, 14], [(14, 'Short Sword of Ykesha')])
+        assert cursor.executed_queries[0][1] == [14]
+        assert response.get_json()['next_cursor'] is None
+
+    def test_rank_cursor_survives_an_index_rebuild(self, flask_test_client):
+        response, cursor = self.search(flask_test_client, '/api/items/search?q=short+sword&limit=2&after=rank:2,12',
+                                       [11, 13, 12, 14], [(14, 'Short Sword of Ykesha')])
+        assert response.status_code == 200
+        assert cursor.executed_queries[0][1] == [14]
+
+        # The last row dropped out entirely: keep the position instead of failing
+        response, cursor = self.search(flask_test_client, '/api/items/search?q=short+sword&limit=2&after=rank:2,12',
+                                       [13, 14, 15], [(15, 'Short Sword of the Ykesha')])
+        assert response.status_code == 200
+        assert cursor.executed_queries[0][1] == [15]
+
+    def test_keyset_cursor_keeps_name_order_once_index_is_ready(self, flask_test_client):
+        response, cursor = self.search(flask_test_client, '/api/items/search?q=short+sword&limit=2&after=Rusty%20Short%20Sword,12',
+                                       [13, 12, 14], [(13, 'Short Sword'), (14, 'Short Sword of Ykesha')])
+
+        assert response.status_code == 200
+        query, params = cursor.executed_queries[0]
+        assert '(items.Name > %s OR (items.Name = %s AND items.id > %s))' in query
+        assert params == [13, 12, 14, 'Rusty Short Sword', 'Rusty Short Sword', 12, 2]
+        assert response.get_json()['next_cursor'] == 'Short Sword of Ykesha,14'
+
+
+class TestSuggestEndpoint:
+    """Test the /api/suggest route."""
+
+    def test_requires_query(self, flask_test_client):
+        assert flask_test_client.get('/api/suggest').status_code == 400
+        assert flask_test_client.get('/api/suggest?q=sw&types=bogus').status_code == 400
+
+    def test_serves_from_registry_without_database(self, flask_test_client):
+        from unittest.mock import patch
+
+        registry = NameIndexRegistry()
+        registry.build(FakeConnection(NAME_RESPONSES))
+
+        with patch('app.get_name_indexes', return_value=registry), \
+             patch('app.get_eqemu_db_connection') as mock_get_conn:
+            response = flask_test_client.get('/api/suggest?q=short&types=items,spells&limit=1')
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['ready'] is True
+        assert data['suggestions'] == {'items': [{'id': 10, 'name': 'Short Sword'}], 'spells': []}
+        mock_get_conn.assert_not_called()
@@ -0,0 +1,62 @@
+"""
+Tests for the batched NPC detail loader.
+"""
+
+from utils.npc_details import load_npc_relations, MAX_ITEMS_PER_LOOT_GROUP
+from tests.conftest import FakeCursor
+
+
+def npc_cursor(loot_groups=5):
+    """Cursor answering the NPC detail queries with `loot_groups` loot groups."""
+    return FakeCursor([
+        ('FROM zone z', [{'note': '', 'short_name': 'qeynos2', 'long_name': 'North Qeynos',
+                          'x': 1.0, 'y': 2.0, 'z': 3.0, 'spawngroup': 'fippy'}]),
+        ('npc_spells_entries', [{'spellid': 5, 'spell_name': 'Fire_Bolt', 'new_icon': 3, 'minlevel': 1,
+                                 'maxlevel': 255, 'priority': 1, 'recast_delay': 0}]),
+        ('merchantlist', [{'item_id': 9, 'item_name': 'Bread', 'icon': 1, 'price': 4}]),
+        ('loottable_entries', [
+            {'lootdrop_id': 100 + n, 'table_probability': 50, 'multiplier': 1, 'droplimit': 0, 'mindrop': 0}
+            for n in range(loot_groups)
+        ]),
+        ('lootdrop_entries', lambda query, params: [
+            {'lootdrop_id': drop_id, 'item_id': drop_id * 100 + n, 'item_name': f'Item_{n}',
+             'icon': 1, 'itemtype': 0, 'item_chance': 40}
+            for drop_id in params if drop_id != 101
+            for n in range(25)
+        ]),
+    ])
+
+
+NPC = {'id': 1, 'level': 10, 'loottable_id': 7, 'npc_spells_id': 3, 'merchant_id': 4}
+
+
+class TestNpcDetailsLoader:
+    """Test the batched relation loader."""
+
+    def test_query_count_is_constant(self):
+        small = npc_cursor(loot_groups=2)
+        large = npc_cursor(loot_groups=60)
+        load_npc_relations(small, NPC)
+        load_npc_relations(large, NPC)
+
+        assert len(small.queries) == len(large.queries) == 5
+
+    def test_loot_groups_are_assembled(self):
+        relations = load_npc_relations(npc_cursor(loot_groups=3), NPC)
+        drops = relations['loot_drops']
+
+        # Group 101 has no discovered items and is dropped
+        assert [d['loot_drop_id'] for d in drops] == [100, 102]
+        assert len(drops[0]['items']) == MAX_ITEMS_PER_LOOT_GROUP
+        assert drops[0]['table_probability'] == 50
+        assert drops[0]['items'][0]['overall_probability'] == 20.0
+        assert drops[0]['items'][0]['item_name'] == 'Item 0'
+
+    def test_optional_relations_are_skipped(self):
+        cursor = npc_cursor()
+        relations = load_npc_relations(cursor, {'id': 1, 'level': 1})
+
+        assert len(cursor.queries) == 1
+        assert relations['spawn_locations'][0]['zone_long_name'] == 'North Qeynos'
+        assert relations['loot_drops'] == relations['spells'] == relations['merchant_items'] == []
+
@@ -0,0 +1,151 @@
+"""
+Tests for the background query tracking queue.
+"""
+
+import json
+import os
+import types
+from unittest.mock import Mock, patch
+
+import pytest
+from flask import Flask
+
+from utils import query_tracker
+from utils.query_tracker import QueryTrackingQueue, TrackedCursor, parse_query
+from utils.query_tracking_persistence import write_json_atomic
+from utils.sql_fingerprint import fingerprint_query
+
+
+class FakeAdmin(types.ModuleType):
+    def __init__(self):
+        super().__init__('routes.admin')
+        self.batches = []
+        self.saves = 0
+
+    def track_database_queries(self, entries):
+        self.batches.append(entries)
+
+    def save_query_tracking(self):
+        self.saves += 1
+
+
+@pytest.fixture
+def fake_admin():
+    admin = FakeAdmin()
+    with patch.dict('sys.modules', {'routes.admin': admin}):
+        yield admin
+
+
+@pytest.fixture
+def tracking_queue():
+    queue = QueryTrackingQueue(maxsize=100)
+    # Keep the worker thread out of these tests; they drain explicitly
+    with patch.object(queue, '_ensure_worker'), \
+            patch.object(query_tracker, 'get_query_tracking_queue', return_value=queue):
+        yield queue
+
+
+class TestParseQuery:
+    def test_types_and_tables(self):
+        assert parse_query('SELECT id FROM `items` WHERE id = %s') == ('SELECT', 'items')
+        assert parse_query('insert into npc_types (id) values (1)') == ('INSERT', 'npc_types')
+        assert parse_query('UPDATE "users" SET x = 1') == ('UPDATE', 'users')
+        assert parse_query('DELETE FROM spawn2 WHERE id = 1') == ('DELETE', 'spawn2')
+        assert parse_query('SHOW TABLES') == ('SHOW', 'unknown')
+        assert parse_query('SELECT n.id FROM (SELECT id FROM npc_types) n') == ('SELECT', 'npc_types')
+
+    def test_repeated_queries_hit_the_cache(self):
+        fingerprint_query.cache_clear()
+        for _ in range(5):
+            parse_query('SELECT * FROM items WHERE id = %s')
+        assert fingerprint_query.cache_info().hits == 4
+
+
+class TestQueryTrackingQueue:
+    def test_execute_only_queues(self, tracking_queue, fake_admin):
+        cursor = TrackedCursor(Mock())
+        cursor.execute('SELECT * FROM items WHERE id = %s', (1,))
+
+        assert fake_admin.batches == []
+        assert tracking_queue.get_stats()['queued'] == 1
+
+    def test_drain_tracks_in_batches(self, tracking_queue, fake_admin):
+        cursor = TrackedCursor(Mock())
+        with patch.object(query_tracker, 'QUERY_TRACKING_BATCH_SIZE', 2):
+            for _ in range(3):
+                cursor.execute('SELECT * FROM items')
+            tracking_queue.drain()
+
+        assert [len(batch) for batch in fake_admin.batches] == [2, 1]
+        entry = fake_admin.batches[0][0]
+        assert entry['query_type'] == 'SELECT'
+        assert entry['table_name'] == 'items'
+        assert entry['request_info'] is None
+        assert tracking_queue.get_stats()['queued'] == 0
+
+    def test_captures_request_on_request_thread(self, tracking_queue, fake_admin):
+        app = Flask(__name__)
+        with app.test_request_context('/api/items/5', method='GET'):
+            TrackedCursor(Mock()).execute('SELECT * FROM items')
+        tracking_queue.drain()
+
+        assert fake_admin.batches[0][0]['request_info'] == ('GET', '/api/items/5')
+
+    def test_failed_queries_are_tracked(self, tracking_queue, fake_admin):
+        raw = Mock()
+        raw.execute.side_effect = RuntimeError('boom')
+        with pytest.raises(RuntimeError):
+            TrackedCursor(raw).execute('SELECT * FROM items')
+        tracking_queue.drain()
+        assert len(fake_admin.batches[0]) == 1
+
+    def test_full_queue_drops_oldest(self, fake_admin):
+        queue = QueryTrackingQueue(maxsize=2)
+        with patch.object(queue, '_ensure_worker'):
+            for table in ('a', 'b', 'c'):
+                queue.put(f'SELECT * FROM {table}', 1.0)
+        queue.drain()
+
+        assert [entry['table_name'] for entry in fake_admin.batches[0]] == ['b', 'c']
+        assert queue.get_stats()['dropped'] == 1
+
+    def test_save_only_after_new_data(self, tracking_queue, fake_admin):
+        with patch.object(query_tracker, 'QUERY_TRACKING_SAVE_SECONDS', 0), \
+                patch.object(tracking_queue._wakeup, 'wait', side_effect=[True, True, SystemExit]):
+            tracking_queue.put('SELECT * FROM items', 1.0)
+            with pytest.raises(SystemExit):
+                tracking_queue._run()
+
+        assert fake_admin.saves == 1
+
+    def test_skips_tracking_until_admin_loaded(self, tracking_queue):
+        with patch.dict('sys.modules', {'routes.admin': None}):
+            tracking_queue.put('SELECT * FROM items', 1.0)
+            tracking_queue.drain()
+        assert tracking_queue.get_stats()['processed'] == 0
+
+
+class TestAtomicWrite:
+    def test_replaces_file_without_leftovers(self, tmp_path):
+        path = tmp_path / 'metrics.json'
+        write_json_atomic(str(path), {'total_queries': 1})
+        write_json_atomic(str(path), {'total_queries': 2})
+
+        assert json.loads(path.read_text()) == {'total_queries': 2}
+        assert os.listdir(tmp_path) == ['metrics.json']
+
+    def test_failed_write_keeps_previous_file(self, tmp_path):
+        path = tmp_path / 'metrics.json'
+        write_json_atomic(str(path), {'total_queries': 1})
+        with pytest.raises(TypeError):
+            write_json_atomic(str(path), {'bad': object()})
+
+        assert json.loads(path.read_text()) == {'total_queries': 1}
+        assert os.listdir(tmp_path) == ['metrics.json']
+
+
+class TestSourceEndpoints:
+    def test_resolves_request_info(self):
+        from routes.admin import resolve_source_endpoint
+        assert resolve_source_endpoint('GET', '/api/items/5') == 'Item Search'
+        assert resolve_source_endpoint('GET', '/api/zone-npcs/qeynos') == 'GET /api/zone-npcs/qeynos'
@@ -0,0 +1,150 @@
+"""
+Tests for the recipe dependency graph and the recipe tree endpoint.
+"""
+
+import json
+from unittest.mock import patch
+
+from utils.recipe_graph import RecipeGraph, RecipeGraphManager, classify_entry, ROLE_COMPONENT, ROLE_TOOL
+from tests.conftest import FakeConnection
+
+
+# id, name, tradeskill, trivial
+RECIPES = [
+    (1, 'Steel_Sword', 63, 150),
+    (2, 'Steel Bar', 63, 50),
+    (3, 'Steel Bar (hard)', 63, 120),
+    (4, 'Ore Refining', 63, 20),
+]
+
+# recipe_id, item_id, successcount, componentcount, iscontainer, item_name
+ENTRIES = [
+    (1, 10, 1, 0, 0, 'Steel Sword'),
+    (1, 20, 0, 3, 0, 'Steel Bar'),
+    (1, 30, 1, 1, 0, 'Smithy Hammer'),
+    (1, 40, 0, 0, 1, 'Forge'),
+    (2, 20, 2, 0, 0, 'Steel Bar'),
+    (2, 50, 0, 2, 0, 'Steel Ore'),
+    (2, 40, 0, 0, 1, 'Forge'),
+    (3, 20, 1, 0, 0, 'Steel Bar'),
+    (3, 60, 0, 1, 0, 'Coal'),
+    # Refining turns a bar back into ore: a cycle with recipe 2
+    (4, 50, 4, 0, 0, 'Steel Ore'),
+    (4, 20, 0, 1, 0, 'Steel Bar'),
+]
+
+
+GRAPH_RESPONSES = [('tradeskill_recipe_entries', ENTRIES), ('FROM tradeskill_recipe', RECIPES)]
+
+
+class TestClassifyEntry:
+    def test_roles(self):
+        assert classify_entry(0, 3, 0) == (ROLE_COMPONENT, 3)
+        assert classify_entry(1, 1, 0) == (ROLE_TOOL, 1)
+        assert classify_entry(1, 3, 0) == (ROLE_COMPONENT, 2)
+        assert classify_entry(0, 0, 0) is None
+
+
+class TestRecipeGraph:
+    """Test tree expansion, totals and cycle handling."""
+
+    def test_producers_easiest_first(self):
+        graph = RecipeGraph(RECIPES, ENTRIES)
+
+        assert graph.producers(20) == [2, 3]
+        assert graph.producers(10) == [1]
+        assert graph.producers(999) == []
+
+    def test_expand_aggregates_raw_materials(self):
+        expanded = RecipeGraph(RECIPES, ENTRIES).expand(1)
+
+        tree = expanded['tree']
+        assert tree['recipe_name'] == 'Steel Sword'
+        bar = tree['components'][0]
+        # 3 bars at 2 per combine -> 2 combines of recipe 2
+        assert bar['combines'] == 2
+        assert bar['alternatives'] == 1
+        assert bar['recipe']['recipe_id'] == 2
+        # Refining needs a bar and recipe 2 is already on the path, so it goes through recipe 3
+        refining = bar['recipe']['components'][0]['recipe']
+        assert refining['recipe_id'] == 4
+        assert refining['components'][0]['recipe']['recipe_id'] == 3
+        assert expanded['raw_materials'] == [{'item_id': 60, 'item_name': 'Coal', 'quantity': 2}]
+        assert expanded['tools'] == [{'item_id': 30, 'item_name': 'Smithy Hammer'}]
+        assert expanded['containers'] == [{'item_id': 40, 'item_name': 'Forge'}]
+        assert expanded['has_cycles'] is False
+
+    def test_cycle_stops_at_repeated_recipe(self):
+        graph = RecipeGraph(RECIPES, [entry for entry in ENTRIES if entry[0] != 3])
+
+        expanded = graph.expand(1)
+
+        ore = expanded['tree']['components'][0]['recipe']['components'][0]
+        assert ore['recipe']['components'][0]['cycle'] is True
+        assert expanded['has_cycles'] is True
+        # 2 bar combines x 1 refining combine x 1 bar, left as a raw material
+        assert expanded['raw_materials'] == [{'item_id': 20, 'item_name': 'Steel Bar', 'quantity': 2}]
+
+    def test_depth_limit_and_memo(self):
+        graph = RecipeGraph(RECIPES, ENTRIES)
+
+        shallow = graph.expand(1, depth=1)
+        assert shallow['truncated'] is True
+        assert shallow['raw_materials'][0]['item_name'] == 'Steel Bar'
+
+        assert graph.expand(2)['tree']['components'][0]['item_name'] == 'Steel Ore'
+        assert graph.expand(99) is None
+
+    def test_node_budget_truncates_without_poisoning_memo(self):
+        graph = RecipeGraph(RECIPES, [entry for entry in ENTRIES if entry[0] != 4])
+
+        capped = graph.expand(1, max_nodes=1)
+        assert capped['nodes'] == 1
+        assert capped['truncated'] is True
+        assert capped['tree']['components'][0]['truncated'] is True
+        assert capped['raw_materials'][0]['item_name'] == 'Steel Bar'
+
+        full = graph.expand(1)
+        assert full['nodes'] == 2
+        assert full['truncated'] is False
+        assert full['raw_materials'] == [{'item_id': 50, 'item_name': 'Steel Ore', 'quantity': 4}]
+
+        # A memoized subtree larger than what's left of the budget isn't reused
+        capped = graph.expand(1, max_nodes=1)
+        assert capped['nodes'] == 1
+        assert capped['truncated'] is True
+
+    def test_acyclic_subtrees_are_memoized(self):
+        graph = RecipeGraph(RECIPES, [entry for entry in ENTRIES if entry[0] != 4])
+
+        graph.expand(1)
+        graph.expand(1)
+        assert graph.get_stats()['memo_hits'] >= 1
+
+    def test_manager_build(self):
+        manager = RecipeGraphManager()
+        manager.build(FakeConnection(GRAPH_RESPONSES), version_tag='peq@localhost')
+
+        assert manager.is_fresh('peq@localhost')
+        assert manager.get_status()['recipes'] == 4
+        manager.invalidate()
+        assert manager.graph is None
+
+
+class TestRecipeTreeEndpoint:
+    """Test /api/recipes/<id>/tree."""
+
+    def test_expands_from_graph(self, flask_test_client):
+        with patch('app.get_ready_recipe_graph', return_value=RecipeGraph(RECIPES, ENTRIES)):
+            response = flask_test_client.get('/api/recipes/1/tree?depth=3')
+            assert response.status_code == 200
+            assert json.loads(response.data)['depth'] == 3
+            assert flask_test_client.get('/api/recipes/99/tree').status_code == 404
+            assert flask_test_client.get('/api/recipes/1/tree?depth=50').status_code == 400
+
+    def test_building(self, flask_test_client):
+        with patch('app.get_ready_recipe_graph', return_value=None):
+            response = flask_test_client.get('/api/recipes/1/tree')
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '10'
@@ -0,0 +1,75 @@
+"""
+Tests for the precomputed recipe -> primary result table.
+"""
+
+from utils.recipe_results import RecipeResultIndex, pick_primary_results, query_primary_results
+from tests.conftest import FakeConnection, FakeCursor
+
+
+# recipe_id, item_id, successcount, componentcount, iscontainer, itemtype, bagtype, name, icon
+ROWS = [
+    (1, 100, 1, 0, 0, 0, 0, 'Fine Steel Sword', 501),
+    (1, 200, 1, 1, 0, 11, 0, 'Smithy Hammer', 502),        # returned tool, also a component
+    (2, 300, 1, 0, 1, 11, 0, 'Forge', 503),                 # container
+    (2, 301, 1, 0, 0, 11, 20, "Jeweler's Kit", 504),        # tradeskill container by bag type
+    (2, 302, 2, 0, 0, 29, 0, 'Gold Ring', 505),
+    (2, 303, 2, 0, 0, 29, 0, 'Silver Ring', 506),           # ties on successcount, higher id loses
+    (3, 400, 1, 0, 0, 11, 16, 'Sewing Kit', 507),           # only a container comes back
+    (4, 500, 1, 0, 0, 11, 0, 'Planing Tool', 508),          # Misc item named like a tool
+    (4, 501, 1, 0, 0, 10, 0, 'Filed Steel Breastplate', 509),  # armor, whatever the name
+    (5, 600, 1, 0, 0, None, None, 'Tinkered Saw', 510),     # type unknown: name fallback
+]
+
+
+class TestPickPrimaryResults:
+    """Test tool/container skipping and tie-breaking."""
+
+    def test_skips_tools_and_containers(self):
+        results = pick_primary_results(ROWS)
+
+        assert results[1] == (100, 501, 'Fine Steel Sword')
+        assert results[2] == (302, 505, 'Gold Ring')
+        assert 3 not in results
+        assert results[4] == (501, 509, 'Filed Steel Breastplate')
+        assert 5 not in results
+
+    def test_accepts_dict_rows(self):
+        columns = ('recipe_id', 'item_id', 'successcount', 'componentcount', 'iscontainer', 'itemtype', 'bagtype',
+                   'name', 'icon')
+        rows = [dict(zip(columns, row)) for row in ROWS]
+
+        assert pick_primary_results(rows) == pick_primary_results(ROWS)
+
+    def test_query_for_some_recipes(self):
+        cursor = FakeCursor([('', ROWS[:2])])
+
+        assert query_primary_results(cursor, [1]) == {1: (100, 501, 'Fine Steel Sword')}
+        assert cursor.queries[0][1] == (1,)
+        assert query_primary_results(cursor, []) == {}
+        assert len(cursor.queries) == 1
+
+
+class TestRecipeResultIndex:
+    """Test building, persistence and invalidation."""
+
+    def test_build_save_load(self, tmp_path):
+        path = str(tmp_path / 'recipe_results.json.gz')
+        index = RecipeResultIndex(path=path)
+        index.build(FakeConnection([('', ROWS)]), version_tag='peq@localhost')
+        index.save()
+
+        loaded = RecipeResultIndex(path=path)
+        assert loaded.load()
+        assert loaded.version_tag == 'peq@localhost'
+        assert loaded.get(2) == (302, 505, 'Gold Ring')
+        assert loaded.get_many([1, 3, 2]) == {1: (100, 501, 'Fine Steel Sword'), 2: (302, 505, 'Gold Ring')}
+        assert loaded.get_status()['recipes'] == 3
+
+    def test_version_change_invalidates(self, tmp_path):
+        index = RecipeResultIndex(path=str(tmp_path / 'recipe_results.json.gz'))
+        index.build(FakeConnection([('', ROWS)]), version_tag='old')
+        index._last_build_attempt = float('inf')  # keep the background build from starting
+
+        assert index.ensure_fresh(lambda: (None, None, 'unused'), 'old')
+        assert not index.ensure_fresh(lambda: (None, None, 'unused'), 'new')
+        assert index.get(1) is None
@@ -0,0 +1,136 @@
+"""
+Tests for the read-through response cache.
+"""
+
+import time
+from flask import Flask, jsonify
+
+from utils.response_cache import ResponseCache, cached_response, get_response_cache
+
+
+class TestResponseCache:
+    """Test keys, eviction, expiry, invalidation and the disk tier."""
+
+    def test_key_normalizes_params(self):
+        cache = ResponseCache()
+        a = cache.make_key('/api/items/1', {'b': ['2'], 'a': ['1', ' 3']})
+        b = cache.make_key('/api/items/1', {'a': ['3', '1'], 'b': '2'})
+        c = cache.make_key('/api/items/2', {'a': ['3', '1'], 'b': '2'})
+        assert a == b
+        assert a != c
+
+    def test_hit_and_miss_counters(self):
+        cache = ResponseCache()
+        key = cache.make_key('/api/items/1')
+        assert cache.get(key) is None
+        cache.set(key, b'{"id": 1}')
+        assert cache.get(key) == (b'{"id": 1}', 'application/json')
+
+        stats = cache.get_stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == 50.0
+
+    def test_lru_eviction_by_bytes(self):
+        cache = ResponseCache(max_bytes=10)
+        cache.set('a', b'12345')
+        cache.set('b', b'12345')
+        cache.get('a')  # 'b' becomes least recently used
+        cache.set('c', b'12345')
+
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.get('c') is not None
+        assert cache.get_stats()['bytes'] == 10
+        assert cache.get_stats()['evictions'] == 1
+
+    def test_entries_expire(self):
+        cache = ResponseCache()
+        cache.set('a', b'{}', ttl=0.01)
+        time.sleep(0.02)
+        assert cache.get('a') is None
+        assert cache.get_stats()['expirations'] == 1
+
+    def test_invalidate_changes_keys(self):
+        cache = ResponseCache()
+        key = cache.make_key('/api/items/1')
+        cache.set(key, b'{}')
+
+        cache.invalidate_all()
+
+        assert cache.get(key) is None
+        assert cache.make_key('/api/items/1') != key
+        assert cache.get_stats()['entries'] == 0
+
+    def test_disk_tier_survives_new_instance(self, tmp_path):
+        first = ResponseCache(disk_dir=str(tmp_path))
+        first.set('abcdef', b'{"id": 1}')
+
+        second = ResponseCache(disk_dir=str(tmp_path))
+        assert second.get('abcdef') == (b'{"id": 1}', 'application/json')
+        assert second.get_stats()['disk_hits'] == 1
+
+        second.invalidate_all()
+        assert ResponseCache(disk_dir=str(tmp_path)).get('abcdef') is None
+
+    def test_invalidate_leaves_other_directories_alone(self, tmp_path):
+        (tmp_path / 'zone_summaries').mkdir()
+        (tmp_path / 'zone_summaries' / 'manifest.json').write_text('{}')
+        cache = ResponseCache(disk_dir=str(tmp_path))
+        cache.set('abcdef', b'{"id": 1}')
+
+        cache.invalidate_all()
+        assert sorted(p.name for p in tmp_path.iterdir()) == ['zone_summaries']
+        assert (tmp_path / 'zone_summaries' / 'manifest.json').exists()
+
+
+class TestCachedResponseDecorator:
+    """Test the Flask view decorator."""
+
+    def make_app(self):
+        app = Flask(__name__)
+        app.config['RESPONSE_CACHE_ENABLED'] = True
+        calls = {'count': 0}
+
+        @app.route('/api/test-cache/<int:thing_id>')
+        @cached_response(ttl=60)
+        def thing(thing_id):
+            calls['count'] += 1
+            if thing_id == 0:
+                return jsonify({'error': 'not found'}), 404
+            return jsonify({'id': thing_id})
+
+        return app, calls
+
+    def test_successful_responses_are_cached(self):
+        app, calls = self.make_app()
+        get_response_cache().invalidate_all()
+        client = app.test_client()
+
+        first = client.get('/api/test-cache/7?x=1')
+        second = client.get('/api/test-cache/7?x=1')
+
+        assert first.headers['X-Cache'] == 'MISS'
+        assert second.headers['X-Cache'] == 'HIT'
+        assert second.get_json() == {'id': 7}
+        assert calls['count'] == 1
+
+    def test_errors_are_not_cached(self):
+        app, calls = self.make_app()
+        client = app.test_client()
+
+        client.get('/api/test-cache/0')
+        client.get('/api/test-cache/0')
+
+        assert calls['count'] == 2
+
+    def test_disabled_in_testing_mode_by_default(self):
+        app, calls = self.make_app()
+        del app.config['RESPONSE_CACHE_ENABLED']
+        app.config['TESTING'] = True
+        client = app.test_client()
+
+        client.get('/api/test-cache/8')
+        client.get('/api/test-cache/8')
+
+        assert calls['count'] == 2
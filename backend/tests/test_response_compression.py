@@ -0,0 +1,186 @@
+"""
+Tests for response compression and streamed JSON responses.
+"""
+
+import gzip
+import json
+import zlib
+from unittest.mock import patch
+
+import pytest
+from flask import Flask, Response, jsonify
+
+from utils.json_streaming import stream_json_list, streamed_json_response, iter_cursor_rows
+from utils.response_cache import ResponseCache, cached_response
+from utils.response_compression import ResponseCompressor, negotiate_encoding, parse_accept_encoding
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    compressor = ResponseCompressor({'compression_min_size': 100})
+    compressor.init_app(app)
+    app.compressor = compressor
+
+    rows = [{'id': i, 'name': f'Item number {i}'} for i in range(200)]
+
+    @app.route('/big')
+    def big():
+        return jsonify({'items': rows})
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/missing')
+    def missing():
+        return jsonify({'error': 'x' * 500}), 404
+
+    @app.route('/precompressed')
+    def precompressed():
+        response = Response(gzip.compress(b'{"a":1}'), mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
+
+    @app.route('/stream')
+    def stream():
+        return streamed_json_response(stream_json_list({'kind': 'test'}, 'items', iter(rows), batch_size=7,
+                                                       tail=lambda: {'total_count': len(rows)}))
+
+    return app
+
+
+class TestNegotiation:
+    def test_parse_accept_encoding(self):
+        assert parse_accept_encoding('gzip, br;q=0.5, deflate;q=0') == {'gzip': 1.0, 'br': 0.5}
+
+    def test_negotiate(self):
+        assert negotiate_encoding('gzip, br', brotli_available=True) == 'br'
+        assert negotiate_encoding('gzip, br', brotli_available=False) == 'gzip'
+        assert negotiate_encoding('br;q=0.2, gzip;q=0.8', brotli_available=True) == 'gzip'
+        assert negotiate_encoding('*', brotli_available=False) == 'gzip'
+        assert negotiate_encoding('identity') is None
+        assert negotiate_encoding('gzip;q=0') is None
+
+
+class TestResponseCompressor:
+    """Test which responses get compressed and how."""
+
+    def test_large_json_is_gzipped(self, app):
+        response = app.test_client().get('/big', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert len(json.loads(gzip.decompress(response.data))['items']) == 200
+        stats = app.compressor.get_stats()
+        assert stats['compressed'] == 1 and stats['bytes_out'] < stats['bytes_in']
+
+    def test_skipped_responses(self, app):
+        client = app.test_client()
+        headers = {'Accept-Encoding': 'gzip'}
+
+        assert 'Content-Encoding' not in client.get('/big').headers
+        assert 'Content-Encoding' not in client.get('/small', headers=headers).headers
+        assert 'Content-Encoding' not in client.get('/missing', headers=headers).headers
+        response = client.get('/precompressed', headers=headers)
+        assert gzip.decompress(response.data) == b'{"a":1}'
+
+    def test_streamed_response_is_compressed_incrementally(self, app):
+        response = app.test_client().get('/stream', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        body = json.loads(zlib.decompress(response.data, 31))
+        assert body['kind'] == 'test'
+        assert body['total_count'] == 200
+        assert body['items'][199]['id'] == 199
+
+    def test_brotli_preferred_when_client_accepts_it(self, app):
+        brotli = pytest.importorskip('brotli')
+        response = app.test_client().get('/big', headers={'Accept-Encoding': 'gzip, deflate, br'})
+
+        assert response.headers['Content-Encoding'] == 'br'
+        assert len(json.loads(brotli.decompress(response.data))['items']) == 200
+
+    def test_streamed_response_is_brotli_compressed(self, app):
+        brotli = pytest.importorskip('brotli')
+        response = app.test_client().get('/stream', headers={'Accept-Encoding': 'br'})
+
+        assert response.headers['Content-Encoding'] == 'br'
+        body = json.loads(brotli.decompress(response.data))
+        assert body['total_count'] == 200
+        assert body['items'][199]['id'] == 199
+
+
+class TestJsonStreaming:
+    def test_stream_json_list(self):
+        dumps = json.dumps
+        assert json.loads(b''.join(stream_json_list({}, 'rows', [], dumps=dumps))) == {'rows': []}
+        chunks = list(stream_json_list({'a': 1}, 'rows', range(5), tail=lambda: {'n': 5}, dumps=dumps, batch_size=2))
+        assert len(chunks) == 5
+        assert json.loads(b''.join(chunks)) == {'a': 1, 'rows': [0, 1, 2, 3, 4], 'n': 5}
+
+    def test_iter_cursor_rows(self):
+        class Cursor:
+            def __init__(self):
+                self.batches = [[1, 2], [3], []]
+
+            def fetchmany(self, size):
+                return self.batches.pop(0)
+
+        assert list(iter_cursor_rows(Cursor(), batch_size=2)) == [1, 2, 3]
+
+    def test_streamed_json_is_cached_once_complete(self):
+        app = Flask(__name__)
+        app.config['RESPONSE_CACHE_ENABLED'] = True
+        calls = []
+
+        @app.route('/rows')
+        @cached_response()
+        def rows():
+            calls.append(1)
+            return streamed_json_response(stream_json_list({}, 'rows', iter([1, 2, 3])))
+
+        with patch('utils.response_cache.get_response_cache', return_value=ResponseCache()):
+            client = app.test_client()
+            first = client.get('/rows')
+            first_body = first.data
+            first.close()
+            second = client.get('/rows')
+
+        assert json.loads(first_body) == json.loads(second.data) == {'rows': [1, 2, 3]}
+        assert second.headers['X-Cache'] == 'HIT'
+        assert len(calls) == 1
+
+
+class TestItemsWithSpellStreaming:
+    """Test the streamed /api/spells/<id>/items response."""
+
+    def test_connection_closes_before_the_body_is_read(self, flask_test_client):
+        from unittest.mock import Mock
+        from utils.schema_capabilities import SchemaCapabilities
+
+        cursor = Mock()
+        cursor.fetchall.return_value = [
+            {'id': 1, 'name': 'Scroll_of_Light', 'icon': 500, 'scrolleffect': 42, 'clickeffect': 0,
+             'proceffect': 0, 'worneffect': 0, 'focuseffect': 0, 'bardeffect': 0},
+            (2, 'Lantern', 600, 0, 42, 0, 0, 0, 42)
+        ]
+        conn = Mock()
+        conn.cursor.return_value = cursor
+        capabilities = SchemaCapabilities({'items': {'id'}, 'discovered_items': {'item_id'}})
+        with patch('app.get_eqemu_db_connection', return_value=(conn, 'mysql', None)), \
+             patch('app.get_schema_capabilities', return_value=capabilities):
+            # A HEAD request never iterates the streamed body
+            flask_test_client.head('/api/spells/42/items')
+            conn.close.assert_called_once()
+            cursor.close.assert_called_once()
+
+            response = flask_test_client.get('/api/spells/42/items?fresh=1')
+            data = json.loads(response.data)
+            response.close()
+
+        assert data['spell_id'] == 42
+        assert data['total_count'] == 2
+        assert data['items'][0]['name'] == 'Scroll of Light'
+        assert data['items'][1]['effect_types'] == ['click', 'bard']
+        assert conn.close.call_count == 2
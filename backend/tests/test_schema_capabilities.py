@@ -0,0 +1,67 @@
+"""
+Tests for the schema capability registry.
+"""
+
+from utils.schema_capabilities import SchemaCapabilityRegistry, SchemaCapabilities, UNKNOWN_CAPABILITIES
+from tests.conftest import FakeConnection
+
+
+SCHEMA_RESPONSES = [
+    ('information_schema.COLUMNS', [
+        {'table_name': 'items', 'column_name': 'id'},
+        {'table_name': 'Merchantlist', 'column_name': 'item'},
+        {'table_name': 'Merchantlist', 'column_name': 'merchantid'},
+        ('lootdrop_entries', 'item_id'),
+    ]),
+    ('STATISTICS', [
+        {'TABLE_NAME': 'merchantlist', 'INDEX_NAME': 'PRIMARY', 'COLUMN_NAME': 'merchantid'},
+        {'TABLE_NAME': 'merchantlist', 'INDEX_NAME': 'PRIMARY', 'COLUMN_NAME': 'slot'},
+    ]),
+]
+
+
+def access_denied(query, params):
+    raise RuntimeError("access denied")
+
+
+class TestSchemaCapabilities:
+    """Test introspection, lookups and invalidation."""
+
+    def test_tables_columns_and_indexes(self):
+        capabilities = SchemaCapabilities.introspect(FakeConnection(SCHEMA_RESPONSES))
+
+        assert capabilities.has('lootdrop_entries')
+        assert capabilities.has('merchantlist', 'merchantid')
+        assert not capabilities.has('merchantlist', 'sellrate')
+        assert not capabilities.has('forage')
+        assert capabilities.has_all('items', 'MERCHANTLIST')
+        assert capabilities.has_index('merchantlist', 'merchantid')
+        assert capabilities.has_index('merchantlist', 'merchantid', 'slot')
+        assert not capabilities.has_index('merchantlist', 'slot')
+
+    def test_introspects_once_per_version_tag(self):
+        registry = SchemaCapabilityRegistry()
+        conn = FakeConnection(SCHEMA_RESPONSES)
+
+        first = registry.get(conn, 'db-a')
+        assert registry.get(conn, 'db-a') is first
+        assert len(conn.queries) == 2
+
+        registry.get(conn, 'db-b')
+        assert len(conn.queries) == 4
+
+        registry.invalidate()
+        registry.get(conn, 'db-b')
+        assert registry.get_status()['loads'] == 3
+
+    def test_failed_introspection_is_not_cached(self):
+        registry = SchemaCapabilityRegistry()
+
+        capabilities = registry.get(FakeConnection([('', access_denied)]), 'db-a')
+        assert capabilities is UNKNOWN_CAPABILITIES
+        # Tables are assumed present, optional columns absent
+        assert capabilities.has('lootdrop_entries')
+        assert not capabilities.has('merchantlist', 'sellrate')
+
+        assert registry.get(FakeConnection(SCHEMA_RESPONSES), 'db-a').has('items')
+        assert registry.get_status()['failures'] == 1
@@ -0,0 +1,158 @@
+"""
+Tests for search pagination: keyset cursors and cached totals.
+"""
+
+import json
+import pytest
+from unittest.mock import Mock, patch
+
+from tests.conftest import MockRealDictCursor
+from utils.search_pagination import (
+    SearchCountCache, parse_pagination_args, encode_cursor, decode_cursor,
+    encode_rank_cursor, decode_rank_cursor, rank_cursor_start, keyset_condition, resolve_total, get_search_count_cache
+)
+
+
+class TestCursors:
+    def test_round_trip_with_commas_in_name(self):
+        cursor = encode_cursor('Fine Steel Sword, Rusted', 1234)
+        assert decode_cursor(cursor) == ('Fine Steel Sword, Rusted', 1234)
+
+    def test_leading_level(self):
+        assert decode_cursor(encode_cursor(12, 'Gate, Greater', 36), leading_int=True) == (12, 'Gate, Greater', 36)
+
+    def test_malformed(self):
+        with pytest.raises(ValueError):
+            decode_cursor('no-id-here')
+        with pytest.raises(ValueError):
+            decode_cursor('Short Sword,abc')
+
+    def test_rank_cursor(self):
+        assert decode_rank_cursor(encode_rank_cursor(20, 1234)) == (20, 1234)
+        # Keyset cursors are left to decode_cursor, even for odd item names
+        assert decode_rank_cursor('Short Sword,10') is None
+        assert decode_rank_cursor(None) is None
+        for malformed in ('rank:20', 'rank:x,1', 'rank:0,1', 'rank:1,2,3'):
+            with pytest.raises(ValueError):
+                decode_rank_cursor(malformed)
+
+    def test_rank_cursor_start(self):
+        assert rank_cursor_start([1, 2, 3, 4], 2, 2) == 2
+        assert rank_cursor_start([9, 1, 2, 3], 2, 2) == 3
+        assert rank_cursor_start([1, 3, 4], 2, 2) == 2
+
+    def test_parse_args(self):
+        assert parse_pagination_args({}) == ('estimated', None)
+        assert parse_pagination_args({'count': 'EXACT', 'after': 'a,1'}) == ('exact', 'a,1')
+        with pytest.raises(ValueError):
+            parse_pagination_args({'count': 'sometimes'})
+
+    def test_keyset_condition(self):
+        clause, params = keyset_condition(['items.Name', 'items.id'], ['Short Sword', 10])
+        assert clause == "(items.Name > %s OR (items.Name = %s AND items.id > %s))"
+        assert params == ['Short Sword', 'Short Sword', 10]
+
+
+class TestSearchCountCache:
+    def test_key_ignores_filter_order_and_case(self):
+        a = [{'field': 'ac', 'operator': 'greater than', 'value': 10},
+             {'field': 'magic', 'operator': 'is', 'value': True}]
+        key = SearchCountCache.make_key('items', 'Short  Sword', a)
+
+        assert key == SearchCountCache.make_key('items', 'short sword', list(reversed(a)))
+        assert key != SearchCountCache.make_key('spells', 'short sword', a)
+        assert key != SearchCountCache.make_key('items', 'short sword', a[:1])
+
+    def test_lru_and_invalidate(self):
+        cache = SearchCountCache(max_entries=1)
+        cache.set('a', 5)
+        cache.set('b', 6)
+
+        assert cache.get('a') is None
+        assert cache.get('b') == 6
+
+        cache.invalidate_all()
+        assert cache.get('b') is None
+
+
+class TestResolveTotal:
+    def setup_method(self):
+        get_search_count_cache().invalidate_all()
+
+    def test_short_page_needs_no_count(self):
+        count = Mock()
+        assert resolve_total('exact', 'k1', 3, 40, 20, count) == (43, False)
+        count.assert_not_called()
+
+    def test_estimated_reuses_cached_count(self):
+        count = Mock(return_value=500)
+
+        assert resolve_total('estimated', 'k2', 20, 0, 20, count) == (500, False)
+        assert resolve_total('estimated', 'k2', 20, 100, 20, count) == (500, True)
+        assert resolve_total('exact', 'k2', 20, 100, 20, count) == (500, False)
+        assert count.call_count == 2
+
+    def test_none_mode_and_keyset_pages(self):
+        count = Mock(return_value=500)
+
+        assert resolve_total('none', 'k3', 20, 0, 20, count) == (None, False)
+        # An empty keyset page says nothing about the total
+        assert resolve_total('none', 'k3', 0, None, 20, count) == (None, False)
+        count.assert_not_called()
+
+
+class TestItemSearchPagination:
+    """Test keyset and count modes on the item search endpoint."""
+
+    def item_rows(self, names):
+        columns = ['itemtype', 'ac', 'hp', 'mana', 'astr', 'asta', 'aagi', 'adex', 'awis', 'aint',
+                   'acha', 'weight', 'damage', 'delay', 'magic', 'nodrop', 'norent', 'classes',
+                   'races', 'slots', 'lore', 'loregroup', 'reqlevel', 'stackable', 'stacksize',
+                   'icon', 'price', 'size', 'mr', 'fr', 'cr', 'dr', 'pr', 'reclevel',
+                   'clickeffect', 'proceffect', 'worneffect', 'focuseffect']
+        return [dict({c: 0 for c in columns}, id=item_id, Name=name) for item_id, name in names]
+
+    def search(self, client, url, rows):
+        with patch('app.get_eqemu_db_connection') as mock_get_conn, \
+             patch('app.search_name_index', return_value=None):
+            mock_conn = Mock()
+            mock_cursor = MockRealDictCursor(rows)
+            mock_cursor.fetchone = Mock(return_value={'total_count': 57})
+            mock_conn.cursor.return_value = mock_cursor
+            mock_get_conn.return_value = (mock_conn, 'mysql', None)
+            response = client.get(url)
+        return response, mock_cursor
+
+    def test_keyset_page_uses_cursor_not_offset(self, flask_test_client):
+        get_search_count_cache().invalidate_all()
+        rows = self.item_rows([(21, 'Short Sword'), (22, 'Short Sword')])
+
+        response, cursor = self.search(
+            flask_test_client, '/api/items/search?q=sword&limit=2&after=Rusty%20Sword,20', rows)
+
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['next_cursor'] == 'Short Sword,22'
+        assert data['total_count'] == 57
+
+        page_query, page_params = cursor.executed_queries[0]
+        assert 'OFFSET' not in page_query
+        assert '(items.Name > %s OR (items.Name = %s AND items.id > %s))' in page_query
+        assert page_params == ['%sword%', 'Rusty Sword', 'Rusty Sword', 20, 2]
+        assert 'COUNT(*)' in cursor.executed_queries[1][0]
+
+    def test_repeated_search_reuses_estimated_count(self, flask_test_client):
+        get_search_count_cache().invalidate_all()
+        rows = self.item_rows([(1, 'Cloth Cap'), (2, 'Leather Cap')])
+
+        self.search(flask_test_client, '/api/items/search?q=cap&limit=2', rows)
+        response, cursor = self.search(flask_test_client, '/api/items/search?q=cap&limit=2&offset=10', rows)
+
+        data = json.loads(response.data)
+        assert data['total_count'] == 57
+        assert data['total_is_estimate'] is True
+        assert len(cursor.executed_queries) == 1
+
+    def test_invalid_count_mode(self, flask_test_client):
+        response, _ = self.search(flask_test_client, '/api/items/search?q=cap&count=maybe', [])
+        assert response.status_code == 400
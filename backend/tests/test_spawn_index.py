@@ -0,0 +1,120 @@
+"""
+Tests for the per-zone spawn grid and the region/nearest endpoints.
+"""
+
+import json
+import time
+import random
+from unittest.mock import Mock, patch
+
+from utils.spawn_index import SpawnGrid, SpawnIndexCache, SPAWN_INDEX_DATABASE_TTL_SECONDS
+
+
+def make_spawns(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {'id': i, 'name': f'npc {i}', 'location': {
+            'x': rng.uniform(-3000, 3000), 'y': rng.uniform(-2000, 1000), 'z': rng.uniform(-50, 50), 'heading': 0}}
+        for i in range(count)
+    ]
+
+
+class TestSpawnGrid:
+    """Check grid queries against brute force."""
+
+    def test_bbox_matches_brute_force(self):
+        spawns = make_spawns(2000)
+        grid = SpawnGrid(spawns)
+
+        for bbox in [(-500, -500, 500, 500), (-3000, -2000, 3000, 1000), (2900, 900, 5000, 5000), (10, 10, 11, 11)]:
+            min_x, min_y, max_x, max_y = bbox
+            expected = [s['id'] for s in spawns
+                        if min_x <= s['location']['x'] <= max_x and min_y <= s['location']['y'] <= max_y]
+            found, total = grid.query_bbox(*bbox)
+            assert [s['id'] for s in found] == expected
+            assert total == len(expected)
+
+        found, total = grid.query_bbox(-3000, -2000, 3000, 1000, limit=5)
+        assert len(found) == 5 and total == 2000
+
+    def test_nearest_matches_brute_force(self):
+        spawns = make_spawns(1500)
+        grid = SpawnGrid(spawns)
+
+        def brute(x, y, z, k):
+            def dist(s):
+                loc = s['location']
+                d = (loc['x'] - x) ** 2 + (loc['y'] - y) ** 2 + ((loc['z'] - z) ** 2 if z is not None else 0)
+                return d ** 0.5
+            return [s['id'] for s in sorted(spawns, key=lambda s: (dist(s), s['id']))[:k]]
+
+        for x, y, z in [(0, 0, None), (-2990, 990, None), (8000, -9000, None), (100, -100, 20)]:
+            assert [s['id'] for _, s in grid.nearest(x, y, z, k=7)] == brute(x, y, z, 7)
+
+        within = grid.nearest(0, 0, k=100, max_distance=150)
+        assert all(distance <= 150 for distance, _ in within)
+
+    def test_empty_zone(self):
+        grid = SpawnGrid([])
+        assert grid.query_bbox(0, 0, 1, 1) == ([], 0)
+        assert grid.nearest(0, 0) == []
+
+
+class TestSpawnIndexCache:
+    def test_versioned_grids_are_cached(self):
+        cache = SpawnIndexCache()
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return make_spawns(10)
+
+        first = cache.get('qeynos', 1.0, loader)
+        assert cache.get('qeynos', 1.0, loader) is first
+        cache.get('qeynos', 2.0, loader)
+        cache.get('qeynos', None, loader)
+        cache.get('qeynos', None, loader)
+        assert len(loads) == 4
+        assert cache.get_stats()['hits'] == 1
+
+
+class TestSpawnEndpoints:
+    """Test /api/zone-npcs/<zone>/region and /nearest."""
+
+    def test_region_in_map_space(self, flask_test_client):
+        spawns = [{'id': 1, 'location': {'x': 100.0, 'y': 50.0, 'z': 0.0, 'heading': 0}},
+                  {'id': 2, 'location': {'x': -400.0, 'y': 50.0, 'z': 0.0, 'heading': 0}}]
+        with patch('app.get_spawn_index_cache', return_value=SpawnIndexCache()), \
+             patch('app.get_ready_zone_summaries', return_value=Mock(built_at=1.0)), \
+             patch('app._load_zone_npcs', return_value=(spawns, 'summary', 1.0)) as load:
+            world = flask_test_client.get('/api/zone-npcs/qeynos/region?bbox=0,0,200,200')
+            mapped = flask_test_client.get('/api/zone-npcs/qeynos/region?bbox=-200,-200,0,0&space=map')
+            nearest = flask_test_client.get('/api/zone-npcs/qeynos/nearest?x=-390&y=40&k=1')
+
+        assert [npc['id'] for npc in json.loads(world.data)['npcs']] == [1]
+        assert [npc['id'] for npc in json.loads(mapped.data)['npcs']] == [1]
+        data = json.loads(nearest.data)
+        assert data['npcs'][0]['id'] == 2
+        assert data['npcs'][0]['distance'] == 14.14
+        # The spawn list is loaded once; later queries are served from the cached grid
+        assert load.call_count == 1
+
+    def test_database_grids_are_cached_per_time_bucket(self, flask_test_client):
+        spawns = [{'id': 1, 'location': {'x': 100.0, 'y': 50.0, 'z': 0.0, 'heading': 0}}]
+        with patch('app.get_spawn_index_cache', return_value=SpawnIndexCache()), \
+             patch('app.get_ready_zone_summaries', return_value=None), \
+             patch('app._content_db_version_tag', return_value='abc'), \
+             patch('app._load_zone_npcs', return_value=(spawns, 'database', None)) as load:
+            first = flask_test_client.get('/api/zone-npcs/qeynos/nearest?x=0&y=0&k=1')
+            flask_test_client.get('/api/zone-npcs/qeynos/nearest?x=10&y=0&k=1')
+            with patch('app.time.time', return_value=time.time() + SPAWN_INDEX_DATABASE_TTL_SECONDS):
+                flask_test_client.get('/api/zone-npcs/qeynos/nearest?x=20&y=0&k=1')
+
+        assert first.get_json()['source'] == 'database'
+        assert load.call_count == 2
+
+    def test_bad_requests(self, flask_test_client):
+        assert flask_test_client.get('/api/zone-npcs/qeynos/region').status_code == 400
+        assert flask_test_client.get('/api/zone-npcs/qeynos/region?bbox=5,5,1,1').status_code == 400
+        assert flask_test_client.get('/api/zone-npcs/qeynos/nearest?x=1').status_code == 400
+        assert flask_test_client.get('/api/zone-npcs/qeynos/nearest?x=1&y=1&space=pixels').status_code == 400
@@ -0,0 +1,156 @@
+"""
+Tests for SQL fingerprinting and per-statement query profiles.
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+from flask import Flask
+
+from utils import metrics_store
+from utils.metrics_store import MetricsStore
+from utils.sql_fingerprint import fingerprint_query, normalize_query, extract_tables
+
+
+class TestNormalizeQuery:
+    def test_literals_and_placeholders_become_markers(self):
+        assert normalize_query("SELECT * FROM items WHERE id = 1001 AND Name LIKE '%sword%'") == \
+            'select * from items where id = ? and name like ?'
+        assert normalize_query('SELECT * FROM items WHERE id = %s AND slots & %(slot)s') == \
+            'select * from items where id = ? and slots & ?'
+
+    def test_lists_collapse(self):
+        assert normalize_query('SELECT id FROM items WHERE id IN (1, 2, 3)') == \
+            normalize_query('select id from items where id in (%s)')
+        assert normalize_query('INSERT INTO t (a, b) VALUES (1, 2), (3, 4)') == 'insert into t (a, b) values (?+)'
+
+    def test_comments_whitespace_and_quotes(self):
+        query = "SELECT  `id`\n  FROM \"items\" -- lookup\n WHERE name = 'a -- b' /* hint */"
+        assert normalize_query(query) == 'select id from items where name = ?'
+
+    def test_identifiers_keep_digits(self):
+        assert normalize_query('SELECT x FROM spawn2 WHERE classes1 > 5') == 'select x from spawn2 where classes1 > ?'
+
+    def test_batch_suffix_is_dropped(self):
+        assert normalize_query('INSERT INTO t (a) VALUES (%s) (batch of 25)') == 'insert into t (a) values (?+)'
+
+
+class TestFingerprint:
+    def test_same_shape_same_id(self):
+        first = fingerprint_query("SELECT * FROM items WHERE id = 1")
+        second = fingerprint_query("select *  from `items` where id=2")
+        other = fingerprint_query("SELECT * FROM items WHERE Name = 'x'")
+        assert first.id == second.id
+        assert first.id != other.id
+        assert len(first.id) == 16
+
+    def test_tables_include_joins_and_subqueries(self):
+        fingerprint = fingerprint_query(
+            'SELECT i.id FROM items i JOIN lootdrop_entries le ON le.item_id = i.id '
+            'WHERE i.id IN (SELECT item_id FROM merchantlist)'
+        )
+        assert fingerprint.query_type == 'SELECT'
+        assert fingerprint.tables == ('items', 'lootdrop_entries', 'merchantlist')
+
+    def test_comma_joins_and_writes(self):
+        assert extract_tables('select a from spawn2 s2, npc_types n where n.id = ?') == ['spawn2', 'npc_types']
+        assert fingerprint_query('UPDATE users SET x = 1').tables == ('users',)
+        assert fingerprint_query('DESC items').query_type == 'DESCRIBE'
+
+
+class TestQueryProfiles:
+    def record(self, store, query, ms, rows=None, endpoint=None):
+        store.record_query(ms, 'SELECT', None, fingerprint=fingerprint_query(query), rows=rows,
+                           source_endpoint=endpoint)
+
+    def test_profiles_group_by_shape_across_workers(self, tmp_path):
+        path = str(tmp_path / 'metrics.db')
+        worker_a = MetricsStore(path, flush_seconds=60)
+        worker_b = MetricsStore(path, flush_seconds=60)
+        self.record(worker_a, 'SELECT * FROM items WHERE id = 1', 10.0, rows=1, endpoint='Item Search')
+        self.record(worker_a, 'SELECT * FROM items WHERE id = 2', 30.0, rows=1, endpoint='Item Search')
+        self.record(worker_b, 'SELECT * FROM items WHERE id = 3', 20.0, rows=0, endpoint='Item Data')
+        self.record(worker_b, 'SELECT * FROM spells_new', 5.0, rows=40)
+        worker_b.flush()
+
+        top = worker_a.top_queries()
+        assert [p['query'] for p in top] == ['select * from items where id = ?', 'select * from spells_new']
+        items = top[0]
+        assert items['calls'] == 3
+        assert items['total_ms'] == 60.0
+        assert items['min_ms'] == 10.0
+        assert items['max_ms'] == 30.0
+        assert items['mean_ms'] == 20.0
+        assert items['rows'] == 2
+        assert items['tables'] == ['items']
+        assert items['percent_of_total'] == pytest.approx(92.31)
+        assert items['endpoints'] == [{'endpoint': 'Item Search', 'calls': 2}, {'endpoint': 'Item Data', 'calls': 1}]
+        assert items['latency']['count'] == 3
+
+    def test_sorts(self, tmp_path):
+        store = MetricsStore(str(tmp_path / 'metrics.db'), flush_seconds=60)
+        for _ in range(5):
+            self.record(store, 'SELECT 1 FROM a', 1.0)
+        self.record(store, 'SELECT 1 FROM b', 50.0, rows=500)
+
+        assert store.top_queries('calls')[0]['tables'] == ['a']
+        assert store.top_queries('max_time')[0]['tables'] == ['b']
+        assert store.top_queries('rows')[0]['tables'] == ['b']
+        assert len(store.top_queries(limit=1)) == 1
+
+    def test_profile_cap_drops_cheapest(self, tmp_path):
+        store = MetricsStore(str(tmp_path / 'metrics.db'), flush_seconds=60)
+        with patch.object(metrics_store, 'QUERY_PROFILE_MAX', 2):
+            self.record(store, 'SELECT 1 FROM a', 5.0, endpoint='x')
+            self.record(store, 'SELECT 1 FROM b', 1.0, endpoint='x')
+            self.record(store, 'SELECT 1 FROM c', 9.0, endpoint='x')
+            store.flush()
+            store._last_prune_slot = None
+            store.flush()
+
+        assert [p['tables'] for p in store.top_queries()] == [['c'], ['a']]
+
+    def test_reset_clears_profiles(self, tmp_path):
+        store = MetricsStore(str(tmp_path / 'metrics.db'), flush_seconds=60)
+        self.record(store, 'SELECT 1 FROM a', 5.0)
+        store.reset()
+        assert store.top_queries() == []
+
+
+class TestQueryProfilesEndpoint:
+    def test_returns_profiles_and_validates_sort(self, tmp_path):
+        from routes import admin
+
+        store = MetricsStore(str(tmp_path / 'metrics.db'))
+        admin_app = Flask(__name__)
+        with patch.object(admin, 'get_metrics_store', return_value=store):
+            admin.track_database_query('SELECT * FROM items WHERE id = 7', 150.0, rows=1, request_info=('GET', '/api/items/7'))
+
+            with admin_app.test_request_context('/?sort=calls&limit=5'):
+                response = admin.get_query_profiles.__wrapped__()
+            with admin_app.test_request_context('/?sort=bogus'):
+                invalid = admin.get_query_profiles.__wrapped__()
+
+        data = response.get_json()['data']
+        assert data['sort'] == 'calls'
+        assert data['queries'][0]['query'] == 'select * from items where id = ?'
+        assert data['queries'][0]['endpoints'] == [{'endpoint': 'Item Search', 'calls': 1}]
+        assert invalid[1] == 400
+
+    def test_shared_store_is_called_outside_metrics_lock(self):
+        from routes import admin
+
+        lock_held = []
+        store = Mock()
+        store.record_query.side_effect = lambda *args, **kwargs: lock_held.append(admin.metrics_lock._is_owned())
+        sampler = Mock()
+        sampler.offer.side_effect = lambda *args: lock_held.append(admin.metrics_lock._is_owned())
+        with patch.object(admin, 'get_metrics_store', return_value=store), \
+                patch.object(admin, 'get_explain_sampler', return_value=sampler):
+            admin.track_database_queries([
+                {'query': 'SELECT * FROM items WHERE id = 7', 'execution_time': 150.0,
+                 'request_info': ('GET', '/api/items/7'), 'explain_params': (7,)}
+            ])
+
+        assert lock_held == [False, False]
+        assert store.record_query.call_args.args[2] == 'items'
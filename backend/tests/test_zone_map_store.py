@@ -0,0 +1,252 @@
+"""
+Tests for the zone map catalog and binary zone map store.
+"""
+
+import os
+import gzip
+import json
+import base64
+
+import numpy as np
+import pytest
+
+from utils.zone_map_store import ZoneMapStore, parse_map_text
+from utils.zone_map_catalog import ZoneMapCatalog, split_map_filename
+
+
+LINES = "\n".join([
+    "L 0.0000, 0.0000, 1.0000, 10.0000, 0.0000, 1.0000, 0, 0, 255",
+    "L 10.0000, 0.0000, 1.0000, 10.0000, 10.0000, 1.0000, 240, 240, 240",
+    "L 10.4000, 10.0000, 1.0000, 10.0000, 10.2000, 1.0000, 0, 0, 0",
+    "L 100.0000, 100.0000, 0.0000, 200.0000, 100.0000, 0.0000, 1, 2, 3",
+    "L broken",
+])
+LABELS = "\n".join([
+    "P 5.0000, 5.0000, 1.0000, 255, 0, 0, 3, to_North_Qeynos",
+    "P 150.0000, 100.0000, 0.0000, 0, 127, 0, 2, Bank, with a comma",
+])
+
+
+@pytest.fixture
+def store(tmp_path):
+    maps_dir = tmp_path / 'Maps'
+    maps_dir.mkdir()
+    (maps_dir / 'testzone.txt').write_text(LINES)
+    (maps_dir / 'testzone_1.txt').write_bytes(LABELS.encode('latin-1') + b"\nP 1, 1, 1, 0, 0, 0, 1, Caf\xe9")
+    catalog = ZoneMapCatalog(maps_dir=str(maps_dir), check_seconds=0)
+    return ZoneMapStore(catalog=catalog, cache_dir=str(tmp_path / 'cache'))
+
+
+class TestZoneMapStore:
+    """Test conversion, memory-mapped reads and queries."""
+
+    def test_parse_skips_malformed_lines(self):
+        segments, labels = parse_map_text(LINES + "\n" + LABELS)
+        assert len(segments) == 4
+        assert segments[0] == (0.0, 0.0, 1.0, 10.0, 0.0, 1.0, 0, 0, 255)
+        assert labels[1][7] == 'Bank, with a comma'
+
+    def test_round_trip(self, store):
+        zone_map = store.get('testzone')
+
+        assert zone_map.segment_count == 4
+        assert zone_map.label_count == 3
+        assert zone_map.bbox == (0.0, 0.0, 0.0, 200.0, 100.0, 1.0)
+        assert zone_map.colors[1].tolist() == [240, 240, 240]
+        labels = zone_map.query_labels()
+        assert labels[0] == (5.0, 5.0, 1.0, 255, 0, 0, 3, 'to_North_Qeynos')
+        # Non UTF-8 label files fall back to latin-1
+        assert labels[2][7] == 'Café'
+
+    def test_missing_zone(self, store):
+        assert store.get('nowhere') is None
+
+    def test_bbox_query(self, store):
+        zone_map = store.get('testzone')
+
+        segments, colors = zone_map.query_segments(bbox=(50, 50, 250, 150))
+        assert segments.tolist() == [[100.0, 100.0, 0.0, 200.0, 100.0, 0.0]]
+        assert colors.tolist() == [[1, 2, 3]]
+        assert [label[7] for label in zone_map.query_labels(bbox=(50, 50, 250, 150))] == ['Bank, with a comma']
+
+    def test_lod_drops_collapsed_segments(self, store):
+        zone_map = store.get('testzone')
+
+        segments, colors = zone_map.query_segments(lod=5)
+        # The tiny third segment snaps to a single point
+        assert len(segments) == 3
+        assert len(colors) == 3
+
+    def test_lod_dedupes_reversed_segments(self, tmp_path):
+        maps_dir = tmp_path / 'Maps'
+        maps_dir.mkdir()
+        (maps_dir / 'dupes.txt').write_text(
+            "L 0, 0, 0, 10, 0, 0, 1, 1, 1\nL 10.1, 0.1, 0, 0.1, -0.1, 0, 1, 1, 1\n")
+        zone_map = ZoneMapStore(maps_dir=str(maps_dir), cache_dir=str(tmp_path / 'c')).get('dupes')
+
+        assert len(zone_map.query_segments()[0]) == 2
+        assert len(zone_map.query_segments(lod=1)[0]) == 1
+
+    def test_rebuilds_when_source_changes(self, store):
+        first = store.get('testzone')
+        assert store.get('testzone') is first
+
+        lines_path = os.path.join(store.maps_dir, 'testzone.txt')
+        with open(lines_path, 'a') as f:
+            f.write("\nL 1, 1, 1, 2, 2, 2, 0, 0, 0")
+        os.utime(lines_path, (first.source_mtime + 10, first.source_mtime + 10))
+
+        assert store.get('testzone').segment_count == 5
+        assert store.get_stats()['builds'] == 2
+
+    def test_build_all(self, store):
+        assert store.build_all() == 1
+        assert os.path.exists(store.binary_path('testzone'))
+
+    def test_precompressed_responses_are_built_once(self, store):
+        zone_map = store.get('testzone')
+        calls = []
+
+        def render():
+            calls.append(1)
+            return {'zone': 'testzone'}
+
+        body = store.get_response('testzone', zone_map, 'legacy', render)
+        assert store.get_response('testzone', zone_map, 'legacy', render) == body
+        assert json.loads(gzip.decompress(store.get_response('testzone', zone_map, 'legacy', render, 'gzip'))) == \
+            {'zone': 'testzone'}
+        assert len(calls) == 1
+
+        # Rebuilding the binary drops responses rendered from the old version
+        identity_path = store.response_path('testzone', 'legacy', zone_map.version)
+        store.build('testzone')
+        assert not os.path.exists(identity_path)
+
+    def test_response_removed_by_a_rebuild_is_rendered_again(self, store):
+        zone_map = store.get('testzone')
+        calls = []
+
+        def render():
+            calls.append(1)
+            return {'zone': 'testzone'}
+
+        store.get_response('testzone', zone_map, 'legacy', render)
+        # Another worker rebuilt the zone between the lookup and the read
+        store._remove_responses('testzone')
+        body = store.get_response('testzone', zone_map, 'legacy', render, 'gzip')
+
+        assert json.loads(gzip.decompress(body)) == {'zone': 'testzone'}
+        assert len(calls) == 2
+
+
+class TestZoneMapCatalog:
+    """Test layer discovery and change detection."""
+
+    def test_split_filename(self):
+        assert split_map_filename('qeynos2.txt') == ('qeynos2', 'base')
+        assert split_map_filename('qeynos2_1.txt') == ('qeynos2', '_1')
+        assert split_map_filename('readme.md') is None
+
+    def test_layers_sizes_and_encodings(self, store):
+        zones = store.catalog.list_zones()
+
+        assert [z['zone'] for z in zones] == ['testzone']
+        layers = zones[0]['layers']
+        assert set(layers) == {'base', '_1'}
+        assert layers['base']['encoding'] == 'utf-8'
+        assert layers['_1']['encoding'] == 'latin-1'
+        assert layers['base']['size'] == len(LINES)
+        assert 'path' not in layers['base']
+
+    def test_lookup_is_case_insensitive(self, store):
+        assert store.catalog.get('TestZone')['zone'] == 'testzone'
+
+    def test_refresh_is_throttled(self, tmp_path):
+        maps_dir = tmp_path / 'Maps'
+        maps_dir.mkdir()
+        catalog = ZoneMapCatalog(maps_dir=str(maps_dir), check_seconds=3600)
+        assert catalog.list_zones() == []
+
+        (maps_dir / 'newzone.txt').write_text(LINES)
+        assert catalog.get('newzone') is None
+        assert catalog.refresh(force=True) is True
+        assert catalog.get('newzone') is not None
+
+    def test_first_lookup_scans_and_fork_gets_fresh_lock(self, tmp_path):
+        maps_dir = tmp_path / 'Maps'
+        maps_dir.mkdir()
+        (maps_dir / 'newzone.txt').write_text(LINES)
+        catalog = ZoneMapCatalog(maps_dir=str(maps_dir), check_seconds=3600)
+        assert catalog.scanned_at is None
+
+        # A lock held by a thread in the parent must not survive into a forked worker
+        catalog._lock.acquire()
+        catalog._after_fork()
+        assert catalog.get('newzone') is not None
+        assert catalog.scanned_at is not None
+
+
+class TestZoneMapEndpoint:
+    """Test the /api/zone-map route formats."""
+
+    def test_legacy_and_typed_formats(self, flask_test_client, store, monkeypatch):
+        monkeypatch.setattr('app.get_zone_map_store', lambda: store)
+
+        legacy = flask_test_client.get('/api/zone-map/testzone').get_json()
+        assert legacy['lines'][0] == "L 0.0000, 0.0000, 1.0000, 10.0000, 0.0000, 1.0000, 0, 0, 255"
+        assert legacy['labels'][0] == "P 5.0000, 5.0000, 1.0000, 255, 0, 0, 3, to_North_Qeynos"
+
+        typed = flask_test_client.get('/api/zone-map/testzone?format=typed&bbox=-1,-1,20,20').get_json()
+        segments = np.frombuffer(base64.b64decode(typed['segments']['data']), dtype='<f4')
+        assert typed['line_count'] == 3
+        assert segments.reshape(-1, 6)[0].tolist() == [0.0, 0.0, 1.0, 10.0, 0.0, 1.0]
+
+    def test_bad_params(self, flask_test_client, store, monkeypatch):
+        monkeypatch.setattr('app.get_zone_map_store', lambda: store)
+
+        assert flask_test_client.get('/api/zone-map/testzone?bbox=1,2,3').status_code == 400
+        assert flask_test_client.get('/api/zone-map/testzone?lod=-1').status_code == 400
+        assert flask_test_client.get('/api/zone-map/missing').status_code == 404
+
+    def test_full_map_is_precompressed_with_etag(self, flask_test_client, store, monkeypatch):
+        monkeypatch.setattr('app.get_zone_map_store', lambda: store)
+
+        plain = flask_test_client.get('/api/zone-map/testzone')
+        assert plain.headers.get('Content-Encoding') is None
+        assert plain.headers['Cache-Control'] == 'public, no-cache'
+        assert 'Accept-Encoding' in plain.headers['Vary']
+
+        compressed = flask_test_client.get('/api/zone-map/testzone', headers={'Accept-Encoding': 'gzip'})
+        assert compressed.headers['Content-Encoding'] == 'gzip'
+        assert json.loads(gzip.decompress(compressed.get_data())) == plain.get_json()
+
+        etag = compressed.headers['ETag']
+        not_modified = flask_test_client.get('/api/zone-map/testzone',
+                                             headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert not_modified.status_code == 304
+        assert not_modified.get_data() == b''
+
+    def test_versioned_url_is_immutable(self, flask_test_client, store, monkeypatch):
+        monkeypatch.setattr('app.get_zone_map_store', lambda: store)
+        version = store.source_version('testzone')
+
+        response = flask_test_client.get(f'/api/zone-map/testzone?format=typed&v={version}')
+        assert response.get_json()['version'] == version
+        assert 'immutable' in response.headers['Cache-Control']
+
+    def test_viewport_queries_revalidate(self, flask_test_client, store, monkeypatch):
+        monkeypatch.setattr('app.get_zone_map_store', lambda: store)
+        url = '/api/zone-map/testzone?bbox=-1,-1,20,20'
+
+        etag = flask_test_client.get(url).headers['ETag']
+        assert etag != flask_test_client.get(url + '&lod=5').headers['ETag']
+        assert flask_test_client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    def test_zone_map_listing(self, flask_test_client, store, monkeypatch):
+        monkeypatch.setattr('app.get_zone_map_catalog', lambda: store.catalog)
+        monkeypatch.setattr('app.get_zone_map_store', lambda: store)
+
+        data = flask_test_client.get('/api/zone-maps').get_json()
+        assert data['count'] == 1
+        assert sorted(data['zones'][0]['layers']) == ['_1', 'base']
+        assert data['zones'][0]['version'] == store.source_version('testzone')
@@ -0,0 +1,183 @@
+"""
+Tests for the precomputed zone summaries and the paged zone endpoints.
+"""
+
+import os
+import json
+from unittest.mock import Mock, patch
+
+import pytest
+
+from utils.zone_summaries import (
+    ZoneSummaryStore, summarize_items, summarize_npcs, parse_zone_page_args, zone_page_of
+)
+from tests.conftest import FakeConnection
+
+
+def spawn_row(zone, npc_id, name, level, spawn_id):
+    return {
+        'zone': zone, 'spawn_id': spawn_id, 'id': npc_id, 'name': name, 'lastname': '', 'level': level,
+        'race': 1, 'class': 1, 'hp': 100, 'mana': 0, 'AC': 10, 'mindmg': 1, 'maxdmg': 5,
+        'x': 1.5, 'y': -2, 'z': None, 'heading': 0, 'respawntime': 640, 'variance': 0, 'pathgrid': 0,
+        'spawngroup_name': 'grp', 'spawn_chance': 100
+    }
+
+
+def drop_row(zone, npc_id, item_id, name, probability, chance):
+    return {'zone': zone, 'npc_id': npc_id, 'id': item_id, 'Name': name, 'icon': 500, 'itemtype': 10,
+            'probability': probability, 'chance': chance}
+
+
+SPAWNS = [
+    spawn_row('qeynos', 1, 'a_rat', 1, 10),
+    spawn_row('qeynos', 2, 'Captain_Tillin', 40, 11),
+    spawn_row('qeynos', 1, 'a_rat', 1, 12),
+    spawn_row('freporte', 3, 'a_guard', 30, 20),
+]
+
+DROPS = [
+    drop_row('qeynos', 1, 100, 'Rat Whiskers', 100, 50),
+    drop_row('qeynos', 2, 100, 'Rat Whiskers', 50, 10),
+    drop_row('qeynos', 2, 101, 'Bronze Sword', 100, 5),
+]
+
+
+SUMMARY_RESPONSES = [
+    ('FROM zone', [{'short_name': 'qeynos'}, {'short_name': 'freporte'}, {'short_name': 'tutorialb'}]),
+    ('lootdrop_entries', DROPS),
+    ('', SPAWNS),
+]
+
+
+class TestSummaries:
+    """Test row shaping and paging helpers."""
+
+    def test_npcs_ordered_by_level_then_name(self):
+        npcs = summarize_npcs(SPAWNS[:3])
+
+        assert [npc['name'] for npc in npcs] == ['Captain Tillin', 'a rat', 'a rat']
+        assert npcs[1]['location'] == {'x': 1.5, 'y': -2.0, 'z': 0, 'heading': 0.0}
+
+    def test_items_unique_with_best_chance(self):
+        items = summarize_items(DROPS)
+
+        assert [item['name'] for item in items] == ['Bronze Sword', 'Rat Whiskers']
+        assert items[1]['drop_chance'] == 50.0
+        assert items[1]['npc_count'] == 2
+
+    def test_page_args(self):
+        assert parse_zone_page_args({}) == (None, 0)
+        assert parse_zone_page_args({'limit': '5', 'offset': '10'}) == (5, 10)
+        for bad in ({'limit': '0'}, {'limit': '5000'}, {'offset': '-1'}, {'limit': 'x'}):
+            with pytest.raises(ValueError):
+                parse_zone_page_args(bad)
+        assert zone_page_of([1, 2, 3, 4], 2, 1) == [2, 3]
+        assert zone_page_of([1, 2, 3, 4], None, 3) == [4]
+
+
+class TestZoneSummaryStore:
+    """Test building, reloading and lookups."""
+
+    def test_build_and_reload(self, tmp_path):
+        directory = str(tmp_path / 'zone_summaries')
+        store = ZoneSummaryStore(directory=directory)
+        store.build(FakeConnection(SUMMARY_RESPONSES), version_tag='peq@localhost')
+
+        qeynos = store.get_zone('qeynos')
+        assert len(qeynos['npcs']) == 3
+        assert len(qeynos['items']) == 2
+        assert store.get_zone('tutorialb') == {'npcs': [], 'items': []}
+        assert store.get_zone('nowhere') is None
+
+        reloaded = ZoneSummaryStore(directory=directory)
+        assert reloaded.load()
+        assert reloaded.version_tag == 'peq@localhost'
+        assert reloaded.get_zone('freporte')['npcs'][0]['name'] == 'a guard'
+        assert reloaded.get_status()['zones'] == 3
+
+    def test_rebuild_replaces_artifacts(self, tmp_path):
+        store = ZoneSummaryStore(directory=str(tmp_path / 'zone_summaries'))
+        store.build(FakeConnection(SUMMARY_RESPONSES))
+        store.get_zone('qeynos')
+        store.build(FakeConnection(SUMMARY_RESPONSES))
+
+        assert store.get_status()['cached_zones'] == 0
+        assert len(store.get_zone('qeynos')['npcs']) == 3
+
+    def test_reader_follows_rebuild_by_another_worker(self, tmp_path):
+        directory = str(tmp_path / 'zone_summaries')
+        builder = ZoneSummaryStore(directory=directory)
+        builder.build(FakeConnection(SUMMARY_RESPONSES))
+        reader = ZoneSummaryStore(directory=directory)
+        assert reader.load()
+        first_build = reader.build_id
+
+        # Two more builds prune the one the reader still points at
+        builder.build(FakeConnection(SUMMARY_RESPONSES))
+        second_build = builder.build_id
+        builder.build(FakeConnection(SUMMARY_RESPONSES))
+
+        assert not os.path.exists(os.path.join(directory, first_build))
+        assert len(reader.get_zone('qeynos')['npcs']) == 3
+        assert reader.build_id == builder.build_id
+        assert sorted(os.listdir(directory)) == sorted(['manifest.json', second_build, builder.build_id])
+
+    def test_worker_adopts_fresh_build_from_another_worker(self, tmp_path):
+        directory = str(tmp_path / 'zone_summaries')
+        ZoneSummaryStore(directory=directory).build(FakeConnection(SUMMARY_RESPONSES), version_tag='peq@localhost')
+        store = ZoneSummaryStore(directory=directory)
+        connection_factory = Mock()
+
+        store._build_worker(connection_factory, 'peq@localhost')
+
+        connection_factory.assert_not_called()
+        assert store.is_fresh('peq@localhost')
+        assert len(store.get_zone('qeynos')['items']) == 2
+
+
+class TestZoneEndpoints:
+    """Test /api/zone-npcs and /api/zone-items paging and sources."""
+
+    def test_npcs_from_summary_are_paged(self, flask_test_client, tmp_path):
+        store = ZoneSummaryStore(directory=str(tmp_path / 'zone_summaries'))
+        store.build(FakeConnection(SUMMARY_RESPONSES))
+        with patch('app.get_ready_zone_summaries', return_value=store):
+            response = flask_test_client.get('/api/zone-npcs/QEYNOS?limit=2&offset=1')
+            missing = flask_test_client.get('/api/zone-items/nowhere')
+
+        data = json.loads(response.data)
+        assert data['source'] == 'summary'
+        assert (data['count'], data['total'], data['offset']) == (2, 3, 1)
+        assert missing.status_code == 404
+
+    def test_items_fall_back_to_database(self, flask_test_client):
+        cursor = Mock()
+        cursor.fetchone.return_value = (1, 'qeynos', 'South Qeynos')
+        cursor.fetchall.return_value = DROPS
+        conn = Mock()
+        conn.cursor.return_value = cursor
+        with patch('app.get_eqemu_db_connection', return_value=(conn, 'mysql', None)):
+            response = flask_test_client.get('/api/zone-items/qeynos')
+
+        data = json.loads(response.data)
+        assert data['source'] == 'database'
+        assert data['total'] == 2
+        conn.close.assert_called_once()
+
+    def test_unreadable_summary_falls_back_to_database(self, flask_test_client):
+        store = Mock()
+        store.get_zone.side_effect = FileNotFoundError('qeynos.json.gz')
+        cursor = Mock()
+        cursor.fetchone.return_value = (1, 'qeynos', 'South Qeynos')
+        cursor.fetchall.return_value = DROPS
+        conn = Mock()
+        conn.cursor.return_value = cursor
+        with patch('app.get_ready_zone_summaries', return_value=store), \
+                patch('app.get_eqemu_db_connection', return_value=(conn, 'mysql', None)):
+            response = flask_test_client.get('/api/zone-items/qeynos')
+
+        assert response.status_code == 200
+        assert json.loads(response.data)['source'] == 'database'
+
+    def test_bad_paging(self, flask_test_client):
+        assert flask_test_client.get('/api/zone-npcs/qeynos?limit=0').status_code == 400
@@ -9,6 +9,7 @@ This module manages connections to the EQEmu content database with:
 - Sanitization of configuration values
 """
 
+import os
 import time
 import logging
 import threading
@@ -17,12 +18,18 @@ from urllib.parse import urlparse
 from contextlib import contextmanager
 
 from utils.database_connectors import get_database_connector
-from utils.db_connection_pool import DatabaseConnectionPool
+from utils.db_connection_pool import DatabaseConnectionPool, BoundedConnectionPool
 from utils.persistent_config import get_persistent_config
 from utils.db_config_validator import validate_database_config
 
 logger = logging.getLogger(__name__)
 
+# Shared pool sizing (per worker process)
+POOL_MAX_CONNECTIONS = int(os.environ.get('EQEMU_DB_POOL_SIZE', '10'))
+POOL_TIMEOUT = float(os.environ.get('EQEMU_DB_POOL_TIMEOUT', '5'))
+POOL_MAX_AGE = int(os.environ.get('EQEMU_DB_POOL_MAX_AGE', '1800'))
+POOL_MAX_IDLE = int(os.environ.get('EQEMU_DB_POOL_MAX_IDLE', '300'))
+
 
 class ContentDatabaseManager:
     """Manages content database connections with automatic reconnection."""
@@ -30,6 +37,8 @@ class ContentDatabaseManager:
     def __init__(self):
         """Initialize the content database manager."""
         self._pool = None
+        self._pool_signature = None
+        self._pool_settings = None
         self._lock = threading.Lock()
         self._last_connect_attempt = 0
         self._connect_retry_delay = 1  # Start with 1 second delay
@@ -132,51 +141,6 @@ class ContentDatabaseManager:
         
         return db_config, db_type
         
-    def _create_connection_pool(self) -> bool:
-        """Create a new connection pool with retry logic."""
-        try:
-            # Load configuration
-            self._config, self._db_type = self._load_database_config()
-            if not self._config:
-                return False
-                
-            # Create connection pool
-            logger.info(f"Creating connection pool for {self._db_type} database...")
-            
-            # Create a connection factory function for the pool
-            def create_connection():
-                from utils.database_connectors import get_database_connector
-                return get_database_connector(self._db_type, self._config)
-            
-            self._pool = DatabaseConnectionPool(
-                create_connection_func=create_connection,
-                max_connections=3,  # Reduced from 5 to prevent hanging
-                timeout=2           # Reduced from 5 to prevent hanging
-            )
-            
-            # Test the connection
-            with self._pool.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT 1")
-                cursor.fetchone()
-                cursor.close()
-                
-            logger.info("✅ Database connection pool created successfully")
-            self._connection_healthy = True
-            self._connect_retry_delay = 1  # Reset retry delay on success
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to create connection pool: {e}")
-            self._connection_healthy = False
-            if self._pool:
-                try:
-                    self._pool.close_all()
-                except:
-                    pass
-                self._pool = None
-            return False
-            
     def _ensure_connection(self) -> bool:
         """Ensure database connection is available, with non-blocking retry logic."""
         with self._lock:
@@ -210,34 +174,97 @@ class ContentDatabaseManager:
                 logger.error(f"Error loading database config: {e}")
                 return False
                 
+    def _build_pool(self, db_type: str, db_config: Dict[str, Any]):
+        """Create a connection pool for the given database settings."""
+        def create_connection():
+            return get_database_connector(db_type, db_config, track_queries=True)
+        
+        kwargs = {
+            'max_connections': POOL_MAX_CONNECTIONS,
+            'timeout': POOL_TIMEOUT
+        }
+        if DatabaseConnectionPool is BoundedConnectionPool:
+            kwargs.update({
+                'max_age': POOL_MAX_AGE,
+                'max_idle': POOL_MAX_IDLE,
+                # MySQL connections run with autocommit, so there's nothing to roll back
+                'rollback_on_release': not (db_type == 'mysql' and db_config.get('autocommit'))
+            })
+        
+        logger.info(f"Creating {db_type} connection pool (max {POOL_MAX_CONNECTIONS} connections)")
+        return DatabaseConnectionPool(create_connection, **kwargs)
+        
+    def _close_pool_locked(self):
+        """Close the current pool. Caller must hold self._lock."""
+        if self._pool:
+            try:
+                self._pool.close_all()
+            except Exception as e:
+                logger.error(f"Error closing connection pool: {e}")
+        self._pool = None
+        self._pool_signature = None
+        self._pool_settings = None
+        
+    def get_pool(self, db_type: str, db_config: Dict[str, Any]):
+        """
+        Get the shared connection pool for the given database settings.
+        
+        The pool is rebuilt when the settings change (e.g. after the admin
+        panel points the app at a different database).
+        """
+        signature = (db_type, tuple(sorted((k, str(v)) for k, v in db_config.items())))
+        with self._lock:
+            if self._pool is None or self._pool_signature != signature:
+                if self._pool is not None:
+                    logger.info("Database settings changed, replacing connection pool")
+                self._close_pool_locked()
+                self._pool = self._build_pool(db_type, db_config)
+                self._pool_signature = signature
+                self._pool_settings = (db_type, db_config)
+                self._db_type = db_type
+            return self._pool
+        
+    def acquire(self, db_type: str, db_config: Dict[str, Any]):
+        """
+        Borrow a pooled connection. Calling close() on it returns it to the pool.
+        
+        Raises:
+            PoolExhaustedError: If every connection stays busy for the pool timeout
+        """
+        try:
+            pool = self.get_pool(db_type, db_config)
+            if hasattr(pool, 'acquire'):
+                conn = pool.acquire()
+            else:
+                # Legacy pools (USE_SIMPLE_POOL / USE_ORIGINAL_POOL) only offer a
+                # context manager, so hand out a direct connection instead
+                conn = get_database_connector(db_type, db_config, track_queries=True)
+        except Exception:
+            with self._lock:
+                self._connection_healthy = False
+            raise
+        self._connection_healthy = True
+        return conn
+                
     @contextmanager
     def get_connection(self):
-        """Get a database connection with automatic retry (POOLING DISABLED)."""
+        """Get a pooled database connection with automatic retry."""
         max_retries = 3
         retry_count = 0
         
         while retry_count < max_retries:
             try:
-                # Load config directly each time (no pooling)
-                config, db_type = self._load_database_config()
+                # Reuse the settings of the live pool so both entry points share it
+                with self._lock:
+                    pool_settings = self._pool_settings
+                if pool_settings:
+                    db_type, config = pool_settings
+                else:
+                    config, db_type = self._load_database_config()
                 if not config or not db_type:
                     raise Exception("Database configuration not available")
                 
-                # Create direct connection without pooling but with tracking
-                conn = get_database_connector(db_type, config, track_queries=True)
-                logger.info("Created direct database connection (no pooling, with tracking)")
-                
-                try:
-                    yield conn
-                    return
-                finally:
-                    # Always close the connection when done
-                    try:
-                        conn.close()
-                        logger.debug("Closed direct database connection")
-                    except:
-                        pass
-                    
+                conn = self.acquire(db_type, config)
             except Exception as e:
                 retry_count += 1
                 logger.error(f"Connection error (attempt {retry_count}/{max_retries}): {e}")
@@ -251,6 +278,18 @@ class ContentDatabaseManager:
                     
                 # Wait before retry
                 time.sleep(1 * retry_count)
+                continue
+            
+            try:
+                yield conn
+            except Exception:
+                # Don't hand a connection in an unknown state to the next request
+                if hasattr(conn, 'discard'):
+                    conn.discard()
+                raise
+            finally:
+                conn.close()
+            return
                 
     def get_connection_status(self) -> Dict[str, Any]:
         """Get current connection status."""
@@ -264,9 +303,10 @@ class ContentDatabaseManager:
                 connected = False
                 config_loaded = False
             
+            pool = self._pool
             status = {
                 'connected': connected,
-                'pool_active': False,  # We're using direct connections, not pooling
+                'pool_active': pool is not None,
                 'retry_delay': max(0, self._connect_retry_delay - (time.time() - self._last_connect_attempt)),
                 'last_attempt': self._last_connect_attempt,
                 'database_type': self._db_type,
@@ -274,22 +314,17 @@ class ContentDatabaseManager:
                 'validation_result': self._last_validation_result
             }
             
-            # No pool statistics since we're using direct connections
-            status['pool_stats'] = None
+        # Stats take the pool's own lock, so read them outside ours
+        status['pool_stats'] = pool.get_pool_stats() if pool is not None else None
                 
-            return status
+        return status
             
     def close(self):
         """Close the connection pool."""
         with self._lock:
             if self._pool:
-                try:
-                    self._pool.close_all()
-                except Exception as e:
-                    logger.error(f"Error closing connection pool: {e}")
-                finally:
-                    self._pool = None
-                    self._connection_healthy = False
+                self._close_pool_locked()
+                self._connection_healthy = False
 
 
 # Global instance
@@ -2,12 +2,14 @@
 Database connection pooling for EQEmu database connections.
 Maintains a pool of reusable connections to prevent connection exhaustion.
 
-NOTE: This module includes a SimpleConnectionPool fallback to prevent hanging issues.
+BoundedConnectionPool is the default; SimpleConnectionPool (no reuse) and the
+original queue-based pool remain available through environment variables.
 """
 
 import threading
 import time
 import logging
+from collections import deque
 from queue import Queue, Empty
 from contextlib import contextmanager
 
@@ -73,64 +75,251 @@ class SimpleConnectionPool:
         # Nothing to close since we don't pool connections
 
 
-class DatabaseConnectionPool:
-    """Thread-safe database connection pool."""
+class PoolExhaustedError(Exception):
+    """Raised when no pooled connection becomes available within the timeout."""
+    pass
+
+
+class PooledConnection:
+    """
+    Proxy around a pooled connection.
     
-    def __init__(self, create_connection_func, max_connections=10, timeout=2):
+    Behaves like the wrapped connection, except that close() hands the
+    connection back to the pool instead of closing the socket. This keeps
+    existing callers that do ``conn.close()`` working unchanged.
+    """
+    
+    def __init__(self, pool, connection, created_at):
+        self._pool = pool
+        self._connection = connection
+        self._created_at = created_at
+        self._released = False
+        
+    @property
+    def raw_connection(self):
+        """The underlying (possibly query-tracked) driver connection."""
+        return self._connection
+        
+    def cursor(self, *args, **kwargs):
+        """Get a cursor from the underlying connection."""
+        if self._released:
+            raise RuntimeError("Connection has already been returned to the pool")
+        return self._connection.cursor(*args, **kwargs)
+    
+    def close(self):
+        """Return the connection to the pool (idempotent)."""
+        if not self._released:
+            self._released = True
+            self._pool._release(self._connection, self._created_at)
+            
+    def discard(self):
+        """Close the underlying connection instead of returning it (e.g. after a fatal error)."""
+        if not self._released:
+            self._released = True
+            self._pool._release(self._connection, self._created_at, discard=True)
+    
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class BoundedConnectionPool:
+    """
+    Bounded, thread-safe database connection pool.
+    
+    - At most ``max_connections`` connections exist at once (idle + in use)
+    - Idle connections are validated with a cheap ping() when borrowed
+    - Connections older than ``max_age`` or idle longer than ``max_idle`` are recycled
+    - When exhausted, borrowers wait up to ``timeout`` seconds, then get PoolExhaustedError
+    """
+    
+    def __init__(self, create_connection_func, max_connections=10, timeout=5,
+                 max_age=1800, max_idle=300, rollback_on_release=True):
         """
-        Initialize connection pool with reduced limits to prevent hanging.
+        Initialize bounded connection pool.
         
         Args:
             create_connection_func: Function that creates a new database connection
-            max_connections: Maximum number of connections in the pool (reduced from 20)
-            timeout: Connection timeout in seconds (reduced from 5)
+            max_connections: Maximum number of open connections (idle + in use)
+            timeout: Seconds to wait for a free connection before giving up
+            max_age: Seconds after which a connection is closed instead of reused
+            max_idle: Seconds a connection may sit idle before it is closed
+            rollback_on_release: Roll back open transactions when a connection is returned
+                                 (unnecessary for autocommit MySQL connections)
         """
         self.create_connection = create_connection_func
         self.max_connections = max_connections
         self.timeout = timeout
-        self.pool = Queue(maxsize=max_connections)
-        self.all_connections = []
-        self.lock = threading.Lock()
+        self.max_age = max_age
+        self.max_idle = max_idle
+        self.rollback_on_release = rollback_on_release
+        # Idle connections as (connection, created_at, last_used); most recently used at the end
+        self._idle = deque()
+        self._in_use = 0
+        self._pending = 0
+        self._cond = threading.Condition(threading.Lock())
         self._closed = False
-        
-    def _create_new_connection(self):
-        """Create a new connection with simplified timeout protection."""
-        try:
-            conn = self.create_connection()
-            
-            with self.lock:
-                self.all_connections.append(conn)
-            logger.info(f"Created new database connection (total: {len(self.all_connections)})")
-            return conn
-            
-        except Exception as e:
-            logger.error(f"Failed to create database connection: {e}")
-            raise
+        self._stats = {
+            'borrows': 0,
+            'connections_created': 0,
+            'connections_recycled': 0,
+            'connections_discarded': 0,
+            'failed_pings': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0
+        }
         
     def _is_connection_alive(self, conn):
-        """Check if a connection is still alive."""
+        """Check if a connection is still alive with a cheap ping."""
         try:
-            # Handle test/dummy connections
-            if isinstance(conn, str):
-                return True  # Dummy connections are always "alive"
-                
-            # Different databases have different ways to check
             if hasattr(conn, 'ping'):
-                # MySQL
                 conn.ping(reconnect=False)
             elif hasattr(conn, 'cursor'):
-                # PostgreSQL/Generic - try a simple query
                 cursor = conn.cursor()
                 cursor.execute("SELECT 1")
                 cursor.close()
-            else:
-                # Unknown connection type, assume it's alive
-                return True
-                
             return True
-        except:
+        except Exception:
             return False
+        
+    def _is_expired(self, created_at, last_used, now):
+        """Whether a connection should be recycled rather than reused."""
+        if self.max_age and now - created_at > self.max_age:
+            return True
+        if self.max_idle and now - last_used > self.max_idle:
+            return True
+        return False
+    
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            if hasattr(conn, 'close'):
+                conn.close()
+        except Exception:
+            pass
+        
+    def acquire(self, timeout=None):
+        """
+        Borrow a connection from the pool.
+        
+        Returns:
+            PooledConnection whose close() returns it to the pool
+            
+        Raises:
+            PoolExhaustedError: If no connection became available within the timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+        
+        while True:
+            candidate = None
+            stale = []
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed")
+                    
+                    # Prefer the most recently used idle connection, recycling expired ones
+                    now = time.monotonic()
+                    while self._idle:
+                        conn, created_at, last_used = self._idle.pop()
+                        if self._is_expired(created_at, last_used, now):
+                            stale.append(conn)
+                            self._stats['connections_recycled'] += 1
+                            continue
+                        candidate = (conn, created_at)
+                        break
+                    
+                    if candidate or self._in_use + len(self._idle) + self._pending < self.max_connections:
+                        # Reserve a slot; ping/connect happen outside the lock
+                        self._pending += 1
+                        break
+                    
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        logger.error(f"Connection pool exhausted! No connection available after {timeout}s "
+                                     f"({self.max_connections} in use)")
+                        raise PoolExhaustedError(
+                            "Database connection pool exhausted - all connections in use")
+                    if not waited:
+                        waited = True
+                        self._stats['waits'] += 1
+                    self._cond.wait(remaining)
             
+            for conn in stale:
+                self._close_quietly(conn)
+            
+            try:
+                if candidate:
+                    conn, created_at = candidate
+                    if not self._is_connection_alive(conn):
+                        logger.warning("Dead connection found in pool, discarding")
+                        self._close_quietly(conn)
+                        with self._cond:
+                            self._pending -= 1
+                            self._stats['failed_pings'] += 1
+                            self._cond.notify()
+                        continue
+                else:
+                    conn = self.create_connection()
+                    created_at = time.monotonic()
+            except Exception as e:
+                logger.error(f"Failed to create database connection: {e}")
+                with self._cond:
+                    self._pending -= 1
+                    self._cond.notify()
+                raise
+            
+            wait_ms = (time.monotonic() - start) * 1000
+            with self._cond:
+                self._pending -= 1
+                self._in_use += 1
+                self._stats['borrows'] += 1
+                if candidate is None:
+                    self._stats['connections_created'] += 1
+                if waited:
+                    self._stats['total_wait_ms'] += wait_ms
+                    self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], wait_ms)
+            if candidate is None:
+                logger.info(f"Created new database connection (open: {self._in_use + len(self._idle)})")
+            return PooledConnection(self, conn, created_at)
+    
+    def _release(self, conn, created_at, discard=False):
+        """Return a borrowed connection to the pool (or close it)."""
+        if not discard and self.rollback_on_release and hasattr(conn, 'rollback'):
+            try:
+                conn.rollback()
+            except Exception:
+                logger.warning("Failed to reset connection on return, discarding it")
+                discard = True
+        
+        now = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            if self._closed or discard or (self.max_age and now - created_at > self.max_age):
+                keep = False
+                if discard:
+                    self._stats['connections_discarded'] += 1
+                elif not self._closed:
+                    self._stats['connections_recycled'] += 1
+            else:
+                keep = True
+                self._idle.append((conn, created_at, now))
+            self._cond.notify()
+        
+        if not keep:
+            self._close_quietly(conn)
+    
     @contextmanager
     def get_connection(self):
         """
@@ -138,104 +327,49 @@ class DatabaseConnectionPool:
         
         Usage:
             with pool.get_connection() as conn:
-                # Use connection
                 cursor = conn.cursor()
                 cursor.execute("SELECT * FROM items")
         """
-        if self._closed:
-            raise RuntimeError("Connection pool is closed")
-            
-        conn = None
+        conn = self.acquire()
         try:
-            # Try to get an existing connection from the pool
-            try:
-                conn = self.pool.get(timeout=0.1)
-                # Check if connection is still alive
-                if not self._is_connection_alive(conn):
-                    logger.warning("Dead connection found in pool, creating new one")
-                    try:
-                        conn.close()
-                    except:
-                        pass
-                    conn = self._create_new_connection()
-            except Empty:
-                # No connections available, create a new one if under limit
-                with self.lock:
-                    if len(self.all_connections) < self.max_connections:
-                        conn = self._create_new_connection()
-                    else:
-                        # Wait for a connection to become available with shorter timeout
-                        logger.warning(f"Connection pool full ({self.max_connections} connections), waiting up to {self.timeout}s...")
-                        try:
-                            conn = self.pool.get(timeout=self.timeout)
-                            if not self._is_connection_alive(conn):
-                                logger.warning("Retrieved dead connection from pool, creating new one")
-                                try:
-                                    conn.close()
-                                except:
-                                    pass
-                                # Try to create a new connection even if pool is full
-                                conn = self._create_new_connection()
-                        except Empty:
-                            # Pool is full and no connections available - this can cause hanging
-                            logger.error(f"Connection pool exhausted! No connections available after {self.timeout}s timeout")
-                            raise Exception("Database connection pool exhausted - all connections in use")
-            
-            # Yield the connection for use
             yield conn
-            
+        except Exception:
+            # The connection may be in an unknown state; don't hand it to someone else
+            conn.discard()
+            raise
         finally:
-            # Return connection to pool
-            if conn and not self._closed:
-                try:
-                    # Only rollback if connection has this method
-                    if hasattr(conn, 'rollback'):
-                        conn.rollback()
-                    self.pool.put(conn)
-                except:
-                    # Connection is broken, don't return to pool
-                    logger.warning("Failed to return connection to pool")
-                    try:
-                        if hasattr(conn, 'close'):
-                            conn.close()
-                    except:
-                        pass
-                        
+            conn.close()
+    
     def get_pool_stats(self):
         """Get statistics about the connection pool."""
-        with self.lock:
-            return {
-                'total_connections': len(self.all_connections),
-                'available_connections': self.pool.qsize(),
-                'in_use_connections': len(self.all_connections) - self.pool.qsize(),
+        with self._cond:
+            stats = dict(self._stats)
+            idle = len(self._idle)
+            stats.update({
+                'total_connections': idle + self._in_use,
+                'available_connections': idle,
+                'in_use_connections': self._in_use,
                 'max_connections': self.max_connections,
-                'is_closed': self._closed
-            }
+                'timeout': self.timeout,
+                'max_age': self.max_age,
+                'max_idle': self.max_idle,
+                'is_closed': self._closed,
+                'pool_type': 'bounded'
+            })
+        stats['total_wait_ms'] = round(stats['total_wait_ms'], 2)
+        stats['max_wait_ms'] = round(stats['max_wait_ms'], 2)
+        stats['avg_wait_ms'] = round(stats['total_wait_ms'] / stats['waits'], 2) if stats['waits'] else 0.0
+        return stats
     
     def close_all(self):
-        """Close all connections in the pool."""
-        self._closed = True
-        
-        # Close all connections
-        with self.lock:
-            # Empty the pool
-            while not self.pool.empty():
-                try:
-                    conn = self.pool.get_nowait()
-                    if hasattr(conn, 'close'):
-                        conn.close()
-                except:
-                    pass
-                    
-            # Close any connections that might be in use
-            for conn in self.all_connections:
-                try:
-                    if hasattr(conn, 'close'):
-                        conn.close()
-                except:
-                    pass
-                    
-            self.all_connections.clear()
+        """Close idle connections; in-use connections are closed as they are returned."""
+        with self._cond:
+            self._closed = True
+            idle = [entry[0] for entry in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
 
 
 class OriginalDatabaseConnectionPool:
@@ -406,17 +540,21 @@ class OriginalDatabaseConnectionPool:
             self.all_connections.clear()
 
 
-# Use SimpleConnectionPool by default to avoid hanging issues
-# Set environment variable USE_ORIGINAL_POOL=true to use the original pool
+# Use the bounded pool by default.
+# USE_SIMPLE_POOL=true opens a fresh connection per request (no reuse);
+# USE_ORIGINAL_POOL=true restores the legacy queue-based pool.
 import os
 USE_ORIGINAL_POOL = os.environ.get('USE_ORIGINAL_POOL', 'false').lower() == 'true'
+USE_SIMPLE_POOL = os.environ.get('USE_SIMPLE_POOL', 'false').lower() == 'true'
 
 if USE_ORIGINAL_POOL:
     DatabaseConnectionPool = OriginalDatabaseConnectionPool
     logger.info("Using original database connection pool (may have hanging issues)")
-else:
+elif USE_SIMPLE_POOL:
     DatabaseConnectionPool = SimpleConnectionPool
-    logger.info("Using simple database connection pool (no hanging issues)")
+    logger.info("Using simple database connection pool (no connection reuse)")
+else:
+    DatabaseConnectionPool = BoundedConnectionPool
 
 
 # Global connection pool instance
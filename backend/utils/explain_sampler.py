@@ -0,0 +1,351 @@
+"""
+Automatic EXPLAIN capture for slow content queries.
+
+Query profiles say which statements are expensive but not why. When
+sampling is enabled (QUERY_EXPLAIN_SAMPLING=true), a SELECT against the
+MySQL content database that takes QUERY_EXPLAIN_MS or longer is re-issued
+as EXPLAIN FORMAT=JSON with the same parameters and the plan is stored
+with its query profile (see MetricsStore.save_query_plan).
+
+Sampling stays off the request path and out of the way of live traffic:
+TrackedCursor only keeps the parameters of slow statements, the query
+tracking worker offers them here, and a single background thread runs the
+EXPLAINs one at a time on a pooled connection, pausing between them. Each
+fingerprint is explained at most once per QUERY_EXPLAIN_INTERVAL_SECONDS
+across all workers.
+
+Plans are checked for full table scans and filesorts on the large content
+tables (QUERY_EXPLAIN_TABLES); for those, an index is suggested from the
+columns the WHERE and ORDER BY clauses use.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+
+from utils.metrics_store import get_metrics_store
+from utils.sql_fingerprint import extract_table_aliases
+
+logger = logging.getLogger(__name__)
+
+QUERY_EXPLAIN_SAMPLING = os.environ.get('QUERY_EXPLAIN_SAMPLING', 'false').lower() == 'true'
+QUERY_EXPLAIN_MS = float(os.environ.get('QUERY_EXPLAIN_MS', '100'))
+QUERY_EXPLAIN_INTERVAL_SECONDS = float(os.environ.get('QUERY_EXPLAIN_INTERVAL_SECONDS', '3600'))
+# Pause after each EXPLAIN so sampling never holds a pooled connection for long
+QUERY_EXPLAIN_PAUSE_SECONDS = float(os.environ.get('QUERY_EXPLAIN_PAUSE_SECONDS', '1'))
+QUERY_EXPLAIN_QUEUE_SIZE = 50
+QUERY_EXPLAIN_TABLES = tuple(
+    name.strip().lower()
+    for name in os.environ.get('QUERY_EXPLAIN_TABLES', 'items,spells_new,npc_types,lootdrop_entries').split(',')
+    if name.strip()
+)
+# Fingerprints remembered for rate limiting
+QUERY_EXPLAIN_RECENT_MAX = 5000
+# Columns in a suggested index
+SUGGESTED_INDEX_MAX_COLUMNS = 3
+
+# `db`.`alias`.`column` <op> in MySQL's attached_condition; leading-wildcard LIKE can't use an index
+_CONDITION_COLUMN = r'`{alias}`\.`(\w+)`\s*(?:=|<=>|<=|>=|<|>|between\b|in\s*\(|is\s+null|like\s+\'(?!%))'
+_ORDER_BY = re.compile(r'\border by (.+?)(?: limit\b| for update\b| lock in\b|\)|$)')
+_ORDER_COLUMN = re.compile(r'^(?:([a-z_]\w*)\.)?([a-z_]\w*)(?: asc| desc)?$')
+
+
+def _walk_plan(node, pending_sort=None):
+    """
+    Yield (table node, filesorted) for every table access in an EXPLAIN JSON plan.
+
+    A using_filesort on an ordering/grouping operation is charged to the
+    first table read under it (the one whose rows are sorted).
+    """
+    if isinstance(node, list):
+        for child in node:
+            yield from _walk_plan(child, pending_sort)
+        return
+    if not isinstance(node, dict):
+        return
+    if node.get('using_filesort'):
+        pending_sort = [True]
+    table = node.get('table')
+    if isinstance(table, dict):
+        filesort = bool(table.get('using_filesort'))
+        if pending_sort and pending_sort[0]:
+            filesort = True
+            pending_sort[0] = False
+        yield table, filesort
+        # Derived tables and subqueries hang off the table node
+        for key in ('materialized_from_subquery', 'attached_subqueries'):
+            if key in table:
+                yield from _walk_plan(table[key])
+    for key, child in node.items():
+        if key != 'table' and isinstance(child, (dict, list)):
+            yield from _walk_plan(child, pending_sort)
+
+
+def _condition_columns(condition, alias):
+    """Columns of one table compared in an index-friendly way in an attached_condition."""
+    if not condition:
+        return []
+    pattern = re.compile(_CONDITION_COLUMN.format(alias=re.escape(alias)), re.I)
+    columns = []
+    for column in pattern.findall(condition):
+        column = column.lower()
+        if column not in columns:
+            columns.append(column)
+    return columns
+
+
+def _order_columns(normalized, alias, single_table):
+    """Plain columns of one table in the statement's ORDER BY."""
+    match = _ORDER_BY.search(normalized)
+    if not match:
+        return []
+    columns = []
+    for term in match.group(1).split(', '):
+        column = _ORDER_COLUMN.match(term.strip())
+        if not column:
+            # An expression; no index can serve the sort
+            return []
+        prefix, name = column.groups()
+        if prefix == alias or (prefix is None and single_table):
+            columns.append(name)
+        else:
+            # Sorted by another table's column first; an index here won't avoid the sort
+            return columns
+    return columns
+
+
+def analyze_plan(plan, normalized_query, watched_tables=QUERY_EXPLAIN_TABLES):
+    """
+    Find full scans and filesorts on watched tables in an EXPLAIN FORMAT=JSON plan.
+
+    Args:
+        plan: Parsed EXPLAIN FORMAT=JSON output
+        normalized_query: Normalized statement text (maps aliases to tables
+            and supplies the ORDER BY columns)
+        watched_tables: Tables whose scans and sorts are flagged
+
+    Returns:
+        Dict with 'issues' (table, issue, rows examined, key), 'suggested_indexes'
+        (table, columns, DDL) and 'flagged'
+    """
+    aliases = extract_table_aliases(normalized_query)
+    single_table = len(set(aliases.values())) == 1
+    issues = []
+    suggestions = []
+    for table, filesort in _walk_plan(plan.get('query_block', plan)):
+        alias = str(table.get('table_name', '')).lower()
+        name = aliases.get(alias, alias)
+        if name not in watched_tables:
+            continue
+        access_type = table.get('access_type')
+        entry = {
+            'table': name,
+            'rows': table.get('rows_examined_per_scan'),
+            'key': table.get('key'),
+            'possible_keys': table.get('possible_keys') or []
+        }
+        if access_type == 'ALL':
+            issues.append(dict(entry, issue='full_scan'))
+        elif access_type == 'index':
+            issues.append(dict(entry, issue='full_index_scan'))
+        if filesort:
+            issues.append(dict(entry, issue='filesort'))
+        if access_type not in ('ALL', 'index') and not filesort:
+            continue
+
+        # Filter columns first, then sort columns, so one index can serve both
+        if access_type in ('ALL', 'index'):
+            # With possible_keys MySQL chose to scan anyway; another index on the same columns won't help
+            columns = [] if entry['possible_keys'] else _condition_columns(table.get('attached_condition'), alias)
+        elif access_type in ('ref', 'eq_ref', 'const'):
+            columns = [part.lower() for part in table.get('used_key_parts') or []]
+        else:
+            # A range scan can't also deliver rows in sort order
+            continue
+        if filesort:
+            columns += [c for c in _order_columns(normalized_query, alias, single_table) if c not in columns]
+        columns = columns[:SUGGESTED_INDEX_MAX_COLUMNS]
+        if columns and not any(s['table'] == name and s['columns'] == columns for s in suggestions):
+            suggestions.append({
+                'table': name,
+                'columns': columns,
+                'sql': f"ALTER TABLE {name} ADD INDEX idx_{'_'.join(columns)} ({', '.join(columns)})"
+            })
+    return {'issues': issues, 'suggested_indexes': suggestions, 'flagged': bool(issues)}
+
+
+class ExplainSampler:
+    """
+    Background EXPLAIN capture for slow SELECTs, rate limited per fingerprint.
+
+    The connection factory returns (conn, db_type, error) like
+    get_eqemu_db_connection(); the connection is closed (returned to its
+    pool) after each EXPLAIN.
+    """
+
+    def __init__(self, enabled=QUERY_EXPLAIN_SAMPLING, threshold_ms=QUERY_EXPLAIN_MS,
+                 interval_seconds=QUERY_EXPLAIN_INTERVAL_SECONDS, connection_factory=None):
+        self.enabled = enabled
+        self.threshold_ms = threshold_ms
+        self.interval_seconds = interval_seconds
+        self._connection_factory = connection_factory
+        self._items = deque(maxlen=QUERY_EXPLAIN_QUEUE_SIZE)
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = os.getpid()
+        self._stats = {'offered': 0, 'queued': 0, 'skipped_recent': 0, 'dropped': 0,
+                       'captured': 0, 'flagged': 0, 'failed': 0}
+
+    def set_connection_factory(self, connection_factory):
+        self._connection_factory = connection_factory
+
+    def wants(self, execution_time):
+        """Whether a statement this slow would be sampled (checked before keeping its parameters)."""
+        return self.enabled and self._connection_factory is not None and execution_time >= self.threshold_ms
+
+    def offer(self, fingerprint, query, params, execution_time):
+        """
+        Queue a slow statement for EXPLAIN unless its fingerprint was explained recently.
+
+        Args:
+            fingerprint: sql_fingerprint Fingerprint of the statement
+            query: SQL text as executed (with driver placeholders)
+            params: Parameters it was executed with (empty for none)
+            execution_time: How long it took, in ms
+
+        Returns:
+            True if queued
+        """
+        if not self.wants(execution_time) or fingerprint.query_type != 'SELECT':
+            return False
+        now = time.time()
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked child: the parent's queue and worker thread are not ours
+                self._items.clear()
+                self._thread = None
+                self._pid = os.getpid()
+            self._stats['offered'] += 1
+            last = self._recent.get(fingerprint.id)
+            if last is not None and now - last < self.interval_seconds:
+                self._stats['skipped_recent'] += 1
+                return False
+            self._recent[fingerprint.id] = now
+            self._recent.move_to_end(fingerprint.id)
+            while len(self._recent) > QUERY_EXPLAIN_RECENT_MAX:
+                self._recent.popitem(last=False)
+            if len(self._items) == self._items.maxlen:
+                self._stats['dropped'] += 1
+            self._items.append((fingerprint, query, params, execution_time))
+            self._stats['queued'] += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='explain-sampler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return True
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while True:
+                try:
+                    item = self._items.popleft()
+                except IndexError:
+                    break
+                try:
+                    self.capture(*item)
+                except Exception as e:
+                    logger.error(f"EXPLAIN sampler error: {e}")
+                time.sleep(QUERY_EXPLAIN_PAUSE_SECONDS)
+
+    def capture(self, fingerprint, query, params, execution_time):
+        """
+        Run EXPLAIN FORMAT=JSON for a statement and store the analyzed plan.
+
+        Returns:
+            The analysis from analyze_plan(), or None if nothing was captured
+        """
+        store = get_metrics_store()
+        captured_at = store.query_plan_captured_at(fingerprint.id)
+        if captured_at is not None and time.time() - captured_at < self.interval_seconds:
+            # Another worker explained it already
+            with self._lock:
+                self._stats['skipped_recent'] += 1
+            return None
+
+        conn, db_type, error = self._connection_factory()
+        if conn is None:
+            logger.debug(f"EXPLAIN sampler has no content database connection: {error}")
+            with self._lock:
+                self._stats['failed'] += 1
+            return None
+        try:
+            if db_type != 'mysql':
+                # FORMAT=JSON plans are MySQL's
+                return None
+            cursor = conn.cursor()
+            # The EXPLAIN itself shouldn't show up in query tracking
+            if hasattr(cursor, '_track_queries'):
+                cursor._track_queries = False
+            try:
+                explain_query = f"EXPLAIN FORMAT=JSON {query}"
+                if params:
+                    cursor.execute(explain_query, params)
+                else:
+                    cursor.execute(explain_query)
+                row = cursor.fetchone()
+            finally:
+                cursor.close()
+            plan = json.loads(next(iter(row.values())) if isinstance(row, dict) else row[0])
+        except Exception as e:
+            logger.warning(f"Failed to capture EXPLAIN for query {fingerprint.id}: {e}")
+            with self._lock:
+                self._stats['failed'] += 1
+            return None
+        finally:
+            conn.close()
+
+        analysis = analyze_plan(plan, fingerprint.normalized)
+        store.save_query_plan(fingerprint.id, plan, analysis, execution_time)
+        with self._lock:
+            self._stats['captured'] += 1
+            if analysis['flagged']:
+                self._stats['flagged'] += 1
+        if analysis['flagged']:
+            issues = ', '.join(f"{issue['issue']} on {issue['table']}" for issue in analysis['issues'])
+            logger.info(f"Slow query {fingerprint.id} ({execution_time:.0f}ms): {issues}")
+        return analysis
+
+    def get_status(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                enabled=self.enabled,
+                connected=self._connection_factory is not None,
+                threshold_ms=self.threshold_ms,
+                interval_seconds=self.interval_seconds,
+                watched_tables=list(QUERY_EXPLAIN_TABLES),
+                pending=len(self._items)
+            )
+
+
+# Global instance
+_explain_sampler = None
+_explain_sampler_lock = threading.Lock()
+
+
+def get_explain_sampler():
+    """Get the singleton EXPLAIN sampler."""
+    global _explain_sampler
+    if _explain_sampler is None:
+        with _explain_sampler_lock:
+            if _explain_sampler is None:
+                _explain_sampler = ExplainSampler()
+    return _explain_sampler
@@ -0,0 +1,436 @@
+"""
+Compiled filter-to-SQL planner for item and spell search.
+
+Turns the validated filter list from validate_json_filters() into a WHERE
+fragment plus parameters:
+
+- Field mappings and operator templates are module-level tables instead of
+  being rebuilt inside every search request
+- Numeric ranges on the same column are collapsed ("ac > 10", "ac > 20",
+  "ac between 0 and 50" -> "ac > 20 AND ac <= 50"); impossible combinations
+  become 1=0
+- Predicates are ordered by estimated selectivity so the cheapest, most
+  selective checks run first on rows MySQL has to scan
+- The SQL template for each filter shape is compiled once and cached
+
+Debug mode (FILTER_PLANNER_DEBUG=true) captures EXPLAIN output for slow
+filter combinations; timings per combination are always kept.
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+
+logger = logging.getLogger(__name__)
+
+FILTER_PLANNER_DEBUG = os.environ.get('FILTER_PLANNER_DEBUG', 'false').lower() == 'true'
+# Queries slower than this get an EXPLAIN captured in debug mode
+FILTER_PLANNER_EXPLAIN_MS = float(os.environ.get('FILTER_PLANNER_EXPLAIN_MS', '250'))
+FILTER_PLANNER_MAX_PLANS = 500
+FILTER_PLANNER_MAX_TEMPLATES = 1024
+
+ITEM_FIELD_MAP = {
+    'name': 'items.Name',
+    'ac': 'items.ac',
+    'hp': 'items.hp',
+    'mana': 'items.mana',
+    'str': 'items.astr',
+    'sta': 'items.asta',
+    'agi': 'items.aagi',
+    'dex': 'items.adex',
+    'wis': 'items.awis',
+    'int': 'items.aint',
+    'cha': 'items.acha',
+    'weight': 'items.weight',
+    'damage': 'items.damage',
+    'delay': 'items.delay',
+    'magic': 'items.magic',
+    'nodrop': 'items.nodrop',
+    'norent': 'items.norent',
+    'classes': 'items.classes',
+    'races': 'items.races',
+    'reqlevel': 'items.reqlevel',
+    'stackable': 'items.stackable',
+    'stacksize': 'items.stacksize',
+    'icon': 'items.icon',
+    'price': 'items.price',
+    'size': 'items.size',
+    'mr': 'items.mr',
+    'fr': 'items.fr',
+    'cr': 'items.cr',
+    'dr': 'items.dr',
+    'pr': 'items.pr',
+    'reclevel': 'items.reclevel',
+    'lore_flag': 'items.loregroup',
+    'lore': 'items.lore',
+    'loretext': 'items.lore',  # Map loretext to lore column
+    'clickeffect': 'items.clickeffect',
+    'proceffect': 'items.proceffect',
+    'worneffect': 'items.worneffect',
+    'focuseffect': 'items.focuseffect',
+    'slots': 'items.slots'
+}
+
+SPELL_CLASS_COLUMNS = {
+    'warrior_level': 'classes1',
+    'cleric_level': 'classes2',
+    'paladin_level': 'classes3',
+    'ranger_level': 'classes4',
+    'shadowknight_level': 'classes5',
+    'druid_level': 'classes6',
+    'monk_level': 'classes7',
+    'bard_level': 'classes8',
+    'rogue_level': 'classes9',
+    'shaman_level': 'classes10',
+    'necromancer_level': 'classes11',
+    'wizard_level': 'classes12',
+    'magician_level': 'classes13',
+    'enchanter_level': 'classes14',
+    'beastlord_level': 'classes15',
+    'berserker_level': 'classes16'
+}
+
+SPELL_FIELD_MAP = dict(
+    {
+        'name': 'spells_new.name',
+        'mana': 'spells_new.mana',
+        'cast_time': 'spells_new.cast_time',
+        'range': 'spells_new.range',
+        'targettype': 'spells_new.targettype',
+        'skill': 'spells_new.skill',
+        'resisttype': 'spells_new.resisttype',
+        'spell_category': 'spells_new.spell_category',
+        'buffduration': 'spells_new.buffduration',
+        'deities': 'spells_new.deities',
+    },
+    **{field: f'spells_new.{column}' for field, column in SPELL_CLASS_COLUMNS.items()},
+    **{f'effect{i}': f'spells_new.effectid{i}' for i in range(1, 13)},
+    **{f'component{i}': f'spells_new.components{i}' for i in range(1, 5)}
+)
+
+FIELD_MAPS = {'item': ITEM_FIELD_MAP, 'spell': SPELL_FIELD_MAP}
+TABLE_PREFIXES = {'item': 'items', 'spell': 'spells_new'}
+
+# Item boolean columns stored inverted (0 = flag set)
+INVERTED_BOOLEAN_FIELDS = {'nodrop', 'norent'}
+
+# SQL template per predicate kind; {col} is the column, %s the parameters
+PREDICATE_TEMPLATES = {
+    'like': "{col} LIKE %s",
+    'eq': "{col} = %s",
+    'ne': "{col} != %s",
+    'gt': "{col} > %s",
+    'ge': "{col} >= %s",
+    'lt': "{col} < %s",
+    'le': "{col} <= %s",
+    'between': "{col} BETWEEN %s AND %s",
+    'nonzero': "{col} != 0",
+    'zero': "{col} = 0",
+    'exists': "{col} IS NOT NULL AND {col} != 0 AND {col} != -1",
+    'not_exists': "({col} IS NULL OR {col} = 0 OR {col} = -1)",
+    'bits_any': "({col} & %s) != 0",
+    'ne_255': "{col} != 255",
+    'eq_255': "{col} = 255",
+    'never': "1=0",
+}
+
+# Rough fraction of rows each predicate kind keeps, used for ordering
+PREDICATE_SELECTIVITY = {
+    'never': 0.0,
+    'eq': 0.05,
+    'between': 0.2,
+    'ge': 0.3,
+    'gt': 0.3,
+    'le': 0.5,
+    'lt': 0.5,
+    'exists': 0.1,
+    'eq_255': 0.8,
+    'ne_255': 0.2,
+    'nonzero': 0.2,
+    'zero': 0.8,
+    'not_exists': 0.9,
+    'ne': 0.95,
+}
+# LIKE can't use an index and has to scan the string, so it goes last
+LIKE_SELECTIVITY = 0.3
+LIKE_COST = 4.0
+# Chance that any one bit of a slot/class/race mask is set on a row
+BITMASK_BIT_SELECTIVITY = 0.08
+
+Predicate = namedtuple('Predicate', ['column', 'kind', 'params', 'selectivity'])
+FilterPlan = namedtuple('FilterPlan', ['sql', 'params', 'signature'])
+
+EMPTY_PLAN = FilterPlan('', [], ())
+
+
+def _bitmask_selectivity(mask):
+    try:
+        bits = bin(int(mask) & 0xFFFFFFFF).count('1')
+    except (TypeError, ValueError):
+        return 1.0
+    return 1 - (1 - BITMASK_BIT_SELECTIVITY) ** bits
+
+
+def _to_predicates(filter_item, field_map, table_prefix):
+    """Translate one validated filter into predicates (empty if it adds no condition)."""
+    field = filter_item['field']
+    operator = filter_item['operator']
+    value = filter_item.get('value')
+    column = field_map.get(field, f'{table_prefix}.{field}')
+
+    if operator == 'contains':
+        return [Predicate(column, 'like', [f'%{value}%'], LIKE_SELECTIVITY)]
+    if operator == 'starts with':
+        return [Predicate(column, 'like', [f'{value}%'], LIKE_SELECTIVITY)]
+    if operator == 'ends with':
+        return [Predicate(column, 'like', [f'%{value}'], LIKE_SELECTIVITY)]
+    if operator == 'equals':
+        return [Predicate(column, 'eq', [value], None)]
+    if operator == 'not equals':
+        return [Predicate(column, 'ne', [value], None)]
+    if operator == 'greater than':
+        return [Predicate(column, 'gt', [value], None)]
+    if operator == 'less than':
+        return [Predicate(column, 'lt', [value], None)]
+    if operator == 'between':
+        if isinstance(value, list) and len(value) == 2:
+            return [Predicate(column, 'between', [value[0], value[1]], None)]
+        return []
+    if operator == 'is':
+        if field in ('magic', 'nodrop', 'norent'):
+            bool_value = 1 if value else 0
+            if field in INVERTED_BOOLEAN_FIELDS:
+                bool_value = 0 if value else 1
+            return [Predicate(column, 'eq', [bool_value], 0.5)]
+        if field == 'lore_flag':
+            # loregroup: 0 = not lore, non-zero = lore
+            return [Predicate(column, 'nonzero' if value else 'zero', [], None)]
+        return []
+    if operator == 'exists':
+        return [Predicate(column, 'exists' if value else 'not_exists', [], None)]
+    if operator == 'includes' and field == 'slots':
+        return [Predicate(column, 'bits_any', [value], _bitmask_selectivity(value))]
+    if operator == 'class_can_use':
+        return [Predicate(column, 'ne_255' if value else 'eq_255', [], None)]
+    return []
+
+
+def _as_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _collapse_ranges(column, predicates):
+    """
+    Merge eq/gt/lt/between predicates on one column into at most one range.
+
+    Returns:
+        List of predicates replacing the input
+    """
+    lower = None  # (value, inclusive)
+    upper = None
+    equal = None
+    passthrough = []
+
+    def tighter_lower(bound):
+        nonlocal lower
+        if lower is None or bound[0] > lower[0] or (bound[0] == lower[0] and not bound[1]):
+            lower = bound
+
+    def tighter_upper(bound):
+        nonlocal upper
+        if upper is None or bound[0] < upper[0] or (bound[0] == upper[0] and not bound[1]):
+            upper = bound
+
+    for predicate in predicates:
+        numbers = [_as_number(p) for p in predicate.params]
+        # Text equality ("equals 123" on a name) must stay a string comparison
+        text_eq = predicate.kind == 'eq' and isinstance(predicate.params[0], str)
+        if predicate.kind not in ('eq', 'gt', 'lt', 'between') or None in numbers or text_eq:
+            passthrough.append(predicate)
+        elif predicate.kind == 'eq':
+            if equal is not None and equal != numbers[0]:
+                return [Predicate('', 'never', [], None)]
+            equal = numbers[0]
+        elif predicate.kind == 'gt':
+            tighter_lower((numbers[0], False))
+        elif predicate.kind == 'lt':
+            tighter_upper((numbers[0], False))
+        else:
+            tighter_lower((numbers[0], True))
+            tighter_upper((numbers[1], True))
+
+    if equal is not None:
+        if lower and (equal < lower[0] or (equal == lower[0] and not lower[1])):
+            return [Predicate('', 'never', [], None)]
+        if upper and (equal > upper[0] or (equal == upper[0] and not upper[1])):
+            return [Predicate('', 'never', [], None)]
+        return [Predicate(column, 'eq', [_plain(equal)], None)] + passthrough
+
+    if lower and upper:
+        if lower[0] > upper[0] or (lower[0] == upper[0] and not (lower[1] and upper[1])):
+            return [Predicate('', 'never', [], None)]
+        if lower[1] and upper[1]:
+            return [Predicate(column, 'between', [_plain(lower[0]), _plain(upper[0])], None)] + passthrough
+    collapsed = []
+    if lower:
+        collapsed.append(Predicate(column, 'ge' if lower[1] else 'gt', [_plain(lower[0])], None))
+    if upper:
+        collapsed.append(Predicate(column, 'le' if upper[1] else 'lt', [_plain(upper[0])], None))
+    return collapsed + passthrough
+
+
+def _plain(number):
+    """Keep whole numbers as ints so parameters render like the originals."""
+    return int(number) if float(number).is_integer() else number
+
+
+def _sort_key(predicate):
+    if predicate.kind == 'like':
+        return (predicate.selectivity * LIKE_COST, predicate.column)
+    selectivity = predicate.selectivity
+    if selectivity is None:
+        selectivity = PREDICATE_SELECTIVITY.get(predicate.kind, 0.5)
+    return (selectivity, predicate.column)
+
+
+class FilterPlanner:
+    """Compiles validated search filters into ordered, parameterized SQL."""
+
+    def __init__(self, debug=FILTER_PLANNER_DEBUG, explain_threshold_ms=FILTER_PLANNER_EXPLAIN_MS):
+        self.debug = debug
+        self.explain_threshold_ms = explain_threshold_ms
+        self._templates = {}
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'template_hits': 0, 'template_misses': 0, 'explains': 0}
+
+    def plan(self, filters, filter_type='item'):
+        """
+        Compile filters into a WHERE fragment.
+
+        Args:
+            filters: Validated filter list from validate_json_filters()
+            filter_type: 'item' or 'spell'
+
+        Returns:
+            FilterPlan(sql, params, signature); sql is '' when there is nothing to filter
+        """
+        if not filters:
+            return EMPTY_PLAN
+
+        field_map = FIELD_MAPS[filter_type]
+        table_prefix = TABLE_PREFIXES[filter_type]
+
+        by_column = OrderedDict()
+        for filter_item in filters:
+            for predicate in _to_predicates(filter_item, field_map, table_prefix):
+                by_column.setdefault(predicate.column, []).append(predicate)
+
+        predicates = []
+        for column, column_predicates in by_column.items():
+            predicates.extend(_collapse_ranges(column, column_predicates))
+        if not predicates:
+            return EMPTY_PLAN
+        if any(p.kind == 'never' for p in predicates):
+            predicates = [Predicate('', 'never', [], None)]
+
+        predicates.sort(key=_sort_key)
+        signature = (filter_type,) + tuple((p.column, p.kind) for p in predicates)
+        params = [param for p in predicates for param in p.params]
+        return FilterPlan(self._template(signature), params, signature)
+
+    def _template(self, signature):
+        with self._lock:
+            sql = self._templates.get(signature)
+            if sql is not None:
+                self._stats['template_hits'] += 1
+                return sql
+            self._stats['template_misses'] += 1
+        sql = " AND ".join(PREDICATE_TEMPLATES[kind].format(col=column) for column, kind in signature[1:])
+        with self._lock:
+            if len(self._templates) >= FILTER_PLANNER_MAX_TEMPLATES:
+                self._templates.clear()
+            self._templates[signature] = sql
+        return sql
+
+    def record(self, plan, elapsed_ms, cursor=None, query=None, params=None):
+        """
+        Record how long a query using this plan took.
+
+        In debug mode, slow queries get an EXPLAIN captured with the same
+        cursor (run after the caller has fetched its rows).
+        """
+        if not plan.signature:
+            return
+        with self._lock:
+            entry = self._plans.get(plan.signature)
+            if entry is None:
+                entry = {'sql': plan.sql, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                         'explain': None, 'explain_ms': None}
+                self._plans[plan.signature] = entry
+                while len(self._plans) > FILTER_PLANNER_MAX_PLANS:
+                    self._plans.popitem(last=False)
+            self._plans.move_to_end(plan.signature)
+            entry['calls'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+            want_explain = (
+                self.debug and cursor is not None and query
+                and elapsed_ms >= self.explain_threshold_ms
+                and (entry['explain_ms'] is None or elapsed_ms > entry['explain_ms'])
+            )
+        if not want_explain:
+            return
+
+        try:
+            cursor.execute(f"EXPLAIN {query}", params)
+            explain_rows = [dict(row) if isinstance(row, dict) else list(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.warning(f"Failed to capture EXPLAIN for filter plan: {e}")
+            return
+        with self._lock:
+            entry['explain'] = explain_rows
+            entry['explain_ms'] = elapsed_ms
+            self._stats['explains'] += 1
+
+    def get_slow_plans(self, limit=20):
+        """Get recorded filter combinations, slowest average first."""
+        with self._lock:
+            plans = [
+                {
+                    'filter_type': signature[0],
+                    'predicates': [f"{column} {kind}".strip() for column, kind in signature[1:]],
+                    'sql': entry['sql'],
+                    'calls': entry['calls'],
+                    'avg_ms': round(entry['total_ms'] / entry['calls'], 2) if entry['calls'] else 0,
+                    'max_ms': round(entry['max_ms'], 2),
+                    'explain': entry['explain']
+                }
+                for signature, entry in self._plans.items()
+            ]
+        plans.sort(key=lambda p: p['avg_ms'], reverse=True)
+        return plans[:limit]
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, debug=self.debug, templates=len(self._templates),
+                        tracked_plans=len(self._plans))
+
+
+# Global instance
+_filter_planner = None
+_filter_planner_lock = threading.Lock()
+
+
+def get_filter_planner():
+    """Get the singleton filter planner."""
+    global _filter_planner
+    if _filter_planner is None:
+        with _filter_planner_lock:
+            if _filter_planner is None:
+                _filter_planner = FilterPlanner()
+    return _filter_planner
@@ -0,0 +1,141 @@
+"""
+Batched item availability lookups.
+
+Search result pages need to know, for every listed item, which source types
+exist (drops, merchants, ground spawns, forage, recipes). Calling the single
+item availability endpoint per row costs a connection and up to a dozen
+probes each; this module answers a whole page with one grouped IN (...) query
+per source type and returns a bitmap per item in the same bit order as the
+item source index (AVAILABILITY_FLAGS).
+"""
+
+import logging
+
+from utils.item_source_index import AVAILABILITY_FLAGS, EXCLUDED_ZONES
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on ids per request (one IN list per source query)
+AVAILABILITY_BATCH_MAX_IDS = 500
+
+FLAG_BITS = {name: 1 << bit for bit, name in enumerate(AVAILABILITY_FLAGS)}
+
+_EXCLUDED_ZONES_SQL = ", ".join(f"'{zone}'" for zone in EXCLUDED_ZONES)
+
+# Same filtering as the drop sources endpoint so badges never promise empty tabs
+DROP_ITEMS_QUERY = f"""
+    SELECT DISTINCT lde.item_id
+    FROM lootdrop_entries lde
+    INNER JOIN loottable_entries lte ON lte.lootdrop_id = lde.lootdrop_id
+    INNER JOIN npc_types nt ON nt.loottable_id = lte.loottable_id
+    INNER JOIN spawnentry se ON nt.id = se.npcID
+    INNER JOIN spawn2 s2 ON se.spawngroupID = s2.spawngroupID
+    INNER JOIN zone z ON s2.zone = z.short_name
+    LEFT JOIN spawn2_disabled s2d ON s2.id = s2d.spawn2_id
+    WHERE lde.item_id IN ({{placeholders}})
+      AND z.min_status = 0
+      AND s2d.spawn2_id IS NULL
+      AND nt.merchant_id = 0
+      AND z.short_name NOT IN ({_EXCLUDED_ZONES_SQL})
+"""
+
+MERCHANT_ITEMS_QUERY = "SELECT DISTINCT item FROM merchantlist WHERE item IN ({placeholders})"
+GROUND_SPAWN_ITEMS_QUERY = "SELECT DISTINCT item FROM ground_spawns WHERE item IN ({placeholders})"
+FORAGE_ITEMS_QUERY = "SELECT DISTINCT itemid FROM forage WHERE itemid IN ({placeholders})"
+
+RECIPE_ITEMS_QUERY = """
+    SELECT
+        item_id,
+        MAX(CASE WHEN componentcount > 0 THEN 1 ELSE 0 END) AS used_in_recipe,
+        MAX(CASE WHEN successcount > 0 THEN 1 ELSE 0 END) AS created_by_recipe
+    FROM tradeskill_recipe_entries
+    WHERE item_id IN ({placeholders})
+    GROUP BY item_id
+"""
+
+# (flag, required table, result column, query) for the single-column existence queries
+_SOURCE_QUERIES = (
+    ('drop_sources', 'lootdrop_entries', 'item_id', DROP_ITEMS_QUERY),
+    ('merchant_sources', 'merchantlist', 'item', MERCHANT_ITEMS_QUERY),
+    ('ground_spawns', 'ground_spawns', 'item', GROUND_SPAWN_ITEMS_QUERY),
+    ('forage_sources', 'forage', 'itemid', FORAGE_ITEMS_QUERY),
+)
+
+
+def parse_item_ids(values, max_ids=AVAILABILITY_BATCH_MAX_IDS):
+    """
+    Validate a list of item ids from a request body.
+
+    Returns:
+        List of unique positive int ids, in request order
+
+    Raises:
+        ValueError: If the list is missing, too long or has a non-integer id
+    """
+    if not isinstance(values, list) or not values:
+        raise ValueError("item_ids must be a non-empty list")
+    ids = []
+    for value in values:
+        if isinstance(value, bool):
+            raise ValueError(f"Invalid item id: {value}")
+        try:
+            item_id = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid item id: {value}")
+        if item_id <= 0:
+            raise ValueError(f"Invalid item id: {value}")
+        ids.append(item_id)
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > max_ids:
+        raise ValueError(f"At most {max_ids} item ids per request")
+    return ids
+
+
+def batch_availability(cursor, item_ids, capabilities):
+    """
+    Get availability bitmaps for many items with one query per source type.
+
+    Args:
+        cursor: Content database cursor
+        item_ids: Item ids (at most AVAILABILITY_BATCH_MAX_IDS)
+        capabilities: Schema capabilities used to skip missing tables
+
+    Returns:
+        Dict of item_id -> bitmap (bit order: AVAILABILITY_FLAGS)
+    """
+    bits = {item_id: 0 for item_id in item_ids}
+    if not item_ids:
+        return bits
+    placeholders = ', '.join(['%s'] * len(item_ids))
+    params = tuple(item_ids)
+
+    for flag, table, column, query in _SOURCE_QUERIES:
+        if not capabilities.has(table):
+            continue
+        try:
+            cursor.execute(query.format(placeholders=placeholders), params)
+            for row in cursor.fetchall():
+                item_id = int(row[column] if isinstance(row, dict) else row[0])
+                if item_id in bits:
+                    bits[item_id] |= FLAG_BITS[flag]
+        except Exception as e:
+            logger.warning(f"Batch availability check for {flag} failed: {e}")
+
+    if capabilities.has_all('tradeskill_recipe', 'tradeskill_recipe_entries'):
+        try:
+            cursor.execute(RECIPE_ITEMS_QUERY.format(placeholders=placeholders), params)
+            for row in cursor.fetchall():
+                if isinstance(row, dict):
+                    item_id, used, created = row['item_id'], row['used_in_recipe'], row['created_by_recipe']
+                else:
+                    item_id, used, created = row
+                item_id = int(item_id)
+                if item_id not in bits:
+                    continue
+                if used:
+                    bits[item_id] |= FLAG_BITS['tradeskill_recipes']
+                if created:
+                    bits[item_id] |= FLAG_BITS['created_by_recipes']
+        except Exception as e:
+            logger.warning(f"Batch availability check for recipes failed: {e}")
+    return bits
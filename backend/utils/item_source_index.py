@@ -0,0 +1,570 @@
+"""
+Precomputed item source index.
+
+Scans the loot, merchant, ground spawn, forage and tradeskill tables once in
+bulk and materializes a compact item_id -> sources map. This replaces the
+per-request multi-way joins behind the item drop/merchant/ground/forage and
+availability endpoints with dictionary lookups.
+
+The index is persisted as gzipped JSON so restarts don't need a rebuild, and
+is rebuilt in a background thread when missing, stale or invalidated.
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+import threading
+
+from utils.schema_capabilities import get_schema_registry
+
+logger = logging.getLogger(__name__)
+
+ITEM_SOURCE_INDEX_ENABLED = os.environ.get('ITEM_SOURCE_INDEX_ENABLED', 'true').lower() == 'true'
+ITEM_SOURCE_INDEX_MAX_AGE_HOURS = float(os.environ.get('ITEM_SOURCE_INDEX_MAX_AGE_HOURS', '24'))
+# Minimum seconds between background build attempts (avoids hammering a failing database)
+ITEM_SOURCE_INDEX_RETRY_SECONDS = 60
+ITEM_SOURCE_INDEX_PATH = os.environ.get(
+    'ITEM_SOURCE_INDEX_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'item_source_index.json.gz')
+)
+
+# Bit positions in the per-item availability bitmap (same order as the availability endpoint)
+AVAILABILITY_FLAGS = (
+    'drop_sources',
+    'merchant_sources',
+    'ground_spawns',
+    'forage_sources',
+    'tradeskill_recipes',
+    'created_by_recipes'
+)
+_FLAG_BITS = {name: 1 << bit for bit, name in enumerate(AVAILABILITY_FLAGS)}
+
+# Zones hidden from every source listing
+EXCLUDED_ZONES = ('load', 'arena', 'nexus', 'arttest', 'ssratemple', 'tutorial')
+_EXCLUDED_ZONES_SQL = ", ".join(f"'{zone}'" for zone in EXCLUDED_ZONES)
+
+# Match the per-item endpoints, which cap each listing at 1000 rows
+MAX_ROWS_PER_ITEM = 1000
+
+INDEX_FORMAT_VERSION = 2
+
+DROP_SOURCES_QUERY = f"""
+    SELECT DISTINCT
+        lde.item_id,
+        nt.id as npc_id,
+        nt.name as npc_name,
+        s2.zone,
+        z.long_name as zone_name,
+        lte.multiplier,
+        lte.probability,
+        lde.chance
+    FROM npc_types nt
+    INNER JOIN spawnentry se ON nt.id = se.npcID
+    INNER JOIN spawn2 s2 ON se.spawngroupID = s2.spawngroupID
+    INNER JOIN zone z ON s2.zone = z.short_name
+    INNER JOIN loottable_entries lte ON nt.loottable_id = lte.loottable_id
+    INNER JOIN lootdrop_entries lde ON lte.lootdrop_id = lde.lootdrop_id
+    LEFT JOIN spawn2_disabled s2d ON s2.id = s2d.spawn2_id
+    WHERE z.min_status = 0
+      AND s2d.spawn2_id IS NULL
+      AND nt.merchant_id = 0
+      AND z.short_name NOT IN ({_EXCLUDED_ZONES_SQL})
+"""
+
+MERCHANT_SOURCES_QUERY = f"""
+    SELECT DISTINCT
+        ml.item as item_id,
+        nt.id as npc_id,
+        nt.name as npc_name,
+        nt.class as npc_class,
+        s2.zone,
+        z.long_name as zone_name,
+        ml.slot as merchant_slot,
+        i.price as item_base_price,
+        {{sellrate_column}} as merchant_sellrate
+    FROM npc_types nt
+    INNER JOIN merchantlist ml ON nt.merchant_id = ml.merchantid
+    INNER JOIN spawnentry se ON nt.id = se.npcID
+    INNER JOIN spawn2 s2 ON se.spawngroupID = s2.spawngroupID
+    INNER JOIN zone z ON s2.zone = z.short_name
+    INNER JOIN items i ON ml.item = i.id
+    LEFT JOIN spawn2_disabled s2d ON s2.id = s2d.spawn2_id
+    WHERE z.min_status = 0
+      AND s2d.spawn2_id IS NULL
+      AND z.short_name NOT IN ({_EXCLUDED_ZONES_SQL})
+"""
+
+GROUND_SPAWNS_QUERY = f"""
+    SELECT
+        gs.item as item_id,
+        gs.id as spawn_id,
+        gs.max_x,
+        gs.max_y,
+        gs.max_z,
+        gs.respawn_timer,
+        z.short_name as zone_short,
+        z.long_name as zone_name
+    FROM ground_spawns gs
+    INNER JOIN zone z ON gs.zoneid = z.zoneidnumber
+    WHERE z.min_status = 0
+      AND z.short_name NOT IN ({_EXCLUDED_ZONES_SQL})
+"""
+
+FORAGE_SOURCES_QUERY = f"""
+    SELECT
+        f.itemid as item_id,
+        z.short_name as zone_short,
+        z.long_name as zone_name,
+        MAX(f.chance) as chance,
+        MIN(f.level) as level
+    FROM forage f
+    INNER JOIN zone z ON f.zoneid = z.zoneidnumber
+    WHERE z.min_status = 0
+      AND z.short_name NOT IN ({_EXCLUDED_ZONES_SQL})
+    GROUP BY f.itemid, z.zoneidnumber, z.short_name, z.long_name
+"""
+
+
+def _row_values(row, keys):
+    """Return values for keys from a dict or tuple row."""
+    if isinstance(row, dict):
+        return tuple(row[key] for key in keys)
+    return tuple(row)
+
+
+def _json_number(value):
+    """Convert Decimal and other numeric DB types to JSON-friendly numbers."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return value
+    return int(number) if number.is_integer() else number
+
+
+class ItemSourceIndex:
+    """In-memory item_id -> sources map with disk persistence and background rebuilds."""
+
+    def __init__(self, path=ITEM_SOURCE_INDEX_PATH, max_age_hours=ITEM_SOURCE_INDEX_MAX_AGE_HOURS):
+        """
+        Initialize an empty index.
+
+        Args:
+            path: File the index is persisted to
+            max_age_hours: Age after which the index is rebuilt in the background
+        """
+        self.path = path
+        self.max_age_seconds = max_age_hours * 3600
+        self._lock = threading.Lock()
+        self._build_thread = None
+        self._last_build_attempt = 0
+        self._loaded_from_disk = False
+        self._reset()
+
+    def _reset(self):
+        self._zones = []
+        self._npcs = {}
+        self._items = {}
+        self._flags = {}
+        self._tables = {}
+        self.built_at = None
+        self.build_seconds = None
+        self.version_tag = None
+        self.last_error = None
+
+    @staticmethod
+    def make_version_tag(database_url):
+        """Identify the content database the index was built from."""
+        return hashlib.sha1(str(database_url or '').encode('utf-8')).hexdigest()[:12]
+
+    @property
+    def ready(self):
+        """Whether lookups can be answered from the index."""
+        return self.built_at is not None
+
+    def is_fresh(self, version_tag=None):
+        """Whether the index is built, recent and built from the given database."""
+        if not self.ready:
+            return False
+        if version_tag is not None and version_tag != self.version_tag:
+            return False
+        return time.time() - self.built_at < self.max_age_seconds
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def build(self, conn, version_tag=None, capabilities=None):
+        """
+        Build the index from the content database in one bulk pass per source.
+
+        Args:
+            conn: Open content database connection (DictCursor rows or tuples)
+            version_tag: Identifier of the content database (see make_version_tag)
+            capabilities: SchemaCapabilities of the database; optional columns
+                (merchantlist.sellrate) are only read when it reports them
+        """
+        start = time.time()
+        zones, zone_ids, npcs, items, flags = [], {}, {}, {}, {}
+        tables = {}
+
+        def zone_index(short_name, long_name):
+            if short_name not in zone_ids:
+                zone_ids[short_name] = len(zones)
+                zones.append([short_name, long_name])
+            return zone_ids[short_name]
+
+        def bucket(item_id, kind):
+            return items.setdefault(int(item_id), {}).setdefault(kind, [])
+
+        def mark(item_id, flag):
+            item_id = int(item_id)
+            flags[item_id] = flags.get(item_id, 0) | _FLAG_BITS[flag]
+
+        cursor = conn.cursor()
+        try:
+            def table_exists(name):
+                cursor.execute("SHOW TABLES LIKE %s", (name,))
+                tables[name] = bool(cursor.fetchone())
+                return tables[name]
+
+            if table_exists('lootdrop_entries'):
+                cursor.execute(DROP_SOURCES_QUERY)
+                keys = ('item_id', 'npc_id', 'npc_name', 'zone', 'zone_name', 'multiplier', 'probability', 'chance')
+                for row in cursor.fetchall():
+                    item_id, npc_id, npc_name, zone, zone_name, multiplier, probability, chance = _row_values(row, keys)
+                    npcs[npc_id] = npc_name
+                    bucket(item_id, 'd').append([
+                        npc_id, zone_index(zone, zone_name),
+                        _json_number(multiplier), _json_number(probability), _json_number(chance)
+                    ])
+                    mark(item_id, 'drop_sources')
+
+            if table_exists('merchantlist'):
+                # Same fallback as get_item_merchant_sources: list price when sellrate doesn't exist
+                has_sellrate = capabilities is not None and capabilities.has('merchantlist', 'sellrate')
+                cursor.execute(MERCHANT_SOURCES_QUERY.format(sellrate_column='ml.sellrate' if has_sellrate else '100'))
+                keys = ('item_id', 'npc_id', 'npc_name', 'npc_class', 'zone', 'zone_name', 'merchant_slot',
+                        'item_base_price', 'merchant_sellrate')
+                for row in cursor.fetchall():
+                    item_id, npc_id, npc_name, npc_class, zone, zone_name, slot, price, sellrate = _row_values(row, keys)
+                    npcs[npc_id] = npc_name
+                    bucket(item_id, 'm').append([
+                        npc_id, npc_class, zone_index(zone, zone_name), slot, _json_number(price),
+                        _json_number(sellrate)
+                    ])
+                # Availability mirrors the endpoint: any merchantlist entry counts
+                cursor.execute("SELECT DISTINCT item FROM merchantlist")
+                for row in cursor.fetchall():
+                    mark(_row_values(row, ('item',))[0], 'merchant_sources')
+
+            if table_exists('ground_spawns'):
+                cursor.execute(GROUND_SPAWNS_QUERY)
+                keys = ('item_id', 'spawn_id', 'max_x', 'max_y', 'max_z', 'respawn_timer', 'zone_short', 'zone_name')
+                for row in cursor.fetchall():
+                    item_id, spawn_id, x, y, z, respawn_timer, zone, zone_name = _row_values(row, keys)
+                    bucket(item_id, 'g').append([
+                        spawn_id, _json_number(x), _json_number(y), _json_number(z),
+                        respawn_timer, zone_index(zone, zone_name)
+                    ])
+                cursor.execute("SELECT DISTINCT item FROM ground_spawns")
+                for row in cursor.fetchall():
+                    mark(_row_values(row, ('item',))[0], 'ground_spawns')
+
+            if table_exists('forage'):
+                cursor.execute(FORAGE_SOURCES_QUERY)
+                keys = ('item_id', 'zone_short', 'zone_name', 'chance', 'level')
+                for row in cursor.fetchall():
+                    item_id, zone, zone_name, chance, level = _row_values(row, keys)
+                    bucket(item_id, 'f').append([zone_index(zone, zone_name), _json_number(chance), level])
+                cursor.execute("SELECT DISTINCT itemid FROM forage")
+                for row in cursor.fetchall():
+                    mark(_row_values(row, ('itemid',))[0], 'forage_sources')
+
+            if table_exists('tradeskill_recipe_entries'):
+                cursor.execute("""
+                    SELECT item_id,
+                           MAX(componentcount > 0) as used_in_recipe,
+                           MAX(successcount > 0) as created_by_recipe
+                    FROM tradeskill_recipe_entries
+                    GROUP BY item_id
+                """)
+                keys = ('item_id', 'used_in_recipe', 'created_by_recipe')
+                for row in cursor.fetchall():
+                    item_id, used, created = _row_values(row, keys)
+                    if used:
+                        mark(item_id, 'tradeskill_recipes')
+                    if created:
+                        mark(item_id, 'created_by_recipes')
+        finally:
+            cursor.close()
+
+        # Pre-sort each listing the way the per-item queries order them
+        def zone_name_of(idx):
+            return zones[idx][1] or ''
+
+        for sources in items.values():
+            if 'd' in sources:
+                sources['d'].sort(key=lambda r: (zone_name_of(r[1]), npcs.get(r[0]) or ''))
+                del sources['d'][MAX_ROWS_PER_ITEM:]
+            if 'm' in sources:
+                sources['m'].sort(key=lambda r: (zone_name_of(r[2]), npcs.get(r[0]) or ''))
+                del sources['m'][MAX_ROWS_PER_ITEM:]
+            if 'g' in sources:
+                sources['g'].sort(key=lambda r: (zone_name_of(r[5]), r[1] or 0, r[2] or 0))
+                del sources['g'][MAX_ROWS_PER_ITEM:]
+            if 'f' in sources:
+                sources['f'].sort(key=lambda r: zone_name_of(r[0]))
+
+        with self._lock:
+            self._zones = zones
+            self._npcs = npcs
+            self._items = items
+            self._flags = flags
+            self._tables = tables
+            self.built_at = time.time()
+            self.build_seconds = round(self.built_at - start, 2)
+            self.version_tag = version_tag
+            self.last_error = None
+
+        logger.info(f"Item source index built: {len(items)} items with sources, "
+                    f"{len(npcs)} NPCs, {len(zones)} zones in {self.build_seconds}s")
+
+    def build_in_background(self, connection_factory, version_tag=None):
+        """
+        Rebuild the index in a daemon thread unless a build is already running.
+
+        Args:
+            connection_factory: Callable returning (conn, db_type, error), e.g. get_eqemu_db_connection
+            version_tag: Identifier of the content database
+        """
+        with self._lock:
+            if self._build_thread and self._build_thread.is_alive():
+                return False
+            if time.time() - self._last_build_attempt < ITEM_SOURCE_INDEX_RETRY_SECONDS:
+                return False
+            self._last_build_attempt = time.time()
+            self._build_thread = threading.Thread(
+                target=self._build_worker, args=(connection_factory, version_tag),
+                name='item-source-index-build', daemon=True
+            )
+            self._build_thread.start()
+        return True
+
+    def _build_worker(self, connection_factory, version_tag):
+        conn = None
+        try:
+            conn, db_type, error = connection_factory()
+            if not conn:
+                raise Exception(error or 'Database not configured')
+            self.build(conn, version_tag, get_schema_registry().get(conn, version_tag, db_type))
+            self.save()
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Failed to build item source index: {e}")
+        finally:
+            if conn:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def invalidate(self):
+        """Discard the index (content database changed)."""
+        with self._lock:
+            self._reset()
+            self._last_build_attempt = 0
+        logger.info("Item source index invalidated")
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def save(self):
+        """Write the index to disk atomically."""
+        with self._lock:
+            payload = {
+                'format': INDEX_FORMAT_VERSION,
+                'built_at': self.built_at,
+                'build_seconds': self.build_seconds,
+                'version_tag': self.version_tag,
+                'tables': self._tables,
+                'zones': self._zones,
+                'npcs': {str(k): v for k, v in self._npcs.items()},
+                'items': {str(k): v for k, v in self._items.items()},
+                'flags': {str(k): v for k, v in self._flags.items()}
+            }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+        logger.info(f"Item source index saved to {self.path}")
+
+    def load(self):
+        """
+        Load a previously saved index.
+
+        Returns:
+            True if an index was loaded
+        """
+        self._loaded_from_disk = True
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload.get('format') != INDEX_FORMAT_VERSION:
+                logger.info("Item source index on disk uses an old format, ignoring it")
+                return False
+            with self._lock:
+                self._zones = payload['zones']
+                self._npcs = {int(k): v for k, v in payload['npcs'].items()}
+                self._items = {int(k): v for k, v in payload['items'].items()}
+                self._flags = {int(k): v for k, v in payload['flags'].items()}
+                self._tables = payload.get('tables', {})
+                self.built_at = payload['built_at']
+                self.build_seconds = payload.get('build_seconds')
+                self.version_tag = payload.get('version_tag')
+            logger.info(f"Loaded item source index from {self.path} ({len(self._items)} items)")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to load item source index from {self.path}: {e}")
+            return False
+
+    def ensure_fresh(self, connection_factory, version_tag=None):
+        """
+        Make sure the index is usable, scheduling a background rebuild if not.
+
+        Loads the persisted index on first use. Never blocks on a rebuild.
+
+        Returns:
+            True if lookups can be served from the index right now
+        """
+        if not self._loaded_from_disk and not self.ready:
+            self.load()
+        if self.ready and version_tag is not None and self.version_tag != version_tag:
+            # Built from a different database - never serve it
+            self.invalidate()
+        if not self.is_fresh(version_tag):
+            self.build_in_background(connection_factory, version_tag)
+        return self.ready
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def _zone(self, idx):
+        return self._zones[idx]
+
+    def has_table(self, name):
+        """Whether a source table existed when the index was built."""
+        return self._tables.get(name, False)
+
+    def availability(self, item_id):
+        """Get the availability flags dict for an item (0/1 per source)."""
+        bits = self._flags.get(int(item_id), 0)
+        return {name: 1 if bits & _FLAG_BITS[name] else 0 for name in AVAILABILITY_FLAGS}
+
+    def availability_bits(self, item_id):
+        """Get the availability bitmap for an item (bit order: AVAILABILITY_FLAGS)."""
+        return self._flags.get(int(item_id), 0)
+
+    def drop_rows(self, item_id):
+        """Drop source rows shaped like the drop-sources query results."""
+        rows = []
+        for npc_id, zone_idx, multiplier, probability, chance in self._items.get(int(item_id), {}).get('d', ()):
+            zone_short, zone_name = self._zone(zone_idx)
+            rows.append({
+                'npc_id': npc_id,
+                'npc_name': self._npcs.get(npc_id, ''),
+                'zone': zone_short,
+                'zone_name': zone_name,
+                'multiplier': multiplier,
+                'probability': probability,
+                'chance': chance
+            })
+        return rows
+
+    def merchant_rows(self, item_id):
+        """Merchant rows shaped like the merchant-sources query results."""
+        rows = []
+        for npc_id, npc_class, zone_idx, slot, price, sellrate in self._items.get(int(item_id), {}).get('m', ()):
+            zone_short, zone_name = self._zone(zone_idx)
+            rows.append({
+                'npc_id': npc_id,
+                'npc_name': self._npcs.get(npc_id, ''),
+                'npc_class': npc_class,
+                'zone': zone_short,
+                'zone_name': zone_name,
+                'merchant_slot': slot,
+                'item_base_price': price,
+                'merchant_sellrate': sellrate
+            })
+        return rows
+
+    def ground_spawn_rows(self, item_id):
+        """Ground spawn rows shaped like the ground-spawns query results."""
+        rows = []
+        for spawn_id, x, y, z, respawn_timer, zone_idx in self._items.get(int(item_id), {}).get('g', ()):
+            zone_short, zone_name = self._zone(zone_idx)
+            rows.append({
+                'spawn_id': spawn_id,
+                'max_x': x,
+                'max_y': y,
+                'max_z': z,
+                'respawn_timer': respawn_timer,
+                'zone_short': zone_short,
+                'zone_name': zone_name
+            })
+        return rows
+
+    def forage_rows(self, item_id):
+        """Forage rows shaped like the forage-sources query results."""
+        rows = []
+        for zone_idx, chance, level in self._items.get(int(item_id), {}).get('f', ()):
+            zone_short, zone_name = self._zone(zone_idx)
+            rows.append({
+                'zone_short': zone_short,
+                'zone_name': zone_name,
+                'chance': chance,
+                'level': level
+            })
+        return rows
+
+    def get_status(self):
+        """Get build/freshness information for admin pages."""
+        with self._lock:
+            building = bool(self._build_thread and self._build_thread.is_alive())
+            return {
+                'ready': self.ready,
+                'building': building,
+                'built_at': self.built_at,
+                'age_seconds': round(time.time() - self.built_at, 1) if self.built_at else None,
+                'build_seconds': self.build_seconds,
+                'items_with_sources': len(self._items),
+                'items_with_flags': len(self._flags),
+                'npcs': len(self._npcs),
+                'zones': len(self._zones),
+                'path': self.path,
+                'last_error': self.last_error
+            }
+
+
+# Global instance
+_item_source_index = None
+_item_source_index_lock = threading.Lock()
+
+
+def get_item_source_index():
+    """Get the singleton item source index."""
+    global _item_source_index
+    if _item_source_index is None:
+        with _item_source_index_lock:
+            if _item_source_index is None:
+                _item_source_index = ItemSourceIndex()
+    return _item_source_index
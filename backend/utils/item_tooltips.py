@@ -0,0 +1,163 @@
+"""
+Item tooltip row service.
+
+Tooltips are requested constantly (hovering inventories, item links) and the
+underlying items rows only change with the content database, so rows are
+kept in an id-keyed LRU cache. A bulk request only asks the database for the
+ids that missed, in chunked IN (...) queries on one connection, and rows
+come back in the order the ids were requested. Ids that don't exist are
+remembered too, so repeated misses don't reach the database either.
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+ITEM_TOOLTIP_CACHE_MAX_ENTRIES = int(os.environ.get('ITEM_TOOLTIP_CACHE_MAX_ENTRIES', '20000'))
+# Ids per IN (...) query
+ITEM_TOOLTIP_CHUNK_SIZE = 200
+# Largest bulk request accepted by the routes
+ITEM_TOOLTIP_MAX_IDS = 500
+
+# Following Char Browser column selection
+TOOLTIP_COLUMNS = """
+    id, Name, icon, ac, hp, mana, endur, attack, damage, delay,
+    weight, astr, asta, aagi, adex, awis, aint, acha,
+    pr, mr, fr, cr, dr, svcorruption,
+    classes, races, deity, slots, itemtype, price,
+    magic, nodrop, lore, stacksize, material, color
+"""
+
+TOOLTIP_QUERY = f"""
+    SELECT {TOOLTIP_COLUMNS}
+    FROM items
+    WHERE id IN ({{placeholders}})
+"""
+
+# Cached marker for ids the items table doesn't have
+_MISSING = object()
+
+
+class ItemTooltipService:
+    """LRU-cached, order-preserving item row lookups for tooltips."""
+
+    def __init__(self, max_entries=ITEM_TOOLTIP_CACHE_MAX_ENTRIES, chunk_size=ITEM_TOOLTIP_CHUNK_SIZE):
+        self.max_entries = max_entries
+        self.chunk_size = chunk_size
+        # item_id -> row dict (or _MISSING)
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'queries': 0}
+
+    def _lookup(self, item_ids):
+        """Split ids into cached rows and ids that need a query."""
+        cached = {}
+        missing = []
+        with self._lock:
+            for item_id in item_ids:
+                row = self._rows.get(item_id)
+                if row is None:
+                    missing.append(item_id)
+                else:
+                    self._rows.move_to_end(item_id)
+                    cached[item_id] = row
+            self._stats['hits'] += len(cached)
+            self._stats['misses'] += len(missing)
+        return cached, missing
+
+    def _store(self, rows):
+        with self._lock:
+            for item_id, row in rows.items():
+                self._rows[item_id] = row
+                self._rows.move_to_end(item_id)
+            while len(self._rows) > self.max_entries:
+                self._rows.popitem(last=False)
+
+    def _query(self, conn, item_ids):
+        """Fetch rows for ids in chunked IN (...) queries on one connection."""
+        found = {}
+        cursor = conn.cursor()
+        try:
+            for start in range(0, len(item_ids), self.chunk_size):
+                chunk = item_ids[start:start + self.chunk_size]
+                cursor.execute(TOOLTIP_QUERY.format(placeholders=', '.join(['%s'] * len(chunk))), chunk)
+                rows = cursor.fetchall()
+                if rows and not isinstance(rows[0], dict):
+                    columns = [desc[0] for desc in cursor.description]
+                    rows = [dict(zip(columns, row)) for row in rows]
+                for row in rows:
+                    found[int(row['id'])] = dict(row)
+                with self._lock:
+                    self._stats['queries'] += 1
+        finally:
+            cursor.close()
+        return found
+
+    def get_rows(self, item_ids, connection_factory):
+        """
+        Get tooltip rows for items, querying only the ids not cached yet.
+
+        Args:
+            item_ids: Item ids in the order the caller wants them back
+            connection_factory: Callable returning (conn, db_type, error) like
+                get_eqemu_db_connection; only called when something missed
+
+        Returns:
+            List of row dicts in request order (duplicates and unknown ids skipped)
+
+        Raises:
+            ConnectionError: If a connection is needed but can't be borrowed
+        """
+        ordered_ids = list(dict.fromkeys(int(item_id) for item_id in item_ids))
+        cached, missing = self._lookup(ordered_ids)
+
+        if missing:
+            conn, _, error = connection_factory()
+            if not conn:
+                raise ConnectionError(error or 'Database not configured')
+            try:
+                found = self._query(conn, missing)
+            finally:
+                conn.close()
+            fetched = {item_id: found.get(item_id, _MISSING) for item_id in missing}
+            self._store(fetched)
+            cached.update(fetched)
+
+        return [cached[item_id] for item_id in ordered_ids if cached[item_id] is not _MISSING]
+
+    def get_row(self, item_id, connection_factory):
+        """Get one item's tooltip row (None if the item doesn't exist)."""
+        rows = self.get_rows([item_id], connection_factory)
+        return rows[0] if rows else None
+
+    def invalidate_all(self):
+        """Drop every cached row (content database changed)."""
+        with self._lock:
+            self._rows.clear()
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(
+                self._stats,
+                entries=len(self._rows),
+                hit_rate=round(self._stats['hits'] / lookups * 100, 2) if lookups else 0
+            )
+
+
+# Global instance
+_item_tooltip_service = None
+_item_tooltip_service_lock = threading.Lock()
+
+
+def get_item_tooltip_service():
+    """Get the singleton item tooltip service."""
+    global _item_tooltip_service
+    if _item_tooltip_service is None:
+        with _item_tooltip_service_lock:
+            if _item_tooltip_service is None:
+                _item_tooltip_service = ItemTooltipService()
+    return _item_tooltip_service
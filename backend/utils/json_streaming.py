@@ -0,0 +1,72 @@
+"""
+Streaming JSON responses for large list endpoints.
+
+jsonify() builds every row dict and then the whole encoded body in memory
+before the first byte is sent. stream_json_list() instead writes the
+object's leading fields, then the list rows in small batches as the cursor
+fetches them, then trailing fields (such as the row count) that are only
+known at the end. The output is one ordinary JSON object, so clients don't
+need to change.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from the cursor and encoded per yielded chunk
+JSON_STREAM_BATCH_SIZE = 100
+
+
+def iter_cursor_rows(cursor, batch_size=JSON_STREAM_BATCH_SIZE):
+    """Yield rows from an executed cursor with fetchmany()."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def stream_json_list(head, list_key, rows, tail=None, dumps=None, batch_size=JSON_STREAM_BATCH_SIZE):
+    """
+    Encode {**head, list_key: [rows...], **tail()} incrementally.
+
+    Args:
+        head: Dict of fields written before the list
+        list_key: Name of the list field
+        rows: Iterable of JSON-serializable rows (consumed lazily)
+        tail: Optional callable returning fields written after the list; it
+            runs once every row has been produced
+        dumps: JSON encoder for values (defaults to flask.json.dumps)
+        batch_size: Rows encoded per yielded chunk
+
+    Yields:
+        UTF-8 encoded chunks of the JSON object
+    """
+    if dumps is None:
+        from flask import json as flask_json
+        dumps = flask_json.dumps
+
+    def fields(values):
+        return ''.join(f'{dumps(key)}:{dumps(value)},' for key, value in values.items())
+
+    yield ('{' + fields(head) + f'{dumps(list_key)}:[').encode('utf-8')
+
+    batch = []
+    first = True
+    for row in rows:
+        batch.append(dumps(row))
+        if len(batch) >= batch_size:
+            yield (('' if first else ',') + ','.join(batch)).encode('utf-8')
+            first = False
+            batch = []
+    if batch:
+        yield (('' if first else ',') + ','.join(batch)).encode('utf-8')
+
+    trailing = fields(tail() if tail else {})
+    yield (']' + (',' + trailing[:-1] if trailing else '') + '}').encode('utf-8')
+
+
+def streamed_json_response(chunks):
+    """Wrap stream_json_list() output in a streamed application/json response."""
+    from flask import Response, stream_with_context
+    return Response(stream_with_context(chunks), mimetype='application/json')
@@ -0,0 +1,111 @@
+"""
+Fixed-bucket latency histograms.
+
+Averages hide tail latency: one endpoint answering most requests in 5ms and
+a few in 2s averages out to something that looks fine. LatencyHistogram
+counts samples in log-linear buckets (HDR histogram style): every power of
+two is split into LATENCY_SUB_BUCKETS equal buckets, so a reported
+percentile is within 1/LATENCY_SUB_BUCKETS of the true value across the
+whole range from LATENCY_UNIT_MS up to minutes. Recording is a single
+index computation and increment; percentiles walk the buckets once.
+
+Bucket indexes are stable, so histograms from different processes and time
+windows merge by adding counts (the metrics store keeps them per minute).
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Smallest distinguishable latency (10 microseconds)
+LATENCY_UNIT_MS = 0.01
+# Buckets per power of two; 16 keeps the relative error at 1/16 (6.25%)
+LATENCY_SUB_BUCKET_BITS = 4
+LATENCY_SUB_BUCKETS = 1 << LATENCY_SUB_BUCKET_BITS
+# Largest bucket exponent; samples of 2**28 units (~45 minutes) or more share the last bucket
+LATENCY_MAX_EXPONENT = 28 - LATENCY_SUB_BUCKET_BITS - 1
+LATENCY_BUCKET_COUNT = LATENCY_SUB_BUCKETS * (LATENCY_MAX_EXPONENT + 2)
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+def bucket_index(value_ms):
+    """Get the bucket index for a latency in milliseconds."""
+    units = int(value_ms / LATENCY_UNIT_MS) if value_ms > 0 else 0
+    if units < LATENCY_SUB_BUCKETS:
+        return units
+    exponent = units.bit_length() - LATENCY_SUB_BUCKET_BITS - 1
+    if exponent > LATENCY_MAX_EXPONENT:
+        return LATENCY_BUCKET_COUNT - 1
+    # units >> exponent is in [SUB_BUCKETS, 2 * SUB_BUCKETS)
+    return LATENCY_SUB_BUCKETS * (exponent + 1) + (units >> exponent) - LATENCY_SUB_BUCKETS
+
+
+def bucket_upper_ms(index):
+    """Get the highest latency (ms) that falls in a bucket."""
+    if index < LATENCY_SUB_BUCKETS:
+        return (index + 1) * LATENCY_UNIT_MS
+    exponent = index // LATENCY_SUB_BUCKETS - 1
+    sub = index % LATENCY_SUB_BUCKETS + LATENCY_SUB_BUCKETS
+    return ((sub + 1) << exponent) * LATENCY_UNIT_MS
+
+
+class LatencyHistogram:
+    """Counts of latency samples per bucket, plus the exact maximum."""
+
+    __slots__ = ('counts', 'total', 'max_ms')
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.max_ms = 0.0
+
+    def record(self, value_ms, count=1):
+        index = bucket_index(value_ms)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+        if value_ms > self.max_ms:
+            self.max_ms = float(value_ms)
+
+    def add_bucket(self, index, count):
+        """Add counts for a bucket (when loading stored or merged histograms)."""
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total += count
+
+    def merge(self, other):
+        for index, count in other.counts.items():
+            self.add_bucket(index, count)
+        self.max_ms = max(self.max_ms, other.max_ms)
+        return self
+
+    def percentile(self, percent):
+        """
+        Get the latency at or below which `percent` of samples fall.
+
+        Returns:
+            Bucket upper bound in ms (capped at the recorded maximum), or None if empty
+        """
+        if not self.total:
+            return None
+        target = max(1, -(-self.total * percent // 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                value = bucket_upper_ms(index)
+                return min(value, self.max_ms) if self.max_ms else value
+        return self.max_ms
+
+    def summary(self, percentiles=DEFAULT_PERCENTILES):
+        """
+        Get count, percentiles and max, rounded to 0.01ms.
+
+        Returns:
+            Dict like {'count': 120, 'p50': 4.2, 'p90': 11.0, 'p99': 48.5, 'max': 52.1}
+        """
+        result = {'count': self.total}
+        for percent in percentiles:
+            value = self.percentile(percent)
+            result[f'p{percent}'] = round(value, 2) if value is not None else None
+        result['max'] = round(self.max_ms, 2) if self.total else None
+        return result
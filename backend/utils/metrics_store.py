@@ -0,0 +1,751 @@
+"""
+Request and query metrics shared by every worker process.
+
+track_endpoint_metric and track_database_query used to update dicts in the
+admin module, so each gunicorn worker only saw its own traffic and the
+admin dashboard reported whichever worker happened to serve it.
+MetricsStore buffers increments in process (under a lock) and a background
+thread per process folds them into a small SQLite database in WAL mode every
+few seconds, so request threads never wait on SQLite. Reads flush the local
+buffer first and then aggregate across all workers.
+
+Connections and the flush thread are started lazily and again after a fork,
+so importing the app in the gunicorn master (--preload) is safe. If the database file can't
+be opened the store falls back to an in-memory database and reports only
+this process.
+
+Request and query latencies are also kept as fixed-bucket histograms (see
+latency_histogram) per endpoint and per table, in one-minute slots, so the
+admin views can report p50/p90/p99/max over a rolling window.
+
+Each distinct statement shape (see sql_fingerprint) gets a query profile,
+much like a pg_stat_statements row: calls, total/min/max time, rows, the
+endpoints that issued it, and its own latency histogram. Profiles can also
+carry the EXPLAIN plan the explain_sampler captured for the statement.
+"""
+
+import os
+import json
+import time
+import atexit
+import sqlite3
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+
+from utils.latency_histogram import LatencyHistogram, bucket_index
+
+logger = logging.getLogger(__name__)
+
+METRICS_DB_PATH = os.environ.get(
+    'METRICS_DB_PATH',
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'metrics', 'metrics.db')
+)
+# Seconds between background flushes (0 = only flush on reads and at exit)
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', '2'))
+# Workers that haven't flushed for this long are not counted as active
+METRICS_WORKER_STALE_SECONDS = 300
+# Ring sizes, matching the in-process deques they replace
+RESPONSE_TIME_SAMPLES = 1000
+QUERY_TIME_SAMPLES = 100
+SLOW_QUERY_SAMPLES = 20
+TIMELINE_HOURS = 168
+# Latency histogram slot length and how long slots are kept
+LATENCY_SLOT_SECONDS = 60
+LATENCY_RETENTION_SECONDS = int(os.environ.get('METRICS_LATENCY_RETENTION_SECONDS', '86400'))
+# Rolling windows the admin views can ask for
+LATENCY_WINDOWS = {'5m': 300, '1h': 3600, '24h': 86400}
+# Query profiles kept; beyond this the ones with the least total time are dropped
+QUERY_PROFILE_MAX = int(os.environ.get('METRICS_QUERY_PROFILE_MAX', '2000'))
+QUERY_PROFILE_SORTS = {
+    'total_time': 'total_ms',
+    'calls': 'calls',
+    'mean_time': 'total_ms / calls',
+    'max_time': 'max_ms',
+    'rows': 'rows'
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS endpoint_stats (
+    endpoint TEXT PRIMARY KEY,
+    total_calls INTEGER NOT NULL DEFAULT 0,
+    total_time REAL NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    last_called REAL
+);
+CREATE TABLE IF NOT EXISTS samples (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, value REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS samples_kind ON samples (kind, id);
+CREATE TABLE IF NOT EXISTS counters (
+    kind TEXT NOT NULL, name TEXT NOT NULL, value INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, name)
+);
+CREATE TABLE IF NOT EXISTS slow_queries (id INTEGER PRIMARY KEY AUTOINCREMENT, entry TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS timeline (
+    hour TEXT NOT NULL, table_name TEXT NOT NULL, count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (hour, table_name)
+);
+CREATE TABLE IF NOT EXISTS workers (pid INTEGER PRIMARY KEY, started_at REAL, last_seen REAL);
+CREATE TABLE IF NOT EXISTS latency (
+    kind TEXT NOT NULL, name TEXT NOT NULL, slot INTEGER NOT NULL, bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, name, slot, bucket)
+);
+CREATE TABLE IF NOT EXISTS latency_max (
+    kind TEXT NOT NULL, name TEXT NOT NULL, slot INTEGER NOT NULL, max_ms REAL NOT NULL,
+    PRIMARY KEY (kind, name, slot)
+);
+CREATE INDEX IF NOT EXISTS latency_slot ON latency (slot);
+CREATE TABLE IF NOT EXISTS query_profiles (
+    fingerprint TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    query_type TEXT,
+    tables TEXT,
+    calls INTEGER NOT NULL DEFAULT 0,
+    total_ms REAL NOT NULL DEFAULT 0,
+    min_ms REAL,
+    max_ms REAL,
+    rows INTEGER NOT NULL DEFAULT 0,
+    first_seen REAL,
+    last_seen REAL
+);
+CREATE TABLE IF NOT EXISTS query_profile_endpoints (
+    fingerprint TEXT NOT NULL, endpoint TEXT NOT NULL, calls INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (fingerprint, endpoint)
+);
+CREATE TABLE IF NOT EXISTS query_plans (
+    fingerprint TEXT PRIMARY KEY,
+    plan TEXT NOT NULL,
+    analysis TEXT NOT NULL,
+    query_ms REAL,
+    captured_at REAL NOT NULL
+);
+"""
+
+# Timeline rows with this table name hold the hour's total
+TIMELINE_TOTAL = ''
+
+
+def _current_slot(now=None):
+    return int((now if now is not None else time.time()) // LATENCY_SLOT_SECONDS)
+
+
+def _current_hour():
+    return datetime.now().replace(minute=0, second=0, microsecond=0).isoformat()
+
+
+class _PendingMetrics:
+    """Metrics recorded in this process since the last flush."""
+
+    def __init__(self):
+        self.endpoints = {}
+        self.response_times = []
+        self.query_times = []
+        self.counters = Counter()
+        self.slow_queries = []
+        self.timeline = Counter()
+        self.latency = Counter()
+        self.latency_max = {}
+        self.profiles = {}
+        self.profile_endpoints = Counter()
+
+    def __bool__(self):
+        return bool(self.endpoints or self.counters or self.latency)
+
+    def merge(self, newer):
+        """Fold a newer buffer into this one (puts back a batch that failed to write)."""
+        for endpoint, (calls, total, errors, last) in newer.endpoints.items():
+            stats = self.endpoints.setdefault(endpoint, [0, 0.0, 0, None])
+            stats[0] += calls
+            stats[1] += total
+            stats[2] += errors
+            stats[3] = last
+        self.response_times += newer.response_times
+        self.query_times += newer.query_times
+        self.slow_queries += newer.slow_queries
+        self.counters.update(newer.counters)
+        self.timeline.update(newer.timeline)
+        self.latency.update(newer.latency)
+        self.profile_endpoints.update(newer.profile_endpoints)
+        for key, value in newer.latency_max.items():
+            self.latency_max[key] = max(value, self.latency_max.get(key, value))
+        for key, newer_profile in newer.profiles.items():
+            profile = self.profiles.setdefault(key, newer_profile)
+            if profile is not newer_profile:
+                profile['calls'] += newer_profile['calls']
+                profile['total_ms'] += newer_profile['total_ms']
+                profile['min_ms'] = min(profile['min_ms'], newer_profile['min_ms'])
+                profile['max_ms'] = max(profile['max_ms'], newer_profile['max_ms'])
+                profile['rows'] += newer_profile['rows']
+                profile['last_seen'] = newer_profile['last_seen']
+        # Keep the buffer bounded while the store is unavailable
+        del self.response_times[:-RESPONSE_TIME_SAMPLES]
+        del self.query_times[:-QUERY_TIME_SAMPLES]
+        del self.slow_queries[:-SLOW_QUERY_SAMPLES]
+
+
+class MetricsStore:
+    """Per-process buffer over a SQLite aggregate shared by all workers."""
+
+    def __init__(self, path=METRICS_DB_PATH, flush_seconds=METRICS_FLUSH_SECONDS):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.shared = path != ':memory:'
+        # _lock guards the buffer and is never held across SQLite calls;
+        # _db_lock guards the connection. Take _db_lock first when both are needed.
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = None
+        self._flusher = None
+        self._pid = os.getpid()
+        self._started_at = time.time()
+        self._last_prune_slot = None
+        self._pending = _PendingMetrics()
+
+    def _record_latency(self, kind, name, value_ms):
+        """Buffer one latency sample. Caller holds the lock."""
+        slot = _current_slot()
+        self._pending.latency[(kind, name, slot, bucket_index(value_ms))] += 1
+        key = (kind, name, slot)
+        if value_ms > self._pending.latency_max.get(key, -1.0):
+            self._pending.latency_max[key] = float(value_ms)
+
+    def _check_fork(self):
+        """Drop state inherited from a parent process. Caller holds the lock."""
+        if self._pid != os.getpid():
+            # The parent's buffer, connection and flush thread are not ours
+            self._pending = _PendingMetrics()
+            self._started_at = time.time()
+            self._conn = None
+            self._flusher = None
+            self._pid = os.getpid()
+
+    def _after_fork(self):
+        """Replace locks a parent thread may have held at fork time."""
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+
+    def _start_flusher(self):
+        """Start this process's background flush thread. Caller holds the lock."""
+        if self._flusher is not None or self.flush_seconds <= 0:
+            return
+        self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush_pending()
+            except Exception as e:
+                logger.warning(f"Background metrics flush failed: {e}")
+
+    def _connection(self):
+        """Get this process's connection, opening it on first use. Caller holds _db_lock."""
+        with self._lock:
+            self._check_fork()
+        if self._conn is not None:
+            return self._conn
+        if self.shared:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._conn = self._open(self.path)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Metrics store {self.path} unavailable, using per-process metrics: {e}")
+                self.shared = False
+        if self._conn is None:
+            self._conn = self._open(':memory:')
+        return self._conn
+
+    @staticmethod
+    def _open(path):
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        if path != ':memory:':
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(SCHEMA)
+        conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('stats_since', ?)", (repr(time.time()),)
+        )
+        return conn
+
+    def record_request(self, endpoint, response_time, is_error=False):
+        """Buffer one request's timing (milliseconds)."""
+        with self._lock:
+            self._check_fork()
+            self._start_flusher()
+            stats = self._pending.endpoints.setdefault(endpoint, [0, 0.0, 0, None])
+            stats[0] += 1
+            stats[1] += response_time
+            stats[2] += 1 if is_error else 0
+            stats[3] = time.time()
+            self._pending.response_times.append(response_time)
+            self._record_latency('endpoint', endpoint, response_time)
+
+    def record_query(self, execution_time, query_type, table_name=None, slow_entry=None,
+                     fingerprint=None, rows=None, source_endpoint=None):
+        """
+        Buffer one database query.
+
+        Args:
+            execution_time: Milliseconds
+            query_type: SELECT, INSERT, ...
+            table_name: Lowercase table name, if known
+            slow_entry: JSON-serializable details when the query was slow
+            fingerprint: sql_fingerprint.Fingerprint of the statement, to update its profile
+            rows: Rows returned or affected, if known
+            source_endpoint: Name of the endpoint that issued the query
+        """
+        with self._lock:
+            self._check_fork()
+            self._start_flusher()
+            pending = self._pending
+            pending.counters[('db', 'total_queries')] += 1
+            pending.counters[('query_type', query_type)] += 1
+            pending.query_times.append(execution_time)
+            hour = _current_hour()
+            pending.timeline[(hour, TIMELINE_TOTAL)] += 1
+            if table_name:
+                pending.counters[('table', table_name)] += 1
+                pending.timeline[(hour, table_name)] += 1
+                self._record_latency('table', table_name, execution_time)
+            if slow_entry is not None:
+                pending.slow_queries.append(json.dumps(slow_entry, default=str))
+            if fingerprint is not None:
+                self._record_profile(fingerprint, execution_time, rows, source_endpoint)
+
+    def _record_profile(self, fingerprint, execution_time, rows, source_endpoint):
+        """Buffer one execution of a statement. Caller holds the lock."""
+        now = time.time()
+        profile = self._pending.profiles.get(fingerprint.id)
+        if profile is None:
+            profile = self._pending.profiles[fingerprint.id] = {
+                'query': fingerprint.normalized,
+                'query_type': fingerprint.query_type,
+                'tables': json.dumps(list(fingerprint.tables)),
+                'calls': 0, 'total_ms': 0.0, 'min_ms': execution_time, 'max_ms': execution_time,
+                'rows': 0, 'first_seen': now
+            }
+        profile['calls'] += 1
+        profile['total_ms'] += execution_time
+        profile['min_ms'] = min(profile['min_ms'], execution_time)
+        profile['max_ms'] = max(profile['max_ms'], execution_time)
+        profile['rows'] += rows or 0
+        profile['last_seen'] = now
+        if source_endpoint:
+            self._pending.profile_endpoints[(fingerprint.id, source_endpoint)] += 1
+        self._record_latency('query', fingerprint.id, execution_time)
+
+    def flush(self):
+        """Write this process's buffered metrics to the shared store."""
+        with self._db_lock:
+            self._flush()
+
+    def flush_pending(self):
+        """Flush only if something is buffered (background thread and exit)."""
+        with self._db_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+            self._flush()
+
+    def _flush(self):
+        """Write the buffer. Caller holds _db_lock; _lock is only taken to swap the buffer out."""
+        conn = self._connection()
+        with self._lock:
+            pending, self._pending = self._pending, _PendingMetrics()
+        now = time.time()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(
+                    'INSERT INTO endpoint_stats (endpoint, total_calls, total_time, errors, last_called) '
+                    'VALUES (?, ?, ?, ?, ?) ON CONFLICT (endpoint) DO UPDATE SET '
+                    'total_calls = total_calls + excluded.total_calls, '
+                    'total_time = total_time + excluded.total_time, '
+                    'errors = errors + excluded.errors, '
+                    'last_called = MAX(COALESCE(last_called, 0), excluded.last_called)',
+                    [(endpoint, *stats) for endpoint, stats in pending.endpoints.items()]
+                )
+                conn.executemany(
+                    'INSERT INTO counters (kind, name, value) VALUES (?, ?, ?) '
+                    'ON CONFLICT (kind, name) DO UPDATE SET value = value + excluded.value',
+                    [(kind, name, value) for (kind, name), value in pending.counters.items()]
+                )
+                conn.executemany(
+                    'INSERT INTO timeline (hour, table_name, count) VALUES (?, ?, ?) '
+                    'ON CONFLICT (hour, table_name) DO UPDATE SET count = count + excluded.count',
+                    [(hour, table, count) for (hour, table), count in pending.timeline.items()]
+                )
+                self._append_ring(conn, 'response', pending.response_times, RESPONSE_TIME_SAMPLES)
+                self._append_ring(conn, 'query', pending.query_times, QUERY_TIME_SAMPLES)
+                if pending.slow_queries:
+                    conn.executemany('INSERT INTO slow_queries (entry) VALUES (?)', [(e,) for e in pending.slow_queries])
+                    conn.execute(
+                        'DELETE FROM slow_queries WHERE id <= '
+                        '(SELECT id FROM slow_queries ORDER BY id DESC LIMIT 1 OFFSET ?)', (SLOW_QUERY_SAMPLES,)
+                    )
+                if pending.timeline:
+                    conn.execute(
+                        'DELETE FROM timeline WHERE hour NOT IN '
+                        '(SELECT DISTINCT hour FROM timeline ORDER BY hour DESC LIMIT ?)', (TIMELINE_HOURS,)
+                    )
+                conn.executemany(
+                    'INSERT INTO latency (kind, name, slot, bucket, count) VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT (kind, name, slot, bucket) DO UPDATE SET count = count + excluded.count',
+                    [(*key, count) for key, count in pending.latency.items()]
+                )
+                conn.executemany(
+                    'INSERT INTO latency_max (kind, name, slot, max_ms) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (kind, name, slot) DO UPDATE SET max_ms = MAX(max_ms, excluded.max_ms)',
+                    [(*key, value) for key, value in pending.latency_max.items()]
+                )
+                conn.executemany(
+                    'INSERT INTO query_profiles (fingerprint, query, query_type, tables, calls, total_ms, '
+                    'min_ms, max_ms, rows, first_seen, last_seen) '
+                    'VALUES (:fingerprint, :query, :query_type, :tables, :calls, :total_ms, '
+                    ':min_ms, :max_ms, :rows, :first_seen, :last_seen) '
+                    'ON CONFLICT (fingerprint) DO UPDATE SET '
+                    'calls = calls + excluded.calls, total_ms = total_ms + excluded.total_ms, '
+                    'min_ms = MIN(min_ms, excluded.min_ms), max_ms = MAX(max_ms, excluded.max_ms), '
+                    'rows = rows + excluded.rows, last_seen = MAX(last_seen, excluded.last_seen)',
+                    [dict(profile, fingerprint=key) for key, profile in pending.profiles.items()]
+                )
+                conn.executemany(
+                    'INSERT INTO query_profile_endpoints (fingerprint, endpoint, calls) VALUES (?, ?, ?) '
+                    'ON CONFLICT (fingerprint, endpoint) DO UPDATE SET calls = calls + excluded.calls',
+                    [(*key, count) for key, count in pending.profile_endpoints.items()]
+                )
+                slot = _current_slot(now)
+                if self._last_prune_slot != slot:
+                    self._prune(conn, slot)
+                    self._last_prune_slot = slot
+                conn.execute(
+                    'INSERT INTO workers (pid, started_at, last_seen) VALUES (?, ?, ?) '
+                    'ON CONFLICT (pid) DO UPDATE SET started_at = excluded.started_at, last_seen = excluded.last_seen',
+                    (self._pid, self._started_at, now)
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            # Put the batch back in front of anything recorded since and retry on the next flush
+            logger.warning(f"Failed to flush metrics: {e}")
+            with self._lock:
+                pending.merge(self._pending)
+                self._pending = pending
+
+    @staticmethod
+    def _prune(conn, slot):
+        """Drop expired latency slots and the least costly query profiles over the cap."""
+        oldest = slot - LATENCY_RETENTION_SECONDS // LATENCY_SLOT_SECONDS
+        conn.execute('DELETE FROM latency WHERE slot < ?', (oldest,))
+        conn.execute('DELETE FROM latency_max WHERE slot < ?', (oldest,))
+        conn.execute(
+            'DELETE FROM query_profiles WHERE fingerprint IN (SELECT fingerprint FROM query_profiles '
+            'ORDER BY total_ms DESC LIMIT -1 OFFSET ?)', (QUERY_PROFILE_MAX,)
+        )
+        for table in ('query_profile_endpoints', 'query_plans'):
+            conn.execute(f'DELETE FROM {table} WHERE fingerprint NOT IN (SELECT fingerprint FROM query_profiles)')
+
+    @staticmethod
+    def _append_ring(conn, kind, values, size):
+        if not values:
+            return
+        conn.executemany('INSERT INTO samples (kind, value) VALUES (?, ?)', [(kind, v) for v in values[-size:]])
+        conn.execute(
+            'DELETE FROM samples WHERE kind = ? AND id <= '
+            '(SELECT id FROM samples WHERE kind = ? ORDER BY id DESC LIMIT 1 OFFSET ?)', (kind, kind, size)
+        )
+
+    def seed_database_stats(self, database_stats):
+        """
+        Start a new store from persisted query tracking data.
+
+        Only applies while the store has no query counters yet, so restarting
+        one worker doesn't add the persisted totals again.
+        """
+        with self._db_lock:
+            conn = self._connection()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    if conn.execute("SELECT 1 FROM counters WHERE kind = 'db' LIMIT 1").fetchone() is None:
+                        rows = [('db', 'total_queries', int(database_stats.get('total_queries', 0)))]
+                        rows += [('query_type', k, int(v)) for k, v in database_stats.get('query_types', {}).items()]
+                        rows += [('table', k, int(v)) for k, v in database_stats.get('tables_accessed', {}).items()]
+                        conn.executemany('INSERT INTO counters (kind, name, value) VALUES (?, ?, ?)', rows)
+                        conn.executemany(
+                            "INSERT INTO samples (kind, value) VALUES ('query', ?)",
+                            [(float(v),) for v in list(database_stats.get('query_times', []))[-QUERY_TIME_SAMPLES:]]
+                        )
+                        conn.executemany(
+                            'INSERT INTO slow_queries (entry) VALUES (?)',
+                            [(json.dumps(e, default=str),)
+                             for e in list(database_stats.get('slow_queries', []))[-SLOW_QUERY_SAMPLES:]]
+                        )
+                        for entry in database_stats.get('timeline', []):
+                            hour = entry['timestamp']
+                            rows = [(hour, TIMELINE_TOTAL, int(entry.get('total_queries', 0)))]
+                            rows += [(hour, t, int(c)) for t, c in entry.get('tables', {}).items()]
+                            conn.executemany(
+                                'INSERT OR IGNORE INTO timeline (hour, table_name, count) VALUES (?, ?, ?)', rows
+                            )
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+            except (sqlite3.Error, KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Failed to seed metrics store: {e}")
+
+    def snapshot(self):
+        """
+        Get metrics aggregated across all workers (including this one's buffer).
+
+        Returns:
+            Dict with endpoint_stats, response_times, database and worker info
+        """
+        with self._db_lock:
+            self._flush()
+            conn = self._connection()
+            now = time.time()
+
+            endpoint_stats = {
+                endpoint: {'total_calls': calls, 'total_time': total, 'errors': errors, 'last_called': last}
+                for endpoint, calls, total, errors, last in conn.execute(
+                    'SELECT endpoint, total_calls, total_time, errors, last_called FROM endpoint_stats'
+                )
+            }
+
+            def samples(kind):
+                return [v for (v,) in conn.execute('SELECT value FROM samples WHERE kind = ? ORDER BY id', (kind,))]
+
+            counters = {}
+            for kind, name, value in conn.execute('SELECT kind, name, value FROM counters'):
+                counters.setdefault(kind, {})[name] = value
+
+            timeline = {}
+            for hour, table, count in conn.execute('SELECT hour, table_name, count FROM timeline ORDER BY hour'):
+                entry = timeline.setdefault(hour, {'timestamp': hour, 'total_queries': 0, 'tables': {}})
+                if table == TIMELINE_TOTAL:
+                    entry['total_queries'] = count
+                else:
+                    entry['tables'][table] = count
+
+            workers = [
+                {'pid': pid, 'started_at': started, 'last_seen': seen}
+                for pid, started, seen in conn.execute(
+                    'SELECT pid, started_at, last_seen FROM workers WHERE last_seen >= ? ORDER BY pid',
+                    (now - METRICS_WORKER_STALE_SECONDS,)
+                )
+            ]
+            stats_since = float(conn.execute("SELECT value FROM meta WHERE key = 'stats_since'").fetchone()[0])
+
+            return {
+                'endpoint_stats': endpoint_stats,
+                'response_times': samples('response'),
+                'database': {
+                    'total_queries': counters.get('db', {}).get('total_queries', 0),
+                    'query_times': samples('query'),
+                    'query_types': counters.get('query_type', {}),
+                    'tables_accessed': counters.get('table', {}),
+                    'slow_queries': [
+                        json.loads(entry) for (entry,) in conn.execute('SELECT entry FROM slow_queries ORDER BY id')
+                    ],
+                    'timeline': list(timeline.values())
+                },
+                'stats_since': stats_since,
+                'workers': workers,
+                'shared': self.shared
+            }
+
+    def latency_histograms(self, kind, window_seconds=3600, names=None):
+        """
+        Get latency histograms per endpoint or table over a rolling window,
+        across all workers.
+
+        Args:
+            kind: 'endpoint', 'table' or 'query' (fingerprint ids)
+            window_seconds: How far back to look (rounded to whole slots)
+            names: Optional names to limit the result to
+
+        Returns:
+            Dict of name -> LatencyHistogram
+        """
+        with self._db_lock:
+            self._flush()
+            conn = self._connection()
+            first_slot = _current_slot() - max(1, int(window_seconds // LATENCY_SLOT_SECONDS)) + 1
+            name_filter, params = '', [kind, first_slot]
+            if names is not None:
+                names = list(names)
+                name_filter = f" AND name IN ({','.join('?' * len(names))})"
+                params += names
+            histograms = {}
+            for name, bucket, count in conn.execute(
+                'SELECT name, bucket, SUM(count) FROM latency WHERE kind = ? AND slot >= ?'
+                f'{name_filter} GROUP BY name, bucket', params
+            ):
+                histograms.setdefault(name, LatencyHistogram()).add_bucket(bucket, count)
+            for name, max_ms in conn.execute(
+                f'SELECT name, MAX(max_ms) FROM latency_max WHERE kind = ? AND slot >= ?{name_filter} GROUP BY name',
+                params
+            ):
+                if name in histograms:
+                    histograms[name].max_ms = max_ms
+        return histograms
+
+    def latency_summaries(self, kind, window_seconds=3600):
+        """Get p50/p90/p99/max per endpoint or table (see latency_histograms)."""
+        return {name: h.summary() for name, h in self.latency_histograms(kind, window_seconds).items()}
+
+    def top_queries(self, sort='total_time', limit=20, window_seconds=3600):
+        """
+        Get query profiles across all workers, most expensive first.
+
+        Args:
+            sort: One of QUERY_PROFILE_SORTS
+            limit: Profiles to return
+            window_seconds: Window for the latency percentiles (counts and
+                totals are since the last reset)
+
+        Returns:
+            List of profile dicts with percentiles, top endpoints and share of total query time
+        """
+        order = QUERY_PROFILE_SORTS[sort]
+        with self._db_lock:
+            self._flush()
+            conn = self._connection()
+            columns = ('fingerprint', 'query', 'query_type', 'tables', 'calls', 'total_ms',
+                       'min_ms', 'max_ms', 'rows', 'first_seen', 'last_seen')
+            profiles = [
+                dict(zip(columns, row)) for row in conn.execute(
+                    f'SELECT {", ".join(columns)} FROM query_profiles ORDER BY {order} DESC LIMIT ?', (limit,)
+                )
+            ]
+            total_time = conn.execute('SELECT COALESCE(SUM(total_ms), 0) FROM query_profiles').fetchone()[0]
+            endpoints = {}
+            plans = {}
+            if profiles:
+                ids = [p['fingerprint'] for p in profiles]
+                for fingerprint, endpoint, calls in conn.execute(
+                    'SELECT fingerprint, endpoint, calls FROM query_profile_endpoints '
+                    f"WHERE fingerprint IN ({','.join('?' * len(ids))}) ORDER BY calls DESC", ids
+                ):
+                    endpoints.setdefault(fingerprint, []).append({'endpoint': endpoint, 'calls': calls})
+                plans = {
+                    fingerprint: (json.loads(analysis), captured_at) for fingerprint, analysis, captured_at in conn.execute(
+                        'SELECT fingerprint, analysis, captured_at FROM query_plans '
+                        f"WHERE fingerprint IN ({','.join('?' * len(ids))})", ids
+                    )
+                }
+
+        latency = self.latency_histograms('query', window_seconds, [p['fingerprint'] for p in profiles])
+        for profile in profiles:
+            calls = profile['calls']
+            profile['tables'] = json.loads(profile['tables'] or '[]')
+            profile['mean_ms'] = round(profile['total_ms'] / calls, 2) if calls else 0
+            profile['rows_per_call'] = round(profile['rows'] / calls, 2) if calls else 0
+            profile['percent_of_total'] = round(profile['total_ms'] * 100 / total_time, 2) if total_time else 0
+            profile['total_ms'] = round(profile['total_ms'], 2)
+            profile['endpoints'] = endpoints.get(profile['fingerprint'], [])[:5]
+            histogram = latency.get(profile['fingerprint'])
+            profile['latency'] = histogram.summary() if histogram else None
+            plan = plans.get(profile['fingerprint'])
+            profile['plan'] = dict(plan[0], captured_at=plan[1]) if plan else None
+        return profiles
+
+    def save_query_plan(self, fingerprint, plan, analysis, query_ms=None):
+        """
+        Store the EXPLAIN plan captured for a query profile (replacing any older one).
+
+        Args:
+            fingerprint: Query profile fingerprint id
+            plan: Parsed EXPLAIN FORMAT=JSON output
+            analysis: explain_sampler.analyze_plan() result
+            query_ms: Execution time of the statement that was explained
+        """
+        with self._db_lock:
+            # The profile may still be buffered; write it first so pruning keeps the plan
+            self._flush()
+            self._connection().execute(
+                'INSERT OR REPLACE INTO query_plans (fingerprint, plan, analysis, query_ms, captured_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (fingerprint, json.dumps(plan), json.dumps(analysis), query_ms, time.time())
+            )
+
+    def query_plan_captured_at(self, fingerprint):
+        """Get when a plan was last captured for a fingerprint (epoch seconds), or None."""
+        with self._db_lock:
+            row = self._connection().execute(
+                'SELECT captured_at FROM query_plans WHERE fingerprint = ?', (fingerprint,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_query_plan(self, fingerprint):
+        """
+        Get the stored EXPLAIN plan for a query profile.
+
+        Returns:
+            Dict with query, plan, analysis, query_ms and captured_at, or None
+        """
+        with self._db_lock:
+            self._flush()
+            row = self._connection().execute(
+                'SELECT p.query, q.plan, q.analysis, q.query_ms, q.captured_at FROM query_plans q '
+                'LEFT JOIN query_profiles p ON p.fingerprint = q.fingerprint WHERE q.fingerprint = ?',
+                (fingerprint,)
+            ).fetchone()
+        if row is None:
+            return None
+        query, plan, analysis, query_ms, captured_at = row
+        return {'fingerprint': fingerprint, 'query': query, 'plan': json.loads(plan),
+                'analysis': json.loads(analysis), 'query_ms': query_ms, 'captured_at': captured_at}
+
+    def reset(self):
+        """Clear metrics for every worker."""
+        with self._db_lock:
+            with self._lock:
+                self._pending = _PendingMetrics()
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for table in ('endpoint_stats', 'samples', 'counters', 'slow_queries', 'timeline',
+                              'latency', 'latency_max', 'query_profiles', 'query_profile_endpoints',
+                              'query_plans'):
+                    conn.execute(f'DELETE FROM {table}')
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('stats_since', ?)", (repr(time.time()),))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    def get_status(self):
+        with self._lock:
+            return {
+                'shared': self.shared,
+                'path': self.path if self.shared else None,
+                'flush_seconds': self.flush_seconds,
+                'pending_requests': len(self._pending.response_times),
+                'pending_queries': len(self._pending.query_times)
+            }
+
+
+# Global instance
+_metrics_store = None
+_metrics_store_lock = threading.Lock()
+
+
+def get_metrics_store():
+    """Get the singleton metrics store."""
+    global _metrics_store
+    if _metrics_store is None:
+        with _metrics_store_lock:
+            if _metrics_store is None:
+                _metrics_store = MetricsStore()
+                atexit.register(_metrics_store.flush_pending)
+                if hasattr(os, 'register_at_fork'):
+                    os.register_at_fork(after_in_child=_metrics_store._after_fork)
+    return _metrics_store
@@ -0,0 +1,398 @@
+"""
+In-process name indexes for item, spell and NPC search and typeahead.
+
+`LIKE '%q%'` can't use a B-tree index, so every search keystroke was a full
+table scan (NPC search ORs six of them). These indexes are bulk-loaded from
+the content database in a background thread and answer substring queries
+from memory, returning ranked ids so only the requested page of rows has to
+be fetched from MySQL. A sorted prefix index over the same names (plus
+zones) backs /api/suggest.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from array import array
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+NAME_INDEX_ENABLED = os.environ.get('NAME_INDEX_ENABLED', 'true').lower() == 'true'
+# discovered_items changes as players play, so refresh fairly often
+NAME_INDEX_MAX_AGE_MINUTES = float(os.environ.get('NAME_INDEX_MAX_AGE_MINUTES', '15'))
+# Above this many matches, searches fall back to the SQL LIKE path instead of a huge IN list
+NAME_INDEX_MAX_IN_IDS = int(os.environ.get('NAME_INDEX_MAX_IN_IDS', '5000'))
+NAME_INDEX_RETRY_SECONDS = 60
+
+# Bulk-load queries per index; must return id and name columns. Extra columns
+# (icons, levels) are passed through in typeahead suggestions.
+NAME_INDEX_QUERIES = {
+    'items': """
+        SELECT items.id, items.Name AS name, items.icon
+        FROM items
+        INNER JOIN discovered_items di ON items.id = di.item_id
+    """,
+    'spells': "SELECT id, name, new_icon AS icon FROM spells_new",
+    'npcs': "SELECT id, name, level FROM npc_types",
+    'zones': "SELECT short_name AS id, long_name AS name FROM zone"
+}
+NAME_INDEX_COLUMNS = {
+    'items': ('id', 'name', 'icon'),
+    'spells': ('id', 'name', 'icon'),
+    'npcs': ('id', 'name', 'level'),
+    'zones': ('id', 'name')
+}
+
+# Kinds that get a trigram index for full search (zones only need suggestions)
+TRIGRAM_KINDS = ('items', 'spells', 'npcs')
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Match tiers used for ranking (lower is better)
+TIER_EXACT = 0
+TIER_PREFIX = 1
+TIER_WORD_PREFIX = 2
+TIER_SUBSTRING = 3
+
+
+def normalize_name(name):
+    """
+    Normalize a name or query for matching.
+
+    Mirrors the NPC search rules: case-insensitive, underscores match spaces
+    and '#' prefixes are ignored ("#Lord_Nagafen" == "lord nagafen").
+    """
+    if not name:
+        return ''
+    name = str(name).lower().replace('_', ' ').replace('#', '')
+    return _WHITESPACE_RE.sub(' ', name).strip()
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramNameIndex:
+    """Trigram index over (id, name) pairs with ranked substring search."""
+
+    def __init__(self):
+        self._ids = array('q')
+        self._normalized = []
+        self._postings = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def build(self, entries):
+        """
+        Build the index.
+
+        Args:
+            entries: Iterable of (id, name) pairs
+        """
+        rows = []
+        for entry_id, name in entries:
+            normalized = normalize_name(name)
+            if normalized:
+                rows.append((normalized, int(entry_id)))
+        # Positions follow name order so ties rank alphabetically for free
+        rows.sort()
+
+        postings = {}
+        for position, (normalized, _) in enumerate(rows):
+            for gram in _trigrams(normalized):
+                postings.setdefault(gram, []).append(position)
+
+        self._ids = array('q', (row[1] for row in rows))
+        self._normalized = [row[0] for row in rows]
+        self._postings = {gram: array('i', positions) for gram, positions in postings.items()}
+
+    def _candidates(self, query):
+        if len(query) < 3:
+            return (pos for pos, name in enumerate(self._normalized) if query in name)
+
+        grams = _trigrams(query)
+        lists = []
+        for gram in grams:
+            positions = self._postings.get(gram)
+            if positions is None:
+                return ()
+            lists.append(positions)
+        lists.sort(key=len)
+        candidates = set(lists[0])
+        for positions in lists[1:]:
+            candidates.intersection_update(positions)
+            if not candidates:
+                return ()
+        # Trigram overlap doesn't guarantee adjacency - verify the substring
+        return (pos for pos in candidates if query in self._normalized[pos])
+
+    @staticmethod
+    def _tier(name, query):
+        if name == query:
+            return TIER_EXACT
+        if name.startswith(query):
+            return TIER_PREFIX
+        if f' {query}' in name:
+            return TIER_WORD_PREFIX
+        return TIER_SUBSTRING
+
+    def search(self, query, limit=None):
+        """
+        Find ids whose name contains the query.
+
+        Results are ranked exact match, prefix, word prefix, then any
+        substring; ties are ordered by name.
+
+        Returns:
+            List of ids
+        """
+        query = normalize_name(query)
+        if not query:
+            return []
+        ranked = sorted(
+            (self._tier(self._normalized[pos], query), pos)
+            for pos in self._candidates(query)
+        )
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self._ids[pos] for _, pos in ranked]
+
+
+class PrefixSuggestIndex:
+    """
+    Sorted-array prefix index for typeahead suggestions.
+
+    Full names and every word start within a name are kept as sorted keys,
+    so a lookup is a bisect plus a short forward scan: "sw" suggests both
+    "Swordsman Cap" and "Short Sword".
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._name_keys = []
+        self._name_refs = array('i')
+        self._word_keys = []
+        self._word_refs = array('i')
+
+    def __len__(self):
+        return len(self._entries)
+
+    def build(self, entries):
+        """
+        Build the index.
+
+        Args:
+            entries: Iterable of suggestion payload dicts with at least 'id' and 'name'
+        """
+        payloads = []
+        name_keys = []
+        word_keys = []
+        for entry in entries:
+            normalized = normalize_name(entry.get('name'))
+            if not normalized:
+                continue
+            idx = len(payloads)
+            payloads.append(entry)
+            name_keys.append((normalized, idx))
+            words = normalized.split(' ')
+            for i in range(1, len(words)):
+                word_keys.append((' '.join(words[i:]), idx))
+            # Let zones be found by short name too ("qeynos2")
+            extra = normalize_name(entry.get('id')) if isinstance(entry.get('id'), str) else ''
+            if extra and extra != normalized:
+                word_keys.append((extra, idx))
+        name_keys.sort()
+        word_keys.sort()
+
+        self._entries = payloads
+        self._name_keys = [key for key, _ in name_keys]
+        self._name_refs = array('i', (idx for _, idx in name_keys))
+        self._word_keys = [key for key, _ in word_keys]
+        self._word_refs = array('i', (idx for _, idx in word_keys))
+
+    @staticmethod
+    def _scan(keys, refs, prefix, seen, results, limit):
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and len(results) < limit and keys[i].startswith(prefix):
+            idx = refs[i]
+            if idx not in seen:
+                seen.add(idx)
+                results.append(idx)
+            i += 1
+
+    def suggest(self, prefix, limit=10):
+        """
+        Get up to limit entries whose name (or a word in it) starts with prefix.
+
+        Full-name prefix matches come first, then word matches, each alphabetical.
+        """
+        prefix = normalize_name(prefix)
+        if not prefix or limit <= 0:
+            return []
+        seen = set()
+        results = []
+        self._scan(self._name_keys, self._name_refs, prefix, seen, results, limit)
+        self._scan(self._word_keys, self._word_refs, prefix, seen, results, limit)
+        return [self._entries[idx] for idx in results]
+
+
+class NameIndexRegistry:
+    """Holds the item/spell/NPC name indexes and rebuilds them in the background."""
+
+    def __init__(self, max_age_minutes=NAME_INDEX_MAX_AGE_MINUTES):
+        self.max_age_seconds = max_age_minutes * 60
+        self._indexes = {}
+        self._suggest = {}
+        self._lock = threading.Lock()
+        self._build_thread = None
+        self._last_build_attempt = 0
+        self.built_at = None
+        self.build_seconds = None
+        self.version_tag = None
+        self.last_error = None
+
+    @property
+    def ready(self):
+        return self.built_at is not None
+
+    def is_fresh(self, version_tag=None):
+        if not self.ready:
+            return False
+        if version_tag is not None and version_tag != self.version_tag:
+            return False
+        return time.time() - self.built_at < self.max_age_seconds
+
+    def get(self, kind):
+        """Get the search index for 'items', 'spells' or 'npcs' (None if not built)."""
+        return self._indexes.get(kind)
+
+    def get_suggest(self, kind):
+        """Get the typeahead index for 'items', 'spells', 'npcs' or 'zones' (None if not built)."""
+        return self._suggest.get(kind)
+
+    def build(self, conn, version_tag=None):
+        """Bulk-load every name index from the content database."""
+        start = time.time()
+        indexes = {}
+        suggest = {}
+        cursor = conn.cursor()
+        try:
+            for kind, query in NAME_INDEX_QUERIES.items():
+                try:
+                    cursor.execute(query)
+                    rows = cursor.fetchall()
+                except Exception as e:
+                    # A missing table only disables that index
+                    logger.warning(f"Skipping {kind} name index: {e}")
+                    continue
+                columns = NAME_INDEX_COLUMNS[kind]
+                rows = [
+                    {col: row.get(col) for col in columns} if isinstance(row, dict) else dict(zip(columns, row))
+                    for row in rows
+                ]
+                if kind in TRIGRAM_KINDS:
+                    index = TrigramNameIndex()
+                    index.build((row['id'], row['name']) for row in rows)
+                    indexes[kind] = index
+                if kind == 'npcs':
+                    # Display NPC names the way the NPC endpoints do
+                    for row in rows:
+                        row['name'] = (row['name'] or '').replace('_', ' ')
+                suggest_index = PrefixSuggestIndex()
+                suggest_index.build(rows)
+                suggest[kind] = suggest_index
+        finally:
+            cursor.close()
+
+        with self._lock:
+            self._indexes = indexes
+            self._suggest = suggest
+            self.built_at = time.time()
+            self.build_seconds = round(self.built_at - start, 2)
+            self.version_tag = version_tag
+            self.last_error = None
+        logger.info(f"Name indexes built in {self.build_seconds}s: "
+                    + ", ".join(f"{kind}={len(index)}" for kind, index in suggest.items()))
+
+    def build_in_background(self, connection_factory, version_tag=None):
+        """Rebuild in a daemon thread unless a build is running or failed recently."""
+        with self._lock:
+            if self._build_thread and self._build_thread.is_alive():
+                return False
+            if time.time() - self._last_build_attempt < NAME_INDEX_RETRY_SECONDS:
+                return False
+            self._last_build_attempt = time.time()
+            self._build_thread = threading.Thread(
+                target=self._build_worker, args=(connection_factory, version_tag),
+                name='name-index-build', daemon=True
+            )
+            self._build_thread.start()
+        return True
+
+    def _build_worker(self, connection_factory, version_tag):
+        conn = None
+        try:
+            conn, db_type, error = connection_factory()
+            if not conn:
+                raise Exception(error or 'Database not configured')
+            self.build(conn, version_tag)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Failed to build name indexes: {e}")
+        finally:
+            if conn:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def ensure_fresh(self, connection_factory, version_tag=None):
+        """
+        Schedule a background rebuild when stale; never blocks.
+
+        Returns:
+            True if the indexes can serve searches right now
+        """
+        if self.ready and version_tag is not None and self.version_tag != version_tag:
+            self.invalidate()
+        if not self.is_fresh(version_tag):
+            self.build_in_background(connection_factory, version_tag)
+        return self.ready
+
+    def invalidate(self):
+        """Drop all indexes (content database changed)."""
+        with self._lock:
+            self._indexes = {}
+            self._suggest = {}
+            self.built_at = None
+            self.version_tag = None
+            self._last_build_attempt = 0
+
+    def get_status(self):
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'building': bool(self._build_thread and self._build_thread.is_alive()),
+                'built_at': self.built_at,
+                'build_seconds': self.build_seconds,
+                'sizes': {kind: len(index) for kind, index in self._suggest.items()},
+                'last_error': self.last_error
+            }
+
+
+# Global instance
+_name_indexes = None
+_name_indexes_lock = threading.Lock()
+
+
+def get_name_indexes():
+    """Get the singleton name index registry."""
+    global _name_indexes
+    if _name_indexes is None:
+        with _name_indexes_lock:
+            if _name_indexes is None:
+                _name_indexes = NameIndexRegistry()
+    return _name_indexes
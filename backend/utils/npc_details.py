@@ -0,0 +1,235 @@
+"""
+Batched loader for the NPC detail page.
+
+get_npc_details used to run one lootdrop_entries query per loot group on top
+of the spawn, spell and merchant queries, so raid NPCs with dozens of loot
+groups cost dozens of round trips. The loader here runs one query per
+relation (lootdrop items are fetched with a single IN (...) over every
+lootdrop id) and assembles the result in Python, so a page costs a constant
+number of queries however many loot groups the NPC has.
+
+Assembled pages are cached by the response cache (see response_cache) like
+the other content endpoints, so repeat views of the same NPC don't touch
+the database at all.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Items listed per loot group (the page only ever showed the top 20 by chance)
+MAX_ITEMS_PER_LOOT_GROUP = 20
+MAX_MERCHANT_ITEMS = 100
+# Keep IN (...) lists a sane size for very large loot tables
+LOOTDROP_ID_CHUNK_SIZE = 500
+
+SPAWN_QUERY = """
+    SELECT DISTINCT
+        z.note,
+        z.short_name,
+        z.long_name,
+        s2.x,
+        s2.y,
+        s2.z,
+        sg.name AS spawngroup
+    FROM zone z
+    INNER JOIN spawn2 s2 ON z.short_name = s2.zone
+    INNER JOIN spawnentry se ON s2.spawngroupID = se.spawngroupID
+    LEFT JOIN spawngroup sg ON s2.spawngroupID = sg.id
+    WHERE se.npcID = %s
+    ORDER BY z.long_name
+"""
+
+SPELLS_QUERY = """
+    SELECT
+        nse.spellid,
+        sn.name as spell_name,
+        sn.new_icon,
+        nse.minlevel,
+        nse.maxlevel,
+        nse.priority,
+        nse.recast_delay
+    FROM npc_spells_entries nse
+    INNER JOIN spells_new sn ON nse.spellid = sn.id
+    WHERE nse.npc_spells_id = %s
+    AND nse.minlevel <= %s
+    AND nse.maxlevel >= %s
+    ORDER BY nse.priority DESC, sn.name
+"""
+
+MERCHANT_QUERY = f"""
+    SELECT DISTINCT
+        i.id as item_id,
+        i.name as item_name,
+        i.icon,
+        i.price
+    FROM merchantlist ml
+    INNER JOIN items i ON ml.item = i.id
+    INNER JOIN discovered_items di ON i.id = di.item_id
+    WHERE ml.merchantid = %s
+    AND ml.item > 0
+    ORDER BY ml.slot, i.name
+    LIMIT {MAX_MERCHANT_ITEMS}
+"""
+
+LOOT_GROUPS_QUERY = """
+    SELECT DISTINCT
+        lte.lootdrop_id,
+        lte.probability as table_probability,
+        lte.multiplier,
+        lte.droplimit,
+        lte.mindrop
+    FROM loottable_entries lte
+    WHERE lte.loottable_id = %s
+    ORDER BY lte.probability DESC, lte.lootdrop_id
+"""
+
+LOOT_ITEMS_QUERY = """
+    SELECT DISTINCT
+        lde.lootdrop_id,
+        i.id as item_id,
+        i.name as item_name,
+        i.icon,
+        i.itemtype,
+        lde.chance as item_chance
+    FROM lootdrop_entries lde
+    INNER JOIN items i ON lde.item_id = i.id
+    INNER JOIN discovered_items di ON i.id = di.item_id
+    WHERE lde.lootdrop_id IN ({placeholders})
+    AND lde.item_id > 0
+    ORDER BY lde.lootdrop_id, lde.chance DESC, i.name
+"""
+
+
+def _fetch_dicts(cursor, query, params):
+    """Run a query and return its rows as dicts (tuple or dict cursors)."""
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    if rows and not isinstance(rows[0], dict):
+        columns = [desc[0] for desc in cursor.description]
+        return [dict(zip(columns, row)) for row in rows]
+    return [dict(row) for row in rows]
+
+
+def _display_name(name, default):
+    return name.replace('_', ' ') if name else default
+
+
+def load_spawn_locations(cursor, npc_id):
+    return [
+        {
+            'zone_short_name': spawn['short_name'],
+            'zone_long_name': spawn['long_name'] or spawn['short_name'],
+            'zone_note': spawn.get('note', ''),
+            'spawngroup': spawn.get('spawngroup', ''),
+            'x': spawn.get('x', 0),
+            'y': spawn.get('y', 0),
+            'z': spawn.get('z', 0)
+        }
+        for spawn in _fetch_dicts(cursor, SPAWN_QUERY, (npc_id,))
+    ]
+
+
+def load_spells(cursor, npc_spells_id, level):
+    if not npc_spells_id:
+        return []
+    return [
+        {
+            'spell_id': spell['spellid'],
+            'spell_name': _display_name(spell['spell_name'], 'Unknown Spell'),
+            'icon': spell.get('new_icon', 0),
+            'min_level': spell.get('minlevel', 1),
+            'max_level': spell.get('maxlevel', 255),
+            'priority': spell.get('priority', 0),
+            'recast_delay': spell.get('recast_delay', 0)
+        }
+        for spell in _fetch_dicts(cursor, SPELLS_QUERY, (npc_spells_id, level, level))
+    ]
+
+
+def load_merchant_items(cursor, merchant_id):
+    if not merchant_id:
+        return []
+    return [
+        {
+            'item_id': item['item_id'],
+            'item_name': _display_name(item['item_name'], 'Unknown Item'),
+            'icon': item.get('icon', 0),
+            'price': item.get('price', 0)
+        }
+        for item in _fetch_dicts(cursor, MERCHANT_QUERY, (merchant_id,))
+    ]
+
+
+def load_loot_drops(cursor, loottable_id):
+    """
+    Load an NPC's loot groups and their discovered items in two queries.
+
+    Returns:
+        List of loot groups that have at least one discovered item, in
+        loot table order, each with its top items by chance
+    """
+    if not loottable_id:
+        return []
+    groups = _fetch_dicts(cursor, LOOT_GROUPS_QUERY, (loottable_id,))
+    lootdrop_ids = list(dict.fromkeys(group['lootdrop_id'] for group in groups))
+    if not lootdrop_ids:
+        return []
+
+    items_by_drop = {}
+    for start in range(0, len(lootdrop_ids), LOOTDROP_ID_CHUNK_SIZE):
+        chunk = lootdrop_ids[start:start + LOOTDROP_ID_CHUNK_SIZE]
+        query = LOOT_ITEMS_QUERY.format(placeholders=', '.join(['%s'] * len(chunk)))
+        for row in _fetch_dicts(cursor, query, tuple(chunk)):
+            bucket = items_by_drop.setdefault(row['lootdrop_id'], [])
+            if len(bucket) < MAX_ITEMS_PER_LOOT_GROUP:
+                bucket.append(row)
+
+    loot_drops = []
+    for group in groups:
+        rows = items_by_drop.get(group['lootdrop_id'])
+        if not rows:
+            continue
+        table_probability = group.get('table_probability', 100)
+        if table_probability is None:
+            table_probability = 100
+        items = []
+        for row in rows:
+            item_chance = row.get('item_chance', 1)
+            # Overall probability = table_probability * item_chance
+            overall_probability = round((table_probability / 100.0) * (item_chance / 100.0) * 100, 2)
+            items.append({
+                'item_id': row['item_id'],
+                'item_name': _display_name(row['item_name'], 'Unknown Item'),
+                'icon': row.get('icon', 0),
+                'itemtype': row.get('itemtype', 0),
+                'item_chance': item_chance,
+                'overall_probability': max(0.01, overall_probability)
+            })
+        loot_drops.append({
+            'loot_drop_id': group['lootdrop_id'],
+            'table_probability': table_probability,
+            'multiplier': group.get('multiplier', 1),
+            'droplimit': group.get('droplimit', 0),
+            'mindrop': group.get('mindrop', 0),
+            'items': items
+        })
+    return loot_drops
+
+
+def load_npc_relations(cursor, npc_data):
+    """
+    Load everything the NPC page shows besides the npc_types row.
+
+    Runs at most five queries: spawns, spells, merchant list, loot groups
+    and lootdrop items.
+
+    Returns:
+        Dict with spawn_locations, loot_drops, spells and merchant_items
+    """
+    return {
+        'spawn_locations': load_spawn_locations(cursor, npc_data['id']),
+        'loot_drops': load_loot_drops(cursor, npc_data.get('loottable_id')),
+        'spells': load_spells(cursor, npc_data.get('npc_spells_id'), npc_data.get('level', 1)),
+        'merchant_items': load_merchant_items(cursor, npc_data.get('merchant_id'))
+    }
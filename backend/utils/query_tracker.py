@@ -1,12 +1,190 @@
 """
 Database query tracking wrapper for monitoring query performance.
+
+TrackedCursor only times the query and appends it to a bounded in-memory
+queue; parsing, aggregation and disk persistence happen on a background
+thread that drains the queue in batches, so requests don't pay for
+metrics. Statements are parsed with sql_fingerprint, whose results are
+cached by SQL text (which repeats for parameterized queries).
+
+Parameters are only kept for slow MySQL statements while EXPLAIN sampling
+is on (see explain_sampler), so they can be explained later.
 """
 
+import os
+import sys
 import time
+import atexit
 import logging
+import threading
+from collections import deque
+
+from utils.sql_fingerprint import fingerprint_query
+from utils.explain_sampler import get_explain_sampler
 
 logger = logging.getLogger(__name__)
 
+QUERY_TRACKING_QUEUE_SIZE = int(os.environ.get('QUERY_TRACKING_QUEUE_SIZE', '10000'))
+QUERY_TRACKING_BATCH_SIZE = 500
+# How often the background thread drains the queue and writes tracking data to disk
+QUERY_TRACKING_DRAIN_SECONDS = float(os.environ.get('QUERY_TRACKING_DRAIN_SECONDS', '0.5'))
+QUERY_TRACKING_SAVE_SECONDS = float(os.environ.get('QUERY_TRACKING_SAVE_SECONDS', '60'))
+
+
+def parse_query(query):
+    """
+    Get the query type and main table of a SQL statement.
+
+    Returns:
+        Tuple of (query_type, table_name); the table is "unknown" when it can't be found
+    """
+    fingerprint = fingerprint_query(query)
+    return fingerprint.query_type, fingerprint.tables[0] if fingerprint.tables else "unknown"
+
+
+def _current_request_info():
+    """(method, path) of the current Flask request, or None outside a request."""
+    try:
+        from flask import has_request_context, request
+        if has_request_context():
+            return request.method, request.path
+    except ImportError:
+        pass
+    return None
+
+
+class QueryTrackingQueue:
+    """
+    Bounded queue of executed queries drained by a background thread.
+
+    put() is a deque append (atomic under the GIL, no lock taken); when
+    the queue is full the oldest entry is dropped rather than blocking the
+    request. The worker hands batches to routes.admin.track_database_queries
+    and periodically calls routes.admin.save_query_tracking.
+    """
+
+    def __init__(self, maxsize=QUERY_TRACKING_QUEUE_SIZE):
+        self._items = deque(maxlen=maxsize)
+        self._wakeup = threading.Event()
+        self._drain_lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread = None
+        self._pid = os.getpid()
+        self._last_save = time.time()
+        self._dirty = False
+        # Updated without a lock; approximate under contention
+        self._stats = {'enqueued': 0, 'dropped': 0, 'processed': 0, 'batches': 0, 'saves': 0}
+
+    def put(self, query, execution_time, request_info=None, rows=None, explain_params=None):
+        """
+        Queue an executed query for tracking.
+
+        Args:
+            explain_params: Parameters to EXPLAIN the query with (empty for
+                none); None when it shouldn't be explained
+        """
+        if self._pid != os.getpid():
+            # Forked child: the parent's queued queries were tracked there
+            self._items.clear()
+            self._pid = os.getpid()
+        if len(self._items) == self._items.maxlen:
+            self._stats['dropped'] += 1
+        self._items.append((query, execution_time, request_info, rows, explain_params))
+        self._stats['enqueued'] += 1
+        if len(self._items) >= QUERY_TRACKING_BATCH_SIZE:
+            self._wakeup.set()
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='query-tracking', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(QUERY_TRACKING_DRAIN_SECONDS)
+            self._wakeup.clear()
+            try:
+                self.drain()
+                if self._dirty and time.time() - self._last_save >= QUERY_TRACKING_SAVE_SECONDS:
+                    self.save()
+            except Exception as e:
+                logger.error(f"Query tracking worker error: {e}")
+
+    def drain(self):
+        """Track everything queued so far, in batches."""
+        with self._drain_lock:
+            while self._items:
+                batch = []
+                try:
+                    while len(batch) < QUERY_TRACKING_BATCH_SIZE:
+                        batch.append(self._items.popleft())
+                except IndexError:
+                    pass
+                self._process(batch)
+
+    def _process(self, batch):
+        # routes.admin imports this module indirectly, so use it only once it's loaded
+        admin_module = sys.modules.get('routes.admin')
+        if admin_module is None or not hasattr(admin_module, 'track_database_queries'):
+            logger.debug("Admin module not loaded, skipping query tracking to avoid circular import")
+            return
+        entries = []
+        for query, execution_time, request_info, rows, explain_params in batch:
+            fingerprint = fingerprint_query(query)
+            entries.append({
+                'query': query,
+                'execution_time': execution_time,
+                'query_type': fingerprint.query_type,
+                # No table: let track_database_query label SET/SHOW/... statements
+                'table_name': fingerprint.tables[0] if fingerprint.tables else None,
+                'request_info': request_info,
+                'rows': rows,
+                'explain_params': explain_params
+            })
+        admin_module.track_database_queries(entries)
+        self._dirty = True
+        self._stats['processed'] += len(entries)
+        self._stats['batches'] += 1
+
+    def save(self):
+        """Write tracking data to disk (from the worker thread, or at exit)."""
+        self._last_save = time.time()
+        self._dirty = False
+        admin_module = sys.modules.get('routes.admin')
+        if admin_module is not None and hasattr(admin_module, 'save_query_tracking'):
+            admin_module.save_query_tracking()
+            self._stats['saves'] += 1
+
+    def get_stats(self):
+        return dict(
+            self._stats,
+            queued=len(self._items),
+            capacity=self._items.maxlen,
+            parse_cache=fingerprint_query.cache_info()._asdict()
+        )
+
+
+# Global instance
+_query_tracking_queue = None
+_query_tracking_queue_lock = threading.Lock()
+
+
+def get_query_tracking_queue():
+    """Get the singleton query tracking queue."""
+    global _query_tracking_queue
+    if _query_tracking_queue is None:
+        with _query_tracking_queue_lock:
+            if _query_tracking_queue is None:
+                _query_tracking_queue = QueryTrackingQueue()
+                # Track whatever is still queued before admin saves on shutdown
+                atexit.register(_query_tracking_queue.drain)
+    return _query_tracking_queue
+
 
 class TrackedCursor:
     """Wrapper for database cursor that tracks query execution."""
@@ -32,7 +210,10 @@ class TrackedCursor:
             # Track the query if tracking is enabled - use direct tracking to avoid circular imports
             if self._track_queries:
                 try:
-                    self._track_query_direct(query, execution_time)
+                    explain_params = None
+                    if self.db_type == 'mysql' and get_explain_sampler().wants(execution_time):
+                        explain_params = params or ()
+                    self._track_query_direct(query, execution_time, self._rows_affected(), explain_params)
                 except Exception as e:
                     logger.error(f"Error tracking query: {e}")
             
@@ -114,95 +295,24 @@ class TrackedCursor:
         """Context manager exit."""
         self.close()
     
-    def _track_query_direct(self, query, execution_time):
-        """Track query directly without importing admin routes to avoid circular dependency."""
+    def _track_query_direct(self, query, execution_time, rows=None, explain_params=None):
+        """Queue the query for background tracking (avoids importing admin routes here)."""
         try:
-            # Import the specific tracking function without circular dependency
-            import sys
-            import importlib.util
-            
-            # Check if admin module is already loaded to avoid circular import
-            if 'routes.admin' in sys.modules:
-                # Use the already loaded admin module
-                admin_module = sys.modules['routes.admin']
-                if hasattr(admin_module, 'track_database_query'):
-                    # Parse query to extract info
-                    table_name = self._extract_table_name(query)
-                    query_type = self._get_query_type(query)
-                    
-                    # Track using the existing function
-                    admin_module.track_database_query(
-                        query=query,
-                        execution_time=execution_time,
-                        query_type=query_type,
-                        table_name=table_name,
-                        source_endpoint=None  # Let the tracking function detect the source
-                    )
-                    return
-            
-            # If admin not loaded, skip tracking to avoid circular import
-            logger.debug("Admin module not loaded, skipping query tracking to avoid circular import")
-            
+            get_query_tracking_queue().put(query, execution_time, _current_request_info(), rows, explain_params)
         except Exception as e:
             logger.error(f"Direct query tracking failed: {e}")
     
-    def _log_error_direct(self, error_message):
-        """Log error directly without circular dependency."""
-        logger.error(error_message)
-    
-    def _extract_table_name(self, query):
-        """Extract table name from SQL query."""
+    def _rows_affected(self):
+        """Rows returned/affected by the last execute, or None when the driver doesn't know."""
         try:
-            # Simple regex to extract table names from common SQL patterns
-            import re
-            
-            query_upper = query.upper().strip()
-            
-            # Handle different SQL patterns
-            if query_upper.startswith('SELECT'):
-                # Look for FROM clause
-                match = re.search(r'FROM\s+([`"]?)(\w+)\1', query_upper)
-                if match:
-                    return match.group(2).lower()
-            elif query_upper.startswith('INSERT'):
-                # Look for INSERT INTO
-                match = re.search(r'INSERT\s+INTO\s+([`"]?)(\w+)\1', query_upper)
-                if match:
-                    return match.group(2).lower()
-            elif query_upper.startswith('UPDATE'):
-                # Look for UPDATE table
-                match = re.search(r'UPDATE\s+([`"]?)(\w+)\1', query_upper)
-                if match:
-                    return match.group(2).lower()
-            elif query_upper.startswith('DELETE'):
-                # Look for DELETE FROM
-                match = re.search(r'DELETE\s+FROM\s+([`"]?)(\w+)\1', query_upper)
-                if match:
-                    return match.group(2).lower()
-            
-            return "unknown"
-            
+            rowcount = self.cursor.rowcount
         except Exception:
-            return "unknown"
+            return None
+        return rowcount if isinstance(rowcount, int) and rowcount >= 0 else None
     
-    def _get_query_type(self, query):
-        """Extract query type from SQL query."""
-        try:
-            query_upper = query.upper().strip()
-            
-            if query_upper.startswith('SELECT'):
-                return 'SELECT'
-            elif query_upper.startswith('INSERT'):
-                return 'INSERT'
-            elif query_upper.startswith('UPDATE'):
-                return 'UPDATE'
-            elif query_upper.startswith('DELETE'):
-                return 'DELETE'
-            else:
-                return 'OTHER'
-                
-        except Exception:
-            return 'OTHER'
+    def _log_error_direct(self, error_message):
+        """Log error directly without circular dependency."""
+        logger.error(error_message)
 
 
 class TrackedConnection:
@@ -226,6 +336,19 @@ class TrackedConnection:
         """Rollback transaction."""
         return self.connection.rollback()
     
+    def ping(self, reconnect=False):
+        """Check the underlying connection is alive (used by the connection pool)."""
+        if hasattr(self.connection, 'ping'):
+            return self.connection.ping(reconnect=reconnect)
+        # Drivers without ping() (psycopg2, pyodbc) - fall back to a trivial query
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+        finally:
+            cursor.close()
+        return True
+    
     def close(self):
         """Close connection."""
         return self.connection.close()
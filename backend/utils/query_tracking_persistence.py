@@ -5,6 +5,7 @@ Query tracking persistence module for saving and loading query metrics data.
 import json
 import os
 import time
+import tempfile
 from datetime import datetime, timedelta
 from collections import defaultdict, deque
 from typing import Dict, Any, Optional
@@ -12,6 +13,26 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+
+def write_json_atomic(path: str, data: Any, indent: Optional[int] = 2) -> None:
+    """Write JSON to a temp file next to `path` and rename it over `path`.
+
+    Readers (and a crash mid-write) never see a half-written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
 class QueryTrackingPersistence:
     """Handles persistence of query tracking data to disk."""
     
@@ -34,8 +55,7 @@ class QueryTrackingPersistence:
             serializable_data['last_saved'] = datetime.now().isoformat()
             
             # Write to file
-            with open(self.metrics_file, 'w') as f:
-                json.dump(serializable_data, f, indent=2)
+            write_json_atomic(self.metrics_file, serializable_data)
             
             try:
                 logger.info(f"Query metrics saved to {self.metrics_file}")
@@ -87,8 +107,7 @@ class QueryTrackingPersistence:
                 'last_saved': datetime.now().isoformat()
             }
             
-            with open(self.timeline_file, 'w') as f:
-                json.dump(timeline_dict, f, indent=2)
+            write_json_atomic(self.timeline_file, timeline_dict)
             
             try:
                 logger.info(f"Query timeline saved to {self.timeline_file}")
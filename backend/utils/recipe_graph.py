@@ -0,0 +1,464 @@
+"""
+In-memory tradeskill recipe dependency graph.
+
+The recipe endpoints only show one level of a recipe, so following a chain
+(ore -> bar -> sheet -> armor) meant a request per sub-component. This graph
+is bulk-loaded from tradeskill_recipe and tradeskill_recipe_entries into
+compact adjacency arrays (CSR style: one offsets array per relation) and
+expands a recipe into its full sub-component tree with aggregated raw
+material totals. Expansion walks depth-first with the current path as the
+cycle guard and memoizes each recipe's subtree per remaining depth, so
+shared intermediates (e.g. a common bar) are only expanded once. A tree stops
+growing once it holds RECIPE_TREE_MAX_NODES recipe nodes, since memoized
+subtrees are still serialized at every place they appear.
+"""
+
+import os
+import time
+import logging
+import threading
+from array import array
+
+logger = logging.getLogger(__name__)
+
+RECIPE_GRAPH_ENABLED = os.environ.get('RECIPE_GRAPH_ENABLED', 'true').lower() == 'true'
+RECIPE_GRAPH_MAX_AGE_HOURS = float(os.environ.get('RECIPE_GRAPH_MAX_AGE_HOURS', '24'))
+RECIPE_GRAPH_RETRY_SECONDS = 60
+# Default and hard limit for how many recipe levels a tree expands
+RECIPE_TREE_DEFAULT_DEPTH = 8
+RECIPE_TREE_MAX_DEPTH = 12
+# Recipe nodes one tree may contain before the remaining components are left unexpanded
+RECIPE_TREE_MAX_NODES = int(os.environ.get('RECIPE_TREE_MAX_NODES', '2000'))
+# Memoized subtrees kept per graph before the memo is reset
+RECIPE_GRAPH_MEMO_MAX_ENTRIES = 5000
+
+RECIPES_QUERY = "SELECT id, name, tradeskill, trivial FROM tradeskill_recipe"
+
+ENTRIES_QUERY = """
+    SELECT
+        tre.recipe_id,
+        tre.item_id,
+        tre.successcount,
+        tre.componentcount,
+        tre.iscontainer,
+        i.Name AS item_name
+    FROM tradeskill_recipe_entries tre
+    LEFT JOIN items i ON tre.item_id = i.id
+"""
+
+_RECIPE_COLUMNS = ('id', 'name', 'tradeskill', 'trivial')
+_ENTRY_COLUMNS = ('recipe_id', 'item_id', 'successcount', 'componentcount', 'iscontainer', 'item_name')
+
+# Entry roles within a recipe
+ROLE_COMPONENT = 0   # consumed by the combine
+ROLE_OUTPUT = 1      # produced by a successful combine
+ROLE_TOOL = 2        # used and handed back (componentcount == successcount)
+ROLE_CONTAINER = 3   # the combine container
+
+
+def _row_values(row, keys):
+    if isinstance(row, dict):
+        return tuple(row.get(key) for key in keys)
+    return tuple(row)
+
+
+class _NodeBudget:
+    """Recipe nodes one tree expansion may still add, and how often it ran out."""
+
+    __slots__ = ('remaining', 'cuts')
+
+    def __init__(self, max_nodes):
+        self.remaining = max_nodes
+        self.cuts = 0
+
+
+def classify_entry(successcount, componentcount, iscontainer):
+    """
+    Work out what an item does in a recipe.
+
+    An item listed as both component and success is consumed (or produced)
+    only by the difference, so hammers and other returned tools net to zero.
+
+    Returns:
+        (role, quantity) or None for entries that do nothing
+    """
+    if iscontainer:
+        return ROLE_CONTAINER, 1
+    net_consumed = (componentcount or 0) - (successcount or 0)
+    if net_consumed > 0:
+        return ROLE_COMPONENT, net_consumed
+    if net_consumed < 0:
+        return ROLE_OUTPUT, -net_consumed
+    if componentcount:
+        return ROLE_TOOL, componentcount
+    return None
+
+
+class RecipeGraph:
+    """Immutable recipe/component/producer adjacency arrays with memoized tree expansion."""
+
+    def __init__(self, recipe_rows, entry_rows):
+        recipes = sorted(
+            (int(recipe_id), name, tradeskill or 0, trivial or 0)
+            for recipe_id, name, tradeskill, trivial in (_row_values(row, _RECIPE_COLUMNS) for row in recipe_rows)
+        )
+        self._recipe_ids = array('i', (recipe[0] for recipe in recipes))
+        self._recipe_names = [(recipe[1] or '').replace('_', ' ') for recipe in recipes]
+        self._tradeskills = array('i', (recipe[2] for recipe in recipes))
+        self._trivials = array('i', (recipe[3] for recipe in recipes))
+        self._positions = {recipe_id: pos for pos, recipe_id in enumerate(self._recipe_ids)}
+
+        # Sum duplicate rows per (recipe, item) before classifying
+        totals = {}
+        self._item_names = {}
+        for recipe_id, item_id, successcount, componentcount, iscontainer, item_name in (
+                _row_values(row, _ENTRY_COLUMNS) for row in entry_rows):
+            pos = self._positions.get(int(recipe_id))
+            if pos is None:
+                continue
+            key = (pos, int(item_id))
+            success, component, container = totals.get(key, (0, 0, False))
+            totals[key] = (success + (successcount or 0), component + (componentcount or 0),
+                           container or bool(iscontainer))
+            if item_name:
+                self._item_names[int(item_id)] = item_name
+
+        entries = []
+        producers = {}
+        for (pos, item_id), (success, component, container) in totals.items():
+            classified = classify_entry(success, component, container)
+            if classified is None:
+                continue
+            role, quantity = classified
+            entries.append((pos, role, item_id, quantity))
+            if role == ROLE_OUTPUT:
+                producers.setdefault(item_id, []).append(pos)
+        entries.sort()
+
+        # recipe position -> entries[_entry_offsets[pos]:_entry_offsets[pos + 1]]
+        self._entry_offsets = array('I', [0] * (len(recipes) + 1))
+        for pos, _, _, _ in entries:
+            self._entry_offsets[pos + 1] += 1
+        for pos in range(len(recipes)):
+            self._entry_offsets[pos + 1] += self._entry_offsets[pos]
+        self._entry_roles = array('b', (entry[1] for entry in entries))
+        self._entry_items = array('i', (entry[2] for entry in entries))
+        self._entry_quantities = array('i', (entry[3] for entry in entries))
+
+        # item id -> producing recipe positions, easiest (lowest trivial) first
+        self._producer_slots = {}
+        producer_offsets = [0]
+        producer_recipes = []
+        for item_id, positions in producers.items():
+            positions.sort(key=lambda p: (self._trivials[p], self._recipe_ids[p]))
+            self._producer_slots[item_id] = len(producer_offsets) - 1
+            producer_recipes.extend(positions)
+            producer_offsets.append(len(producer_recipes))
+        self._producer_offsets = array('I', producer_offsets)
+        self._producer_recipes = array('i', producer_recipes)
+
+        self._memo = {}
+        self._memo_hits = 0
+
+    @property
+    def recipe_count(self):
+        return len(self._recipe_ids)
+
+    @property
+    def entry_count(self):
+        return len(self._entry_items)
+
+    def item_name(self, item_id):
+        return self._item_names.get(item_id, f'Item {item_id}')
+
+    def _entries(self, pos):
+        for i in range(self._entry_offsets[pos], self._entry_offsets[pos + 1]):
+            yield self._entry_roles[i], self._entry_items[i], self._entry_quantities[i]
+
+    def _output_quantity(self, pos, item_id):
+        for role, entry_item, quantity in self._entries(pos):
+            if role == ROLE_OUTPUT and entry_item == item_id:
+                return quantity
+        return 1
+
+    def producers(self, item_id):
+        """Recipe ids that produce an item, easiest first."""
+        slot = self._producer_slots.get(item_id)
+        if slot is None:
+            return []
+        positions = self._producer_recipes[self._producer_offsets[slot]:self._producer_offsets[slot + 1]]
+        return [self._recipe_ids[pos] for pos in positions]
+
+    def _expand(self, pos, path, depth, budget):
+        """
+        Expand one combine of a recipe.
+
+        Returns:
+            (node, raw, tools, containers, cyclic, truncated, path_dependent, size)
+            where raw maps item_id -> quantity per combine and size counts the
+            recipe nodes in the subtree. Results that had to avoid a recipe on
+            the current path depend on the path taken, and results cut short by
+            the node budget depend on what was expanded before them; neither is
+            memoized.
+        """
+        memo_key = (pos, depth)
+        cached = self._memo.get(memo_key)
+        if cached is not None and cached[7] <= budget.remaining:
+            self._memo_hits += 1
+            budget.remaining -= cached[7]
+            return cached
+
+        budget.remaining -= 1
+        cuts_before = budget.cuts
+        size = 1
+        path.add(pos)
+        raw = {}
+        tools = set()
+        containers = set()
+        cyclic = truncated = path_dependent = False
+        components = []
+        outputs = []
+        for role, item_id, quantity in self._entries(pos):
+            if role == ROLE_OUTPUT:
+                outputs.append({'item_id': item_id, 'item_name': self.item_name(item_id), 'quantity': quantity})
+                continue
+            if role == ROLE_TOOL:
+                tools.add(item_id)
+                continue
+            if role == ROLE_CONTAINER:
+                containers.add(item_id)
+                continue
+
+            component = {'item_id': item_id, 'item_name': self.item_name(item_id), 'quantity': quantity}
+            producer_ids = self.producers(item_id)
+            candidates = [self._positions[recipe_id] for recipe_id in producer_ids
+                          if self._positions[recipe_id] not in path]
+            if producer_ids:
+                component['alternatives'] = len(producer_ids) - 1
+                path_dependent = path_dependent or len(candidates) < len(producer_ids)
+            out_of_nodes = budget.remaining <= 0
+            if producer_ids and not candidates:
+                component['cycle'] = True
+                cyclic = True
+            elif candidates and (depth <= 1 or out_of_nodes):
+                component['truncated'] = True
+                truncated = True
+                if depth > 1:
+                    budget.cuts += 1
+            if not candidates or depth <= 1 or out_of_nodes:
+                raw[item_id] = raw.get(item_id, 0) + quantity
+                components.append(component)
+                continue
+
+            sub_pos = candidates[0]
+            node, sub_raw, sub_tools, sub_containers, sub_cyclic, sub_truncated, sub_path_dependent, sub_size = \
+                self._expand(sub_pos, path, depth - 1, budget)
+            size += sub_size
+            combines = -(-quantity // self._output_quantity(sub_pos, item_id))
+            component['combines'] = combines
+            component['recipe'] = node
+            for raw_item, raw_quantity in sub_raw.items():
+                raw[raw_item] = raw.get(raw_item, 0) + raw_quantity * combines
+            tools |= sub_tools
+            containers |= sub_containers
+            cyclic = cyclic or sub_cyclic
+            truncated = truncated or sub_truncated
+            path_dependent = path_dependent or sub_path_dependent
+            components.append(component)
+        path.discard(pos)
+
+        node = {
+            'recipe_id': self._recipe_ids[pos],
+            'recipe_name': self._recipe_names[pos],
+            'tradeskill_id': self._tradeskills[pos],
+            'trivial': self._trivials[pos],
+            'yields': outputs,
+            'components': components,
+            'tools': sorted(tools),
+            'containers': sorted(containers)
+        }
+        result = (node, raw, frozenset(tools), frozenset(containers), cyclic, truncated, path_dependent, size)
+        if not path_dependent and budget.cuts == cuts_before:
+            if len(self._memo) >= RECIPE_GRAPH_MEMO_MAX_ENTRIES:
+                self._memo.clear()
+            self._memo[memo_key] = result
+        return result
+
+    def expand(self, recipe_id, depth=RECIPE_TREE_DEFAULT_DEPTH, max_nodes=RECIPE_TREE_MAX_NODES):
+        """
+        Expand a recipe into its full sub-component tree.
+
+        Args:
+            recipe_id: Recipe to expand
+            depth: Recipe levels to expand (1 = just this recipe's components)
+            max_nodes: Recipe nodes the tree may hold; components past the
+                budget are left unexpanded and the tree is marked truncated
+
+        Returns:
+            Dict with the tree and aggregated totals, or None if the recipe doesn't exist
+        """
+        pos = self._positions.get(int(recipe_id))
+        if pos is None:
+            return None
+        node, raw, tools, containers, cyclic, truncated, _, size = \
+            self._expand(pos, set(), depth, _NodeBudget(max(1, max_nodes)))
+
+        def named(item_ids):
+            return [{'item_id': item_id, 'item_name': self.item_name(item_id)} for item_id in sorted(item_ids)]
+
+        raw_materials = [
+            {'item_id': item_id, 'item_name': self.item_name(item_id), 'quantity': quantity}
+            for item_id, quantity in raw.items()
+        ]
+        raw_materials.sort(key=lambda material: (material['item_name'], material['item_id']))
+        return {
+            'tree': node,
+            'raw_materials': raw_materials,
+            'tools': named(tools),
+            'containers': named(containers),
+            'has_cycles': cyclic,
+            'truncated': truncated,
+            'depth': depth,
+            'nodes': size
+        }
+
+    def get_stats(self):
+        return {
+            'recipes': self.recipe_count,
+            'entries': self.entry_count,
+            'craftable_items': len(self._producer_slots),
+            'memo_entries': len(self._memo),
+            'memo_hits': self._memo_hits
+        }
+
+
+class RecipeGraphManager:
+    """Holds the current recipe graph and rebuilds it in the background."""
+
+    def __init__(self, max_age_hours=RECIPE_GRAPH_MAX_AGE_HOURS):
+        self.max_age_seconds = max_age_hours * 3600
+        self._graph = None
+        self._lock = threading.Lock()
+        self._build_thread = None
+        self._last_build_attempt = 0
+        self.built_at = None
+        self.build_seconds = None
+        self.version_tag = None
+        self.last_error = None
+
+    @property
+    def ready(self):
+        return self._graph is not None
+
+    @property
+    def graph(self):
+        """The current graph (None until built)."""
+        return self._graph
+
+    def is_fresh(self, version_tag=None):
+        if not self.ready:
+            return False
+        if version_tag is not None and version_tag != self.version_tag:
+            return False
+        return time.time() - self.built_at < self.max_age_seconds
+
+    def build(self, conn, version_tag=None):
+        """Bulk-load the graph from the content database."""
+        start = time.time()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(RECIPES_QUERY)
+            recipe_rows = cursor.fetchall()
+            cursor.execute(ENTRIES_QUERY)
+            entry_rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        graph = RecipeGraph(recipe_rows, entry_rows)
+
+        with self._lock:
+            self._graph = graph
+            self.built_at = time.time()
+            self.build_seconds = round(self.built_at - start, 2)
+            self.version_tag = version_tag
+            self.last_error = None
+        logger.info(f"Recipe graph built: {graph.recipe_count} recipes, "
+                    f"{graph.entry_count} entries in {self.build_seconds}s")
+
+    def build_in_background(self, connection_factory, version_tag=None):
+        """Rebuild in a daemon thread unless a build is running or failed recently."""
+        with self._lock:
+            if self._build_thread and self._build_thread.is_alive():
+                return False
+            if time.time() - self._last_build_attempt < RECIPE_GRAPH_RETRY_SECONDS:
+                return False
+            self._last_build_attempt = time.time()
+            self._build_thread = threading.Thread(
+                target=self._build_worker, args=(connection_factory, version_tag),
+                name='recipe-graph-build', daemon=True
+            )
+            self._build_thread.start()
+        return True
+
+    def _build_worker(self, connection_factory, version_tag):
+        conn = None
+        try:
+            conn, db_type, error = connection_factory()
+            if not conn:
+                raise Exception(error or 'Database not configured')
+            self.build(conn, version_tag)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Failed to build recipe graph: {e}")
+        finally:
+            if conn:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def ensure_fresh(self, connection_factory, version_tag=None):
+        """
+        Schedule a background rebuild when stale; never blocks.
+
+        Returns:
+            True if the graph can expand recipes right now
+        """
+        if self.ready and version_tag is not None and self.version_tag != version_tag:
+            self.invalidate()
+        if not self.is_fresh(version_tag):
+            self.build_in_background(connection_factory, version_tag)
+        return self.ready
+
+    def invalidate(self):
+        """Drop the graph (content database changed)."""
+        with self._lock:
+            self._graph = None
+            self.built_at = None
+            self.version_tag = None
+            self._last_build_attempt = 0
+
+    def get_status(self):
+        with self._lock:
+            return dict(
+                self._graph.get_stats() if self._graph else {},
+                ready=self.ready,
+                building=bool(self._build_thread and self._build_thread.is_alive()),
+                built_at=self.built_at,
+                build_seconds=self.build_seconds,
+                last_error=self.last_error
+            )
+
+
+# Global instance
+_recipe_graph_manager = None
+_recipe_graph_manager_lock = threading.Lock()
+
+
+def get_recipe_graph_manager():
+    """Get the singleton recipe graph manager."""
+    global _recipe_graph_manager
+    if _recipe_graph_manager is None:
+        with _recipe_graph_manager_lock:
+            if _recipe_graph_manager is None:
+                _recipe_graph_manager = RecipeGraphManager()
+    return _recipe_graph_manager
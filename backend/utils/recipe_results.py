@@ -0,0 +1,314 @@
+"""
+Precomputed recipe -> primary result item table.
+
+Recipe listings show each recipe's result icon and name. The item
+tradeskill-recipes endpoint used to work that out with a derived table that
+aggregated every successcount row in tradeskill_recipe_entries through
+dozens of NOT LIKE '%Hammer%' predicates on every request.
+
+The primary result is now picked once in Python: success rows that are
+returned tools (also consumed as components), recipe containers or
+tradeskill containers (by items.bagtype) are skipped, as are Misc-type items
+named like tools; the remaining item with the largest successcount wins. The
+table is built from one scan, persisted as gzipped JSON and rebuilt in a
+background thread when missing, stale or invalidated, so routes only do a
+recipe_id dict lookup.
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+RECIPE_RESULT_INDEX_ENABLED = os.environ.get('RECIPE_RESULT_INDEX_ENABLED', 'true').lower() == 'true'
+RECIPE_RESULT_INDEX_MAX_AGE_HOURS = float(os.environ.get('RECIPE_RESULT_INDEX_MAX_AGE_HOURS', '24'))
+# Minimum seconds between background build attempts (avoids hammering a failing database)
+RECIPE_RESULT_INDEX_RETRY_SECONDS = 60
+RECIPE_RESULT_INDEX_PATH = os.environ.get(
+    'RECIPE_RESULT_INDEX_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'recipe_results.json.gz')
+)
+
+INDEX_FORMAT_VERSION = 2
+
+# EQEmu bag types from Medicine (9) up are tradeskill combiners (forges, kits, kilns...)
+TRADESKILL_BAG_TYPE_MIN = 9
+# Tools have no item type of their own; they are Misc items (weapons, armor,
+# food etc. are always products however they are named)
+MISC_ITEM_TYPE = 11
+# Fallback for Misc items: tools that come back from a combine without being its product
+TOOL_NAME_PATTERN = re.compile(
+    r'hammer|tool|kit|needle|awl|chisel|tongs|file|planer|saw|pottery wheel|kiln',
+    re.IGNORECASE
+)
+
+RESULT_ROWS_QUERY = """
+    SELECT
+        tre.recipe_id,
+        tre.item_id,
+        tre.successcount,
+        tre.componentcount,
+        tre.iscontainer,
+        i.itemtype,
+        i.bagtype,
+        i.name,
+        i.icon
+    FROM tradeskill_recipe_entries tre
+    INNER JOIN items i ON tre.item_id = i.id
+    WHERE tre.successcount > 0
+"""
+
+RECIPE_RESULT_ROWS_QUERY = RESULT_ROWS_QUERY + "  AND tre.recipe_id IN ({placeholders})\n"
+
+_RESULT_COLUMNS = ('recipe_id', 'item_id', 'successcount', 'componentcount', 'iscontainer', 'itemtype', 'bagtype',
+                   'name', 'icon')
+
+
+def _row_values(row, keys):
+    """Return values for keys from a dict or tuple row."""
+    if isinstance(row, dict):
+        return tuple(row[key] for key in keys)
+    return tuple(row)
+
+
+def is_returned_tool(componentcount, iscontainer, itemtype, bagtype, name):
+    """Whether a success row is a tool or container handed back rather than the product."""
+    if (componentcount or 0) > 0 or iscontainer:
+        return True
+    if (bagtype or 0) >= TRADESKILL_BAG_TYPE_MIN:
+        return True
+    if itemtype is not None and itemtype != MISC_ITEM_TYPE:
+        return False
+    return bool(name and TOOL_NAME_PATTERN.search(name))
+
+
+def pick_primary_results(rows):
+    """
+    Pick each recipe's primary result from its success rows.
+
+    Args:
+        rows: Rows shaped like RESULT_ROWS_QUERY results (dicts or tuples)
+
+    Returns:
+        Dict of recipe_id -> (item_id, icon, name)
+    """
+    best = {}
+    for row in rows:
+        recipe_id, item_id, successcount, componentcount, iscontainer, itemtype, bagtype, name, icon = _row_values(
+            row, _RESULT_COLUMNS
+        )
+        if is_returned_tool(componentcount, iscontainer, itemtype, bagtype, name):
+            continue
+        rank = (successcount or 0, -item_id)
+        current = best.get(recipe_id)
+        if current is None or rank > current[0]:
+            best[recipe_id] = (rank, (item_id, icon, name))
+    return {recipe_id: result for recipe_id, (_, result) in best.items()}
+
+
+def query_primary_results(cursor, recipe_ids):
+    """Pick primary results for a few recipes straight from the database."""
+    if not recipe_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    cursor.execute(RECIPE_RESULT_ROWS_QUERY.format(placeholders=placeholders), tuple(recipe_ids))
+    return pick_primary_results(cursor.fetchall())
+
+
+class RecipeResultIndex:
+    """In-memory recipe_id -> primary result map with disk persistence and background rebuilds."""
+
+    def __init__(self, path=RECIPE_RESULT_INDEX_PATH, max_age_hours=RECIPE_RESULT_INDEX_MAX_AGE_HOURS):
+        self.path = path
+        self.max_age_seconds = max_age_hours * 3600
+        self._lock = threading.Lock()
+        self._build_thread = None
+        self._last_build_attempt = 0
+        self._loaded_from_disk = False
+        self._reset()
+
+    def _reset(self):
+        self._results = {}
+        self.built_at = None
+        self.build_seconds = None
+        self.version_tag = None
+        self.last_error = None
+
+    @property
+    def ready(self):
+        """Whether lookups can be answered from the table."""
+        return self.built_at is not None
+
+    def is_fresh(self, version_tag=None):
+        """Whether the table is built, recent and built from the given database."""
+        if not self.ready:
+            return False
+        if version_tag is not None and version_tag != self.version_tag:
+            return False
+        return time.time() - self.built_at < self.max_age_seconds
+
+    def build(self, conn, version_tag=None):
+        """Build the table from one scan of the recipe success rows."""
+        start = time.time()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(RESULT_ROWS_QUERY)
+            results = pick_primary_results(cursor.fetchall())
+        finally:
+            cursor.close()
+        with self._lock:
+            self._results = results
+            self.built_at = time.time()
+            self.build_seconds = round(self.built_at - start, 2)
+            self.version_tag = version_tag
+            self.last_error = None
+        logger.info(f"Recipe result index built: {len(results)} recipes in {self.build_seconds}s")
+
+    def build_in_background(self, connection_factory, version_tag=None):
+        """
+        Rebuild the table in a daemon thread unless a build is already running.
+
+        Args:
+            connection_factory: Callable returning (conn, db_type, error), e.g. get_eqemu_db_connection
+            version_tag: Identifier of the content database
+        """
+        with self._lock:
+            if self._build_thread and self._build_thread.is_alive():
+                return False
+            if time.time() - self._last_build_attempt < RECIPE_RESULT_INDEX_RETRY_SECONDS:
+                return False
+            self._last_build_attempt = time.time()
+            self._build_thread = threading.Thread(
+                target=self._build_worker, args=(connection_factory, version_tag),
+                name='recipe-result-index-build', daemon=True
+            )
+            self._build_thread.start()
+        return True
+
+    def _build_worker(self, connection_factory, version_tag):
+        conn = None
+        try:
+            conn, db_type, error = connection_factory()
+            if not conn:
+                raise Exception(error or 'Database not configured')
+            self.build(conn, version_tag)
+            self.save()
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Failed to build recipe result index: {e}")
+        finally:
+            if conn:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def invalidate(self):
+        """Discard the table (content database changed)."""
+        with self._lock:
+            self._reset()
+            self._last_build_attempt = 0
+        logger.info("Recipe result index invalidated")
+
+    def save(self):
+        """Write the table to disk atomically."""
+        with self._lock:
+            payload = {
+                'format': INDEX_FORMAT_VERSION,
+                'built_at': self.built_at,
+                'build_seconds': self.build_seconds,
+                'version_tag': self.version_tag,
+                'results': {str(k): list(v) for k, v in self._results.items()}
+            }
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """
+        Load a previously saved table.
+
+        Returns:
+            True if a table was loaded
+        """
+        self._loaded_from_disk = True
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                payload = json.load(f)
+            if payload.get('format') != INDEX_FORMAT_VERSION:
+                return False
+            with self._lock:
+                self._results = {int(k): tuple(v) for k, v in payload['results'].items()}
+                self.built_at = payload['built_at']
+                self.build_seconds = payload.get('build_seconds')
+                self.version_tag = payload.get('version_tag')
+            logger.info(f"Loaded recipe result index from {self.path} ({len(self._results)} recipes)")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to load recipe result index from {self.path}: {e}")
+            return False
+
+    def ensure_fresh(self, connection_factory, version_tag=None):
+        """
+        Make sure the table is usable, scheduling a background rebuild if not.
+
+        Loads the persisted table on first use. Never blocks on a rebuild.
+
+        Returns:
+            True if lookups can be served from the table right now
+        """
+        if not self._loaded_from_disk and not self.ready:
+            self.load()
+        if self.ready and version_tag is not None and self.version_tag != version_tag:
+            self.invalidate()
+        if not self.is_fresh(version_tag):
+            self.build_in_background(connection_factory, version_tag)
+        return self.ready
+
+    def get(self, recipe_id):
+        """Get (item_id, icon, name) of a recipe's primary result (None if it has none)."""
+        return self._results.get(int(recipe_id))
+
+    def get_many(self, recipe_ids):
+        """Get primary results for several recipes (recipes without one are left out)."""
+        results = self._results
+        return {recipe_id: results[recipe_id] for recipe_id in recipe_ids if recipe_id in results}
+
+    def get_status(self):
+        """Get build/freshness information for admin pages."""
+        with self._lock:
+            building = bool(self._build_thread and self._build_thread.is_alive())
+            return {
+                'ready': self.ready,
+                'building': building,
+                'built_at': self.built_at,
+                'age_seconds': round(time.time() - self.built_at, 1) if self.built_at else None,
+                'build_seconds': self.build_seconds,
+                'recipes': len(self._results),
+                'path': self.path,
+                'last_error': self.last_error
+            }
+
+
+# Global instance
+_recipe_result_index = None
+_recipe_result_index_lock = threading.Lock()
+
+
+def get_recipe_result_index():
+    """Get the singleton recipe result index."""
+    global _recipe_result_index
+    if _recipe_result_index is None:
+        with _recipe_result_index_lock:
+            if _recipe_result_index is None:
+                _recipe_result_index = RecipeResultIndex()
+    return _recipe_result_index
@@ -0,0 +1,306 @@
+"""
+Read-through response cache for static EQEmu content endpoints.
+
+Item, spell, NPC, recipe and zone data only changes when the content database
+is reloaded, so rendered JSON responses can be reused between requests.
+
+- In-process LRU tier with per-entry TTL and a total byte budget
+- Optional disk tier (RESPONSE_CACHE_DIR) that survives restarts
+- Keys combine the route, normalized query params and a content-DB version;
+  invalidate_all() bumps the version whenever the database config reloads
+"""
+
+import os
+import re
+import time
+import json
+import hashlib
+import shutil
+import logging
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Disk tier shard directories: first two hex digits of the key
+_SHARD_RE = re.compile(r'^[0-9a-f]{2}$')
+
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', '3600'))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '20000'))
+RESPONSE_CACHE_DIR = os.environ.get('RESPONSE_CACHE_DIR', '')
+
+
+class ResponseCache:
+    """Thread-safe LRU + TTL cache of serialized responses with an optional disk tier."""
+
+    def __init__(self, max_bytes=RESPONSE_CACHE_MAX_BYTES, max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+                 default_ttl=RESPONSE_CACHE_TTL, disk_dir=None):
+        """
+        Initialize the response cache.
+
+        Args:
+            max_bytes: Total size budget for cached bodies in memory
+            max_entries: Maximum number of in-memory entries
+            default_ttl: Seconds an entry stays valid unless overridden per route
+            disk_dir: Directory for the disk tier (None disables it)
+        """
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.disk_dir = disk_dir
+        # key -> (body, mimetype, expires_at)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._version = 0
+        self._version_tag = ''
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'disk_hits': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+        if self.disk_dir:
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+            except OSError as e:
+                logger.warning(f"Response cache disk tier disabled ({self.disk_dir}): {e}")
+                self.disk_dir = None
+
+    @property
+    def version(self):
+        """Current content version; part of every cache key."""
+        return f"{self._version_tag}:{self._version}"
+
+    def set_version_tag(self, tag):
+        """Tie cached entries to a content database (e.g. a hash of its URL)."""
+        with self._lock:
+            self._version_tag = hashlib.sha1(str(tag).encode('utf-8')).hexdigest()[:12] if tag else ''
+
+    def make_key(self, route, params=None):
+        """
+        Build a cache key from a route and its query params.
+
+        Params are normalized so that ordering and repeated keys don't
+        produce different keys for the same request.
+        """
+        normalized = []
+        for name, values in sorted((params or {}).items()):
+            if not isinstance(values, (list, tuple)):
+                values = [values]
+            normalized.append([name, sorted(str(v).strip() for v in values)])
+        raw = json.dumps([self.version, route, normalized], separators=(',', ':'))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a cached response.
+
+        Returns:
+            Tuple of (body bytes, mimetype), or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                body, mimetype, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return body, mimetype
+                self._remove_locked(key)
+                self._stats['expirations'] += 1
+
+        entry = self._disk_get(key, now)
+        with self._lock:
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            self._stats['disk_hits'] += 1
+            body, mimetype, expires_at = entry
+            self._store_locked(key, body, mimetype, expires_at)
+        return body, mimetype
+
+    def set(self, key, body, mimetype='application/json', ttl=None):
+        """Store a serialized response body."""
+        ttl = self.default_ttl if ttl is None else ttl
+        if len(body) > self.max_bytes:
+            return
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._store_locked(key, body, mimetype, expires_at)
+            self._stats['stores'] += 1
+        self._disk_set(key, body, mimetype, expires_at)
+
+    def _store_locked(self, key, body, mimetype, expires_at):
+        if key in self._entries:
+            self._remove_locked(key)
+        self._entries[key] = (body, mimetype, expires_at)
+        self._bytes += len(body)
+        # Evict least recently used entries until we fit the budgets again
+        while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            oldest = next(iter(self._entries))
+            self._remove_locked(oldest)
+            self._stats['evictions'] += 1
+
+    def _remove_locked(self, key):
+        body, _, _ = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def _disk_get(self, key, now):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline().decode('utf-8'))
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if header.get('expires_at', 0) <= now:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return body, header.get('mimetype', 'application/json'), header['expires_at']
+
+    def _disk_set(self, key, body, mimetype, expires_at):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(json.dumps({'mimetype': mimetype, 'expires_at': expires_at}).encode('utf-8'))
+                f.write(b'\n')
+                f.write(body)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write response cache entry to disk: {e}")
+
+    def invalidate_all(self):
+        """Drop every cached response (content database changed)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._version += 1
+            self._stats['invalidations'] += 1
+        if self.disk_dir:
+            # Only the shard directories _disk_path creates; the directory may be shared
+            for name in os.listdir(self.disk_dir):
+                if _SHARD_RE.match(name):
+                    shutil.rmtree(os.path.join(self.disk_dir, name), ignore_errors=True)
+        logger.info("Response cache invalidated")
+
+    def get_stats(self):
+        """Get hit/miss counters and current size."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'max_entries': self.max_entries,
+                'default_ttl': self.default_ttl,
+                'disk_tier': bool(self.disk_dir),
+                'version': self.version
+            })
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups * 100, 2) if lookups else 0.0
+        return stats
+
+
+# Global instance
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Get the singleton response cache."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(disk_dir=RESPONSE_CACHE_DIR or None)
+    return _response_cache
+
+
+def _tee_into_cache(chunks, cache, key, mimetype, ttl):
+    """Pass a streamed body through, caching it once the stream completes."""
+    parts = []
+    size = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if parts is not None:
+                size += len(chunk)
+                if size > cache.max_bytes:
+                    parts = None
+                else:
+                    parts.append(chunk)
+            yield chunk
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    # Only reached when the stream ran to the end (not on errors or client disconnects)
+    if parts is not None:
+        cache.set(key, b''.join(parts), mimetype, ttl)
+
+
+def cached_response(ttl=None):
+    """
+    Cache successful JSON responses of a Flask view.
+
+    Only 200 responses are stored. Caching is skipped in testing mode unless
+    RESPONSE_CACHE_ENABLED is set on the app config.
+
+    Usage:
+        @app.route('/api/items/<item_id>')
+        @cached_response(ttl=3600)
+        def get_item_details(item_id):
+            ...
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from flask import current_app, request
+
+            enabled = current_app.config.get(
+                'RESPONSE_CACHE_ENABLED',
+                RESPONSE_CACHE_ENABLED and not current_app.config.get('TESTING')
+            )
+            if not enabled or request.method != 'GET':
+                return view(*args, **kwargs)
+
+            cache = get_response_cache()
+            key = cache.make_key(request.path, request.args.to_dict(flat=False))
+            cached = cache.get(key)
+            if cached is not None:
+                body, mimetype = cached
+                response = current_app.response_class(body, status=200, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and response.is_json:
+                if response.is_streamed:
+                    response.response = _tee_into_cache(response.response, cache, key, response.mimetype, ttl)
+                else:
+                    cache.set(key, response.get_data(), response.mimetype, ttl)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,221 @@
+"""
+Accept-Encoding negotiated response compression.
+
+Item, zone and admin listings return large JSON bodies that compress very
+well. ResponseCompressor is registered as an after_request hook and
+compresses successful text/JSON responses above a size threshold with
+Brotli or gzip, whichever the client prefers (brotli is in
+requirements.txt; without it only gzip is offered). Streamed responses are compressed chunk by chunk with a
+sync flush after each chunk, so rows still reach the client as they are
+produced.
+
+Responses that already carry a Content-Encoding (precompressed zone map
+files) or are file passthroughs are left alone.
+
+Settings come from config.json (compression_* keys, see load_config).
+"""
+
+import gzip
+import zlib
+import logging
+import threading
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    brotli = None
+    HAS_BROTLI = False
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml'
+}
+
+DEFAULT_COMPRESSION_SETTINGS = {
+    'compression_enabled': True,
+    'compression_min_size': 1024,
+    'compression_gzip_level': 6,
+    'compression_brotli_quality': 4
+}
+
+
+def parse_accept_encoding(header):
+    """
+    Parse an Accept-Encoding header.
+
+    Returns:
+        Dict of lowercase coding -> q value (codings with q=0 are dropped)
+    """
+    codings = {}
+    for part in (header or '').split(','):
+        fields = part.strip().split(';')
+        coding = fields[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            codings[coding] = q
+    return codings
+
+
+def negotiate_encoding(header, brotli_available=HAS_BROTLI):
+    """
+    Pick the content coding for a response.
+
+    Brotli wins ties with gzip since it compresses JSON noticeably smaller.
+
+    Returns:
+        'br', 'gzip' or None
+    """
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get('*', 0)
+    candidates = []
+    if brotli_available:
+        candidates.append((codings.get('br', wildcard), 1, 'br'))
+    candidates.append((codings.get('gzip', codings.get('x-gzip', wildcard)), 0, 'gzip'))
+    q, _, coding = max(candidates)
+    return coding if q > 0 else None
+
+
+class _StreamCompressor:
+    """Incremental compressor with a per-chunk sync flush."""
+
+    def __init__(self, coding, settings):
+        self.coding = coding
+        if coding == 'br':
+            self._compressor = brotli.Compressor(quality=settings['compression_brotli_quality'])
+        else:
+            # wbits=31 writes a gzip header and trailer
+            self._compressor = zlib.compressobj(settings['compression_gzip_level'], zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        if self.coding == 'br':
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.coding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def compress_body(body, coding, settings):
+    """Compress a complete response body."""
+    if coding == 'br':
+        return brotli.compress(body, quality=settings['compression_brotli_quality'])
+    return gzip.compress(body, compresslevel=settings['compression_gzip_level'], mtime=0)
+
+
+class ResponseCompressor:
+    """after_request hook that compresses eligible responses."""
+
+    def __init__(self, settings=None):
+        self.settings = dict(DEFAULT_COMPRESSION_SETTINGS)
+        if settings:
+            self.configure(settings)
+        self._lock = threading.Lock()
+        self._stats = {'compressed': 0, 'streamed': 0, 'skipped_small': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    def configure(self, config):
+        """Take compression_* settings from a config dict."""
+        for key, default in DEFAULT_COMPRESSION_SETTINGS.items():
+            value = config.get(key, default)
+            self.settings[key] = bool(value) if isinstance(default, bool) else int(value)
+
+    def init_app(self, app):
+        app.after_request(self.compress_response)
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self._stats[key] += delta
+
+    def _eligible(self, response):
+        if not self.settings['compression_enabled']:
+            return False
+        if not 200 <= response.status_code < 300 or response.status_code == 204:
+            return False
+        if response.direct_passthrough or 'Content-Encoding' in response.headers:
+            return False
+        mimetype = response.mimetype or ''
+        return mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES
+
+    def compress_response(self, response):
+        """Compress a response in place when the client accepts it and it is worth it."""
+        from flask import request
+
+        if not self._eligible(response):
+            return response
+        response.vary.add('Accept-Encoding')
+        coding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+        if coding is None:
+            return response
+
+        if response.is_streamed:
+            compressor = _StreamCompressor(coding, self.settings)
+            chunks = response.response
+
+            def generate():
+                try:
+                    for chunk in chunks:
+                        if isinstance(chunk, str):
+                            chunk = chunk.encode('utf-8')
+                        if chunk:
+                            yield compressor.compress(chunk)
+                    yield compressor.finish()
+                finally:
+                    if hasattr(chunks, 'close'):
+                        chunks.close()
+
+            response.response = generate()
+            response.headers.pop('Content-Length', None)
+            self._count(streamed=1)
+        else:
+            body = response.get_data()
+            if len(body) < self.settings['compression_min_size']:
+                self._count(skipped_small=1)
+                return response
+            compressed = compress_body(body, coding, self.settings)
+            response.set_data(compressed)
+            self._count(compressed=1, bytes_in=len(body), bytes_out=len(compressed))
+
+        response.headers['Content-Encoding'] = coding
+        # The compressed representation differs byte-wise, so a strong validator would be wrong
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats, **self.settings, brotli_available=HAS_BROTLI)
+        stats['ratio'] = round(stats['bytes_out'] / stats['bytes_in'], 3) if stats['bytes_in'] else None
+        return stats
+
+
+# Global instance
+_response_compressor = None
+_response_compressor_lock = threading.Lock()
+
+
+def get_response_compressor():
+    """Get the singleton response compressor."""
+    global _response_compressor
+    if _response_compressor is None:
+        with _response_compressor_lock:
+            if _response_compressor is None:
+                _response_compressor = ResponseCompressor()
+    return _response_compressor
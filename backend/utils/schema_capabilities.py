@@ -0,0 +1,229 @@
+"""
+Schema capability registry for the content database.
+
+Item, recipe and availability routes used to probe for optional tables with
+one to six SHOW TABLES LIKE ... statements per request. The registry reads
+information_schema once per content database config (tables, columns and
+indexes) and answers capabilities.has('lootdrop_entries') or
+capabilities.has('merchantlist', 'sellrate') from memory.
+
+The snapshot is keyed by the content DB version tag and dropped by the
+db_config_manager reload callback, so a database switch re-introspects on
+the next request.
+"""
+
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+MYSQL_COLUMNS_QUERY = """
+    SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE()
+"""
+
+MYSQL_INDEXES_QUERY = """
+    SELECT TABLE_NAME AS table_name, INDEX_NAME AS index_name, COLUMN_NAME AS column_name
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+    ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+"""
+
+POSTGRES_COLUMNS_QUERY = """
+    SELECT table_name, column_name
+    FROM information_schema.columns
+    WHERE table_schema = current_schema()
+"""
+
+MSSQL_COLUMNS_QUERY = """
+    SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name
+    FROM INFORMATION_SCHEMA.COLUMNS
+    WHERE TABLE_SCHEMA = SCHEMA_NAME()
+"""
+
+COLUMNS_QUERIES = {
+    'mysql': MYSQL_COLUMNS_QUERY,
+    'postgresql': POSTGRES_COLUMNS_QUERY,
+    'mssql': MSSQL_COLUMNS_QUERY
+}
+# Index introspection is only used for MySQL (the only engine EQEmu ships on)
+INDEXES_QUERIES = {
+    'mysql': MYSQL_INDEXES_QUERY
+}
+
+
+def _row_values(row, keys):
+    """Return values for keys from a dict or tuple row."""
+    if isinstance(row, dict):
+        return tuple(row.get(key, row.get(key.upper())) for key in keys)
+    return tuple(row)
+
+
+class SchemaCapabilities:
+    """Immutable snapshot of the tables, columns and indexes in a database."""
+
+    def __init__(self, columns, indexes=None):
+        # Names are matched case-insensitively (MySQL on Windows lowercases them)
+        self._columns = {
+            table.lower(): frozenset(col.lower() for col in cols)
+            for table, cols in columns.items()
+        }
+        self._indexes = {
+            table.lower(): {name: tuple(col.lower() for col in cols) for name, cols in table_indexes.items()}
+            for table, table_indexes in (indexes or {}).items()
+        }
+        self.loaded_at = time.time()
+
+    def has(self, table, column=None):
+        """Check whether a table (or a column of a table) exists."""
+        columns = self._columns.get(table.lower())
+        if columns is None:
+            return False
+        return column is None or column.lower() in columns
+
+    def has_all(self, *tables):
+        """Check whether every one of the tables exists."""
+        return all(self.has(table) for table in tables)
+
+    def has_index(self, table, *columns):
+        """Check whether an index on the table starts with the given columns."""
+        wanted = tuple(col.lower() for col in columns)
+        return any(
+            index_columns[:len(wanted)] == wanted
+            for index_columns in self._indexes.get(table.lower(), {}).values()
+        )
+
+    @property
+    def tables(self):
+        return sorted(self._columns)
+
+    def columns(self, table):
+        return sorted(self._columns.get(table.lower(), ()))
+
+    @classmethod
+    def introspect(cls, conn, db_type='mysql'):
+        """
+        Read the schema of the connection's current database.
+
+        Args:
+            conn: Open DB-API connection (not closed here)
+            db_type: 'mysql', 'postgresql' or 'mssql'
+
+        Returns:
+            SchemaCapabilities
+        """
+        columns = {}
+        indexes = {}
+        cursor = conn.cursor()
+        try:
+            cursor.execute(COLUMNS_QUERIES.get(db_type, MYSQL_COLUMNS_QUERY))
+            for row in cursor.fetchall():
+                table, column = _row_values(row, ('table_name', 'column_name'))
+                columns.setdefault(table, set()).add(column)
+
+            indexes_query = INDEXES_QUERIES.get(db_type)
+            if indexes_query:
+                cursor.execute(indexes_query)
+                for row in cursor.fetchall():
+                    table, index_name, column = _row_values(row, ('table_name', 'index_name', 'column_name'))
+                    indexes.setdefault(table, {}).setdefault(index_name, []).append(column)
+        finally:
+            cursor.close()
+        return cls(columns, indexes)
+
+
+class _UnknownCapabilities:
+    """Stand-in used when introspection failed.
+
+    Tables are assumed to exist, so routes run their real queries and report
+    failures as they always did; optional columns and indexes are assumed
+    missing so nothing opts into SQL that might not parse.
+    """
+
+    def has(self, table, column=None):
+        return column is None
+
+    def has_all(self, *tables):
+        return True
+
+    def has_index(self, table, *columns):
+        return False
+
+
+UNKNOWN_CAPABILITIES = _UnknownCapabilities()
+
+
+class SchemaCapabilityRegistry:
+    """Caches one SchemaCapabilities snapshot per content database version tag."""
+
+    def __init__(self):
+        # (version_tag, SchemaCapabilities) swapped as one reference
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._stats = {'loads': 0, 'failures': 0, 'load_seconds': 0.0}
+
+    def get(self, conn, version_tag, db_type='mysql'):
+        """
+        Get the capabilities of the content database, introspecting on first use.
+
+        Args:
+            conn: Open connection used only when the schema isn't loaded yet
+            version_tag: Identifies the configured content database
+            db_type: Database engine of the connection
+
+        Returns:
+            SchemaCapabilities, or UNKNOWN_CAPABILITIES if introspection failed
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot[0] == version_tag:
+            return snapshot[1]
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot[0] == version_tag:
+                return snapshot[1]
+            start = time.time()
+            try:
+                capabilities = SchemaCapabilities.introspect(conn, db_type)
+            except Exception as e:
+                # Not cached: the next request tries again
+                logger.error(f"Schema introspection failed: {e}")
+                self._stats['failures'] += 1
+                return UNKNOWN_CAPABILITIES
+            self._snapshot = (version_tag, capabilities)
+            self._stats['loads'] += 1
+            self._stats['load_seconds'] += time.time() - start
+        logger.info(f"Schema capabilities loaded: {len(capabilities.tables)} tables")
+        return capabilities
+
+    def invalidate(self):
+        """Forget the loaded schema (content database config changed)."""
+        with self._lock:
+            self._snapshot = None
+
+    def get_status(self):
+        snapshot = self._snapshot
+        capabilities = snapshot[1] if snapshot else None
+        return dict(
+            self._stats,
+            load_seconds=round(self._stats['load_seconds'], 3),
+            loaded=capabilities is not None,
+            tables=len(capabilities.tables) if capabilities else 0,
+            loaded_at=capabilities.loaded_at if capabilities else None
+        )
+
+
+# Global instance
+_schema_registry = None
+_schema_registry_lock = threading.Lock()
+
+
+def get_schema_registry():
+    """Get the singleton schema capability registry."""
+    global _schema_registry
+    if _schema_registry is None:
+        with _schema_registry_lock:
+            if _schema_registry is None:
+                _schema_registry = SchemaCapabilityRegistry()
+    return _schema_registry
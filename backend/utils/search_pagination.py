@@ -0,0 +1,274 @@
+"""
+Pagination helpers for item and spell search.
+
+Searches used to run a COUNT(*) over the same predicate before every page,
+doubling the database work. Callers now choose a count mode:
+
+- estimated (default): reuse a cached total for the normalized query and
+  filter set; only the first search for a combination pays for COUNT(*)
+- exact: always run COUNT(*)
+- none: skip the total entirely
+
+Keyset paging (after=<name,id>) continues from the last row of the previous
+page instead of scanning and discarding OFFSET rows. Name-only item searches
+served from the in-memory name index page in rank order instead, with
+rank:<position,id> cursors, so the two cursor kinds are never mixed up.
+"""
+
+import os
+import time
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+SEARCH_COUNT_CACHE_TTL = int(os.environ.get('SEARCH_COUNT_CACHE_TTL', '900'))
+SEARCH_COUNT_CACHE_MAX_ENTRIES = int(os.environ.get('SEARCH_COUNT_CACHE_MAX_ENTRIES', '5000'))
+
+COUNT_MODES = ('estimated', 'exact', 'none')
+DEFAULT_COUNT_MODE = 'estimated'
+
+RANK_CURSOR_PREFIX = 'rank:'
+
+
+def parse_pagination_args(args):
+    """
+    Read the count mode and keyset cursor from request args.
+
+    Args:
+        args: Request args mapping
+
+    Returns:
+        Tuple of (count_mode, after) where after is the raw cursor string or None
+
+    Raises:
+        ValueError: If the count mode is unknown
+    """
+    count_mode = (args.get('count') or DEFAULT_COUNT_MODE).strip().lower()
+    if count_mode not in COUNT_MODES:
+        raise ValueError(f"Invalid count mode '{count_mode}'. Use one of: {', '.join(COUNT_MODES)}")
+    after = args.get('after') or None
+    return count_mode, after
+
+
+def encode_cursor(*values):
+    """Build an after= cursor from the sort key of the last row on a page."""
+    return ','.join('' if value is None else str(value) for value in values)
+
+
+def decode_cursor(after, leading_int=False):
+    """
+    Parse an after= cursor.
+
+    Names can contain commas, so the id is taken from the last comma and an
+    optional leading sort level from the first.
+
+    Args:
+        after: Cursor string, "<name>,<id>" or "<level>,<name>,<id>"
+        leading_int: Whether the cursor starts with an integer sort level
+
+    Returns:
+        Tuple of (name, id) or (level, name, id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not after or ',' not in after:
+        raise ValueError("Invalid cursor: expected after=<name,id>")
+    head, last_id = after.rsplit(',', 1)
+    last_id = int(last_id)
+    if not leading_int:
+        return head, last_id
+    if ',' not in head:
+        raise ValueError("Invalid cursor: expected after=<level,name,id>")
+    level, name = head.split(',', 1)
+    return int(level), name, last_id
+
+
+def encode_rank_cursor(position, last_id):
+    """Build an after= cursor for paging through a ranked id list."""
+    return f"{RANK_CURSOR_PREFIX}{position},{last_id}"
+
+
+def decode_rank_cursor(after):
+    """
+    Parse a rank:<position,id> cursor.
+
+    Args:
+        after: Cursor string
+
+    Returns:
+        Tuple of (position, last_id), or None if after is not a rank cursor
+
+    Raises:
+        ValueError: If the cursor is a malformed rank cursor
+    """
+    if not after or not after.startswith(RANK_CURSOR_PREFIX):
+        return None
+    try:
+        position, last_id = (int(part) for part in after[len(RANK_CURSOR_PREFIX):].split(','))
+    except ValueError:
+        raise ValueError("Invalid cursor: expected after=rank:<position,id>")
+    if position < 1:
+        raise ValueError("Invalid cursor: expected after=rank:<position,id>")
+    return position, last_id
+
+
+def rank_cursor_start(ranked_ids, position, last_id):
+    """
+    Find where the page after a rank cursor starts.
+
+    The position is trusted while the id before it is still last_id. If the
+    index was rebuilt in between, paging resumes after last_id wherever it
+    now ranks, or at the same position if it dropped out of the results.
+    """
+    if position <= len(ranked_ids) and ranked_ids[position - 1] == last_id:
+        return position
+    try:
+        return ranked_ids.index(last_id) + 1
+    except ValueError:
+        return position
+
+
+def keyset_condition(columns, values):
+    """
+    Build a WHERE condition selecting rows that sort after the given key.
+
+    Expands (a, b, c) > (x, y, z) into nested ORs, which MySQL can satisfy
+    with a range scan on a matching index.
+
+    Args:
+        columns: Sort columns/expressions in ORDER BY order (all ascending)
+        values: Values of those columns for the last row of the previous page
+
+    Returns:
+        Tuple of (condition, params)
+    """
+    column, rest = columns[0], columns[1:]
+    value, rest_values = values[0], values[1:]
+    if not rest:
+        return f"{column} > %s", [value]
+    inner, inner_params = keyset_condition(rest, rest_values)
+    return f"({column} > %s OR ({column} = %s AND {inner}))", [value, value] + inner_params
+
+
+class SearchCountCache:
+    """Thread-safe LRU + TTL cache of search totals keyed by normalized filter set."""
+
+    def __init__(self, max_entries=SEARCH_COUNT_CACHE_MAX_ENTRIES, ttl=SEARCH_COUNT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (count, expires_at)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0}
+
+    @staticmethod
+    def make_key(kind, search_query, filters):
+        """
+        Build a cache key for a search.
+
+        Filter order and query case/whitespace don't change the result set,
+        so they don't change the key either.
+        """
+        normalized_query = ' '.join((search_query or '').lower().split())
+        normalized_filters = sorted(
+            json.dumps(
+                [f.get('field'), f.get('operator'), f.get('value')],
+                sort_keys=True, default=str
+            )
+            for f in (filters or [])
+        )
+        raw = json.dumps([kind, normalized_query, normalized_filters])
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Get a cached total, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[0]
+
+    def set(self, key, count):
+        """Store a total."""
+        with self._lock:
+            self._entries[key] = (count, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            self._stats['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_all(self):
+        """Drop every cached total (content database changed)."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                hit_rate=round(self._stats['hits'] / lookups * 100, 2) if lookups else 0
+            )
+
+
+def resolve_total(count_mode, cache_key, page_rows, offset, limit, count_func):
+    """
+    Work out the total for a search page, running COUNT(*) only when needed.
+
+    A short first-page (or offset) result already pins down the exact total,
+    so no COUNT is needed for it in any mode.
+
+    Args:
+        count_mode: 'estimated', 'exact' or 'none'
+        cache_key: SearchCountCache key for this search
+        page_rows: Number of rows returned for the page
+        offset: Offset of the page (None for keyset pages)
+        limit: Page size
+        count_func: Callable running the COUNT query and returning the total
+
+    Returns:
+        Tuple of (total_count, is_estimate); total_count is None in 'none' mode
+    """
+    cache = get_search_count_cache()
+    if offset is not None and page_rows < limit and (page_rows or offset == 0):
+        total = offset + page_rows
+        cache.set(cache_key, total)
+        return total, False
+
+    if count_mode == 'none':
+        return None, False
+
+    if count_mode == 'estimated':
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached, True
+
+    total = count_func()
+    cache.set(cache_key, total)
+    return total, False
+
+
+# Global instance
+_search_count_cache = None
+_search_count_cache_lock = threading.Lock()
+
+
+def get_search_count_cache():
+    """Get the singleton search count cache."""
+    global _search_count_cache
+    if _search_count_cache is None:
+        with _search_count_cache_lock:
+            if _search_count_cache is None:
+                _search_count_cache = SearchCountCache()
+    return _search_count_cache
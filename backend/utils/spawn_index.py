@@ -0,0 +1,226 @@
+"""
+Per-zone spatial index over NPC spawn points.
+
+The zone NPC endpoint returns every spawn point in a zone; the map only
+needs what is on screen. SpawnGrid buckets a zone's spawn points into a
+uniform grid (points sorted by cell with an offsets array per cell, like the
+other compact indexes) so rectangle queries only touch the cells the
+rectangle overlaps, and nearest-spawn queries search outward ring by ring
+until no closer point can exist.
+
+Grids are built from the zone NPC list (zone summaries when built) and kept
+in a small LRU keyed by zone and the version of the data they came from.
+Without zone summaries the version is the content database plus a
+SPAWN_INDEX_DATABASE_TTL_SECONDS time bucket.
+"""
+
+import os
+import math
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SPAWN_INDEX_CACHE_ZONES = int(os.environ.get('SPAWN_INDEX_CACHE_ZONES', '64'))
+# How long a grid built from live database rows is reused
+SPAWN_INDEX_DATABASE_TTL_SECONDS = int(os.environ.get('SPAWN_INDEX_DATABASE_TTL_SECONDS', '300'))
+# Target average points per grid cell and the smallest cell size in world units
+SPAWN_GRID_POINTS_PER_CELL = 8
+SPAWN_GRID_MIN_CELL_SIZE = 50.0
+# Result limits for the region and nearest endpoints
+SPAWN_REGION_MAX_RESULTS = 5000
+SPAWN_NEAREST_MAX_K = 100
+
+
+class SpawnGrid:
+    """Uniform grid over spawn (x, y) with exact rectangle and k-nearest queries."""
+
+    def __init__(self, spawns):
+        """
+        Build the grid.
+
+        Args:
+            spawns: Zone NPC dicts with a 'location' {'x', 'y', 'z'} (as served by /api/zone-npcs)
+        """
+        self.spawns = list(spawns)
+        count = len(self.spawns)
+        self.xs = np.array([s['location']['x'] for s in self.spawns], dtype=np.float64)
+        self.ys = np.array([s['location']['y'] for s in self.spawns], dtype=np.float64)
+        self.zs = np.array([s['location']['z'] for s in self.spawns], dtype=np.float64)
+
+        if count:
+            self.min_x, self.min_y = float(self.xs.min()), float(self.ys.min())
+            extent = max(float(self.xs.max()) - self.min_x, float(self.ys.max()) - self.min_y, 1.0)
+        else:
+            self.min_x = self.min_y = 0.0
+            extent = 1.0
+        cells_per_side = max(1, int(math.sqrt(max(count, 1) / SPAWN_GRID_POINTS_PER_CELL)))
+        self.cell_size = max(extent / cells_per_side, SPAWN_GRID_MIN_CELL_SIZE)
+        self.cols = int(extent // self.cell_size) + 1
+        self.rows = self.cols
+
+        cells = self._cell_of(self.xs, self.ys)
+        # Point indexes sorted by cell; cell c holds order[offsets[c]:offsets[c + 1]]
+        self.order = np.argsort(cells, kind='stable')
+        self.offsets = np.searchsorted(cells[self.order], np.arange(self.cols * self.rows + 1))
+
+    def __len__(self):
+        return len(self.spawns)
+
+    def _cell_coords(self, x, y):
+        col = np.clip(((np.asarray(x) - self.min_x) // self.cell_size).astype(np.int64), 0, self.cols - 1)
+        row = np.clip(((np.asarray(y) - self.min_y) // self.cell_size).astype(np.int64), 0, self.rows - 1)
+        return col, row
+
+    def _cell_of(self, x, y):
+        col, row = self._cell_coords(x, y)
+        return row * self.cols + col
+
+    def _points_in_cells(self, col_lo, col_hi, row_lo, row_hi):
+        """Indexes of points in a block of cells (bounds inclusive)."""
+        chunks = []
+        for row in range(row_lo, row_hi + 1):
+            start = self.offsets[row * self.cols + col_lo]
+            end = self.offsets[row * self.cols + col_hi + 1]
+            if end > start:
+                chunks.append(self.order[start:end])
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def query_bbox(self, min_x, min_y, max_x, max_y, limit=SPAWN_REGION_MAX_RESULTS):
+        """
+        Get spawns inside a rectangle (inclusive), in zone list order.
+
+        Returns:
+            Tuple of (spawns, total) where total counts every match before limit
+        """
+        if not self.spawns:
+            return [], 0
+        col_lo, row_lo = self._cell_coords(min_x, min_y)
+        col_hi, row_hi = self._cell_coords(max_x, max_y)
+        candidates = self._points_in_cells(int(col_lo), int(col_hi), int(row_lo), int(row_hi))
+        xs, ys = self.xs[candidates], self.ys[candidates]
+        hits = np.sort(candidates[(xs >= min_x) & (xs <= max_x) & (ys >= min_y) & (ys <= max_y)])
+        return [self.spawns[i] for i in hits[:limit].tolist()], len(hits)
+
+    def nearest(self, x, y, z=None, k=10, max_distance=None):
+        """
+        Get the k spawns closest to a point.
+
+        Searches rings of cells around the point's cell and stops once the
+        ring is farther away than the k-th closest point found so far.
+
+        Args:
+            x, y: Point in world coordinates
+            z: Optional height; when given distances are 3D
+            k: Number of spawns to return
+            max_distance: Optional cutoff distance
+
+        Returns:
+            List of (distance, spawn) tuples, closest first
+        """
+        if not self.spawns or k < 1:
+            return []
+        center_col, center_row = (int(v) for v in self._cell_coords(x, y))
+        found_idx = np.empty(0, dtype=np.int64)
+        found_dist = np.empty(0, dtype=np.float64)
+        max_ring = max(self.cols, self.rows)
+        for ring in range(max_ring + 1):
+            col_lo, col_hi = center_col - ring, center_col + ring
+            row_lo, row_hi = center_row - ring, center_row + ring
+            ring_points = []
+            for row in range(max(row_lo, 0), min(row_hi, self.rows - 1) + 1):
+                if row in (row_lo, row_hi):
+                    ring_points.append(self._points_in_cells(max(col_lo, 0), min(col_hi, self.cols - 1), row, row))
+                else:
+                    for col in (col_lo, col_hi):
+                        if 0 <= col < self.cols:
+                            ring_points.append(self._points_in_cells(col, col, row, row))
+            if ring_points:
+                idx = np.concatenate(ring_points)
+                if len(idx):
+                    dist = (self.xs[idx] - x) ** 2 + (self.ys[idx] - y) ** 2
+                    if z is not None:
+                        dist = dist + (self.zs[idx] - z) ** 2
+                    found_idx = np.concatenate([found_idx, idx])
+                    found_dist = np.concatenate([found_dist, np.sqrt(dist)])
+
+            # Anything outside this ring is at least `ring * cell_size` away horizontally
+            reach = ring * self.cell_size
+            if max_distance is not None and reach > max_distance:
+                break
+            if len(found_dist) >= k and np.partition(found_dist, k - 1)[k - 1] <= reach:
+                break
+
+        if max_distance is not None:
+            keep = found_dist <= max_distance
+            found_idx, found_dist = found_idx[keep], found_dist[keep]
+        best = np.lexsort((found_idx, found_dist))[:k]
+        return [(float(found_dist[i]), self.spawns[int(found_idx[i])]) for i in best]
+
+
+class SpawnIndexCache:
+    """LRU of per-zone spawn grids keyed by zone and data version."""
+
+    def __init__(self, max_zones=SPAWN_INDEX_CACHE_ZONES):
+        self.max_zones = max_zones
+        self._grids = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'builds': 0}
+
+    def get(self, zone, version, loader):
+        """
+        Get a zone's grid, building it from loader() on a miss.
+
+        Args:
+            zone: Zone short name
+            version: Version of the spawn data (e.g. the zone summary build
+                time); None means the data isn't versioned and the grid is not cached
+            loader: Callable returning the zone's spawn list
+
+        Returns:
+            SpawnGrid
+        """
+        key = (zone, version)
+        if version is not None:
+            with self._lock:
+                grid = self._grids.get(key)
+                if grid is not None:
+                    self._grids.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return grid
+
+        grid = SpawnGrid(loader())
+        with self._lock:
+            self._stats['builds'] += 1
+            if version is not None:
+                self._grids[key] = grid
+                while len(self._grids) > self.max_zones:
+                    self._grids.popitem(last=False)
+        return grid
+
+    def invalidate_all(self):
+        """Drop every grid (content database changed)."""
+        with self._lock:
+            self._grids.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, zones=len(self._grids))
+
+
+# Global instance
+_spawn_index_cache = None
+_spawn_index_cache_lock = threading.Lock()
+
+
+def get_spawn_index_cache():
+    """Get the singleton spawn index cache."""
+    global _spawn_index_cache
+    if _spawn_index_cache is None:
+        with _spawn_index_cache_lock:
+            if _spawn_index_cache is None:
+                _spawn_index_cache = SpawnIndexCache()
+    return _spawn_index_cache
@@ -0,0 +1,127 @@
+"""
+SQL statement fingerprints.
+
+Queries that differ only in literal values (item ids, search strings, IN
+lists of varying length) are the same statement as far as tuning goes.
+fingerprint_query() normalizes a statement the way pg_stat_statements and
+pt-query-digest do: comments dropped, literals and driver placeholders
+replaced with ?, IN/VALUES lists collapsed, identifiers unquoted,
+whitespace folded and spacing around operators made uniform, and
+everything lowercased. The normalized text is hashed
+into a short fingerprint id that query profiles are keyed by.
+
+Double quotes are treated like backticks (identifier quotes, as in
+PostgreSQL for the accounts database); the content queries pass strings as
+parameters rather than double-quoted literals.
+"""
+
+import re
+import hashlib
+import logging
+from collections import namedtuple
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+SQL_FINGERPRINT_CACHE_SIZE = 4096
+# Normalized text longer than this is cut (keeps profiles of huge generated statements small)
+SQL_FINGERPRINT_MAX_LENGTH = 2000
+
+Fingerprint = namedtuple('Fingerprint', ['id', 'normalized', 'query_type', 'tables'])
+
+_BLOCK_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_LINE_COMMENT = re.compile(r'(?:--|#)[^\n]*')
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|\?|(?<!:):[a-z_]\w*\b', re.I)
+_HEX = re.compile(r'\b0x[0-9a-f]+\b', re.I)
+_NUMBER = re.compile(r'(?<![\w$.])\d+(?:\.\d+)?(?:e[+-]?\d+)?\b', re.I)
+_WHITESPACE = re.compile(r'\s+')
+_COMPARISON = re.compile(r'\s*(<=>|<=|>=|!=|<>|=|<|>)\s*')
+_COMMA = re.compile(r'\s*,\s*')
+_OPEN_PAREN = re.compile(r'\(\s+')
+_CLOSE_PAREN = re.compile(r'\s+\)')
+_IN_LIST = re.compile(r'\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_VALUES_LIST = re.compile(r'\bvalues\s*(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*')
+_BATCH_SUFFIX = re.compile(r'\s*\(batch(?: of \?)?\)$')
+_TABLE_REF = r'[a-z_][\w$]*(?:\.[a-z_][\w$]*)?'
+_TABLES = re.compile(
+    r'\b(?:from|join|into|update)\s+(' + _TABLE_REF + r'(?:\s+(?:as\s+)?[a-z_]\w*)?'
+    r'(?:\s*,\s*' + _TABLE_REF + r'(?:\s+(?:as\s+)?[a-z_]\w*)?)*)'
+)
+_NOT_TABLES = {'select', 'dual', 'where', 'set', 'values', 'lateral'}
+# Words _TABLES can pick up after a table name that aren't aliases
+_NOT_ALIASES = {'where', 'join', 'inner', 'left', 'right', 'cross', 'natural', 'straight_join', 'on', 'using',
+                'order', 'group', 'having', 'limit', 'union', 'set', 'values', 'force', 'use', 'ignore',
+                'for', 'lock', 'partition', 'window', 'select'}
+
+
+def normalize_query(query):
+    """Get the literal-free, lowercased form of a SQL statement."""
+    # Strings first, so comment markers inside them survive until they're replaced
+    text = _STRING.sub('?', query)
+    text = _BLOCK_COMMENT.sub(' ', text)
+    text = _LINE_COMMENT.sub(' ', text)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _HEX.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _WHITESPACE.sub(' ', text.replace('`', '').replace('"', '')).strip().lower()
+    # Same spacing around operators, commas and parentheses however the query was written
+    text = _COMPARISON.sub(r' \1 ', text)
+    text = _COMMA.sub(', ', text)
+    text = _OPEN_PAREN.sub('(', _CLOSE_PAREN.sub(')', text))
+    text = _IN_LIST.sub('in (?+)', text)
+    text = _VALUES_LIST.sub('values (?+)', text)
+    text = _BATCH_SUFFIX.sub('', text)
+    return text[:SQL_FINGERPRINT_MAX_LENGTH]
+
+
+def extract_tables(normalized):
+    """Get the tables a normalized statement reads or writes, in order of appearance."""
+    tables = []
+    for match in _TABLES.finditer(normalized):
+        for ref in match.group(1).split(','):
+            name = ref.strip().split(' ')[0]
+            if name and name not in _NOT_TABLES and name not in tables:
+                tables.append(name)
+    return tables
+
+
+def extract_table_aliases(normalized):
+    """
+    Map the names a normalized statement refers to its tables by to the tables.
+
+    Returns:
+        Dict of alias (or bare table name) -> table name, without any schema prefix
+    """
+    aliases = {}
+    for match in _TABLES.finditer(normalized):
+        for ref in match.group(1).split(','):
+            parts = ref.strip().split(' ')
+            name = parts[0]
+            if not name or name in _NOT_TABLES:
+                continue
+            table = name.split('.')[-1]
+            aliases.setdefault(table, table)
+            alias = parts[-1]
+            if len(parts) > 1 and alias not in _NOT_ALIASES:
+                aliases[alias] = table
+    return aliases
+
+
+@lru_cache(maxsize=SQL_FINGERPRINT_CACHE_SIZE)
+def fingerprint_query(query):
+    """
+    Fingerprint a SQL statement.
+
+    Returns:
+        Fingerprint(id, normalized, query_type, tables) where id is a
+        16-character hex digest of the normalized text
+    """
+    normalized = normalize_query(query)
+    first_word = normalized.split(' ', 1)[0].upper() if normalized else ''
+    if first_word == 'DESC':
+        first_word = 'DESCRIBE'
+    query_type = first_word if first_word in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'SHOW',
+                                              'SET', 'DESCRIBE', 'EXPLAIN') else 'OTHER'
+    digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+    return Fingerprint(digest, normalized, query_type, tuple(extract_tables(normalized)))
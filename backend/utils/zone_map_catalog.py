@@ -0,0 +1,190 @@
+"""
+Catalog of the zone map text files in the Maps directory.
+
+Resolves the Maps directory once and records which layers exist per zone
+(<zone>.txt, <zone>_1.txt, <zone>_2.txt, <zone>_3.txt) with their sizes,
+mtimes and encodings, so map lookups are a dict hit instead of probing
+candidate directories and suffixes with os.path.exists on every request.
+
+The catalog re-stats the directory at most every ZONE_MAP_CATALOG_CHECK_SECONDS
+and only re-reads files whose size or mtime changed. The first scan happens on
+the first lookup in each worker, never at import, so a preloading server
+doesn't fork workers in the middle of a scan.
+"""
+
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+ZONE_MAP_CATALOG_CHECK_SECONDS = float(os.environ.get('ZONE_MAP_CATALOG_CHECK_SECONDS', '60'))
+
+# Candidate Maps locations: backend/Maps (Railway symlink), project root, Railway absolute path
+MAPS_DIR_CANDIDATES = (
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Maps'),
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'Maps'),
+    '/app/Maps'
+)
+
+# Layers are named by file suffix; <zone>.txt is the base layer
+LAYER_SUFFIXES = ('_1', '_2', '_3')
+BASE_LAYER = 'base'
+
+
+def resolve_maps_dir():
+    """Get the first Maps directory that exists (None if there is none)."""
+    for candidate in MAPS_DIR_CANDIDATES:
+        if os.path.isdir(candidate):
+            return candidate
+    return None
+
+
+def detect_encoding(path):
+    """Get 'utf-8' if the file decodes as UTF-8, otherwise 'latin-1'."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    try:
+        raw.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def split_map_filename(filename):
+    """
+    Split a map file name into (zone, layer).
+
+    Returns:
+        Tuple of (zone, layer) or None if it isn't a map file
+    """
+    if not filename.endswith('.txt'):
+        return None
+    stem = filename[:-4]
+    suffix = stem[-2:]
+    if suffix in LAYER_SUFFIXES and len(stem) > 2:
+        return stem[:-2], suffix
+    return stem, BASE_LAYER
+
+
+class ZoneMapCatalog:
+    """In-memory index of zone map files keyed by lowercase zone short name."""
+
+    def __init__(self, maps_dir=None, check_seconds=ZONE_MAP_CATALOG_CHECK_SECONDS):
+        self.maps_dir = maps_dir or resolve_maps_dir()
+        self.check_seconds = check_seconds
+        # zone -> {'zone': name, 'layers': {layer: {path, size, mtime, encoding}}}
+        self._zones = {}
+        self._lock = threading.Lock()
+        self._last_check = 0
+        self.scanned_at = None
+        self.scan_seconds = None
+
+    def refresh(self, force=False):
+        """
+        Re-stat the Maps directory if the check interval has passed.
+
+        Returns:
+            True if anything changed
+        """
+        now = time.time()
+        if not force and now - self._last_check < self.check_seconds:
+            return False
+        with self._lock:
+            if not force and now - self._last_check < self.check_seconds:
+                return False
+            self._last_check = now
+            if not self.maps_dir:
+                return False
+            start = time.time()
+            previous = {
+                layer['path']: layer
+                for entry in self._zones.values() for layer in entry['layers'].values()
+            }
+            zones = {}
+            try:
+                entries = list(os.scandir(self.maps_dir))
+            except OSError as e:
+                logger.error(f"Failed to scan zone maps in {self.maps_dir}: {e}")
+                return False
+            for dir_entry in entries:
+                parsed = split_map_filename(dir_entry.name)
+                if not parsed or not dir_entry.is_file():
+                    continue
+                zone, layer = parsed
+                stat = dir_entry.stat()
+                old = previous.get(dir_entry.path)
+                if old and old['size'] == stat.st_size and old['mtime'] == stat.st_mtime:
+                    info = old
+                else:
+                    info = {
+                        'path': dir_entry.path,
+                        'size': stat.st_size,
+                        'mtime': stat.st_mtime,
+                        'encoding': detect_encoding(dir_entry.path)
+                    }
+                zone_entry = zones.setdefault(zone.lower(), {'zone': zone, 'layers': {}})
+                zone_entry['layers'][layer] = info
+
+            changed = zones != self._zones
+            self._zones = zones
+            self.scanned_at = time.time()
+            self.scan_seconds = round(self.scanned_at - start, 3)
+        if changed:
+            logger.info(f"Zone map catalog: {len(zones)} zones in {self.maps_dir} ({self.scan_seconds}s)")
+        return changed
+
+    def _after_fork(self):
+        """Replace the lock a parent thread may have held at fork time."""
+        self._lock = threading.Lock()
+
+    def get(self, zone):
+        """Get the catalog entry for a zone (None if it has no map files)."""
+        self.refresh()
+        return self._zones.get(zone.lower())
+
+    def layer(self, zone, layer):
+        """Get file info for one layer of a zone (None if missing)."""
+        entry = self.get(zone)
+        return entry['layers'].get(layer) if entry else None
+
+    def list_zones(self):
+        """Get every catalogued zone, sorted by name."""
+        self.refresh()
+        zones = self._zones
+        return [
+            {
+                'zone': key,
+                'layers': {
+                    layer: {k: v for k, v in info.items() if k != 'path'}
+                    for layer, info in sorted(entry['layers'].items())
+                }
+            }
+            for key, entry in sorted(zones.items())
+        ]
+
+    def get_status(self):
+        return {
+            'maps_dir': self.maps_dir,
+            'zones': len(self._zones),
+            'scanned_at': self.scanned_at,
+            'scan_seconds': self.scan_seconds
+        }
+
+
+# Global instance
+_zone_map_catalog = None
+_zone_map_catalog_lock = threading.Lock()
+
+
+def get_zone_map_catalog():
+    """Get the singleton zone map catalog."""
+    global _zone_map_catalog
+    if _zone_map_catalog is None:
+        with _zone_map_catalog_lock:
+            if _zone_map_catalog is None:
+                _zone_map_catalog = ZoneMapCatalog()
+                if hasattr(os, 'register_at_fork'):
+                    os.register_at_fork(after_in_child=_zone_map_catalog._after_fork)
+    return _zone_map_catalog
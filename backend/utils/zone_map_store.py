@@ -0,0 +1,492 @@
+"""
+Binary pre-parsed zone map store.
+
+The Maps/*.txt files are plain text ("L x1, y1, z1, x2, y2, z2, r, g, b" line
+segments and "P x, y, z, r, g, b, size, text" labels). Parsing them on every
+request was slow enough that the endpoint truncated big zones, so each map is
+converted once into a compact little-endian binary file:
+
+    header      64 bytes (magic, version, counts, source mtime, bbox)
+    segments    float32[n_segments * 6]   x1, y1, z1, x2, y2, z2
+    colors      uint8[n_segments * 3]     r, g, b (padded to 4 bytes)
+    label_pos   float32[n_labels * 3]     x, y, z
+    label_attr  uint8[n_labels * 4]       r, g, b, size
+    label_offs  uint32[n_labels + 1]      offsets into the text blob
+    label_text  UTF-8 text blob
+
+Files are memory-mapped at serve time and exposed as numpy views, so
+bounding-box and level-of-detail queries never touch the text maps.
+
+Full-map responses are also rendered once per map version and stored next
+to the binary as <zone>.<variant>.json plus .gz and .br copies, so repeat
+requests are served straight from disk without re-serializing or
+re-compressing. brotli is in requirements.txt; without it only the .gz copy
+is written.
+"""
+
+import os
+import glob
+import gzip
+import json
+import mmap
+import time
+import struct
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+from utils.zone_map_catalog import ZoneMapCatalog, BASE_LAYER, get_zone_map_catalog
+
+logger = logging.getLogger(__name__)
+
+ZONE_MAP_CACHE_DIR = os.environ.get(
+    'ZONE_MAP_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'zone_maps')
+)
+ZONE_MAP_MAX_OPEN = int(os.environ.get('ZONE_MAP_MAX_OPEN', '64'))
+
+MAGIC = b'ZMAP'
+FORMAT_VERSION = 1
+# magic, version, reserved, n_segments, n_labels, text_bytes, source_mtime, bbox[6]
+HEADER_STRUCT = struct.Struct('<4sHHIIId6f')
+HEADER_SIZE = 64
+
+# Content-Encoding -> file suffix, in server preference order
+PRECOMPRESSED_ENCODINGS = (('br', '.br'), ('gzip', '.gz')) if BROTLI_AVAILABLE else (('gzip', '.gz'),)
+
+
+def map_version(source_mtime):
+    """Get the version string of a map built from sources with this mtime."""
+    return f"{FORMAT_VERSION}.{int(source_mtime * 1000):x}"
+
+
+def _align4(size):
+    return (size + 3) & ~3
+
+
+def read_map_text(path, encoding=None):
+    """Read a map file in its catalogued encoding (UTF-8, falling back to latin-1)."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if encoding:
+        return raw.decode(encoding)
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('latin-1')
+
+
+def parse_map_text(text):
+    """
+    Parse map text into segments and labels.
+
+    Returns:
+        Tuple of (segments, labels) where segments are
+        (x1, y1, z1, x2, y2, z2, r, g, b) and labels (x, y, z, r, g, b, size, text)
+    """
+    segments = []
+    labels = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('L '):
+            parts = line[2:].split(',')
+            if len(parts) < 9:
+                continue
+            try:
+                segments.append(tuple(float(p) for p in parts[:6]) + tuple(int(float(p)) for p in parts[6:9]))
+            except ValueError:
+                continue
+        elif line.startswith('P '):
+            parts = line[2:].split(',', 7)
+            if len(parts) < 8:
+                continue
+            try:
+                labels.append(tuple(float(p) for p in parts[:3])
+                              + tuple(int(float(p)) for p in parts[3:7])
+                              + (parts[7].strip(),))
+            except ValueError:
+                continue
+    return segments, labels
+
+
+def encode_zone_map(segments, labels, source_mtime=0.0):
+    """Pack parsed segments and labels into the binary format."""
+    seg = np.asarray([s[:6] for s in segments], dtype='<f4').reshape(-1, 6)
+    colors = np.asarray([s[6:9] for s in segments], dtype=np.int64).reshape(-1, 3).clip(0, 255).astype(np.uint8)
+    label_pos = np.asarray([l[:3] for l in labels], dtype='<f4').reshape(-1, 3)
+    label_attr = np.asarray([l[3:7] for l in labels], dtype=np.int64).reshape(-1, 4).clip(0, 255).astype(np.uint8)
+    texts = [l[7].encode('utf-8') for l in labels]
+    offsets = np.zeros(len(texts) + 1, dtype='<u4')
+    if texts:
+        offsets[1:] = np.cumsum([len(t) for t in texts])
+    blob = b''.join(texts)
+
+    if len(seg):
+        points = np.concatenate([seg[:, 0:3], seg[:, 3:6]])
+        bbox = tuple(float(v) for v in np.concatenate([points.min(axis=0), points.max(axis=0)]))
+    elif len(label_pos):
+        bbox = tuple(float(v) for v in np.concatenate([label_pos.min(axis=0), label_pos.max(axis=0)]))
+    else:
+        bbox = (0.0,) * 6
+
+    header = HEADER_STRUCT.pack(MAGIC, FORMAT_VERSION, 0, len(seg), len(label_pos), len(blob),
+                                float(source_mtime), *bbox)
+    color_bytes = colors.tobytes()
+    return b''.join([
+        header.ljust(HEADER_SIZE, b'\0'),
+        seg.tobytes(),
+        color_bytes.ljust(_align4(len(color_bytes)), b'\0'),
+        label_pos.tobytes(),
+        label_attr.tobytes(),
+        offsets.tobytes(),
+        blob
+    ])
+
+
+class ZoneMap:
+    """Memory-mapped binary zone map with bbox and level-of-detail queries."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            (magic, version, _, n_segments, n_labels, text_bytes,
+             self.source_mtime, *bbox) = HEADER_STRUCT.unpack_from(self._mmap, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported zone map file {path}")
+            self.bbox = tuple(bbox)
+
+            buf = memoryview(self._mmap)
+            pos = HEADER_SIZE
+            self.segments = np.frombuffer(buf, dtype='<f4', count=n_segments * 6, offset=pos).reshape(-1, 6)
+            pos += n_segments * 24
+            self.colors = np.frombuffer(buf, dtype=np.uint8, count=n_segments * 3, offset=pos).reshape(-1, 3)
+            pos += _align4(n_segments * 3)
+            self.label_positions = np.frombuffer(buf, dtype='<f4', count=n_labels * 3, offset=pos).reshape(-1, 3)
+            pos += n_labels * 12
+            self.label_attrs = np.frombuffer(buf, dtype=np.uint8, count=n_labels * 4, offset=pos).reshape(-1, 4)
+            pos += n_labels * 4
+            self._label_offsets = np.frombuffer(buf, dtype='<u4', count=n_labels + 1, offset=pos)
+            pos += (n_labels + 1) * 4
+            self._text_start = pos
+            self._text_bytes = text_bytes
+        except Exception:
+            self.close()
+            raise
+        self._label_texts = None
+
+    @property
+    def version(self):
+        return map_version(self.source_mtime)
+
+    @property
+    def segment_count(self):
+        return len(self.segments)
+
+    @property
+    def label_count(self):
+        return len(self.label_positions)
+
+    @property
+    def label_texts(self):
+        if self._label_texts is None:
+            blob = self._mmap[self._text_start:self._text_start + self._text_bytes]
+            offsets = self._label_offsets.tolist()
+            self._label_texts = [
+                blob[offsets[i]:offsets[i + 1]].decode('utf-8', errors='replace')
+                for i in range(len(offsets) - 1)
+            ]
+        return self._label_texts
+
+    def query_segments(self, bbox=None, lod=0):
+        """
+        Get segments intersecting a bounding box, optionally simplified.
+
+        Level of detail snaps endpoints to a grid of `lod` map units and drops
+        segments that collapse to a point or duplicate another snapped segment.
+
+        Args:
+            bbox: (min_x, min_y, max_x, max_y) or None for the whole map
+            lod: Grid size in map units (0 = full detail)
+
+        Returns:
+            Tuple of (segments float32 (n, 6), colors uint8 (n, 3))
+        """
+        segments = self.segments
+        colors = self.colors
+        if bbox is not None and len(segments):
+            min_x, min_y, max_x, max_y = bbox
+            xs = segments[:, [0, 3]]
+            ys = segments[:, [1, 4]]
+            mask = ((xs.max(axis=1) >= min_x) & (xs.min(axis=1) <= max_x)
+                    & (ys.max(axis=1) >= min_y) & (ys.min(axis=1) <= max_y))
+            segments = segments[mask]
+            colors = colors[mask]
+
+        if lod and lod > 0 and len(segments):
+            snapped = segments.copy()
+            snapped[:, [0, 1, 3, 4]] = np.round(snapped[:, [0, 1, 3, 4]] / lod) * lod
+            keep = (snapped[:, 0] != snapped[:, 3]) | (snapped[:, 1] != snapped[:, 4])
+            snapped = snapped[keep]
+            colors = colors[keep]
+            # Direction doesn't matter for dedupe: order endpoints canonically
+            a = snapped[:, [0, 1]]
+            b = snapped[:, [3, 4]]
+            swap = (a[:, 0] > b[:, 0]) | ((a[:, 0] == b[:, 0]) & (a[:, 1] > b[:, 1]))
+            key = np.where(swap[:, None], np.hstack([b, a]), np.hstack([a, b]))
+            _, first = np.unique(key, axis=0, return_index=True)
+            first.sort()
+            segments = snapped[first]
+            colors = colors[first]
+        return segments, colors
+
+    def query_labels(self, bbox=None):
+        """
+        Get labels inside a bounding box.
+
+        Returns:
+            List of (x, y, z, r, g, b, size, text) tuples
+        """
+        positions = self.label_positions
+        indexes = range(len(positions))
+        if bbox is not None and len(positions):
+            min_x, min_y, max_x, max_y = bbox
+            mask = ((positions[:, 0] >= min_x) & (positions[:, 0] <= max_x)
+                    & (positions[:, 1] >= min_y) & (positions[:, 1] <= max_y))
+            indexes = np.nonzero(mask)[0].tolist()
+        texts = self.label_texts
+        pos_list = positions.tolist()
+        attr_list = self.label_attrs.tolist()
+        return [tuple(pos_list[i]) + tuple(attr_list[i]) + (texts[i],) for i in indexes]
+
+    def close(self):
+        """Release the mapping; only for maps no other code holds."""
+        for attr in ('segments', 'colors', 'label_positions', 'label_attrs', '_label_offsets'):
+            setattr(self, attr, None)
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Views handed out earlier still export the buffer
+            pass
+
+
+class ZoneMapStore:
+    """Builds binary zone maps from Maps/*.txt and serves them memory-mapped."""
+
+    def __init__(self, catalog=None, maps_dir=None, cache_dir=ZONE_MAP_CACHE_DIR, max_open=ZONE_MAP_MAX_OPEN):
+        self.catalog = catalog or ZoneMapCatalog(maps_dir)
+        self.cache_dir = cache_dir
+        self.max_open = max_open
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'builds': 0, 'build_seconds': 0.0,
+                       'precompressed_hits': 0, 'precompressed_builds': 0}
+
+    @property
+    def maps_dir(self):
+        return self.catalog.maps_dir
+
+    def source_files(self, zone):
+        """
+        Find the catalogued text files a zone map is built from.
+
+        Lines come from <zone>.txt (falling back to _1/_2), labels from <zone>_1.txt.
+
+        Returns:
+            Tuple of (lines_info, labels_info) catalog entries; either may be None
+        """
+        entry = self.catalog.get(zone)
+        if not entry:
+            return None, None
+        layers = entry['layers']
+        lines_info = layers.get(BASE_LAYER) or layers.get('_1') or layers.get('_2')
+        return lines_info, layers.get('_1')
+
+    def source_version(self, zone):
+        """Get the current map version of a zone from the catalog (None if it has no map)."""
+        lines_info, labels_info = self.source_files(zone)
+        if not lines_info:
+            return None
+        return map_version(max(info['mtime'] for info in (lines_info, labels_info) if info))
+
+    def binary_path(self, zone):
+        return os.path.join(self.cache_dir, f"{zone.lower()}.zmap")
+
+    def response_path(self, zone, variant, version):
+        return os.path.join(self.cache_dir, f"{zone.lower()}.{variant}.{version}.json")
+
+    def _remove_responses(self, zone):
+        """Delete precompressed responses left over from older builds of a zone."""
+        for path in glob.glob(os.path.join(glob.escape(self.cache_dir), f"{glob.escape(zone.lower())}.*.json*")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get_response(self, zone, zone_map, variant, render, encoding='identity'):
+        """
+        Get the stored full-map response body for a zone, rendering it once.
+
+        The JSON body is written together with its compressed copies the first
+        time a map version is requested; later calls only read files. A file
+        removed by a concurrent rebuild of the zone is rendered again.
+
+        Args:
+            zone: Zone short name
+            zone_map: ZoneMap the response is rendered from
+            variant: Response variant name (e.g. 'legacy', 'typed')
+            render: Callable returning the JSON-serializable payload
+            encoding: Content encoding to return ('identity', 'gzip' or 'br')
+
+        Returns:
+            Response body bytes in the requested encoding
+        """
+        path = self.response_path(zone, variant, zone_map.version)
+        paths = {'identity': path}
+        paths.update({name: path + suffix for name, suffix in PRECOMPRESSED_ENCODINGS})
+        try:
+            with open(paths[encoding], 'rb') as f:
+                body = f.read()
+            with self._lock:
+                self._stats['precompressed_hits'] += 1
+            return body
+        except FileNotFoundError:
+            pass
+
+        body = json.dumps(render(), separators=(',', ':')).encode('utf-8')
+        bodies = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if BROTLI_AVAILABLE:
+            bodies['br'] = brotli.compress(body, quality=11)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        for name, target in paths.items():
+            with open(target + tmp_suffix, 'wb') as f:
+                f.write(bodies[name])
+            os.replace(target + tmp_suffix, target)
+
+        with self._lock:
+            self._stats['precompressed_builds'] += 1
+        return bodies[encoding]
+
+    def build(self, zone, lines_info=None, labels_info=None):
+        """
+        Convert a zone's text maps into the binary format.
+
+        Returns:
+            Path of the binary file, or None if the zone has no map
+        """
+        if lines_info is None and labels_info is None:
+            lines_info, labels_info = self.source_files(zone)
+        if not lines_info:
+            return None
+        start = time.time()
+        segments, _ = parse_map_text(read_map_text(lines_info['path'], lines_info['encoding']))
+        labels = []
+        source_mtime = lines_info['mtime']
+        if labels_info:
+            _, labels = parse_map_text(read_map_text(labels_info['path'], labels_info['encoding']))
+            source_mtime = max(source_mtime, labels_info['mtime'])
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._remove_responses(zone)
+        path = self.binary_path(zone)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(encode_zone_map(segments, labels, source_mtime))
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._stats['builds'] += 1
+            self._stats['build_seconds'] += time.time() - start
+        return path
+
+    def get(self, zone):
+        """
+        Get a memory-mapped zone map, building or rebuilding it when needed.
+
+        Returns:
+            ZoneMap or None if the zone has no map
+        """
+        lines_info, labels_info = self.source_files(zone)
+        if not lines_info:
+            return None
+        source_mtime = max(info['mtime'] for info in (lines_info, labels_info) if info)
+        key = zone.lower()
+
+        with self._lock:
+            zone_map = self._open.get(key)
+            if zone_map is not None and zone_map.source_mtime >= source_mtime:
+                self._open.move_to_end(key)
+                self._stats['hits'] += 1
+                return zone_map
+
+        path = self.binary_path(zone)
+        zone_map = None
+        if os.path.exists(path):
+            try:
+                zone_map = ZoneMap(path)
+                if zone_map.source_mtime < source_mtime:
+                    zone_map.close()
+                    zone_map = None
+            except Exception as e:
+                logger.warning(f"Discarding unreadable zone map {path}: {e}")
+                zone_map = None
+        if zone_map is None:
+            self.build(zone, lines_info, labels_info)
+            zone_map = ZoneMap(path)
+
+        # Evicted maps may still be in use by other requests; their mmap is
+        # released when the last reference goes away
+        with self._lock:
+            self._open[key] = zone_map
+            self._open.move_to_end(key)
+            while len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+        return zone_map
+
+    def build_all(self):
+        """
+        Build binary maps for every catalogued zone.
+
+        Returns:
+            Number of zones built
+        """
+        built = 0
+        for entry in self.catalog.list_zones():
+            try:
+                if self.build(entry['zone']):
+                    built += 1
+            except Exception as e:
+                logger.error(f"Failed to build zone map {entry['zone']}: {e}")
+        return built
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, open_maps=len(self._open),
+                        build_seconds=round(self._stats['build_seconds'], 2),
+                        encodings=[encoding for encoding, _ in PRECOMPRESSED_ENCODINGS])
+
+
+# Global instance
+_zone_map_store = None
+_zone_map_store_lock = threading.Lock()
+
+
+def get_zone_map_store():
+    """Get the singleton zone map store."""
+    global _zone_map_store
+    if _zone_map_store is None:
+        with _zone_map_store_lock:
+            if _zone_map_store is None:
+                _zone_map_store = ZoneMapStore(catalog=get_zone_map_catalog())
+    return _zone_map_store
@@ -0,0 +1,541 @@
+"""
+Precomputed per-zone NPC and drop summaries.
+
+The zone page loads every NPC spawn and every unique drop for a zone. Doing
+that per request meant a six-table DISTINCT join for the drops and a
+spawn join capped at LIMIT 500 for the NPCs, which silently cut off big
+zones. The builder here scans spawns and loot for the whole world once,
+groups them by zone and writes one gzipped JSON artifact per zone plus a
+manifest, so the zone endpoints only read (and cache) a file and slice out
+the requested page.
+
+Each build goes to its own subdirectory and the manifest names the current
+one, so a rebuild never moves files out from under a reader, and a file
+lock keeps several workers sharing the directory from building at once.
+
+The row shaping functions are shared with the endpoints' SQL fallback, which
+is used for a single zone while the artifacts are missing or being rebuilt.
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import uuid
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are only serialized within a process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ZONE_SUMMARIES_ENABLED = os.environ.get('ZONE_SUMMARIES_ENABLED', 'true').lower() == 'true'
+ZONE_SUMMARIES_MAX_AGE_HOURS = float(os.environ.get('ZONE_SUMMARIES_MAX_AGE_HOURS', '24'))
+# Minimum seconds between background build attempts (avoids hammering a failing database)
+ZONE_SUMMARIES_RETRY_SECONDS = 60
+ZONE_SUMMARIES_DIR = os.environ.get(
+    'ZONE_SUMMARIES_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'zone_summaries')
+)
+# Zone summaries kept decoded in memory
+ZONE_SUMMARIES_CACHE_ZONES = int(os.environ.get('ZONE_SUMMARIES_CACHE_ZONES', '32'))
+# Largest page the zone endpoints hand out (no limit = the whole list)
+ZONE_SUMMARY_MAX_PAGE_SIZE = 1000
+
+SUMMARY_FORMAT_VERSION = 2
+
+_ZONE_NAME_RE = re.compile(r'^[a-z0-9_]+$')
+
+_SPAWN_SELECT = """
+    SELECT DISTINCT
+        s2.zone,
+        s2.id AS spawn_id,
+        nt.id,
+        nt.name,
+        nt.lastname,
+        nt.level,
+        nt.race,
+        nt.class,
+        nt.hp,
+        nt.mana,
+        nt.AC,
+        nt.mindmg,
+        nt.maxdmg,
+        s2.x,
+        s2.y,
+        s2.z,
+        s2.heading,
+        s2.respawntime,
+        s2.variance,
+        s2.pathgrid,
+        sg.name AS spawngroup_name,
+        se.chance AS spawn_chance
+    FROM npc_types nt
+    INNER JOIN spawnentry se ON nt.id = se.npcID
+    INNER JOIN spawn2 s2 ON se.spawngroupID = s2.spawngroupID
+    LEFT JOIN spawngroup sg ON s2.spawngroupID = sg.id
+"""
+
+_DROP_SELECT = """
+    SELECT DISTINCT
+        s2.zone,
+        nt.id AS npc_id,
+        items.id,
+        items.Name,
+        items.icon,
+        items.itemtype,
+        lte.probability,
+        lde.chance
+    FROM spawn2 s2
+    JOIN spawnentry se ON s2.spawngroupID = se.spawngroupID
+    JOIN npc_types nt ON se.npcID = nt.id
+    JOIN loottable_entries lte ON nt.loottable_id = lte.loottable_id
+    JOIN lootdrop_entries lde ON lte.lootdrop_id = lde.lootdrop_id
+    JOIN items ON lde.item_id = items.id
+    WHERE nt.loottable_id > 0
+      AND items.Name IS NOT NULL
+      AND items.Name != ''
+"""
+
+ZONE_SPAWNS_QUERY = _SPAWN_SELECT + "    WHERE s2.zone = %s\n"
+ZONE_DROPS_QUERY = _DROP_SELECT + "      AND s2.zone = %s\n"
+ALL_SPAWNS_QUERY = _SPAWN_SELECT
+ALL_DROPS_QUERY = _DROP_SELECT
+ALL_ZONES_QUERY = "SELECT short_name FROM zone"
+
+
+def _rows_as_dicts(cursor, rows):
+    if rows and not isinstance(rows[0], dict):
+        columns = [desc[0] for desc in cursor.description]
+        return [dict(zip(columns, row)) for row in rows]
+    return rows
+
+
+def _float(value):
+    return float(value) if value is not None else 0
+
+
+def format_zone_npc(row):
+    """Shape one spawn row the way the zone NPC list expects it."""
+    name = row['name'].replace('_', ' ') if row.get('name') else 'Unknown NPC'
+    lastname = row.get('lastname', '') or ''
+    return {
+        'id': row['id'],
+        'name': name,
+        'lastname': lastname,
+        'full_name': (name + ' ' + lastname).strip(),
+        'level': row.get('level', 1),
+        'race': row.get('race', 0),
+        'class': row.get('class', 0),
+        'hp': row.get('hp', 0),
+        'mana': row.get('mana', 0),
+        'ac': row.get('AC', 0),
+        'mindmg': row.get('mindmg', 0),
+        'maxdmg': row.get('maxdmg', 0),
+        'location': {
+            'x': _float(row.get('x')),
+            'y': _float(row.get('y')),
+            'z': _float(row.get('z')),
+            'heading': _float(row.get('heading'))
+        },
+        'spawn_info': {
+            'respawn_time': row.get('respawntime', 0),
+            'variance': row.get('variance', 0),
+            'spawn_chance': row.get('spawn_chance', 100),
+            'spawngroup': row.get('spawngroup_name', '') or '',
+            'pathgrid': row.get('pathgrid', 0)
+        }
+    }
+
+
+def summarize_npcs(rows):
+    """Format and order spawn rows (highest level first, then by name)."""
+    npcs = [format_zone_npc(row) for row in rows]
+    npcs.sort(key=lambda npc: (-(npc['level'] or 0), npc['name'], npc['id']))
+    return npcs
+
+
+def summarize_items(rows):
+    """
+    Collapse drop rows into one entry per item.
+
+    Each item keeps its best per-kill drop chance in the zone
+    (chance * probability / 100, as in the item drop sources) and the number
+    of NPCs in the zone that drop it.
+    """
+    items = {}
+    npcs_by_item = {}
+    for row in rows:
+        item_id = row['id']
+        drop_chance = round(float(row.get('chance') or 0) * float(row.get('probability') or 0) / 100, 2)
+        item = items.get(item_id)
+        if item is None:
+            item = items[item_id] = {
+                'id': item_id,
+                'name': row['Name'],
+                'icon': row.get('icon') or 0,
+                'item_type': row.get('itemtype') or 0,
+                'drop_chance': drop_chance
+            }
+        else:
+            item['drop_chance'] = max(item['drop_chance'], drop_chance)
+        npcs_by_item.setdefault(item_id, set()).add(row['npc_id'])
+    for item_id, item in items.items():
+        item['npc_count'] = len(npcs_by_item[item_id])
+    return sorted(items.values(), key=lambda item: (item['name'], item['id']))
+
+
+def fetch_zone_npcs(cursor, zone):
+    """Query and summarize one zone's spawns (fallback while artifacts build)."""
+    cursor.execute(ZONE_SPAWNS_QUERY, (zone,))
+    return summarize_npcs(_rows_as_dicts(cursor, cursor.fetchall()))
+
+
+def fetch_zone_items(cursor, zone):
+    """Query and summarize one zone's drops (fallback while artifacts build)."""
+    cursor.execute(ZONE_DROPS_QUERY, (zone,))
+    return summarize_items(_rows_as_dicts(cursor, cursor.fetchall()))
+
+
+def parse_zone_page_args(args):
+    """
+    Read limit/offset paging args for zone lists.
+
+    Returns:
+        Tuple of (limit, offset); limit is None when the whole list is wanted
+
+    Raises:
+        ValueError: If the values aren't valid integers in range
+    """
+    try:
+        limit = int(args['limit']) if args.get('limit') else None
+        offset = int(args.get('offset', 0) or 0)
+    except ValueError:
+        raise ValueError('limit and offset must be integers')
+    if limit is not None and not 1 <= limit <= ZONE_SUMMARY_MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {ZONE_SUMMARY_MAX_PAGE_SIZE}')
+    if offset < 0:
+        raise ValueError('offset must not be negative')
+    return limit, offset
+
+
+def zone_page_of(rows, limit, offset):
+    """Slice one page out of a full list."""
+    return rows[offset:offset + limit] if limit is not None else rows[offset:]
+
+
+class ZoneSummaryStore:
+    """Per-zone NPC/drop summary artifacts with background rebuilds and a small decoded-zone LRU."""
+
+    def __init__(self, directory=ZONE_SUMMARIES_DIR, max_age_hours=ZONE_SUMMARIES_MAX_AGE_HOURS,
+                 cache_zones=ZONE_SUMMARIES_CACHE_ZONES):
+        self.directory = directory
+        self.max_age_seconds = max_age_hours * 3600
+        self.cache_zones = cache_zones
+        self._lock = threading.Lock()
+        self._build_thread = None
+        self._last_build_attempt = 0
+        self._loaded_from_disk = False
+        self._reset()
+
+    def _reset(self):
+        # short_name -> [npc_count, item_count] for every known zone
+        self._zones = {}
+        self._cache = OrderedDict()
+        self.built_at = None
+        self.build_seconds = None
+        self.version_tag = None
+        self.build_id = None
+        self.last_error = None
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, 'manifest.json')
+
+    def zone_path(self, zone, build_id=None):
+        return os.path.join(self.directory, build_id or self.build_id or '', f"{zone}.json.gz")
+
+    @property
+    def ready(self):
+        """Whether zone lists can be served from the artifacts."""
+        return self.built_at is not None
+
+    def is_fresh(self, version_tag=None):
+        """Whether the artifacts are built, recent and built from the given database."""
+        if not self.ready:
+            return False
+        if version_tag is not None and version_tag != self.version_tag:
+            return False
+        return time.time() - self.built_at < self.max_age_seconds
+
+    def build(self, conn, version_tag=None):
+        """
+        Scan spawns and drops for every zone and write the per-zone artifacts.
+
+        Artifacts are written to a new build subdirectory and the manifest is
+        switched to it once complete, so readers never see a half-built set.
+        The previous build is kept for workers still reading it. Callers
+        sharing the directory across processes should hold build_lock().
+        """
+        start = time.time()
+        build_id = f"{int(start)}-{uuid.uuid4().hex[:8]}"
+        cursor = conn.cursor()
+        spawns_by_zone = {}
+        drops_by_zone = {}
+        try:
+            cursor.execute(ALL_ZONES_QUERY)
+            known_zones = {
+                ((row['short_name'] if isinstance(row, dict) else row[0]) or '').lower()
+                for row in cursor.fetchall()
+            }
+            cursor.execute(ALL_SPAWNS_QUERY)
+            for row in _rows_as_dicts(cursor, cursor.fetchall()):
+                spawns_by_zone.setdefault((row['zone'] or '').lower(), []).append(row)
+            cursor.execute(ALL_DROPS_QUERY)
+            for row in _rows_as_dicts(cursor, cursor.fetchall()):
+                drops_by_zone.setdefault((row['zone'] or '').lower(), []).append(row)
+        finally:
+            cursor.close()
+
+        staging = os.path.join(self.directory, f"{build_id}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        zones = {}
+        for zone in sorted(known_zones | set(spawns_by_zone) | set(drops_by_zone)):
+            if not _ZONE_NAME_RE.match(zone):
+                continue
+            npcs = summarize_npcs(spawns_by_zone.get(zone, ()))
+            items = summarize_items(drops_by_zone.get(zone, ()))
+            zones[zone] = [len(npcs), len(items)]
+            if npcs or items:
+                with gzip.open(os.path.join(staging, f"{zone}.json.gz"), 'wt', encoding='utf-8') as f:
+                    json.dump({'npcs': npcs, 'items': items}, f, separators=(',', ':'))
+
+        built_at = time.time()
+        build_seconds = round(built_at - start, 2)
+        os.replace(staging, os.path.join(self.directory, build_id))
+
+        previous = self._read_manifest()
+        manifest = {
+            'format': SUMMARY_FORMAT_VERSION,
+            'build': build_id,
+            'built_at': built_at,
+            'build_seconds': build_seconds,
+            'version_tag': version_tag,
+            'zones': zones
+        }
+        manifest_staging = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(manifest_staging, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, separators=(',', ':'))
+        os.replace(manifest_staging, self.manifest_path)
+        self._apply_manifest(manifest)
+        self.last_error = None
+        self._prune({build_id, previous.get('build') if previous else None})
+        logger.info(f"Zone summaries built: {len(zones)} zones in {build_seconds}s")
+
+    def _prune(self, keep):
+        """Remove old builds and abandoned staging directories."""
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name not in keep and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    @contextmanager
+    def build_lock(self):
+        """Hold the directory's build lock (blocks while another worker builds)."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, 'build.lock'), 'a') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def build_in_background(self, connection_factory, version_tag=None):
+        """
+        Rebuild the artifacts in a daemon thread unless a build is already running.
+
+        Args:
+            connection_factory: Callable returning (conn, db_type, error), e.g. get_eqemu_db_connection
+            version_tag: Identifier of the content database
+        """
+        with self._lock:
+            if self._build_thread and self._build_thread.is_alive():
+                return False
+            if time.time() - self._last_build_attempt < ZONE_SUMMARIES_RETRY_SECONDS:
+                return False
+            self._last_build_attempt = time.time()
+            self._build_thread = threading.Thread(
+                target=self._build_worker, args=(connection_factory, version_tag),
+                name='zone-summary-build', daemon=True
+            )
+            self._build_thread.start()
+        return True
+
+    def _build_worker(self, connection_factory, version_tag):
+        conn = None
+        try:
+            with self.build_lock():
+                # Another worker may have finished a build while we waited
+                manifest = self._read_manifest()
+                if manifest and manifest.get('version_tag') == version_tag \
+                        and time.time() - manifest['built_at'] < self.max_age_seconds:
+                    self._apply_manifest(manifest)
+                    logger.info("Zone summaries already rebuilt by another worker")
+                    return
+                conn, db_type, error = connection_factory()
+                if not conn:
+                    raise Exception(error or 'Database not configured')
+                self.build(conn, version_tag)
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Failed to build zone summaries: {e}")
+        finally:
+            if conn:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def invalidate(self):
+        """Forget the current artifacts (content database changed)."""
+        with self._lock:
+            self._reset()
+            self._last_build_attempt = 0
+        logger.info("Zone summaries invalidated")
+
+    def load(self):
+        """
+        Load the manifest of previously built artifacts.
+
+        Returns:
+            True if a manifest was loaded
+        """
+        self._loaded_from_disk = True
+        manifest = self._read_manifest()
+        if manifest is None:
+            return False
+        self._apply_manifest(manifest)
+        logger.info(f"Loaded zone summary manifest from {self.manifest_path} ({len(self._zones)} zones)")
+        return True
+
+    def _read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return None
+        try:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load zone summary manifest from {self.manifest_path}: {e}")
+            return None
+        return manifest if manifest.get('format') == SUMMARY_FORMAT_VERSION else None
+
+    def _apply_manifest(self, manifest):
+        with self._lock:
+            self._zones = manifest['zones']
+            self._cache.clear()
+            self.built_at = manifest['built_at']
+            self.build_seconds = manifest.get('build_seconds')
+            self.version_tag = manifest.get('version_tag')
+            self.build_id = manifest['build']
+
+    def ensure_fresh(self, connection_factory, version_tag=None):
+        """
+        Make sure the artifacts are usable, scheduling a background rebuild if not.
+
+        Loads the persisted manifest on first use. Never blocks on a rebuild.
+
+        Returns:
+            True if zone lists can be served from the artifacts right now
+        """
+        if not self._loaded_from_disk and not self.ready:
+            self.load()
+        if self.ready and version_tag is not None and self.version_tag != version_tag:
+            self.invalidate()
+        if not self.is_fresh(version_tag):
+            self.build_in_background(connection_factory, version_tag)
+        return self.ready
+
+    def get_zone(self, zone):
+        """
+        Get a zone's summary.
+
+        Returns:
+            Dict with 'npcs' and 'items' lists (empty for zones without spawns),
+            or None if the zone is unknown
+
+        Raises:
+            OSError: If the zone's artifact is gone even after picking up the
+                current manifest (callers fall back to the database)
+        """
+        with self._lock:
+            counts = self._zones.get(zone)
+            if counts is None:
+                return None
+            cached = self._cache.get(zone)
+            if cached is not None:
+                self._cache.move_to_end(zone)
+                return cached
+            build_id = self.build_id
+        if not any(counts):
+            return {'npcs': [], 'items': []}
+
+        try:
+            summary = self._read_zone(zone, build_id)
+        except FileNotFoundError:
+            # Another worker rebuilt and pruned the build this one was reading
+            if not self.load() or self.build_id == build_id:
+                raise
+            return self.get_zone(zone)
+        with self._lock:
+            if self.build_id != build_id:
+                return summary
+            self._cache[zone] = summary
+            while len(self._cache) > self.cache_zones:
+                self._cache.popitem(last=False)
+        return summary
+
+    def _read_zone(self, zone, build_id):
+        with gzip.open(self.zone_path(zone, build_id), 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    def get_status(self):
+        """Get build/freshness information for admin pages."""
+        with self._lock:
+            building = bool(self._build_thread and self._build_thread.is_alive())
+            return {
+                'ready': self.ready,
+                'building': building,
+                'built_at': self.built_at,
+                'age_seconds': round(time.time() - self.built_at, 1) if self.built_at else None,
+                'build_seconds': self.build_seconds,
+                'zones': len(self._zones),
+                'cached_zones': len(self._cache),
+                'directory': self.directory,
+                'build': self.build_id,
+                'last_error': self.last_error
+            }
+
+
+# Global instance
+_zone_summary_store = None
+_zone_summary_store_lock = threading.Lock()
+
+
+def get_zone_summary_store():
+    """Get the singleton zone summary store."""
+    global _zone_summary_store
+    if _zone_summary_store is None:
+        with _zone_summary_store_lock:
+            if _zone_summary_store is None:
+                _zone_summary_store = ZoneSummaryStore()
+    return _zone_summary_store
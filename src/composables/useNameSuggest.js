@@ -0,0 +1,96 @@
+/**
+ * Composable for search-box typeahead backed by /api/suggest
+ *
+ * Suggestions come from the backend's in-memory name index, so they are cheap
+ * enough to fetch while typing. The full search endpoints are still used for
+ * submitting a search and for paging through results.
+ */
+
+import { ref, onUnmounted } from 'vue'
+import axios from 'axios'
+import { getApiBaseUrl } from '../config/api'
+
+export function useNameSuggest(type, { limit = 8, delay = 150, minLength = 2 } = {}) {
+  const suggestions = ref([])
+  const showSuggestions = ref(false)
+  const activeSuggestion = ref(-1)
+
+  let debounceTimer = null
+  let requestId = 0
+
+  const clearSuggestions = () => {
+    clearTimeout(debounceTimer)
+    requestId++
+    suggestions.value = []
+    showSuggestions.value = false
+    activeSuggestion.value = -1
+  }
+
+  const fetchSuggestions = async (query, currentId) => {
+    try {
+      const response = await axios.get(`${getApiBaseUrl()}/api/suggest`, {
+        params: { q: query, types: type, limit },
+        timeout: 5000
+      })
+      // Drop responses for text the user has already typed past
+      if (currentId !== requestId) return
+      suggestions.value = response.data.suggestions?.[type] || []
+      showSuggestions.value = suggestions.value.length > 0
+      activeSuggestion.value = -1
+    } catch (error) {
+      if (currentId === requestId) {
+        suggestions.value = []
+        showSuggestions.value = false
+      }
+    }
+  }
+
+  const onSuggestInput = (value) => {
+    const query = (value || '').trim()
+    clearTimeout(debounceTimer)
+    requestId++
+    if (query.length < minLength) {
+      suggestions.value = []
+      showSuggestions.value = false
+      activeSuggestion.value = -1
+      return
+    }
+    const currentId = requestId
+    debounceTimer = setTimeout(() => fetchSuggestions(query, currentId), delay)
+  }
+
+  const moveSuggestion = (step) => {
+    if (!showSuggestions.value || suggestions.value.length === 0) return
+    const count = suggestions.value.length
+    activeSuggestion.value = (activeSuggestion.value + step + count) % count
+  }
+
+  // The highlighted suggestion, if the user arrowed onto one
+  const selectedSuggestion = () => {
+    if (!showSuggestions.value) return null
+    return suggestions.value[activeSuggestion.value] || null
+  }
+
+  // Close on blur after a short delay so a click on a suggestion still lands
+  const hideSuggestionsSoon = () => {
+    setTimeout(() => {
+      showSuggestions.value = false
+      activeSuggestion.value = -1
+    }, 150)
+  }
+
+  onUnmounted(() => {
+    clearTimeout(debounceTimer)
+  })
+
+  return {
+    suggestions,
+    showSuggestions,
+    activeSuggestion,
+    onSuggestInput,
+    moveSuggestion,
+    selectedSuggestion,
+    clearSuggestions,
+    hideSuggestionsSoon
+  }
+}